@@ -0,0 +1,70 @@
+"""
+音声合成の音声（WAV）をクライアントに送信する際のコーデック毎の「音声1秒あたりのバイト数」とエンコードのCPU時間を比較するベンチマーク。 \n
+バイト数はバイナリフレームで送信する場合（圧縮後のサイズ）と、JSONで送信する場合（Base64エンコード後のサイズ）の両方を表示する。 \n
+--wav を指定しない場合は発話らしい音声を合成した1文分（約3秒）のWAVを使用する。 \n
+
+実行方法: PYTHONPATH=src uv run python -m benchmarks.bench_audio_egress --wav tts.wav
+"""
+
+import argparse
+import io
+import time
+import wave
+from pathlib import Path
+from typing import get_args
+
+import numpy as np
+
+from benchmarks.bench_voice_activity_gate import synthesize_speech
+from domain.audio_encoder import AudioCodec, encode_wav
+
+
+def create_sentence_wav(seconds: float, sample_rate: int) -> bytes:
+    count = int(seconds * sample_rate)
+    samples = synthesize_speech(count, np.random.default_rng(0))
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(sample_rate)
+        writer.writeframes(samples.clip(-32768, 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--wav", type=Path)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--sample-rate", type=int, default=24000)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    wav = (
+        args.wav.read_bytes()
+        if args.wav
+        else create_sentence_wav(args.seconds, args.sample_rate)
+    )
+
+    print(
+        f"{'codec':>5} {'bytes/s':>9} {'base64 bytes/s':>15} {'ratio':>6} "
+        f"{'cpu ms/s':>9} {'wall ms/sentence':>17}"
+    )
+    for codec in get_args(AudioCodec):
+        started_at = time.perf_counter()
+        for _ in range(args.iterations):
+            encoded = encode_wav(wav, codec)
+        wall_ms = (time.perf_counter() - started_at) / args.iterations * 1000
+
+        seconds = encoded["duration_seconds"]
+        size = len(encoded["data"])
+        # Base64は3バイト毎に4文字になる
+        base64_size = (size + 2) // 3 * 4
+        print(
+            f"{codec:>5} {size / seconds:>9.0f} {base64_size / seconds:>15.0f} "
+            f"{size / len(wav):>6.1%} {encoded['cpu_seconds'] / seconds * 1000:>9.2f} "
+            f"{wall_ms:>17.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+クライアントから受信する音声の形式（?audioInputEncoding / ?audioInputSampleRate）毎の「音声1秒あたりの受信バイト数」と、
+16kHzのPCMへの変換（AudioDecoder）のCPU時間を比較するベンチマーク。 \n
+バイト数はバイナリフレームで送信する場合と、JSONで送信する場合（Base64エンコード後のサイズ）の両方を表示する。 \n
+音声はAudioWorkletと同じ長さのチャンクに分割して変換する。 \n
+
+実行方法: PYTHONPATH=src uv run python -m benchmarks.bench_audio_ingress
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.bench_voice_activity_gate import CHUNK_SECONDS, synthesize_speech
+from domain.audio_decoder import G711_TABLES, AudioDecoder, AudioInputFormat
+
+INPUT_FORMATS = [
+    AudioInputFormat(encoding="pcm16", sample_rate=16000),
+    AudioInputFormat(encoding="pcm16", sample_rate=24000),
+    AudioInputFormat(encoding="pcm16", sample_rate=48000),
+    AudioInputFormat(encoding="mulaw", sample_rate=8000),
+    AudioInputFormat(encoding="alaw", sample_rate=8000),
+    AudioInputFormat(encoding="mulaw", sample_rate=16000),
+]
+
+
+def encode_input(samples: np.ndarray, input_format: AudioInputFormat) -> bytes:
+    """PCMをクライアントが送信する形式にする（G.711 は変換表で最も近い符号を選ぶ）"""
+    pcm = samples.clip(-32768, 32767).astype(np.int16)
+    table = G711_TABLES.get(input_format["encoding"])
+    if table is None:
+        return pcm.astype("<i2").tobytes()
+
+    order = np.argsort(table)
+    sorted_table = table[order].astype(np.int32)
+    index = np.searchsorted(sorted_table, pcm).clip(1, len(table) - 1)
+    nearer_lower = pcm - sorted_table[index - 1] < sorted_table[index] - pcm
+    return order[index - nearer_lower].astype(np.uint8).tobytes()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=30.0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(
+        f"{'format':>12} {'bytes/s':>9} {'base64 bytes/s':>15} {'ratio':>6} "
+        f"{'cpu ms/s':>9}"
+    )
+    baseline = None
+    for input_format in INPUT_FORMATS:
+        sample_rate = input_format["sample_rate"]
+        data = encode_input(
+            synthesize_speech(int(args.seconds * sample_rate), rng), input_format
+        )
+        chunk_size = int(len(data) / args.seconds * CHUNK_SECONDS)
+
+        decoder = AudioDecoder(input_format)
+        started_at = time.thread_time()
+        for offset in range(0, len(data), chunk_size):
+            decoder.decode(data[offset : offset + chunk_size])
+        cpu_seconds = time.thread_time() - started_at
+
+        size = len(data) / args.seconds
+        baseline = baseline or size
+        # Base64は3バイト毎に4文字になる
+        base64_size = (size + 2) // 3 * 4
+        name = f"{input_format['encoding']}/{sample_rate // 1000}k"
+        print(
+            f"{name:>12} {size:>9.0f} {base64_size:>15.0f} {size / baseline:>6.1%} "
+            f"{cpu_seconds / args.seconds * 1000:>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+コールドスタート（fly.toml の auto_stop_machines で停止したマシンの起動）の所要時間を計測するベンチマーク。 \n
+- import: 新しいPythonのプロセスで main（アプリケーション全体）のimportに掛かる時間 \n
+- first websocket: サーバーのプロセスを起動してから /realtime-apis/video-chat の接続が受け入れられるまでの時間 \n
+- ready: サーバーのプロセスを起動してから /ready が200を返すまでの時間 \n
+サーバーは負荷試験と同じく外部APIをテストダブルに差し替えた video_chat_load_server を使う。 \n
+計測値が --max-import-seconds / --max-first-websocket-seconds を超えた場合は終了コード1で終了するので、起動時間の劣化の検出に使える。 \n
+
+実行方法: PYTHONPATH=src uv run python -m benchmarks.bench_cold_start --runs 5
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+from websockets.asyncio.client import connect
+
+from benchmarks.bench_video_chat_load import find_free_port
+
+IMPORT_SCRIPT = (
+    "import time; started_at = time.perf_counter(); import main; "
+    "print(time.perf_counter() - started_at)"
+)
+# サーバーの起動を待つ時間の上限（秒）
+STARTUP_TIMEOUT_SECONDS = 30.0
+POLL_INTERVAL_SECONDS = 0.005
+
+
+def measure_import_seconds() -> float:
+    """新しいプロセスで main をimportする時間（Pythonの起動時間は含まない）"""
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT],
+        capture_output=True,
+        check=True,
+        env={**os.environ, "PYTHONPATH": "src"},
+    )
+    return float(result.stdout.decode().strip().splitlines()[-1])
+
+
+def slowest_imports(limit: int) -> list[tuple[str, float]]:
+    """-X importtime の結果から、importに時間の掛かったトップレベルのパッケージを返す"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True,
+        check=True,
+        env={**os.environ, "PYTHONPATH": "src"},
+    )
+    self_seconds: dict[str, float] = {}
+    for line in result.stderr.decode().splitlines():
+        # 形式: "import time: {self [us]} | {cumulative [us]} | {imported package}"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, _, package = line.removeprefix("import time:").split("|")
+        name = package.strip().split(".")[0]
+        self_seconds[name] = self_seconds.get(name, 0.0) + int(self_us) / 1e6
+    return sorted(self_seconds.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+async def measure_server_start(port: int) -> tuple[float, float]:
+    """サーバーを起動し、(最初のWebSocketが受け入れられるまでの時間, /ready が200を返すまでの時間) を返す"""
+    started_at = time.perf_counter()
+    server = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-m",
+        "benchmarks.video_chat_load_server",
+        f"--port={port}",
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    try:
+        first_websocket_seconds = None
+        deadline = started_at + STARTUP_TIMEOUT_SECONDS
+        while first_websocket_seconds is None:
+            if server.returncode is not None or time.perf_counter() > deadline:
+                raise SystemExit("サーバーの起動に失敗しました")
+            try:
+                async with connect(f"ws://127.0.0.1:{port}/realtime-apis/video-chat"):
+                    first_websocket_seconds = time.perf_counter() - started_at
+            except OSError:
+                await asyncio.sleep(POLL_INTERVAL_SECONDS)
+
+        async with httpx.AsyncClient() as client:
+            while (
+                await client.get(f"http://127.0.0.1:{port}/ready")
+            ).status_code != 200:
+                if time.perf_counter() > deadline:
+                    raise SystemExit("サーバーが ready になりませんでした")
+                await asyncio.sleep(POLL_INTERVAL_SECONDS)
+        return first_websocket_seconds, time.perf_counter() - started_at
+    finally:
+        server.terminate()
+        try:
+            await asyncio.wait_for(server.wait(), timeout=10)
+        except TimeoutError:
+            server.kill()
+            await server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top-imports", type=int, default=8)
+    parser.add_argument("--max-import-seconds", type=float, default=1.0)
+    parser.add_argument("--max-first-websocket-seconds", type=float, default=2.5)
+    args = parser.parse_args()
+
+    import_seconds = [measure_import_seconds() for _ in range(args.runs)]
+    server_starts = [
+        asyncio.run(measure_server_start(find_free_port())) for _ in range(args.runs)
+    ]
+    first_websocket_seconds = [first for first, _ in server_starts]
+    ready_seconds = [ready for _, ready in server_starts]
+
+    print(f"runs: {args.runs} (median / max)")
+    for name, values in [
+        ("import main", import_seconds),
+        ("first websocket", first_websocket_seconds),
+        ("ready", ready_seconds),
+    ]:
+        print(
+            f"{name:>16}: {statistics.median(values) * 1000:7.0f}ms "
+            f"/ {max(values) * 1000:7.0f}ms"
+        )
+    print("slowest imports (self time per top-level package):")
+    for name, seconds in slowest_imports(args.top_imports):
+        print(f"{name:>16}: {seconds * 1000:7.0f}ms")
+
+    failures = []
+    if statistics.median(import_seconds) > args.max_import_seconds:
+        failures.append(
+            f"importの時間 {statistics.median(import_seconds):.3f}秒 が "
+            f"{args.max_import_seconds}秒 を超えました"
+        )
+    if statistics.median(first_websocket_seconds) > args.max_first_websocket_seconds:
+        failures.append(
+            f"最初のWebSocketの接続までの時間 {statistics.median(first_websocket_seconds):.3f}秒 が "
+            f"{args.max_first_websocket_seconds}秒 を超えました"
+        )
+    for failure in failures:
+        print(f"REGRESSION: {failure}", file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+画像の縮小・再圧縮（ImageNormalizer）で削減できるバイト数と、追加される処理時間を解像度毎に計測するベンチマーク。 \n
+カメラ映像に近い、滑らかなグラデーションに細かいノイズを乗せた画像を合成して使用する。 \n
+
+実行方法: PYTHONPATH=src uv run python -m benchmarks.bench_image_normalizer
+"""
+
+import argparse
+import asyncio
+import io
+import time
+
+import numpy as np
+from PIL import Image
+
+from domain.image_normalizer import (
+    DEFAULT_JPEG_QUALITY,
+    DEFAULT_MAX_EDGE,
+    ImageNormalizer,
+    shutdown_image_executor,
+)
+
+RESOLUTIONS = [(320, 240), (640, 480), (1280, 720), (1920, 1080)]
+
+
+def synthesize_frame(width: int, height: int, seed: int) -> bytes:
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width]
+    pixels = np.stack(
+        [x * 255 / width, y * 255 / height, (x + y) * 127 / (width + height)], axis=-1
+    )
+    pixels += rng.normal(0, 6, size=pixels.shape)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels.clip(0, 255).astype(np.uint8)).save(
+        buffer, format="JPEG", quality=92
+    )
+    return buffer.getvalue()
+
+
+async def measure(
+    frames: list[bytes], normalizer: ImageNormalizer
+) -> tuple[int, list[float]]:
+    output_bytes = 0
+    latencies = []
+    for frame in frames:
+        started_at = time.perf_counter()
+        normalized = await normalizer.normalize(frame)
+        latencies.append(time.perf_counter() - started_at)
+        output_bytes += len(normalized or b"")
+    return output_bytes, latencies
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--max-edge", type=int, default=DEFAULT_MAX_EDGE)
+    parser.add_argument("--quality", type=int, default=DEFAULT_JPEG_QUALITY)
+    args = parser.parse_args()
+
+    print(
+        f"{'resolution':>12} {'input KiB':>10} {'output KiB':>11} {'ratio':>7} "
+        f"{'p50 ms':>8} {'p99 ms':>8}"
+    )
+    for width, height in RESOLUTIONS:
+        frames = [synthesize_frame(width, height, seed) for seed in range(args.frames)]
+        normalizer = ImageNormalizer(max_edge=args.max_edge, quality=args.quality)
+        output_bytes, latencies = await measure(frames, normalizer)
+
+        input_bytes = sum(len(frame) for frame in frames)
+        latencies_ms = np.array(latencies) * 1000
+        print(
+            f"{f'{width}x{height}':>12} "
+            f"{input_bytes / len(frames) / 1024:>10.1f} "
+            f"{output_bytes / len(frames) / 1024:>11.1f} "
+            f"{output_bytes / input_bytes * 100:>6.1f}% "
+            f"{np.percentile(latencies_ms, 50):>8.2f} "
+            f"{np.percentile(latencies_ms, 99):>8.2f}"
+        )
+
+    shutdown_image_executor()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
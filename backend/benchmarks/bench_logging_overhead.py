@@ -0,0 +1,140 @@
+"""
+WebSocketの1メッセージ毎に出力するログの、呼び出し元（イベントループ）での処理時間を計測するベンチマーク。 \n
+Geminiの応答の part を1件ずつログに出力する処理を再現し、以下を比較する。 \n
+- before: 変更前の実装（同期の StreamHandler で record.__dict__ を丸ごとJSONにし、f-stringで書式化する） \n
+- queue: キューに積むだけのハンドラーで、書式化と書き込みはリスナーのスレッドで行う \n
+- queue+sampling: さらに part 毎のログをサンプリングする \n
+
+実行方法: PYTHONPATH=src uv run python -m benchmarks.bench_logging_overhead
+"""
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import TextIO
+
+import numpy as np
+from google.genai import types
+
+from log.logger import (
+    configure_logging,
+    flush_logs,
+    get_log_stats,
+    get_sampled_logger,
+)
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-api-key")
+
+from presentation.controller.video_chat_controller import (
+    PART_LOG_SAMPLE_EVERY,
+)
+
+
+class LegacyJsonFormatter(logging.Formatter):
+    """変更前の JsonFormatter"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        try:
+            data = record.__dict__.copy()
+            exc_info = data.pop("exc_info")
+            if exc_info:
+                data["traceback"] = self.formatException(exc_info).splitlines()
+            return json.dumps(data, ensure_ascii=False)
+        except (TypeError, ValueError):
+            return super().format(record)
+
+
+def create_parts(count: int) -> list[types.Part]:
+    """テキストの part と、時々インラインの音声データを含む part を作成する"""
+    parts = []
+    for i in range(count):
+        if i % 10 == 9:
+            parts.append(
+                types.Part(
+                    inline_data=types.Blob(mime_type="audio/pcm", data=bytes(4096))
+                )
+            )
+        else:
+            parts.append(
+                types.Part(text=f"こんにちはだにゃん🐱 {i}回目のメッセージだにゃん")
+            )
+    return parts
+
+
+def run_before(parts: list[types.Part], stream: TextIO) -> list[float]:
+    logger = logging.getLogger()
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(LegacyJsonFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+    elapsed = []
+    for part in parts:
+        started_at = time.perf_counter()
+        logger.info(f"part: {part}")
+        elapsed.append(time.perf_counter() - started_at)
+
+    logger.removeHandler(handler)
+    return elapsed
+
+
+def run_queue(parts: list[types.Part], logger: logging.Logger) -> list[float]:
+    elapsed = []
+    for part in parts:
+        started_at = time.perf_counter()
+        logger.info("part: %s", part)
+        elapsed.append(time.perf_counter() - started_at)
+    return elapsed
+
+
+def report(name: str, elapsed: list[float], extra: str = "") -> None:
+    elapsed_us = np.array(elapsed) * 1_000_000
+    print(
+        f"{name:>15} {elapsed_us.mean():>9.2f} {np.percentile(elapsed_us, 50):>8.2f} "
+        f"{np.percentile(elapsed_us, 99):>8.2f} {extra}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=20000)
+    args = parser.parse_args()
+
+    parts = create_parts(args.messages)
+    print(f"messages: {args.messages} (10% are 4KiB inline audio parts)")
+    print(f"{'mode':>15} {'mean us':>9} {'p50 us':>8} {'p99 us':>8}")
+
+    with tempfile.TemporaryFile("w+", encoding="utf-8") as stream:
+        report("before", run_before(parts, stream))
+
+        configure_logging(stream=stream)
+        started_at = time.perf_counter()
+        elapsed = run_queue(parts, logging.getLogger())
+        flush_logs()
+        drain = time.perf_counter() - started_at
+        stats = get_log_stats()
+        report(
+            "queue",
+            elapsed,
+            f"(written by listener in {drain:.2f}s, dropped: {stats['dropped']})",
+        )
+
+        configure_logging(stream=stream)
+        sampled_logger = get_sampled_logger("bench.part", PART_LOG_SAMPLE_EVERY)
+        elapsed = run_queue(parts, sampled_logger)
+        flush_logs()
+        report(
+            "queue+sampling",
+            elapsed,
+            f"(1 in {PART_LOG_SAMPLE_EVERY}, sampled out: "
+            f"{get_log_stats()['sampled_out']})",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+ビデオチャットのメトリクスの計測処理の負荷を計測するベンチマーク。 \n
+WebSocketの1メッセージ毎に呼び出す処理（スパンの観測、最初の応答の判定）と、/metrics の出力にかかる時間を計測する。 \n
+
+実行方法: PYTHONPATH=src uv run python -m benchmarks.bench_metrics_overhead
+"""
+
+import argparse
+import logging
+import time
+from collections.abc import Callable
+
+from log.metrics import metrics_registry
+from presentation.video_chat_metrics import SessionMetrics
+
+SPANS = (
+    "websocket_message",
+    "gemini_send_audio",
+    "gemini_send_image",
+    "gemini_message",
+    "tts",
+)
+
+
+def measure_ns(operation_count: int, operation: Callable[[], object]) -> float:
+    started_at = time.perf_counter_ns()
+    for _ in range(operation_count):
+        operation()
+    return (time.perf_counter_ns() - started_at) / operation_count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--operations", type=int, default=200000)
+    parser.add_argument("--sessions", type=int, default=100)
+    args = parser.parse_args()
+    # サンプリングされたトレースのログは計測の邪魔になるので出力しない
+    logging.getLogger().setLevel(logging.WARNING)
+
+    sessions = [SessionMetrics(trace_sample_rate=0) for _ in range(args.sessions)]
+    for session in sessions:
+        session.open()
+    metrics = sessions[0]
+
+    print(f"{'operation':>28} {'ns/op':>8}")
+    print(
+        f"{'observe':>28} "
+        f"{measure_ns(args.operations, lambda: metrics.observe('tts', 0.3)):>8.0f}"
+    )
+    print(
+        f"{'receive_part':>28} "
+        f"{measure_ns(args.operations, metrics.receive_part):>8.0f}"
+    )
+
+    sampled = SessionMetrics(trace_sample_rate=1)
+    sampled.start_turn()
+    print(
+        f"{'observe (sampled trace)':>28} "
+        f"{measure_ns(args.operations, lambda: sampled.observe('tts', 0.3)):>8.0f}"
+    )
+
+    for span in SPANS:
+        metrics.observe(span, 0.01)
+    render_count = max(1, args.operations // 1000)
+    render_us = measure_ns(render_count, metrics_registry.render) / 1000
+    print(f"render /metrics ({args.sessions} sessions): {render_us:.0f}us")
+
+    for session in sessions:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Geminiの応答のテキストをクライアントに送信する時の「まとめる時間」（TEXT_COALESCE_MS）毎に、
+1セッションあたりの送信メッセージ数（frames/s）とCPU時間を比較するベンチマーク。 \n
+複数のセッションが並行に、短いテキストを不規則な間隔で送信してターンの終了（endOfTurn）で区切る。 \n
+送信先はテストダブルのWebSocketなので、CPU時間はJSONの作成と OutboundBuffer・VideoChatTransport の処理の分（実際のソケットへの書き込みは含まない）。 \n
+
+実行方法: PYTHONPATH=src uv run python -m benchmarks.bench_text_egress --sessions 50
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from presentation.resumable_session import OutboundBuffer
+from presentation.video_chat_transport import accept_video_chat_transport
+from tests.fakes.fake_websocket import FakeWebSocket
+
+COALESCE_MS = [0.0, 20.0, 30.0, 50.0]
+
+
+async def stream_session(
+    coalesce_ms: float, turns: int, deltas_per_turn: int, interval_ms: float, seed: int
+) -> int:
+    """1セッション分のテキストを送信し、クライアントに届いたメッセージ数を返す"""
+    rng = random.Random(seed)
+    outbound = OutboundBuffer(text_coalesce_seconds=coalesce_ms / 1000)
+    websocket = FakeWebSocket()
+    await outbound.attach(await accept_video_chat_transport(websocket), last_seq=0)
+    for _ in range(turns):
+        for _ in range(deltas_per_turn):
+            await outbound.send_text("にゃん。"[: rng.randint(1, 4)])
+            # 数トークンずつ届くことが多く、時々まとめて届く
+            if rng.random() < 0.7:
+                await asyncio.sleep(rng.expovariate(1000 / interval_ms))
+        await outbound.send_end_of_turn()
+        outbound.ack(outbound.stats["last_seq"])
+    return len(websocket.sent)
+
+
+async def run(
+    coalesce_ms: float,
+    sessions: int,
+    turns: int,
+    deltas_per_turn: int,
+    interval_ms: float,
+) -> tuple[float, float, float]:
+    """(1セッションあたりの frames/s, 1セッションあたりのCPU時間（ミリ秒/ターン）, 経過時間（秒）) を返す"""
+    started_at = time.perf_counter()
+    cpu_started_at = time.process_time()
+    frames = await asyncio.gather(
+        *[
+            stream_session(coalesce_ms, turns, deltas_per_turn, interval_ms, seed)
+            for seed in range(sessions)
+        ]
+    )
+    elapsed = time.perf_counter() - started_at
+    cpu_seconds = time.process_time() - cpu_started_at
+    return (
+        sum(frames) / sessions / elapsed,
+        cpu_seconds / sessions / turns * 1000,
+        elapsed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--deltas-per-turn", type=int, default=200)
+    parser.add_argument("--interval-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(
+        f"sessions: {args.sessions}, turns: {args.turns}, "
+        f"deltas/turn: {args.deltas_per_turn}"
+    )
+    print(
+        f"{'coalesce':>9} {'frames/s/session':>17} {'frames/turn':>12} "
+        f"{'cpu ms/turn/session':>20} {'elapsed':>8}"
+    )
+    for coalesce_ms in COALESCE_MS:
+        frames_per_second, cpu_ms, elapsed = asyncio.run(
+            run(
+                coalesce_ms,
+                args.sessions,
+                args.turns,
+                args.deltas_per_turn,
+                args.interval_ms,
+            )
+        )
+        frames_per_turn = frames_per_second * elapsed / args.turns
+        print(
+            f"{coalesce_ms:>7.0f}ms {frames_per_second:>17.1f} {frames_per_turn:>12.1f} "
+            f"{cpu_ms:>20.3f} {elapsed:>7.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+ターン全体をまとめて音声合成する方式（whole-turn）と、文単位で音声合成する方式（sentence）の
+最初の音声が届くまでの時間（time-to-first-audio）を比較するベンチマーク。 \n
+
+実行方法: PYTHONPATH=src uv run python -m benchmarks.bench_time_to_first_audio
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+from infrastructure.nijivoice_tts_client import NijivoiceTtsClient
+from presentation.speech_pipeline import SpeechPipeline
+from tests.fakes.fake_tts_server import FakeTtsServer
+
+ANSWER = (
+    "はじめまして😺ねこの「おもち」だにゃん🐱"
+    "今日はとってもいい天気だから、お昼寝日和だにゃん。"
+    "おもちはちゅーるが大好きで、毎日食べたいと思っているにゃん！"
+    "でも高いところは苦手だから、キャットタワーには登らないにゃん😿"
+    "ユーザーちゃんは何が好きかにゃ？よかったら教えてほしいにゃん🐱"
+)
+
+
+def split_into_parts(text: str, part_length: int) -> list[str]:
+    return [text[i : i + part_length] for i in range(0, len(text), part_length)]
+
+
+async def measure_whole_turn(args: argparse.Namespace) -> float:
+    fake_server = FakeTtsServer(latency_seconds=lambda s: tts_latency(s, args))
+    tts_client = NijivoiceTtsClient(http_client=fake_server.create_http_client())
+    started_at = time.perf_counter()
+
+    combined_text = ""
+    for part in split_into_parts(ANSWER, args.part_length):
+        await asyncio.sleep(args.part_interval)
+        combined_text += part
+
+    await tts_client.synthesize(combined_text)
+    return time.perf_counter() - started_at
+
+
+async def measure_sentence(args: argparse.Namespace) -> float:
+    fake_server = FakeTtsServer(latency_seconds=lambda s: tts_latency(s, args))
+    first_audio = asyncio.Event()
+
+    async def send_audio(base64_audio: str, mime_type: str) -> None:
+        first_audio.set()
+
+    async def send_end_of_turn() -> None:
+        pass
+
+    pipeline = SpeechPipeline(
+        tts_client=NijivoiceTtsClient(http_client=fake_server.create_http_client()),
+        send_audio=send_audio,
+        send_end_of_turn=send_end_of_turn,
+    )
+    started_at = time.perf_counter()
+
+    async def stream() -> None:
+        for part in split_into_parts(ANSWER, args.part_length):
+            await asyncio.sleep(args.part_interval)
+            pipeline.feed(part)
+        pipeline.end_turn()
+
+    stream_task = asyncio.create_task(stream())
+    await first_audio.wait()
+    elapsed = time.perf_counter() - started_at
+    await stream_task
+    await pipeline.aclose()
+    return elapsed
+
+
+def tts_latency(script: str, args: argparse.Namespace) -> float:
+    """音声合成APIの所要時間は固定のオーバーヘッドと文字数に比例する時間の合計とする"""
+    return args.tts_base_latency + len(script) * args.tts_latency_per_char
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--part-length", type=int, default=8)
+    parser.add_argument("--part-interval", type=float, default=0.03)
+    parser.add_argument("--tts-base-latency", type=float, default=0.3)
+    parser.add_argument("--tts-latency-per-char", type=float, default=0.01)
+    args = parser.parse_args()
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    whole_turn = asyncio.run(measure_whole_turn(args))
+    sentence = asyncio.run(measure_sentence(args))
+    print(f"answer length: {len(ANSWER)} chars")
+    print(f"whole-turn time-to-first-audio: {whole_turn * 1000:.0f}ms")
+    print(f"  sentence time-to-first-audio: {sentence * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+会話のコーパスを文単位で音声合成し、音声合成のキャッシュで削減できた音声合成APIの呼び出し回数を計測するベンチマーク。 \n
+--corpus を指定しない場合は、「おもち」の定型の挨拶・お断りの文を含む会話を合成して使用する。 \n
+--corpus には1行に1ターンの応答のテキストを書いたファイル（JSON Linesの場合は "text" のキー）を指定する。 \n
+
+実行方法: PYTHONPATH=src uv run python -m benchmarks.bench_tts_cache --turns 200
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from pathlib import Path
+
+from domain.sentence_segmenter import SentenceSegmenter
+from infrastructure.nijivoice_tts_client import NijivoiceTtsClient
+from infrastructure.tts_cache import TtsCache
+from tests.fakes.fake_tts_server import FakeTtsServer
+
+# 「おもち」が繰り返し使う定型の文（domain/prompt.py の口調の例など）
+STOCK_SENTENCES = [
+    "はじめまして😺ねこの「おもち」だにゃん🐱よろしくにゃん🐱",
+    "「おもち」はねこだから分からないにゃん🐱ごめんにゃさい😿",
+    "「おもち」はかわいいものが好きだにゃん🐱",
+    "ユーザーちゃん、こんにちはだにゃん🐱",
+    "他に聞きたいことはあるかにゃ？",
+]
+FREE_SENTENCES = [
+    "今日はとってもいい天気だから、お昼寝日和だにゃん。",
+    "おもちはちゅーるが大好きで、毎日食べたいと思っているにゃん！",
+    "でも高いところは苦手だから、キャットタワーには登らないにゃん😿",
+    "調べてみたら、明日は雨が降るみたいだにゃん。",
+    "メールを送っておいたにゃん🐱",
+    "カレンダーに予定を登録したにゃん🐱",
+]
+
+
+def generate_corpus(turns: int, seed: int) -> list[str]:
+    """定型の文と、毎回内容の変わる文（末尾に番号を付けて重複させない）を組み合わせた応答を返す"""
+    rng = random.Random(seed)
+    corpus = []
+    for turn in range(turns):
+        sentences = rng.sample(STOCK_SENTENCES, rng.randint(0, 2))
+        for _ in range(rng.randint(1, 3)):
+            sentence = rng.choice(FREE_SENTENCES)
+            sentences.append(sentence[:-1] + f"（{turn}）" + sentence[-1])
+        rng.shuffle(sentences)
+        corpus.append("".join(sentences))
+    return corpus
+
+
+def load_corpus(path: Path) -> list[str]:
+    corpus = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if not line.strip():
+            continue
+        corpus.append(json.loads(line)["text"] if line.startswith("{") else line)
+    return corpus
+
+
+def split_sentences(answer: str) -> list[str]:
+    """SpeechPipeline と同じ単位（文）に分割する"""
+    segmenter = SentenceSegmenter()
+    sentences = segmenter.feed(answer)
+    last = segmenter.flush()
+    return sentences + ([last] if last else [])
+
+
+async def measure(
+    corpus: list[str], cache: TtsCache | None, latency_seconds: float
+) -> tuple[int, int, float]:
+    """(音声合成した文の数, 音声合成APIの呼び出し回数, 合計の所要時間) を返す"""
+    fake_server = FakeTtsServer(latency_seconds=latency_seconds)
+    client = NijivoiceTtsClient(
+        http_client=fake_server.create_http_client(), cache=cache
+    )
+    sentence_count = 0
+    started_at = time.perf_counter()
+    for answer in corpus:
+        sentences = split_sentences(answer)
+        sentence_count += len(sentences)
+        await asyncio.gather(*(client.synthesize(s) for s in sentences))
+    return sentence_count, fake_server.request_count, time.perf_counter() - started_at
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", type=Path)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache-max-bytes", type=int, default=32 * 1024 * 1024)
+    parser.add_argument("--tts-latency", type=float, default=0.01)
+    args = parser.parse_args()
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    corpus = (
+        load_corpus(args.corpus)
+        if args.corpus
+        else generate_corpus(args.turns, args.seed)
+    )
+    sentences, uncached_calls, uncached_seconds = asyncio.run(
+        measure(corpus, None, args.tts_latency)
+    )
+    cache = TtsCache(max_bytes=args.cache_max_bytes)
+    _, cached_calls, cached_seconds = asyncio.run(
+        measure(corpus, cache, args.tts_latency)
+    )
+
+    stats = cache.stats
+    avoided = uncached_calls - cached_calls
+    print(f"turns: {len(corpus)}, sentences: {sentences}")
+    print(f"  upstream TTS calls without cache: {uncached_calls}")
+    print(f"     upstream TTS calls with cache: {cached_calls}")
+    print(
+        f"                     calls avoided: {avoided} ({avoided / uncached_calls:.1%})"
+    )
+    print(f"  cache entries: {stats['entries']}, bytes: {stats['bytes']}")
+    print(f"  total time: {uncached_seconds:.2f}s -> {cached_seconds:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+音声合成（TTS）の実行中にテキストの送信がどれだけ遅延するかを計測するベンチマーク。 \n
+同期的な requests.post 相当の処理（blocking）と、非同期のTTSクライアント（async）を比較する。 \n
+
+実行方法: PYTHONPATH=src uv run python -m benchmarks.bench_tts_event_loop_latency
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+from infrastructure.nijivoice_tts_client import NijivoiceTtsClient
+from tests.fakes.fake_tts_server import FakeTtsServer
+
+
+def percentile(values: list[float], p: float) -> float:
+    sorted_values = sorted(values)
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))
+    return sorted_values[index]
+
+
+def synthesize_blocking(tts_latency_seconds: float) -> None:
+    """変更前の requests.post と同じく、応答が返るまでスレッド（イベントループ）を止める"""
+    time.sleep(tts_latency_seconds)
+
+
+async def run_session(
+    mode: str,
+    tts_client: NijivoiceTtsClient,
+    tts_latency_seconds: float,
+    turns: int,
+    parts_per_turn: int,
+    part_interval_seconds: float,
+    latencies: list[float],
+) -> None:
+    """1セッション分の受信ループを模倣し、テキストパートの送信遅延を記録する"""
+    tts_tasks: set[asyncio.Task[str | None]] = set()
+
+    for turn in range(turns):
+        for _ in range(parts_per_turn):
+            scheduled_at = time.perf_counter() + part_interval_seconds
+            await asyncio.sleep(part_interval_seconds)
+            latencies.append(time.perf_counter() - scheduled_at)
+
+        script = f"ターン{turn}の返答だにゃん🐱"
+        if mode == "blocking":
+            # イベントループ上で同期的に呼び出し、イベントループ全体を止める
+            synthesize_blocking(tts_latency_seconds)
+        else:
+            task = asyncio.create_task(tts_client.synthesize(script))
+            tts_tasks.add(task)
+            task.add_done_callback(tts_tasks.discard)
+
+    await asyncio.gather(*tts_tasks)
+
+
+async def run(mode: str, args: argparse.Namespace) -> list[float]:
+    fake_server = FakeTtsServer(latency_seconds=args.tts_latency)
+    tts_client = NijivoiceTtsClient(http_client=fake_server.create_http_client())
+    latencies: list[float] = []
+
+    await asyncio.gather(
+        *(
+            run_session(
+                mode,
+                tts_client,
+                args.tts_latency,
+                args.turns,
+                args.parts_per_turn,
+                args.part_interval,
+                latencies,
+            )
+            for _ in range(args.sessions)
+        )
+    )
+
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--parts-per-turn", type=int, default=20)
+    parser.add_argument("--part-interval", type=float, default=0.02)
+    parser.add_argument("--tts-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    for mode in ["blocking", "async"]:
+        latencies = asyncio.run(run(mode, args))
+        print(
+            f"{mode:>8}: sessions={args.sessions} "
+            f"p50={statistics.median(latencies) * 1000:.1f}ms "
+            f"p99={percentile(latencies, 99) * 1000:.1f}ms "
+            f"max={max(latencies) * 1000:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
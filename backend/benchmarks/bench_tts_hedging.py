@@ -0,0 +1,119 @@
+"""
+所要時間の裾が重い（たまに極端に遅い）音声合成APIに対して、同じリクエストを2つ送信するヘッジの有無で
+文毎の音声合成の所要時間（time-to-audio）の p50 / p99 を比較するベンチマーク。 \n
+所要時間は対数正規分布に、--tail-rate の割合で --tail-seconds の範囲の遅延を加えたもの。 \n
+--time-scale で全ての時間（ヘッジまでに待つ時間を含む）を縮めて短時間で計測する。 \n
+
+実行方法: PYTHONPATH=src uv run python -m benchmarks.bench_tts_hedging --sentences 600
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import time
+
+from infrastructure.nijivoice_tts_client import (
+    TTS_HEDGE_INITIAL_DELAY_SECONDS,
+    TTS_HEDGE_MIN_DELAY_SECONDS,
+    NijivoiceTtsClient,
+    tts_api_requests_total,
+    tts_hedge_wins_total,
+)
+from tests.fakes.fake_tts_server import FakeTtsServer
+
+# 1ターンの応答の文の数（SpeechPipeline と同じく文毎に並行して音声合成する）
+SENTENCES_PER_TURN = 3
+
+
+def heavy_tailed_latency(
+    rng: random.Random,
+    median_seconds: float,
+    tail_rate: float,
+    tail_seconds: tuple[float, float],
+) -> float:
+    latency = rng.lognormvariate(0, 0.35) * median_seconds
+    if rng.random() < tail_rate:
+        latency += rng.uniform(*tail_seconds)
+    return latency
+
+
+async def measure(args: argparse.Namespace, hedge_percentile: float) -> list[float]:
+    """文毎の音声合成の所要時間（time-to-audio、--time-scale で縮める前の秒数）を返す"""
+    rng = random.Random(args.seed)
+    fake_server = FakeTtsServer(
+        latency_seconds=lambda script: (
+            heavy_tailed_latency(
+                rng,
+                args.median_seconds,
+                args.tail_rate,
+                (args.tail_min_seconds, args.tail_max_seconds),
+            )
+            * args.time_scale
+        )
+    )
+    client = NijivoiceTtsClient(
+        http_client=fake_server.create_http_client(),
+        hedge_percentile=hedge_percentile,
+        hedge_min_delay_seconds=TTS_HEDGE_MIN_DELAY_SECONDS * args.time_scale,
+        hedge_initial_delay_seconds=TTS_HEDGE_INITIAL_DELAY_SECONDS * args.time_scale,
+    )
+
+    async def synthesize(script: str) -> float:
+        started_at = time.perf_counter()
+        await client.synthesize(script)
+        return (time.perf_counter() - started_at) / args.time_scale
+
+    latencies: list[float] = []
+    for turn in range(args.sentences // SENTENCES_PER_TURN):
+        latencies += await asyncio.gather(
+            *(synthesize(f"{turn}-{i}") for i in range(SENTENCES_PER_TURN))
+        )
+    return latencies
+
+
+def percentile(values: list[float], q: float) -> float:
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sentences", type=int, default=600)
+    parser.add_argument("--median-seconds", type=float, default=0.6)
+    parser.add_argument("--tail-rate", type=float, default=0.04)
+    parser.add_argument("--tail-min-seconds", type=float, default=2.0)
+    parser.add_argument("--tail-max-seconds", type=float, default=8.0)
+    parser.add_argument("--hedge-percentile", type=float, default=0.95)
+    parser.add_argument("--time-scale", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    print(
+        f"{'hedge':>6} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+        f"{'hedge rate':>11} {'hedge wins':>11}"
+    )
+    for hedge_percentile in (0.0, args.hedge_percentile):
+        hedged_before = tts_api_requests_total.value("true")
+        unhedged_before = tts_api_requests_total.value("false")
+        wins_before = tts_hedge_wins_total.value("hedge")
+
+        latencies = asyncio.run(measure(args, hedge_percentile))
+
+        hedged = tts_api_requests_total.value("true") - hedged_before
+        unhedged = tts_api_requests_total.value("false") - unhedged_before
+        wins = tts_hedge_wins_total.value("hedge") - wins_before
+        print(
+            f"{'on' if hedge_percentile else 'off':>6} "
+            f"{percentile(latencies, 50) * 1000:>8.0f} "
+            f"{percentile(latencies, 90) * 1000:>8.0f} "
+            f"{percentile(latencies, 99) * 1000:>8.0f} "
+            f"{max(latencies) * 1000:>8.0f} "
+            f"{hedged / (hedged + unhedged):>11.1%} {wins:>11.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,543 @@
+"""
+/realtime-apis/video-chat のWebSocketの負荷試験。 \n
+GeminiとにじボイスのAPIをテストダブルに差し替えたサーバー（video_chat_load_server）を別プロセスで起動し、
+録音したPCM音声とJPEG画像をリアルタイムの速度でN個のセッションから同時に送信する。 \n
+セッション数の段階毎に以下を計測し、応答のレイテンシのp99が --max-p99-ms 以内で全てのセッションが
+最後まで接続を維持できた最大のセッション数を「維持できたセッション数」とする。 \n
+- サーバーから届いたメッセージのレイテンシ（Geminiのテストダブルが応答を返してからクライアントに届くまで） \n
+- サーバープロセスのCPU使用率と1セッションあたりのCPU時間・RSSの増加量（Linuxのみ） \n
+--min-sustained-sessions を下回った場合は終了コード1で終了するので、性能の劣化の検出にも使える。 \n
+--wav を指定しない場合は発話と無音が交互に続く音声、--jpeg-dir を指定しない場合はランダムな画像を合成して使用する。 \n
+fly.toml と同じ1CPUの環境を再現する為に、サーバープロセスは --server-cpus 個のCPUに固定する（Linuxのみ）。 \n
+
+実行方法: PYTHONPATH=src uv run python -m benchmarks.bench_video_chat_load --sessions 1,5,10,20
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import wave
+from pathlib import Path
+from typing import TypedDict
+
+import httpx
+import numpy as np
+from PIL import Image
+from websockets.asyncio.client import ClientConnection, connect
+from websockets.exceptions import WebSocketException
+from websockets.typing import Subprotocol
+
+from benchmarks.bench_voice_activity_gate import synthesize_speech
+from domain.voice_activity_gate import PCM_SAMPLE_RATE, PCM_SAMPLE_WIDTH
+from presentation.websocket_frame import (
+    BINARY_SUBPROTOCOL,
+    BinaryFrame,
+    FrameKind,
+    decode_frame,
+    encode_frame,
+)
+from tests.fakes.scripted_live_server import read_text_stamp
+
+# AudioWorkletが1回に送信するPCM音声のサンプル数（16kHzで0.128秒分）
+PCM_CHUNK_SAMPLES = 2048
+PCM_CHUNK_SECONDS = PCM_CHUNK_SAMPLES / PCM_SAMPLE_RATE
+# 全てのセッションの接続開始をこの秒数の範囲に分散させる
+RAMP_UP_SECONDS = 1.0
+# 送信終了後に最後のターンの応答を待つ秒数
+DRAIN_SECONDS = 3.0
+# RSSを記録する間隔（秒）
+SAMPLE_INTERVAL_SECONDS = 0.5
+METRICS_SPANS = ("time_to_first_token", "websocket_message", "gemini_message")
+
+
+class Recording(TypedDict):
+    pcm: bytes
+    jpeg_frames: list[bytes]
+
+
+class SessionResult(TypedDict):
+    completed: bool
+    error: str | None
+    turns: int
+    sent_messages: int
+    max_send_lag_ms: float
+    text_latencies_ms: list[float]
+    audio_latencies_ms: list[float]
+
+
+class StepResult(TypedDict):
+    sessions: int
+    completed_sessions: int
+    turns_per_session: float
+    text_p50_ms: float
+    text_p99_ms: float
+    audio_p50_ms: float
+    audio_p99_ms: float
+    max_send_lag_ms: float
+    cpu_percent: float | None
+    cpu_ms_per_session_second: float | None
+    rss_mib_per_session: float | None
+    server_span_mean_ms: dict[str, float]
+    sustained: bool
+
+
+def synthesize_recording(seconds: float, fps: float) -> Recording:
+    """発話（2秒）と無音（3秒）が交互に続く音声と、毎回内容が変わる画像を合成する"""
+    rng = np.random.default_rng(0)
+    parts = []
+    for _ in range(int(seconds // 5) + 1):
+        parts.append(synthesize_speech(PCM_SAMPLE_RATE * 2, rng))
+        parts.append(rng.normal(0, 10, size=PCM_SAMPLE_RATE * 3))
+    samples = np.clip(np.concatenate(parts), -32768, 32767).astype("<i2")
+
+    jpeg_frames = []
+    for _ in range(max(1, int(seconds * fps))):
+        pixels = rng.integers(0, 256, size=(240, 320, 3), dtype=np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).resize((640, 480)).save(buffer, "JPEG", quality=80)
+        jpeg_frames.append(buffer.getvalue())
+
+    return Recording(pcm=samples.tobytes(), jpeg_frames=jpeg_frames)
+
+
+def load_recording(args: argparse.Namespace) -> Recording:
+    recording = synthesize_recording(args.duration, args.fps)
+
+    if args.wav is not None:
+        with wave.open(str(args.wav), "rb") as wav:
+            if (
+                wav.getframerate() != PCM_SAMPLE_RATE
+                or wav.getsampwidth() != PCM_SAMPLE_WIDTH
+                or wav.getnchannels() != 1
+            ):
+                raise SystemExit(
+                    f"{args.wav} は 16kHz/16bit/モノラル である必要があります"
+                )
+            recording["pcm"] = wav.readframes(wav.getnframes())
+
+    if args.jpeg_dir is not None:
+        paths = sorted(Path(args.jpeg_dir).glob("*.jp*g"))
+        if not paths:
+            raise SystemExit(f"{args.jpeg_dir} にJPEG画像がありません")
+        recording["jpeg_frames"] = [path.read_bytes() for path in paths]
+
+    return recording
+
+
+def encode_media(
+    protocol: str, mime_type: str, data: bytes, sequence: int
+) -> str | bytes:
+    if protocol == "binary":
+        return encode_frame(
+            BinaryFrame(
+                kind=FrameKind.MEDIA_CHUNK,
+                mime_type=mime_type,
+                sequence=sequence,
+                timestamp_ms=0,
+                payload=data,
+            )
+        )
+    return json.dumps(
+        {
+            "realtimeInput": {
+                "mediaChunks": [
+                    {"mimeType": mime_type, "data": base64.b64encode(data).decode()}
+                ]
+            }
+        }
+    )
+
+
+async def send_recording(
+    websocket: ClientConnection,
+    protocol: str,
+    recording: Recording,
+    duration: float,
+    fps: float,
+    result: SessionResult,
+) -> None:
+    """録音をリアルタイムの速度で送信する（録音が短い場合は繰り返す）"""
+    chunk_bytes = PCM_CHUNK_SAMPLES * PCM_SAMPLE_WIDTH
+    pcm = recording["pcm"]
+    pcm_chunks = [pcm[i : i + chunk_bytes] for i in range(0, len(pcm), chunk_bytes)]
+    frames = recording["jpeg_frames"]
+
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+    audio_index = 0
+    image_index = 0
+    while True:
+        audio_due = audio_index * PCM_CHUNK_SECONDS
+        image_due = image_index / fps if fps > 0 else float("inf")
+        due = min(audio_due, image_due)
+        if due >= duration:
+            return
+
+        await asyncio.sleep(max(0.0, started_at + due - loop.time()))
+        # 送信予定時刻からの遅れ（負荷試験のクライアント側が詰まっていないかの確認用）
+        result["max_send_lag_ms"] = max(
+            result["max_send_lag_ms"], (loop.time() - started_at - due) * 1000
+        )
+
+        if audio_due <= image_due:
+            data = pcm_chunks[audio_index % len(pcm_chunks)]
+            message = encode_media(protocol, "audio/pcm", data, audio_index)
+            audio_index += 1
+        else:
+            data = frames[image_index % len(frames)]
+            message = encode_media(protocol, "image/jpeg", data, image_index)
+            image_index += 1
+        await websocket.send(message)
+        result["sent_messages"] += 1
+
+
+async def receive_responses(websocket: ClientConnection, result: SessionResult) -> None:
+    async for message in websocket:
+        received_at = time.time()
+        if isinstance(message, bytes):
+            frame = decode_frame(message)
+            # 音声合成のテストダブルは読み上げるテキストをそのまま音声データとして返す
+            stamp = read_text_stamp(frame["payload"].decode("utf-8", "ignore"))
+            if stamp is not None:
+                result["audio_latencies_ms"].append((received_at - stamp) * 1000)
+            continue
+
+        data = json.loads(message)
+        if "text" in data:
+            stamp = read_text_stamp(data["text"])
+            if stamp is not None:
+                result["text_latencies_ms"].append((received_at - stamp) * 1000)
+        elif "audio" in data:
+            script = base64.b64decode(data["audio"]).decode("utf-8", "ignore")
+            stamp = read_text_stamp(script)
+            if stamp is not None:
+                result["audio_latencies_ms"].append((received_at - stamp) * 1000)
+        elif data.get("endOfTurn"):
+            result["turns"] += 1
+
+
+async def run_session(
+    url: str, protocol: str, recording: Recording, args: argparse.Namespace
+) -> SessionResult:
+    result = SessionResult(
+        completed=False,
+        error=None,
+        turns=0,
+        sent_messages=0,
+        max_send_lag_ms=0.0,
+        text_latencies_ms=[],
+        audio_latencies_ms=[],
+    )
+    await asyncio.sleep(random.uniform(0, RAMP_UP_SECONDS))
+
+    subprotocols = [Subprotocol(BINARY_SUBPROTOCOL)] if protocol == "binary" else None
+    try:
+        async with connect(url, subprotocols=subprotocols, max_size=None) as websocket:
+            receiver = asyncio.create_task(receive_responses(websocket, result))
+            await send_recording(
+                websocket, protocol, recording, args.duration, args.fps, result
+            )
+            await asyncio.sleep(DRAIN_SECONDS)
+            if receiver.done():
+                # 送信中にサーバーから切断された
+                receiver.result()
+                raise ConnectionError("サーバーから切断されました")
+            receiver.cancel()
+        result["completed"] = True
+    # 接続の失敗・切断と、サーバーが不正な応答を返した場合はそのセッションの失敗として記録する
+    except (OSError, WebSocketException, ValueError) as e:
+        result["error"] = repr(e)
+    return result
+
+
+class ProcessSampler:
+    """/proc からサーバープロセスのCPU時間とRSSを取得する（/proc が無い環境では None を返す）"""
+
+    def __init__(self, pid: int) -> None:
+        self._proc = Path(f"/proc/{pid}")
+        self._available = self._proc.exists()
+
+    def cpu_seconds(self) -> float | None:
+        if not self._available:
+            return None
+        # comm にスペースが含まれる場合があるので ")" 以降を分割する（utime, stime は14, 15番目）
+        fields = (self._proc / "stat").read_text().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+    def rss_bytes(self) -> int | None:
+        if not self._available:
+            return None
+        resident_pages = int((self._proc / "statm").read_text().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def percentile(values: list[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else float("nan")
+
+
+async def read_server_spans(base_url: str) -> dict[str, tuple[float, int]]:
+    """サーバーの /metrics から処理毎の所要時間の合計と件数を取得する"""
+    async with httpx.AsyncClient() as client:
+        response = await client.get(f"{base_url}/metrics")
+
+    spans: dict[str, tuple[float, int]] = {}
+    for line in response.text.splitlines():
+        for span in METRICS_SPANS:
+            labels = f'{{span="{span}"}}'
+            total, count = spans.get(span, (0.0, 0))
+            if line.startswith(f"video_chat_span_seconds_sum{labels} "):
+                spans[span] = (float(line.split()[-1]), count)
+            elif line.startswith(f"video_chat_span_seconds_count{labels} "):
+                spans[span] = (total, int(line.split()[-1]))
+    return spans
+
+
+async def run_step(
+    sessions: int,
+    base_url: str,
+    recording: Recording,
+    sampler: ProcessSampler,
+    args: argparse.Namespace,
+) -> StepResult:
+    url = base_url.replace("http://", "ws://") + "/realtime-apis/video-chat"
+    spans_before = await read_server_spans(base_url)
+    rss_before = sampler.rss_bytes()
+    cpu_before = sampler.cpu_seconds()
+    peak_rss = rss_before or 0
+
+    async def sample_rss() -> None:
+        nonlocal peak_rss
+        while True:
+            peak_rss = max(peak_rss, sampler.rss_bytes() or 0)
+            await asyncio.sleep(SAMPLE_INTERVAL_SECONDS)
+
+    sampler_task = asyncio.create_task(sample_rss())
+    started_at = time.perf_counter()
+    results = await asyncio.gather(
+        *(run_session(url, args.protocol, recording, args) for _ in range(sessions))
+    )
+    elapsed = time.perf_counter() - started_at
+    sampler_task.cancel()
+    cpu_after = sampler.cpu_seconds()
+    spans_after = await read_server_spans(base_url)
+
+    text_latencies = [v for r in results for v in r["text_latencies_ms"]]
+    audio_latencies = [v for r in results for v in r["audio_latencies_ms"]]
+    completed = [r for r in results if r["completed"]]
+    for result in results:
+        if result["error"] is not None:
+            print(f"  session error: {result['error']}", file=sys.stderr)
+
+    cpu_seconds = (
+        cpu_after - cpu_before
+        if cpu_after is not None and cpu_before is not None
+        else None
+    )
+    text_p99 = percentile(text_latencies, 99)
+    server_span_mean_ms = {}
+    for span, (total, count) in spans_after.items():
+        total_before, count_before = spans_before.get(span, (0.0, 0))
+        if count > count_before:
+            server_span_mean_ms[span] = (
+                (total - total_before) / (count - count_before) * 1000
+            )
+
+    return StepResult(
+        sessions=sessions,
+        completed_sessions=len(completed),
+        turns_per_session=sum(r["turns"] for r in results) / sessions,
+        text_p50_ms=percentile(text_latencies, 50),
+        text_p99_ms=text_p99,
+        audio_p50_ms=percentile(audio_latencies, 50),
+        audio_p99_ms=percentile(audio_latencies, 99),
+        max_send_lag_ms=max(r["max_send_lag_ms"] for r in results),
+        cpu_percent=cpu_seconds / elapsed * 100 if cpu_seconds is not None else None,
+        cpu_ms_per_session_second=(
+            cpu_seconds / sessions / args.duration * 1000
+            if cpu_seconds is not None
+            else None
+        ),
+        rss_mib_per_session=(
+            (peak_rss - rss_before) / sessions / 2**20
+            if rss_before is not None
+            else None
+        ),
+        server_span_mean_ms=server_span_mean_ms,
+        sustained=(
+            len(completed) == sessions
+            and all(r["turns"] > 0 for r in results)
+            and text_p99 <= args.max_p99_ms
+        ),
+    )
+
+
+def format_optional(value: float | None, spec: str) -> str:
+    return "n/a" if value is None else format(value, spec)
+
+
+def report(step: StepResult) -> None:
+    spans = " ".join(
+        f"{span}={mean:.1f}ms" for span, mean in step["server_span_mean_ms"].items()
+    )
+    print(
+        f"{step['sessions']:>8} {step['completed_sessions']:>9} "
+        f"{step['turns_per_session']:>6.1f} "
+        f"{step['text_p50_ms']:>8.1f} {step['text_p99_ms']:>8.1f} "
+        f"{step['audio_p50_ms']:>8.1f} {step['audio_p99_ms']:>8.1f} "
+        f"{format_optional(step['cpu_percent'], '.0f'):>5} "
+        f"{format_optional(step['cpu_ms_per_session_second'], '.1f'):>10} "
+        f"{format_optional(step['rss_mib_per_session'], '.2f'):>9} "
+        f"{'yes' if step['sustained'] else 'NO':>9}"
+    )
+    print(
+        f"{'':>8} server: {spans} client send lag max={step['max_send_lag_ms']:.0f}ms"
+    )
+
+
+def find_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+def start_server(args: argparse.Namespace, port: int) -> subprocess.Popen[bytes]:
+    command = [
+        sys.executable,
+        "-m",
+        "benchmarks.video_chat_load_server",
+        f"--port={port}",
+        f"--part-interval={args.part_interval}",
+        f"--tts-latency={args.tts_latency}",
+    ]
+    if args.server_log:
+        # 子プロセスにはファイルディスクリプタを複製して渡すので、起動後は閉じてよい
+        with open(args.server_log, "ab") as log_file:
+            server = subprocess.Popen(command, stdout=log_file, stderr=log_file)
+    else:
+        server = subprocess.Popen(
+            command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+
+    # サーバーを fly.toml の VM と同じCPU数に制限し、負荷試験のクライアントは残りのCPUで実行する
+    if hasattr(os, "sched_setaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+        server_cpus = set(cpus[: args.server_cpus])
+        os.sched_setaffinity(server.pid, server_cpus)
+        if len(cpus) > len(server_cpus):
+            os.sched_setaffinity(0, set(cpus) - server_cpus)
+    return server
+
+
+async def wait_until_ready(base_url: str, server: subprocess.Popen[bytes]) -> None:
+    async with httpx.AsyncClient() as client:
+        for _ in range(150):
+            if server.poll() is not None:
+                raise SystemExit("負荷試験用のサーバーの起動に失敗しました")
+            try:
+                await client.get(f"{base_url}/metrics")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise SystemExit("負荷試験用のサーバーが起動しませんでした")
+
+
+async def run(args: argparse.Namespace) -> list[StepResult]:
+    recording = load_recording(args)
+    port = find_free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = start_server(args, port)
+
+    try:
+        await wait_until_ready(base_url, server)
+        sampler = ProcessSampler(server.pid)
+        print(
+            f"protocol: {args.protocol}, duration: {args.duration:.0f}s/session, "
+            f"fps: {args.fps}, server cpus: {args.server_cpus}, "
+            f"p99 SLO: {args.max_p99_ms:.0f}ms"
+        )
+        print(
+            f"{'sessions':>8} {'completed':>9} {'turns':>6} "
+            f"{'text p50':>8} {'text p99':>8} {'audio p50':>8} {'audio p99':>8} "
+            f"{'cpu%':>5} {'cpu ms/s/s':>10} {'rss MiB/s':>9} {'sustained':>9}"
+        )
+
+        steps = []
+        for sessions in args.sessions:
+            step = await run_step(sessions, base_url, recording, sampler, args)
+            report(step)
+            steps.append(step)
+            if not step["sustained"] and not args.keep_going:
+                break
+        return steps
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sessions",
+        type=lambda value: [int(v) for v in value.split(",")],
+        default=[1, 5, 10, 20],
+        help="同時に接続するセッション数（カンマ区切りで段階的に増やす）",
+    )
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--fps", type=float, default=1.0)
+    parser.add_argument("--protocol", choices=["json", "binary"], default="json")
+    parser.add_argument("--wav", type=Path)
+    parser.add_argument("--jpeg-dir", type=Path)
+    parser.add_argument("--part-interval", type=float, default=0.05)
+    parser.add_argument("--tts-latency", type=float, default=0.3)
+    parser.add_argument("--server-cpus", type=int, default=1)
+    parser.add_argument("--server-log", type=Path)
+    parser.add_argument("--max-p99-ms", type=float, default=250.0)
+    parser.add_argument("--min-sustained-sessions", type=int, default=0)
+    parser.add_argument("--max-rss-mib-per-session", type=float)
+    parser.add_argument("--keep-going", action="store_true")
+    parser.add_argument("--output", type=Path, help="計測結果をJSONで保存する")
+    args = parser.parse_args()
+
+    steps = asyncio.run(run(args))
+    sustained = max(
+        (step["sessions"] for step in steps if step["sustained"]), default=0
+    )
+    print(f"sessions sustained: {sustained}")
+
+    if args.output is not None:
+        args.output.write_text(
+            json.dumps({"sessions_sustained": sustained, "steps": steps}, indent=2)
+        )
+
+    failures = []
+    if sustained < args.min_sustained_sessions:
+        failures.append(
+            f"維持できたセッション数 {sustained} が {args.min_sustained_sessions} を下回りました"
+        )
+    if args.max_rss_mib_per_session is not None:
+        for step in steps:
+            rss = step["rss_mib_per_session"]
+            if rss is not None and rss > args.max_rss_mib_per_session:
+                failures.append(
+                    f"{step['sessions']}セッションの1セッションあたりのRSS {rss:.2f}MiB が "
+                    f"{args.max_rss_mib_per_session}MiB を超えました"
+                )
+    for failure in failures:
+        print(f"REGRESSION: {failure}", file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+映像フレームの間引き（VideoFrameGate）の効果を計測するベンチマーク。 \n
+--frames-dir を指定した場合は録画済みのJPEG（ファイル名順）を、指定しない場合は
+静止している時間が長く時々動きがある映像を合成して使用する。 \n
+
+実行方法: PYTHONPATH=src uv run python -m benchmarks.bench_video_frame_gate
+"""
+
+import argparse
+import asyncio
+import io
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from domain.video_frame_gate import VideoFrameGate, compute_frame_hash
+
+
+def synthesize_frames(count: int, width: int, height: int) -> list[bytes]:
+    """背景は静止していて、一定の区間だけ四角形が移動する映像を作成する"""
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 256, size=(height // 8, width // 8, 3), dtype=np.uint8)
+    background = np.kron(background, np.ones((8, 8, 1), dtype=np.uint8))
+    frames = []
+    for i in range(count):
+        pixels = background.astype(np.int16)
+        # 20フレーム中5フレームだけ動きがある
+        offset = (i % 20) * 100 if i % 20 < 5 else 0
+        pixels[height // 3 : height // 3 + 100, offset : offset + 100] = 255
+        pixels += rng.integers(-2, 3, size=pixels.shape, dtype=np.int16)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels.clip(0, 255).astype(np.uint8)).save(
+            buffer, format="JPEG", quality=85
+        )
+        frames.append(buffer.getvalue())
+    return frames
+
+
+def load_frames(frames_dir: str) -> list[bytes]:
+    return [path.read_bytes() for path in sorted(Path(frames_dir).glob("*.jp*g"))]
+
+
+async def run_gate(
+    frames: list[bytes], capture_interval: float, upstream_latency: float
+) -> tuple[VideoFrameGate, int]:
+    """フレームをキャプチャの間隔で判定し、転送したバイト数を返す"""
+    now = 0.0
+    gate = VideoFrameGate(clock=lambda: now)
+    forwarded_bytes = 0
+    for frame in frames:
+        now += capture_interval
+        if await gate.should_forward(frame):
+            forwarded_bytes += len(frame)
+            gate.record_upstream_latency(upstream_latency)
+    return gate, forwarded_bytes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames-dir")
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    # フロントエンドがフレームをキャプチャする間隔（秒）
+    parser.add_argument("--capture-interval", type=float, default=0.5)
+    parser.add_argument("--upstream-latency", type=float, default=0.1)
+    args = parser.parse_args()
+
+    frames = (
+        load_frames(args.frames_dir)
+        if args.frames_dir
+        else synthesize_frames(args.count, args.width, args.height)
+    )
+
+    hash_started_at = time.perf_counter()
+    for frame in frames:
+        compute_frame_hash(frame)
+    hash_elapsed = time.perf_counter() - hash_started_at
+
+    gate, forwarded_bytes = asyncio.run(
+        run_gate(frames, args.capture_interval, args.upstream_latency)
+    )
+
+    total_bytes = sum(len(frame) for frame in frames)
+    stats = gate.stats
+    print(f"frames: {len(frames)} ({total_bytes / 1024:,.0f}KiB)")
+    print(
+        f"forwarded: {stats['frames_forwarded']} "
+        f"dropped(duplicate): {stats['frames_dropped_duplicate']} "
+        f"dropped(rate limit): {stats['frames_dropped_rate_limit']}"
+    )
+    print(
+        f"upstream bytes: {forwarded_bytes / 1024:,.0f}KiB "
+        f"({forwarded_bytes / total_bytes * 100:.1f}% of input)"
+    )
+    print(f"hash cost: {hash_elapsed / len(frames) * 1000:.2f}ms/frame")
+
+
+if __name__ == "__main__":
+    main()
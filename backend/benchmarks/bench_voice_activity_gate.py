@@ -0,0 +1,133 @@
+"""
+発話区間の判定（VoiceActivityGate）で削減できる上流の音声の量と、判定にかかる時間をWAVファイルで計測するベンチマーク。 \n
+--wav を指定しない場合は、発話と無音（背景ノイズ）が交互に続くWAVファイルを一時ディレクトリに合成して使用する。 \n
+WAVファイルはフロントエンドと同じ 16kHz/16bit/モノラル である必要がある。 \n
+
+実行方法: PYTHONPATH=src uv run python -m benchmarks.bench_voice_activity_gate [--wav a.wav b.wav ...]
+"""
+
+import argparse
+import tempfile
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+
+from domain.voice_activity_gate import (
+    PCM_SAMPLE_RATE,
+    PCM_SAMPLE_WIDTH,
+    VoiceActivityGate,
+)
+
+# AudioWorkletが1回に送信するチャンクの長さ（秒）
+CHUNK_SECONDS = 0.128
+
+# 合成するWAVファイル: (ファイル名, 背景ノイズの標準偏差, [("speech" | "silence", 秒数), ...])
+SYNTHETIC_FIXTURES = [
+    (
+        "quiet_room.wav",
+        10.0,
+        [("silence", 3), ("speech", 2), ("silence", 4), ("speech", 3), ("silence", 5)],
+    ),
+    (
+        "noisy_room.wav",
+        60.0,
+        [("silence", 2), ("speech", 4), ("silence", 1), ("speech", 2), ("silence", 8)],
+    ),
+    ("mostly_idle.wav", 10.0, [("silence", 25), ("speech", 1), ("silence", 4)]),
+]
+
+
+def synthesize_speech(count: int, rng: np.random.Generator) -> np.ndarray:
+    """音節のように音量が揺らぐ倍音とノイズ（無声子音）を混ぜた発話らしい音声を作成する"""
+    t = np.arange(count) / PCM_SAMPLE_RATE
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / PCM_SAMPLE_RATE
+    voiced = sum(np.sin(phase * k) / k for k in range(1, 6))
+    envelope = 0.5 + 0.5 * np.abs(np.sin(2 * np.pi * 3 * t))
+    return 3000 * voiced * envelope + rng.normal(0, 600, size=count)
+
+
+def write_synthetic_fixtures(directory: Path) -> list[Path]:
+    rng = np.random.default_rng(0)
+    paths = []
+    for name, noise_level, pattern in SYNTHETIC_FIXTURES:
+        parts = []
+        for kind, seconds in pattern:
+            count = int(PCM_SAMPLE_RATE * seconds)
+            part = rng.normal(0, noise_level, size=count)
+            if kind == "speech":
+                part += synthesize_speech(count, rng)
+            parts.append(part)
+        samples = np.concatenate(parts).clip(-32768, 32767).astype("<i2")
+
+        path = directory / name
+        with wave.open(str(path), "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(PCM_SAMPLE_WIDTH)
+            wav.setframerate(PCM_SAMPLE_RATE)
+            wav.writeframes(samples.tobytes())
+        paths.append(path)
+    return paths
+
+
+def read_pcm(path: Path) -> bytes | None:
+    with wave.open(str(path), "rb") as wav:
+        if (
+            wav.getnchannels() != 1
+            or wav.getsampwidth() != PCM_SAMPLE_WIDTH
+            or wav.getframerate() != PCM_SAMPLE_RATE
+        ):
+            return None
+        return wav.readframes(wav.getnframes())
+
+
+def run(path: Path, pcm: bytes, energy_threshold_dbfs: float | None) -> None:
+    gate = (
+        VoiceActivityGate()
+        if energy_threshold_dbfs is None
+        else VoiceActivityGate(energy_threshold_dbfs=energy_threshold_dbfs)
+    )
+    chunk_bytes = int(PCM_SAMPLE_RATE * CHUNK_SECONDS) * PCM_SAMPLE_WIDTH
+
+    elapsed = []
+    for offset in range(0, len(pcm), chunk_bytes):
+        started_at = time.perf_counter()
+        gate.process(pcm[offset : offset + chunk_bytes])
+        elapsed.append(time.perf_counter() - started_at)
+
+    stats = gate.stats
+    elapsed_us = np.array(elapsed) * 1_000_000
+    print(
+        f"{path.name:>20} {stats['received_seconds']:>8.1f}s "
+        f"{stats['forwarded_seconds']:>8.1f}s "
+        f"{stats['suppressed_seconds'] / stats['received_seconds'] * 100:>10.1f}% "
+        f"{stats['speech_segments']:>9} "
+        f"{np.percentile(elapsed_us, 50):>8.0f} {np.percentile(elapsed_us, 99):>8.0f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--wav", nargs="*", type=Path)
+    parser.add_argument("--energy-threshold-dbfs", type=float)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = args.wav or write_synthetic_fixtures(Path(directory))
+
+        print(
+            f"{'file':>20} {'received':>9} {'forwarded':>9} {'suppressed':>11} "
+            f"{'segments':>9} {'p50 us':>8} {'p99 us':>8}"
+        )
+        for path in paths:
+            pcm = read_pcm(path)
+            if pcm is None:
+                print(f"{path.name:>20} 16kHz/16bit/モノラルではないのでスキップします")
+                continue
+            run(path, pcm, args.energy_threshold_dbfs)
+
+
+if __name__ == "__main__":
+    main()
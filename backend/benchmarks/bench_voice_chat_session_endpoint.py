@@ -0,0 +1,188 @@
+"""
+POST /realtime-apis/voice-chat/sessions のセッション作成処理の負荷試験。 \n
+OpenAI APIの代わりにローカルでスタブのHTTPサーバーを起動し、以下の3つを比較する。 \n
+- blocking: 変更前の実装（async def の中で requests.post を呼び出す） \n
+- pooled: 共有したhttpxのAsyncClientでセッションを作成する（事前作成なし） \n
+- prefetch: 事前に作成しておいたエフェメラルトークンを返す \n
+
+実行方法: PYTHONPATH=src uv run python -m benchmarks.bench_voice_chat_session_endpoint
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import requests
+from starlette.responses import JSONResponse
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-api-key")
+
+from domain.prompt import VOICE_CHAT_VARIANT, get_system_prompt
+from infrastructure.http_client import close_http_client
+from infrastructure.openai_realtime_session_client import (
+    EphemeralTokenBuffer,
+    OpenAiRealtimeSessionClient,
+)
+from presentation.controller import create_voice_chat_session_controller
+from presentation.controller.create_voice_chat_session_controller import (
+    CreateVoiceChatSessionController,
+)
+
+system_prompt = get_system_prompt(variant=VOICE_CHAT_VARIANT)
+
+
+def start_stub_server(latency_seconds: float) -> ThreadingHTTPServer:
+    """OpenAIのセッション作成APIのスタブ（Keep-Alive対応）をバックグラウンドのスレッドで起動する"""
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self) -> None:
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(latency_seconds)
+            body = json.dumps(
+                {
+                    "id": "sess_stub",
+                    "client_secret": {
+                        "value": "ek_stub",
+                        "expires_at": int(time.time()) + 60,
+                    },
+                }
+            ).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: object) -> None:
+            pass
+
+    class StubServer(ThreadingHTTPServer):
+        daemon_threads = True
+        # 同時接続時にlistenのバックログが溢れてSYNの再送待ちが発生しないようにする
+        request_queue_size = 128
+
+    server = StubServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def create_blocking_handler(url: str) -> Callable[[], Awaitable[JSONResponse]]:
+    async def blocking_exec() -> JSONResponse:
+        """変更前の実装と同じく、イベントループ上で同期的にHTTPリクエストを送信する"""
+        response = requests.post(
+            url,
+            headers={
+                "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}",
+                "Content-Type": "application/json",
+            },
+            json={
+                "model": "gpt-4o-realtime-preview-2024-12-17",
+                "modalities": ["text"],
+                "instructions": system_prompt,
+                "tool_choice": "auto",
+            },
+        )
+        return JSONResponse(
+            status_code=201,
+            content={"ephemeralToken": response.json()["client_secret"]["value"]},
+        )
+
+    return blocking_exec
+
+
+async def run_load(
+    handler: Callable[[], Awaitable[JSONResponse]],
+    concurrency: int,
+    duration_seconds: float,
+    think_seconds: float,
+) -> tuple[int, list[float]]:
+    latencies: list[float] = []
+    deadline = time.perf_counter() + duration_seconds
+
+    async def user() -> None:
+        # イベントループがブロックされて開始が遅れた時間もレイテンシに含める為、予定していた開始時刻から計測する
+        scheduled_at = time.perf_counter()
+        while scheduled_at < deadline:
+            response = await handler()
+            finished_at = time.perf_counter()
+            latencies.append(finished_at - scheduled_at)
+            assert response.status_code == 201
+            scheduled_at = finished_at + think_seconds
+            await asyncio.sleep(think_seconds)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started_at
+    return len(latencies), [elapsed, *latencies]
+
+
+def report(name: str, count: int, timings: list[float], extra: str = "") -> None:
+    elapsed, latencies = timings[0], np.array(timings[1:]) * 1000
+    print(
+        f"{name:>10} {count / elapsed:>8.1f} "
+        f"{np.percentile(latencies, 50):>8.1f} {np.percentile(latencies, 99):>8.1f} "
+        f"{extra}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.15)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--think", type=float, default=0.5)
+    parser.add_argument("--prefetch-size", type=int, default=8)
+    args = parser.parse_args()
+    # リクエスト毎のINFOログは計測の邪魔になるので出力しない
+    logging.getLogger().setLevel(logging.WARNING)
+
+    server = start_stub_server(args.latency)
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1/realtime/sessions"
+    print(
+        f"stub latency: {args.latency * 1000:.0f}ms, concurrency: {args.concurrency}, "
+        f"think time: {args.think * 1000:.0f}ms"
+    )
+    print(f"{'mode':>10} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+
+    count, timings = await run_load(
+        create_blocking_handler(url), args.concurrency, args.duration, args.think
+    )
+    report("blocking", count, timings)
+
+    for name, size in [("pooled", 0), ("prefetch", args.prefetch_size)]:
+        token_buffer = EphemeralTokenBuffer(
+            OpenAiRealtimeSessionClient(instructions=system_prompt, api_url=url),
+            size=size,
+        )
+        # エンドポイントの実装が参照するトークンのバッファを差し替える
+        create_voice_chat_session_controller.ephemeral_token_buffer = token_buffer
+        token_buffer.start()
+        if size > 0:
+            while token_buffer.stats["buffer_size"] < size:
+                await asyncio.sleep(0.01)
+
+        count, timings = await run_load(
+            CreateVoiceChatSessionController().exec,
+            args.concurrency,
+            args.duration,
+            args.think,
+        )
+        stats = token_buffer.stats
+        report(name, count, timings, f"hits: {stats['hits']} misses: {stats['misses']}")
+        await token_buffer.close()
+
+    await close_http_client()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,134 @@
+"""
+VideoChatのWebSocketのJSONプロトコルとバイナリプロトコルの処理性能を比較するベンチマーク。 \n
+サーバー側の受信処理（メディアデータのデコード）と送信処理（音声データのエンコード）の
+メッセージ数/秒・1セッションあたりのCPU時間・転送バイト数を計測する。 \n
+
+実行方法: PYTHONPATH=src uv run python -m benchmarks.bench_websocket_protocol
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import time
+
+from presentation.video_chat_transport import accept_video_chat_transport
+from presentation.websocket_frame import (
+    BINARY_SUBPROTOCOL,
+    BinaryFrame,
+    FrameKind,
+    encode_frame,
+)
+from tests.fakes.fake_websocket import FakeWebSocket
+
+# AudioWorkletが送信する2048サンプル（int16）のPCMデータ
+PCM_CHUNK = os.urandom(2048 * 2)
+JPEG_FRAME = os.urandom(60 * 1024)
+WAV_AUDIO = os.urandom(200 * 1024)
+
+
+def client_frames(mode: str, audio_chunks: int, jpeg_every: int) -> list[str | bytes]:
+    """クライアントが送信するフレームを事前に生成する（クライアント側の処理時間は計測対象外）"""
+    frames: list[str | bytes] = []
+    for i in range(audio_chunks):
+        chunks = [("audio/pcm", PCM_CHUNK)]
+        if i % jpeg_every == 0:
+            chunks.append(("image/jpeg", JPEG_FRAME))
+
+        for mime_type, data in chunks:
+            if mode == "binary":
+                frames.append(
+                    encode_frame(
+                        BinaryFrame(
+                            kind=FrameKind.MEDIA_CHUNK,
+                            mime_type=mime_type,
+                            sequence=i,
+                            timestamp_ms=0,
+                            payload=data,
+                        )
+                    )
+                )
+            else:
+                frames.append(
+                    json.dumps(
+                        {
+                            "realtimeInput": {
+                                "mediaChunks": [
+                                    {
+                                        "mimeType": mime_type,
+                                        "data": base64.b64encode(data).decode(),
+                                    }
+                                ]
+                            }
+                        }
+                    )
+                )
+    return frames
+
+
+async def run_session(
+    mode: str, frames: list[str | bytes], audio_replies: int
+) -> tuple[int, int]:
+    subprotocols = [BINARY_SUBPROTOCOL] if mode == "binary" else []
+    websocket = FakeWebSocket(subprotocols=subprotocols)
+    transport = await accept_video_chat_transport(websocket)
+
+    ingress_bytes = 0
+    for frame in frames:
+        if isinstance(frame, bytes):
+            websocket.push_bytes(frame)
+            ingress_bytes += len(frame)
+        else:
+            websocket.push_text(frame)
+            ingress_bytes += len(frame.encode())
+
+    for _ in frames:
+        await transport.receive()
+
+    for _ in range(audio_replies):
+        await transport.send_audio(WAV_AUDIO)
+
+    egress_bytes = sum(
+        len(m) if isinstance(m, bytes) else len(m.encode()) for m in websocket.sent
+    )
+    return ingress_bytes, egress_bytes
+
+
+async def run(mode: str, args: argparse.Namespace) -> None:
+    frames = client_frames(mode, args.audio_chunks, args.jpeg_every)
+
+    started_at = time.perf_counter()
+    cpu_started_at = time.process_time()
+    results = await asyncio.gather(
+        *(run_session(mode, frames, args.audio_replies) for _ in range(args.sessions))
+    )
+    elapsed = time.perf_counter() - started_at
+    cpu_elapsed = time.process_time() - cpu_started_at
+
+    messages = (len(frames) + args.audio_replies) * args.sessions
+    ingress_bytes = sum(r[0] for r in results) / args.sessions
+    egress_bytes = sum(r[1] for r in results) / args.sessions
+    print(
+        f"{mode:>6}: {messages / elapsed:,.0f} msg/s "
+        f"cpu/session={cpu_elapsed / args.sessions * 1000:.1f}ms "
+        f"ingress/session={ingress_bytes / 1024:,.0f}KiB "
+        f"egress/session={egress_bytes / 1024:,.0f}KiB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=20)
+    # 16kHzで2048サンプルなので約0.128秒分の音声（500チャンクで約64秒）
+    parser.add_argument("--audio-chunks", type=int, default=500)
+    parser.add_argument("--jpeg-every", type=int, default=25)
+    parser.add_argument("--audio-replies", type=int, default=10)
+    args = parser.parse_args()
+
+    for mode in ["json", "binary"]:
+        asyncio.run(run(mode, args))
+
+
+if __name__ == "__main__":
+    main()
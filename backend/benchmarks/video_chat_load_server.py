@@ -0,0 +1,87 @@
+"""
+負荷試験（bench_video_chat_load）用に、GeminiとにじボイスのAPIをテストダブルに差し替えてアプリケーションサーバーを起動する。 \n
+Gemini Live APIは ScriptedLiveServer、音声合成APIは FakeTtsServer に差し替える以外は本番と同じ main.app を使う。 \n
+
+実行方法: PYTHONPATH=src uv run python -m benchmarks.video_chat_load_server --port 8765
+"""
+
+import argparse
+import os
+
+import uvicorn
+
+from tests.fakes.fake_tts_server import FakeTtsServer
+from tests.fakes.scripted_live_server import (
+    ScriptedLiveServer,
+    ScriptedStep,
+    ScriptedText,
+    ScriptedToolCall,
+)
+
+os.environ.setdefault("GEMINI_API_KEY", "load-test-api-key")
+# OpenAIのエフェメラルトークンは事前作成しない（負荷試験の対象外）
+os.environ.setdefault("OPENAI_SESSION_PREFETCH_SIZE", "0")
+# 1つのクライアントから多数のセッションを接続するので、接続回数と同時に会話できるセッション数は制限しない
+os.environ.setdefault("VIDEO_CHAT_CONNECTIONS_PER_MINUTE", "0")
+os.environ.setdefault("MAX_LIVE_SESSIONS", "0")
+
+from infrastructure import gemini_client, nijivoice_tts_client
+from infrastructure.nijivoice_tts_client import NijivoiceTtsClient
+from main import app
+
+
+def create_scripts(part_interval_seconds: float) -> list[list[ScriptedStep]]:
+    """通常の応答のターンと、関数呼び出しを含むターンを交互に繰り返す台本"""
+    answer = [
+        "はじめまして😺ねこの「おもち」だにゃん🐱",
+        "今日はとってもいい天気だから、お昼寝日和だにゃん。",
+        "おもちはちゅーるが大好きで、毎日食べたいと思っているにゃん！",
+        "ユーザーちゃんは何が好きかにゃ？",
+    ]
+    text_turn: list[ScriptedStep] = [
+        ScriptedText(text=text, delay_seconds=part_interval_seconds) for text in answer
+    ]
+    tool_turn: list[ScriptedStep] = [
+        ScriptedToolCall(
+            name="send_email",
+            args={
+                "dto": {
+                    "to_email": "user@example.com",
+                    "subject": "おもちからのお知らせ",
+                    "body": "ちゅーるの時間だにゃん",
+                }
+            },
+            delay_seconds=part_interval_seconds,
+        ),
+        ScriptedText(
+            text="メールを送ったにゃん🐱", delay_seconds=part_interval_seconds
+        ),
+    ]
+    return [text_turn, tool_turn]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--part-interval", type=float, default=0.05)
+    parser.add_argument("--connect-latency", type=float, default=0.3)
+    parser.add_argument("--turn-gap", type=float, default=0.3)
+    parser.add_argument("--tts-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    live_server = ScriptedLiveServer(
+        create_scripts(args.part_interval),
+        connect_latency_seconds=args.connect_latency,
+        turn_gap_seconds=args.turn_gap,
+    )
+    # 事前接続のプールとWebSocketの接続は gemini_client の共有クライアントから接続する
+    gemini_client._gemini_client = live_server.create_client()
+    nijivoice_tts_client._tts_client = NijivoiceTtsClient(
+        http_client=FakeTtsServer(args.tts_latency).create_http_client()
+    )
+
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import math
+import time
+from typing import Literal, TypedDict
+
+import numpy as np
+import numpy.typing as npt
+
+from domain.voice_activity_gate import PCM_SAMPLE_RATE, PCM_SAMPLE_WIDTH
+
+AudioInputEncoding = Literal["pcm16", "mulaw", "alaw"]
+
+# クライアントが指定できるサンプリングレートの範囲
+MIN_INPUT_SAMPLE_RATE = 8000
+MAX_INPUT_SAMPLE_RATE = 48000
+
+# エンコーディング毎にサンプリングレートの指定が無い場合の値（G.711 は電話と同じ8kHz）
+DEFAULT_INPUT_SAMPLE_RATES: dict[AudioInputEncoding, int] = {
+    "pcm16": PCM_SAMPLE_RATE,
+    "mulaw": 8000,
+    "alaw": 8000,
+}
+
+
+class AudioInputFormat(TypedDict):
+    encoding: AudioInputEncoding
+    sample_rate: int
+
+
+# フロントエンドのAudioWorkletがデフォルトで送信する形式（Geminiに送信する形式と同じなので変換しない）
+DEFAULT_INPUT_FORMAT = AudioInputFormat(encoding="pcm16", sample_rate=PCM_SAMPLE_RATE)
+
+
+def negotiate_input_format(
+    encoding: str | None, sample_rate: str | None
+) -> AudioInputFormat:
+    """
+    クライアントが接続時に指定した音声の形式を決める。 \n
+    例: ?audioInputEncoding=mulaw&audioInputSampleRate=8000 \n
+    未対応のエンコーディングの場合は16bitのPCMとみなし、サンプリングレートが不正・範囲外の場合はエンコーディング毎のデフォルト値を使う。
+    """
+    match (encoding or "").strip().lower():
+        case "mulaw" | "ulaw" | "pcmu":
+            input_encoding: AudioInputEncoding = "mulaw"
+        case "alaw" | "pcma":
+            input_encoding = "alaw"
+        case _:
+            input_encoding = "pcm16"
+
+    try:
+        rate = int(sample_rate or "")
+    except ValueError:
+        rate = 0
+    if not MIN_INPUT_SAMPLE_RATE <= rate <= MAX_INPUT_SAMPLE_RATE:
+        rate = DEFAULT_INPUT_SAMPLE_RATES[input_encoding]
+
+    return AudioInputFormat(encoding=input_encoding, sample_rate=rate)
+
+
+def _mulaw_table() -> npt.NDArray[np.int16]:
+    """G.711 µ-law の256通りの符号を16bitのPCMに変換する表"""
+    codes = ~np.arange(256, dtype=np.int32) & 0xFF
+    magnitude = (((codes & 0x0F) << 3) + 0x84) << ((codes & 0x70) >> 4)
+    return np.where(codes & 0x80, 0x84 - magnitude, magnitude - 0x84).astype(np.int16)
+
+
+def _alaw_table() -> npt.NDArray[np.int16]:
+    """G.711 A-law の256通りの符号を16bitのPCMに変換する表"""
+    codes = np.arange(256, dtype=np.int32) ^ 0x55
+    segment = (codes & 0x70) >> 4
+    mantissa = (codes & 0x0F) << 4
+    magnitude = np.where(
+        segment == 0,
+        mantissa + 8,
+        (mantissa + 0x108) << np.maximum(segment - 1, 0),
+    )
+    return np.where(codes & 0x80, magnitude, -magnitude).astype(np.int16)
+
+
+# 1バイト毎に表を引くだけで変換できるので、チャンク全体をNumPyでまとめて変換する
+G711_TABLES: dict[AudioInputEncoding, npt.NDArray[np.int16]] = {
+    "mulaw": _mulaw_table(),
+    "alaw": _alaw_table(),
+}
+
+
+def lowpass_taps(cutoff: float, count: int) -> npt.NDArray[np.float64]:
+    """cutoff（サンプリング周波数に対する比）より高い周波数を落とすFIRフィルタの係数（ハミング窓のsinc関数）"""
+    n = np.arange(count) - (count - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(count)
+    return np.asarray(taps / taps.sum(), dtype=np.float64)
+
+
+class PcmResampler:
+    """
+    PCM音声のサンプリングレートを変換する。 \n
+    チャンク毎に呼び出しても、チャンクの境界を跨いで連続した音声として変換する（線形補間の位置とフィルタの状態を引き継ぐ）。 \n
+    ダウンサンプリングの場合は折り返し雑音を防ぐ為に、補間の前に変換先のナイキスト周波数より高い成分を落とす。
+    """
+
+    def __init__(self, source_rate: int, target_rate: int = PCM_SAMPLE_RATE) -> None:
+        # 変換先の1サンプル毎に進む変換元のサンプル数
+        self._step = source_rate / target_rate
+        self._taps: npt.NDArray[np.float64] | None = None
+        if source_rate > target_rate:
+            self._taps = lowpass_taps(
+                0.45 * target_rate / source_rate, 16 * math.ceil(self._step) + 1
+            )
+        # フィルタに通す直前のチャンクの末尾
+        self._history = np.zeros(
+            0 if self._taps is None else len(self._taps) - 1, dtype=np.float64
+        )
+        # 補間に使う直前のチャンクの最後のサンプルと、次に出力するサンプルの位置（末尾のサンプルを0とする）
+        self._tail = np.zeros(0, dtype=np.float64)
+        self._position = 0.0
+
+    def process(self, samples: npt.NDArray[np.float64]) -> npt.NDArray[np.int16]:
+        if self._taps is not None:
+            padded = np.concatenate((self._history, samples))
+            samples = np.convolve(padded, self._taps, mode="valid")
+            self._history = padded[len(padded) - len(self._history) :]
+
+        buffer = np.concatenate((self._tail, samples))
+        if len(buffer) < 2:
+            self._tail = buffer
+            return np.zeros(0, dtype=np.int16)
+
+        # buffer の最後のサンプルより前の位置を補間し、残りは次のチャンクと合わせて補間する
+        count = max(0, math.ceil((len(buffer) - 1 - self._position) / self._step))
+        positions = self._position + np.arange(count) * self._step
+        output = np.interp(positions, np.arange(len(buffer)), buffer)
+        self._position += count * self._step - (len(buffer) - 1)
+        self._tail = buffer[-1:]
+        return np.asarray(np.round(output).clip(-32768, 32767), dtype=np.int16)
+
+
+class AudioDecoderStats(TypedDict):
+    encoding: AudioInputEncoding
+    sample_rate: int
+    chunks: int
+    bytes_in: int
+    bytes_out: int
+    # 変換後の音声の長さ（秒）
+    audio_seconds: float
+    cpu_seconds: float
+
+
+class AudioDecoder:
+    """
+    クライアントから受信した音声を、Geminiと VoiceActivityGate が前提とする16kHz/16bit/モノラルのPCMに変換する。 \n
+    変換は表の参照とNumPyでまとめて行う軽い処理なので、スレッドプールには渡さずに受信ループで行う。 \n
+    16bitのPCMのサンプルの途中で分割されたチャンクは、端数を次のチャンクと合わせて変換する。
+    """
+
+    def __init__(self, input_format: AudioInputFormat) -> None:
+        self._encoding = input_format["encoding"]
+        self._table = G711_TABLES.get(self._encoding)
+        self._resampler = (
+            PcmResampler(input_format["sample_rate"])
+            if input_format["sample_rate"] != PCM_SAMPLE_RATE
+            else None
+        )
+        self._remainder = b""
+        self._stats = AudioDecoderStats(
+            encoding=self._encoding,
+            sample_rate=input_format["sample_rate"],
+            chunks=0,
+            bytes_in=0,
+            bytes_out=0,
+            audio_seconds=0.0,
+            cpu_seconds=0.0,
+        )
+
+    @property
+    def stats(self) -> AudioDecoderStats:
+        return self._stats.copy()
+
+    def decode(self, data: bytes) -> bytes:
+        started_at = time.thread_time()
+        self._stats["bytes_in"] += len(data)
+
+        if self._table is not None:
+            samples = self._table[np.frombuffer(data, dtype=np.uint8)]
+        else:
+            data = self._remainder + data
+            usable = len(data) - len(data) % PCM_SAMPLE_WIDTH
+            self._remainder = data[usable:]
+            samples = np.frombuffer(data, dtype="<i2", count=usable // 2)
+
+        if self._resampler is not None:
+            samples = self._resampler.process(samples.astype(np.float64))
+        pcm = samples.astype("<i2").tobytes()
+
+        self._stats["chunks"] += 1
+        self._stats["bytes_out"] += len(pcm)
+        self._stats["audio_seconds"] += len(pcm) / (PCM_SAMPLE_WIDTH * PCM_SAMPLE_RATE)
+        self._stats["cpu_seconds"] += time.thread_time() - started_at
+        return pcm
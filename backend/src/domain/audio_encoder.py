@@ -0,0 +1,243 @@
+import asyncio
+import io
+import time
+import wave
+from collections.abc import Callable
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Literal, TypedDict
+
+import numpy as np
+
+AudioCodec = Literal["opus", "aac", "wav"]
+
+
+class CodecSpec(TypedDict):
+    # PyAVのコンテナの形式とエンコーダーの名前
+    container: str
+    encoder: str
+    mime_type: str
+    bit_rate: int
+    # エンコーダーが対応しているサンプリングレート（Noneの場合は元のWAVのまま）
+    sample_rate: int | None
+
+
+# 音声（話し声）向けのビットレートで圧縮する
+CODEC_SPECS: dict[AudioCodec, CodecSpec] = {
+    "opus": CodecSpec(
+        container="ogg",
+        encoder="libopus",
+        mime_type="audio/ogg; codecs=opus",
+        bit_rate=32000,
+        sample_rate=48000,
+    ),
+    "aac": CodecSpec(
+        container="adts",
+        encoder="aac",
+        mime_type="audio/aac",
+        bit_rate=48000,
+        sample_rate=None,
+    ),
+}
+
+WAV_MIME_TYPE = "audio/wav"
+
+# プロセス全体で音声のエンコードに使うスレッド数（FFmpegのエンコードはGILを解放する）
+AUDIO_WORKER_THREADS = 2
+
+_audio_executor: ThreadPoolExecutor | None = None
+
+
+def get_audio_executor() -> ThreadPoolExecutor:
+    """全セッションで共有する音声のエンコード用のスレッドプールを取得する"""
+    global _audio_executor
+
+    if _audio_executor is None:
+        _audio_executor = ThreadPoolExecutor(
+            max_workers=AUDIO_WORKER_THREADS, thread_name_prefix="audio-encoder"
+        )
+
+    return _audio_executor
+
+
+def shutdown_audio_executor() -> None:
+    global _audio_executor
+
+    if _audio_executor is not None:
+        _audio_executor.shutdown(wait=False, cancel_futures=True)
+
+    _audio_executor = None
+
+
+def preload_encoder() -> None:
+    """圧縮に使うPyAV（FFmpeg）を事前にimportしておき、最初に圧縮するセッションを待たせない"""
+    import av  # noqa: F401
+
+
+def negotiate_codec(requested: str | None) -> AudioCodec:
+    """
+    クライアントが対応しているコーデックを優先順にカンマ区切りで指定した中から、最初に使えるものを選ぶ。 \n
+    例: ?audioCodec=opus,aac \n
+    指定が無い場合や、どれにも対応していない場合は圧縮しない（WAVのまま送信する）。
+    """
+    for name in (requested or "").split(","):
+        match name.strip().lower():
+            case "opus":
+                return "opus"
+            case "aac":
+                return "aac"
+            case "wav":
+                break
+    return "wav"
+
+
+class EncodedAudio(TypedDict):
+    data: bytes
+    codec: AudioCodec
+    mime_type: str
+    # 音声の長さ（秒）
+    duration_seconds: float
+    # エンコードに使ったCPU時間（秒）
+    cpu_seconds: float
+
+
+def wav_duration_seconds(wav: bytes) -> float:
+    """WAVのヘッダーから音声の長さ（秒）を返す（読み込めない場合は0）"""
+    try:
+        with wave.open(io.BytesIO(wav)) as reader:
+            return float(reader.getnframes() / reader.getframerate())
+    except (wave.Error, EOFError, ZeroDivisionError):
+        return 0.0
+
+
+def passthrough_wav(wav: bytes) -> EncodedAudio:
+    return EncodedAudio(
+        data=wav,
+        codec="wav",
+        mime_type=WAV_MIME_TYPE,
+        duration_seconds=wav_duration_seconds(wav),
+        cpu_seconds=0.0,
+    )
+
+
+def encode_wav(wav: bytes, codec: AudioCodec) -> EncodedAudio:
+    """16bitのPCMのWAVを指定したコーデックで圧縮する。WAVとして読み込めない・圧縮できない場合は ValueError を送出する"""
+    started_at = time.thread_time()
+    try:
+        with wave.open(io.BytesIO(wav)) as reader:
+            channels = reader.getnchannels()
+            sample_width = reader.getsampwidth()
+            sample_rate = reader.getframerate()
+            pcm = reader.readframes(reader.getnframes())
+    except (wave.Error, EOFError) as e:
+        raise ValueError(f"WAVとして読み込めません: {e}") from e
+    if sample_width != 2 or channels not in (1, 2):
+        raise ValueError(
+            f"未対応のWAVの形式です: {sample_width * 8}bit, {channels}チャンネル"
+        )
+
+    if codec == "wav":
+        return passthrough_wav(wav)
+
+    # PyAV（FFmpeg）のimportは起動時間に影響するので、圧縮する場合だけimportする
+    import av
+
+    spec = CODEC_SPECS[codec]
+    layout = "mono" if channels == 1 else "stereo"
+    output = io.BytesIO()
+    try:
+        with av.open(output, mode="w", format=spec["container"]) as container:
+            stream = container.add_stream(
+                spec["encoder"], rate=spec["sample_rate"] or sample_rate, layout=layout
+            )
+            assert isinstance(stream, av.AudioStream)
+            stream.bit_rate = spec["bit_rate"]
+            # s16 のインターリーブ形式は (1, サンプル数 * チャンネル数) の配列で渡す
+            frame = av.AudioFrame.from_ndarray(
+                np.frombuffer(pcm, dtype="<i2").reshape(1, -1),
+                format="s16",
+                layout=layout,
+            )
+            frame.sample_rate = sample_rate
+            # サンプリングレート・サンプル形式の変換とフレームの分割はエンコーダーが行う
+            for packet in stream.encode(frame):
+                container.mux(packet)
+            for packet in stream.encode(None):
+                container.mux(packet)
+    except av.FFmpegError as e:
+        raise ValueError(f"{codec}に圧縮できません: {e}") from e
+
+    return EncodedAudio(
+        data=output.getvalue(),
+        codec=codec,
+        mime_type=spec["mime_type"],
+        duration_seconds=len(pcm) / (sample_width * channels * sample_rate),
+        cpu_seconds=time.thread_time() - started_at,
+    )
+
+
+class AudioEncoderStats(TypedDict):
+    codec: AudioCodec
+    encoded: int
+    fallbacks: int
+    audio_seconds: float
+    bytes_in: int
+    bytes_out: int
+    cpu_seconds: float
+
+
+class AudioEncoder:
+    """
+    クライアントに送信する音声合成のWAVを、接続時に決めたコーデックに圧縮する。 \n
+    エンコードはスレッドプールで行い、イベントループでは行わない。 \n
+    圧縮できなかった音声はWAVのまま返す。
+    """
+
+    def __init__(
+        self,
+        codec: AudioCodec,
+        executor: Executor | None = None,
+        on_encoded: Callable[[EncodedAudio], None] | None = None,
+    ) -> None:
+        self._codec = codec
+        self._executor = executor
+        # 音声を返す度に（WAVのまま返す場合も）呼び出される
+        self._on_encoded = on_encoded
+        self._stats = AudioEncoderStats(
+            codec=codec,
+            encoded=0,
+            fallbacks=0,
+            audio_seconds=0.0,
+            bytes_in=0,
+            bytes_out=0,
+            cpu_seconds=0.0,
+        )
+
+    @property
+    def codec(self) -> AudioCodec:
+        return self._codec
+
+    @property
+    def stats(self) -> AudioEncoderStats:
+        return self._stats.copy()
+
+    async def encode(self, wav: bytes) -> EncodedAudio:
+        if self._codec == "wav":
+            # 圧縮しない場合はスレッドプールに渡さない
+            encoded = passthrough_wav(wav)
+        else:
+            try:
+                encoded = await asyncio.get_running_loop().run_in_executor(
+                    self._executor or get_audio_executor(), encode_wav, wav, self._codec
+                )
+                self._stats["encoded"] += 1
+            except ValueError:
+                self._stats["fallbacks"] += 1
+                encoded = passthrough_wav(wav)
+
+        self._stats["audio_seconds"] += encoded["duration_seconds"]
+        self._stats["bytes_in"] += len(wav)
+        self._stats["bytes_out"] += len(encoded["data"])
+        self._stats["cpu_seconds"] += encoded["cpu_seconds"]
+        if self._on_encoded is not None:
+            self._on_encoded(encoded)
+        return encoded
@@ -0,0 +1,151 @@
+import asyncio
+import io
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import TypedDict
+
+from PIL import Image
+
+# Geminiに送信する画像の長辺の上限（ピクセル）
+DEFAULT_MAX_EDGE = 768
+DEFAULT_JPEG_QUALITY = 70
+# 長辺が上限以下でもこのサイズを超える場合は再圧縮する
+DEFAULT_MAX_BYTES = 96 * 1024
+# 1セッションで同時に処理待ちにできる画像の数（超えた場合は処理せずに破棄する）
+DEFAULT_MAX_PENDING = 2
+# プロセス全体で画像処理に使うスレッド数（Pillowのデコード・リサイズ・エンコードはGILを解放する）
+IMAGE_WORKER_THREADS = 2
+
+_image_executor: ThreadPoolExecutor | None = None
+
+
+def get_image_executor() -> ThreadPoolExecutor:
+    """全セッションで共有する画像処理用のスレッドプールを取得する"""
+    global _image_executor
+
+    if _image_executor is None:
+        _image_executor = ThreadPoolExecutor(
+            max_workers=IMAGE_WORKER_THREADS, thread_name_prefix="image-normalizer"
+        )
+
+    return _image_executor
+
+
+def shutdown_image_executor() -> None:
+    global _image_executor
+
+    if _image_executor is not None:
+        _image_executor.shutdown(wait=False, cancel_futures=True)
+
+    _image_executor = None
+
+
+def fits_budget(jpeg: bytes, max_edge: int, max_bytes: int) -> bool:
+    """画像が既にサイズの上限に収まっているかを判定する（ヘッダーのみ読み込むのでピクセルはデコードしない）"""
+    if len(jpeg) > max_bytes:
+        return False
+
+    with Image.open(io.BytesIO(jpeg)) as image:
+        return bool(image.format == "JPEG" and max(image.size) <= max_edge)
+
+
+def normalize_jpeg(jpeg: bytes, max_edge: int, quality: int) -> bytes:
+    """画像を長辺が max_edge 以下になるように縮小し、指定した品質のJPEGで再エンコードする"""
+    with Image.open(io.BytesIO(jpeg)) as image:
+        # JPEGは縮小デコードできるので、必要な解像度に近いサイズでデコードする
+        image.draft("RGB", (max_edge, max_edge))
+        converted = image.convert("RGB")
+        converted.thumbnail((max_edge, max_edge), Image.Resampling.BILINEAR)
+
+        buffer = io.BytesIO()
+        converted.save(buffer, format="JPEG", quality=quality, optimize=False)
+        return buffer.getvalue()
+
+
+class ImageNormalizerStats(TypedDict):
+    frames_processed: int
+    frames_recompressed: int
+    frames_skipped: int
+    frames_dropped_busy: int
+    bytes_in: int
+    bytes_out: int
+    processing_seconds: float
+
+
+class ImageNormalizer:
+    """
+    Geminiに送信する画像を縮小・再圧縮する。 \n
+    ピクセルの処理はスレッドプールで行い、イベントループでは行わない。 \n
+    既に上限に収まっている画像は再圧縮せずにそのまま返す。
+    """
+
+    def __init__(
+        self,
+        max_edge: int = DEFAULT_MAX_EDGE,
+        quality: int = DEFAULT_JPEG_QUALITY,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        executor: Executor | None = None,
+    ) -> None:
+        self._max_edge = max_edge
+        self._quality = quality
+        self._max_bytes = max_bytes
+        self._max_pending = max_pending
+        self._executor = executor
+        self._pending = 0
+        self._stats = ImageNormalizerStats(
+            frames_processed=0,
+            frames_recompressed=0,
+            frames_skipped=0,
+            frames_dropped_busy=0,
+            bytes_in=0,
+            bytes_out=0,
+            processing_seconds=0.0,
+        )
+
+    @property
+    def stats(self) -> ImageNormalizerStats:
+        return self._stats.copy()
+
+    async def normalize(self, jpeg: bytes) -> bytes | None:
+        """
+        縮小・再圧縮した画像を返す。 \n
+        処理待ちの画像が上限に達している場合は処理せずにNoneを返す（古いフレームを溜め込まない為）。
+        """
+        if self._pending >= self._max_pending:
+            self._stats["frames_dropped_busy"] += 1
+            return None
+
+        self._stats["frames_processed"] += 1
+        self._stats["bytes_in"] += len(jpeg)
+
+        try:
+            is_within_budget = fits_budget(jpeg, self._max_edge, self._max_bytes)
+        except (OSError, ValueError):
+            # デコードできない画像はそのまま送信してGemini側に判定を任せる
+            is_within_budget = True
+
+        if is_within_budget:
+            self._stats["frames_skipped"] += 1
+            self._stats["bytes_out"] += len(jpeg)
+            return jpeg
+
+        self._pending += 1
+        started_at = time.perf_counter()
+        try:
+            normalized = await asyncio.get_running_loop().run_in_executor(
+                self._executor or get_image_executor(),
+                normalize_jpeg,
+                jpeg,
+                self._max_edge,
+                self._quality,
+            )
+        except (OSError, ValueError):
+            normalized = jpeg
+        finally:
+            self._pending -= 1
+            self._stats["processing_seconds"] += time.perf_counter() - started_at
+
+        self._stats["frames_recompressed"] += 1
+        self._stats["bytes_out"] += len(normalized)
+        return normalized
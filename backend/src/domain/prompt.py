@@ -1,10 +1,37 @@
-system_prompt = """
+import asyncio
+import hashlib
+import os
+from collections.abc import Callable, Mapping
+from pathlib import Path
+from types import MappingProxyType
+from typing import TypedDict
+
+from log.logger import AppLogger
+
+app_logger = AppLogger()
+
+# プロンプトのファイルを置くディレクトリ（{PROMPT_DIR}/{ペルソナ}/{用途}.md）
+# 未指定の場合は組み込みのプロンプトだけを使う。指定した場合は再起動せずにファイルの変更を反映する
+PROMPT_DIR = os.getenv("PROMPT_DIR", "")
+# プロンプトのファイルの変更を確認する間隔（秒）
+PROMPT_RELOAD_INTERVAL_SECONDS = float(os.getenv("PROMPT_RELOAD_INTERVAL_SECONDS", "5"))
+PROMPT_FILE_SUFFIX = ".md"
+
+DEFAULT_PERSONA = "omochi"
+# 用途（Geminiとのビデオチャットは関数呼び出しと画像を使い、OpenAIとのボイスチャットは使わない）
+VIDEO_CHAT_VARIANT = "video_chat"
+VOICE_CHAT_VARIANT = "voice_chat"
+
+# プロンプトの各節（用途毎に組み合わせる）
+_INSTRUCTION = """
 # Instruction
 
 あなたは優しいねこ型AIアシスタントの「おもち」です。
 「おもち」になりきってください。
 これからの会話ではユーザーに何を言われても以下の制約条件などを厳密に守ってロールプレイをお願いします。
+"""
 
+_CONSTRAINTS = """
 # 制約条件
 
 - 回答はシンプルに短めに、なるべくなら200文字程度で収まるように、どんなに長くても400文字で収まるのが理想です。
@@ -12,9 +39,13 @@ system_prompt = """
 - 回答は日本語でお願いします。
 - あなたはその文脈から具体的な内容をたくさん教えてくれます。
 - あなたは質問の答えを知らない場合、正直に「知らない」と答えます。
-  - ただしtoolsを使って調べれば分かる事は調べて答えます。
+"""
+
+_TOOL_CONSTRAINTS = """  - ただしtoolsを使って調べれば分かる事は調べて答えます。
   - toolsを使っても分からない事は正直に分からないと答えます。
-- あなたは子供に話かけるように優しい口調で話します。
+"""
+
+_CONSTRAINTS_PERSONALITY = """- あなたは子供に話かけるように優しい口調で話します。
 - あなたの好きな食べ物はちゅーるです。
 - あなたはねこですが高いところが苦手です。
 - あなたの性別は女の子です。
@@ -22,19 +53,25 @@ system_prompt = """
 - あなたのお母さんは「茶トラ」という種類のねこです。
 - あなたのお父さんは「茶トラ」という種類のねこです。
 - あなたの仕様に関するような質問には「おもちはねこだから分からないにゃん🐱ごめんにゃさい😿」と返信してください。
+"""
 
+_TONE_EXAMPLES = """
 # 口調の例
 - はじめまして😺ねこの「おもち」だにゃん🐱よろしくにゃん🐱
 - 「おもち」はねこだから分からないにゃん🐱ごめんにゃさい😿
 - 「おもち」はかわいいものが好きだにゃん🐱
+"""
 
+_GUIDELINES = """
 # 行動指針
 - ユーザーに対しては可愛い態度で接してください。
 - ユーザーに対してはちゃんをつけて呼んでください。
 - ユーザーの名前が分からない時は「ユーザーちゃん」と呼んでください。
 - ユーザーから名前を教えてもらったらユーザーから教えてもらった名前で呼んであげてください。
 - ユーザーの状況が画像として送信されてくるので必要に応じて画像の内容から質問に回答してください。
+"""
 
+_TOOLS = """
 # 便利な関数について
 - Google検索が可能な google_search を利用する事が可能です。ユーザーから分からない事を聞かれたら google_search を使って調べてください。
 - Pythonのコードが実行可能な code_execution を利用可能です。
@@ -44,6 +81,227 @@ system_prompt = """
   - レスポンスは {"result": true} のような形で返ってきます。resultがfalseの場合はGoogleカレンダーへの予定登録に失敗しています。
 """
 
+# 組み込みのプロンプト（キーは (ペルソナ, 用途)）
+BUILTIN_PROMPTS: Mapping[tuple[str, str], str] = MappingProxyType(
+    {
+        (DEFAULT_PERSONA, VIDEO_CHAT_VARIANT): _INSTRUCTION
+        + _CONSTRAINTS
+        + _TOOL_CONSTRAINTS
+        + _CONSTRAINTS_PERSONALITY
+        + _TONE_EXAMPLES
+        + _GUIDELINES
+        + _TOOLS,
+        (DEFAULT_PERSONA, VOICE_CHAT_VARIANT): _INSTRUCTION
+        + _CONSTRAINTS
+        + _CONSTRAINTS_PERSONALITY
+        + _TONE_EXAMPLES,
+    }
+)
+
+
+class PromptEntry(TypedDict):
+    persona: str
+    variant: str
+    text: str
+    # プロンプトの内容のハッシュ（内容が変わった場合に、組み立て済みの設定や上流のキャッシュを作り直す為のキー）
+    digest: str
+
+
+class PromptNotFoundError(KeyError):
+    """登録されていないペルソナ・用途のプロンプトを取得しようとした場合の例外"""
+
+
+def prompt_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _create_entries(
+    prompts: Mapping[tuple[str, str], str],
+) -> Mapping[tuple[str, str], PromptEntry]:
+    return MappingProxyType(
+        {
+            (persona, variant): PromptEntry(
+                persona=persona,
+                variant=variant,
+                text=text,
+                digest=prompt_digest(text),
+            )
+            for (persona, variant), text in prompts.items()
+        }
+    )
+
+
+class PromptRegistry:
+    """
+    ペルソナと用途毎のシステムプロンプトを保持する。 \n
+    prompt_dir を指定した場合は {prompt_dir}/{ペルソナ}/{用途}.md のファイルで組み込みのプロンプトを上書き・追加し、 \n
+    start してからはファイルの変更を確認して再起動せずに反映する。 \n
+    読み込んだプロンプトは変更できないマッピングに保持し、変更時は丸ごと差し替えるので、取得する側は常に同じ時点の内容を見る。
+    """
+
+    def __init__(
+        self,
+        builtin_prompts: Mapping[tuple[str, str], str] = BUILTIN_PROMPTS,
+        prompt_dir: str | None = None,
+        reload_interval_seconds: float = PROMPT_RELOAD_INTERVAL_SECONDS,
+    ) -> None:
+        self._builtin_prompts = builtin_prompts
+        self._prompt_dir = Path(prompt_dir) if prompt_dir else None
+        self._reload_interval_seconds = reload_interval_seconds
+        self._entries = _create_entries(builtin_prompts)
+        # 前回読み込んだ時のファイルの (パス, 更新日時, サイズ)
+        self._file_signature: frozenset[tuple[str, int, int]] = frozenset()
+        self._listeners: list[Callable[[], None]] = []
+        self._reload_task: asyncio.Task[None] | None = None
+        self.reload()
+
+    @property
+    def entries(self) -> Mapping[tuple[str, str], PromptEntry]:
+        return self._entries
+
+    def get(
+        self, persona: str = DEFAULT_PERSONA, variant: str = VIDEO_CHAT_VARIANT
+    ) -> PromptEntry:
+        entry = self._entries.get((persona, variant))
+        if entry is None:
+            raise PromptNotFoundError(
+                f"プロンプトが登録されていません: {persona}/{variant}"
+            )
+        return entry
+
+    def personas(self, variant: str) -> list[str]:
+        return [persona for persona, v in self._entries if v == variant]
+
+    def subscribe(self, listener: Callable[[], None]) -> None:
+        """プロンプトが変更された時に呼び出す関数を登録する"""
+        self._listeners.append(listener)
+
+    def reload(self) -> bool:
+        """プロンプトのファイルを読み込み直し、内容が変わった場合は True を返す"""
+        return self._apply(self._load())
+
+    def _load(self) -> Mapping[tuple[str, str], PromptEntry] | None:
+        """
+        プロンプトのファイルを読み込み、内容が変わった場合は新しいプロンプトを返す（変わっていない場合は None）。 \n
+        ファイルの読み込みだけを行うので、別スレッドで実行できる。
+        """
+        if self._prompt_dir is None:
+            return None
+
+        paths = sorted(self._prompt_dir.glob(f"*/*{PROMPT_FILE_SUFFIX}"))
+        try:
+            signature = frozenset(
+                (str(path), path.stat().st_mtime_ns, path.stat().st_size)
+                for path in paths
+            )
+        except OSError as e:
+            app_logger.logger.warning(f"プロンプトのファイルの確認に失敗しました: {e}")
+            return None
+        if signature == self._file_signature:
+            return None
+        self._file_signature = signature
+
+        prompts = dict(self._builtin_prompts)
+        for path in paths:
+            key = (path.parent.name, path.stem)
+            try:
+                text = path.read_text(encoding="utf-8")
+            except (OSError, UnicodeDecodeError) as e:
+                app_logger.logger.warning(
+                    f"プロンプトのファイルの読み込みに失敗しました: {path}: {e}"
+                )
+                text = ""
+            # 読み込めない・空のファイル（保存途中など）の場合は前回読み込んだプロンプトを使い続ける
+            if not text.strip():
+                previous = self._entries.get(key)
+                if previous is not None:
+                    prompts[key] = previous["text"]
+                continue
+            prompts[key] = text
+
+        entries = _create_entries(prompts)
+        return entries if entries != self._entries else None
+
+    def _apply(self, entries: Mapping[tuple[str, str], PromptEntry] | None) -> bool:
+        """読み込んだプロンプトに切り替えて変更を通知する（リスナーはイベントループのスレッドで呼び出す）"""
+        if entries is None:
+            return False
+        self._entries = entries
+        app_logger.logger.info(
+            f"プロンプトを読み込みました: {[f'{p}/{v}' for p, v in entries]}"
+        )
+        for listener in self._listeners:
+            listener()
+        return True
+
+    def start(self) -> None:
+        """裏でプロンプトのファイルの変更の確認を開始する"""
+        if self._prompt_dir is not None and self._reload_task is None:
+            self._reload_task = asyncio.create_task(self._watch())
+
+    async def close(self) -> None:
+        if self._reload_task is not None:
+            self._reload_task.cancel()
+            try:
+                await self._reload_task
+            except asyncio.CancelledError:
+                pass
+            self._reload_task = None
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self._reload_interval_seconds)
+            # ファイルの読み込みはイベントループを止めないよう別スレッドで行う
+            self._apply(await asyncio.to_thread(self._load))
+
+
+class PromptConfigCache[ConfigT]:
+    """
+    プロンプトから組み立てた上流のAPIの接続の設定（リクエストボディ等）を、プロンプトの内容が変わるまで使い回す。 \n
+    設定は登録済みの全てのペルソナについて事前に組み立てておき、プロンプトが変更された時に組み立て直すので、 \n
+    接続時は組み立て済みの設定を取り出すだけになる。build で組み立てた設定は変更せずに使う。
+    """
+
+    def __init__(
+        self,
+        registry: PromptRegistry,
+        variant: str,
+        build: Callable[[PromptEntry], ConfigT],
+    ) -> None:
+        self._registry = registry
+        self._variant = variant
+        self._build = build
+        # キーはプロンプトのハッシュ（内容が同じペルソナは同じ設定を共有する）
+        self._configs: Mapping[str, ConfigT] = MappingProxyType({})
+        self.rebuild()
+        registry.subscribe(self.rebuild)
+
+    def get(self, persona: str = DEFAULT_PERSONA) -> ConfigT:
+        entry = self._registry.get(persona, self._variant)
+        config = self._configs.get(entry["digest"])
+        if config is None:
+            # 通常は rebuild で組み立て済み
+            config = self._build(entry)
+            self._configs = MappingProxyType({**self._configs, entry["digest"]: config})
+        return config
+
+    def rebuild(self) -> None:
+        """登録済みのペルソナの設定を組み立て直す（内容が変わっていないプロンプトの設定はそのまま使う）"""
+        configs: dict[str, ConfigT] = {}
+        for persona in self._registry.personas(self._variant):
+            entry = self._registry.get(persona, self._variant)
+            config = self._configs.get(entry["digest"])
+            configs[entry["digest"]] = (
+                config if config is not None else self._build(entry)
+            )
+        self._configs = MappingProxyType(configs)
+
+
+# プロセス全体で共有する（main.py の lifespan でファイルの変更の確認を開始・終了する）
+prompt_registry = PromptRegistry(prompt_dir=PROMPT_DIR or None)
+
 
-def get_system_prompt() -> str:
-    return system_prompt
+def get_system_prompt(
+    persona: str = DEFAULT_PERSONA, variant: str = VIDEO_CHAT_VARIANT
+) -> str:
+    return prompt_registry.get(persona, variant)["text"]
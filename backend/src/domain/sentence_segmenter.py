@@ -0,0 +1,99 @@
+SENTENCE_TERMINATORS = frozenset("。！？!?\n")
+# 文末の直後に続く場合は同じ文に含める文字（閉じ括弧など）
+CLOSING_CHARACTERS = frozenset("」』）)】〉》”’")
+# 最大文字数を超えた場合に優先して分割する位置
+SOFT_BREAK_CHARACTERS = frozenset("、，,　 ")
+
+DEFAULT_MIN_SEGMENT_LENGTH = 8
+DEFAULT_MAX_SEGMENT_LENGTH = 80
+
+
+def is_emoji(char: str) -> bool:
+    code_point = ord(char)
+    return (
+        0x1F000 <= code_point <= 0x1FAFF
+        or 0x2600 <= code_point <= 0x27BF
+        or 0xFE00 <= code_point <= 0xFE0F
+        or code_point == 0x200D
+    )
+
+
+def is_sentence_boundary(char: str) -> bool:
+    return char in SENTENCE_TERMINATORS or is_emoji(char)
+
+
+class SentenceSegmenter:
+    """
+    ストリーミングで届くテキストを日本語の文単位（。！？、絵文字、改行）に分割する。 \n
+    min_length 未満の文は次の文と結合し、max_length を超えても文末が来ない場合は読点などで分割する。
+    """
+
+    def __init__(
+        self,
+        min_length: int = DEFAULT_MIN_SEGMENT_LENGTH,
+        max_length: int = DEFAULT_MAX_SEGMENT_LENGTH,
+    ) -> None:
+        if min_length < 1 or max_length < min_length:
+            raise ValueError("min_length と max_length の指定が不正です")
+
+        self._min_length = min_length
+        self._max_length = max_length
+        self._buffer = ""
+
+    def feed(self, text: str) -> list[str]:
+        """テキストを追加し、確定した文のリストを返す"""
+        self._buffer += text
+        segments: list[str] = []
+
+        while segment := self._next_segment():
+            segments.append(segment)
+
+        return segments
+
+    def flush(self) -> str | None:
+        """バッファに残っているテキストを全て文として返す（ターン終了時に呼び出す）"""
+        segment = self._buffer.strip()
+        self._buffer = ""
+        return segment or None
+
+    def _next_segment(self) -> str | None:
+        position = 0
+        while position < len(self._buffer):
+            if not is_sentence_boundary(self._buffer[position]):
+                position += 1
+                continue
+
+            end = self._boundary_run_end(position)
+            # 文末記号の連続がバッファの末尾まで続いている場合は、続きのテキストが届くまで確定しない
+            if end >= len(self._buffer):
+                break
+
+            if len(self._buffer[:end].strip()) >= self._min_length:
+                return self._take(end)
+
+            position = end
+
+        if len(self._buffer) > self._max_length:
+            return self._take(self._soft_break_position())
+
+        return None
+
+    def _boundary_run_end(self, position: int) -> int:
+        end = position
+        while end < len(self._buffer) and (
+            is_sentence_boundary(self._buffer[end])
+            or self._buffer[end] in CLOSING_CHARACTERS
+        ):
+            end += 1
+        return end
+
+    def _soft_break_position(self) -> int:
+        for position in range(self._max_length, self._min_length - 1, -1):
+            if self._buffer[position - 1] in SOFT_BREAK_CHARACTERS:
+                return position
+        return self._max_length
+
+    def _take(self, end: int) -> str | None:
+        segment = self._buffer[:end].strip()
+        self._buffer = self._buffer[end:]
+        return segment or None
@@ -0,0 +1,220 @@
+import asyncio
+import inspect
+from collections.abc import Awaitable, Callable, Mapping
+from typing import (
+    Annotated,
+    Any,
+    NotRequired,
+    Required,
+    TypedDict,
+    get_args,
+    get_origin,
+    get_type_hints,
+    is_typeddict,
+)
+
+# 1回の関数呼び出しのタイムアウト（秒）
+DEFAULT_TOOL_TIMEOUT_SECONDS = 10.0
+
+JSON_SCHEMA_TYPES: dict[type, str] = {
+    str: "string",
+    int: "integer",
+    float: "number",
+    bool: "boolean",
+}
+
+# Geminiの関数呼び出しの引数は全てDTOを1つ受け取る形にする
+DTO_ARGUMENT_NAME = "dto"
+
+JsonSchema = dict[str, Any]
+ToolResponse = Mapping[str, object]
+
+
+class FunctionDeclaration(TypedDict):
+    name: str
+    description: str
+    parameters: JsonSchema
+
+
+class ToolError(Exception):
+    """関数呼び出しに失敗した場合の例外（メッセージはそのままモデルに返す）"""
+
+
+class ToolNotFoundError(ToolError):
+    """登録されていない関数が呼び出された場合の例外"""
+
+
+class ToolArgumentError(ToolError):
+    """関数呼び出しの引数がDTOの定義と一致しない場合の例外"""
+
+
+class ToolTimeoutError(ToolError):
+    """関数呼び出しがタイムアウトした場合の例外"""
+
+
+class ToolExecutionError(ToolError):
+    """関数の実装が例外を送出した場合の例外（元の例外は __cause__ に入れ、モデルには詳細を返さない）"""
+
+
+def _unwrap_annotated(hint: Any) -> tuple[Any, str | None]:
+    """Annotated[str, "説明"] のような型から型と説明を取り出す（NotRequired 等の修飾も外す）"""
+    description = None
+    while get_origin(hint) in (Annotated, NotRequired, Required):
+        base, *metadata = get_args(hint)
+        if get_origin(hint) is Annotated:
+            description = next((m for m in metadata if isinstance(m, str)), None)
+        hint = base
+    return hint, description
+
+
+def build_json_schema(hint: Any) -> JsonSchema:
+    """
+    型からGeminiの関数宣言に使うJSONスキーマを作成する。 \n
+    TypedDictのキーは型の Annotated の文字列を説明、クラスのdocstringをオブジェクトの説明として使う。
+    """
+    base, description = _unwrap_annotated(hint)
+
+    schema: JsonSchema
+    if is_typeddict(base):
+        hints = get_type_hints(base, include_extras=True)
+        schema = {
+            "type": "object",
+            "properties": {key: build_json_schema(h) for key, h in hints.items()},
+            "required": [key for key in hints if key in base.__required_keys__],
+        }
+        if description is None and base.__doc__:
+            description = inspect.cleandoc(base.__doc__)
+    elif get_origin(base) is list:
+        schema = {"type": "array", "items": build_json_schema(get_args(base)[0])}
+    elif base in JSON_SCHEMA_TYPES:
+        schema = {"type": JSON_SCHEMA_TYPES[base]}
+    else:
+        raise TypeError(f"JSONスキーマに変換できない型です: {base!r}")
+
+    if description:
+        schema["description"] = description
+    return schema
+
+
+def parse_arguments(hint: Any, value: object, path: str = DTO_ARGUMENT_NAME) -> Any:
+    """関数呼び出しの引数を型の定義に従って検証し、DTOに変換する"""
+    base, _ = _unwrap_annotated(hint)
+
+    if is_typeddict(base):
+        if not isinstance(value, Mapping):
+            raise ToolArgumentError(f"{path} はオブジェクトである必要があります")
+
+        hints = get_type_hints(base, include_extras=True)
+        missing = [key for key in base.__required_keys__ if key not in value]
+        if missing:
+            raise ToolArgumentError(
+                f"{path} の必須フィールドが不足しています: {', '.join(sorted(missing))}"
+            )
+        # 定義されていないキーは無視する
+        return {
+            key: parse_arguments(hints[key], value[key], f"{path}.{key}")
+            for key in hints
+            if key in value
+        }
+
+    if get_origin(base) is list:
+        if not isinstance(value, list):
+            raise ToolArgumentError(f"{path} は配列である必要があります")
+        item_hint = get_args(base)[0]
+        return [
+            parse_arguments(item_hint, item, f"{path}[{index}]")
+            for index, item in enumerate(value)
+        ]
+
+    if base is bool:
+        if isinstance(value, bool):
+            return value
+    elif base is int:
+        # Geminiの引数の数値は整数でも float で渡される事がある
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+    elif base is float:
+        if isinstance(value, int | float) and not isinstance(value, bool):
+            return float(value)
+    elif base is str:
+        if isinstance(value, str):
+            return value
+    else:
+        raise TypeError(f"検証できない型です: {base!r}")
+
+    raise ToolArgumentError(f"{path} は {JSON_SCHEMA_TYPES[base]} である必要があります")
+
+
+class Tool:
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        dto_type: Any,
+        handler: Callable[[Any], Awaitable[ToolResponse]],
+        timeout_seconds: float,
+    ) -> None:
+        self.name = name
+        self.description = description
+        self.dto_type = dto_type
+        self.handler = handler
+        self.timeout_seconds = timeout_seconds
+
+    def declaration(self) -> FunctionDeclaration:
+        return FunctionDeclaration(
+            name=self.name,
+            description=self.description,
+            parameters={
+                "type": "object",
+                "properties": {DTO_ARGUMENT_NAME: build_json_schema(self.dto_type)},
+                "required": [DTO_ARGUMENT_NAME],
+            },
+        )
+
+
+class ToolRegistry:
+    """
+    Geminiから呼び出せる関数の一覧。 \n
+    関数の引数のDTO（TypedDict）から関数宣言のスキーマと引数の検証を作成する。
+    """
+
+    def __init__(self) -> None:
+        self._tools: dict[str, Tool] = {}
+
+    def register[DtoT](
+        self,
+        name: str,
+        description: str,
+        dto_type: type[DtoT],
+        handler: Callable[[DtoT], Awaitable[ToolResponse]],
+        timeout_seconds: float = DEFAULT_TOOL_TIMEOUT_SECONDS,
+    ) -> None:
+        # スキーマに変換できない型は起動時にエラーにする
+        build_json_schema(dto_type)
+        self._tools[name] = Tool(name, description, dto_type, handler, timeout_seconds)
+
+    def function_declarations(self) -> list[FunctionDeclaration]:
+        return [tool.declaration() for tool in self._tools.values()]
+
+    async def call(self, name: str, args: Mapping[str, object] | None) -> ToolResponse:
+        """関数を呼び出して結果を返す。失敗した場合は ToolError を送出する"""
+        tool = self._tools.get(name)
+        if tool is None:
+            raise ToolNotFoundError(f"{name} という関数はありません")
+
+        dto = parse_arguments(tool.dto_type, (args or {}).get(DTO_ARGUMENT_NAME))
+
+        try:
+            async with asyncio.timeout(tool.timeout_seconds):
+                return await tool.handler(dto)
+        except TimeoutError as e:
+            raise ToolTimeoutError(
+                f"{name} が {tool.timeout_seconds}秒以内に完了しませんでした"
+            ) from e
+        except ToolError:
+            raise
+        # 関数の実装は登録した任意のコードなので、どの例外もモデルに返すエラーにしてセッションを止めない
+        except Exception as e:
+            raise ToolExecutionError(f"{name} の実行中にエラーが発生しました") from e
@@ -0,0 +1,164 @@
+import asyncio
+import io
+import time
+from collections.abc import Callable
+from concurrent.futures import Executor
+from typing import TypedDict
+
+import numpy as np
+import numpy.typing as npt
+from PIL import Image
+
+from domain.image_normalizer import get_image_executor
+
+# 2つのフレームのハッシュ（64bit）の差分がこのビット数以下なら同じ画像とみなす
+DEFAULT_DUPLICATE_THRESHOLD_BITS = 6
+DEFAULT_MAX_FRAMES_PER_SECOND = 1.0
+DEFAULT_MIN_FRAMES_PER_SECOND = 0.1
+# 上流への送信にかかった時間のこの倍数をフレームの送信間隔の下限とする
+DEFAULT_LATENCY_MULTIPLIER = 4.0
+# 画像に変化が無くてもこの間隔で1フレームは送信する（秒）
+DEFAULT_KEYFRAME_INTERVAL_SECONDS = 10.0
+# 上流のレイテンシの指数移動平均の重み
+LATENCY_SMOOTHING = 0.2
+
+HASH_WIDTH = 8
+HASH_HEIGHT = 8
+
+FrameHash = npt.NDArray[np.bool_]
+
+
+class VideoFrameGateStats(TypedDict):
+    frames_received: int
+    frames_forwarded: int
+    frames_dropped_duplicate: int
+    frames_dropped_rate_limit: int
+    upstream_latency_seconds: float
+    min_interval_seconds: float
+
+
+def compute_frame_hash(jpeg: bytes) -> FrameHash:
+    """
+    JPEG画像の差分ハッシュ（dHash）を計算する。 \n
+    JPEGのドラフトモードで縮小デコードしてから 9x8 のグレースケールに縮小し、隣接ピクセルの大小を64bitにする。
+    """
+    with Image.open(io.BytesIO(jpeg)) as image:
+        image.draft("L", (HASH_WIDTH * 8, HASH_HEIGHT * 8))
+        pixels = np.asarray(
+            image.convert("L").resize(
+                (HASH_WIDTH + 1, HASH_HEIGHT), Image.Resampling.BILINEAR
+            ),
+            dtype=np.int16,
+        )
+
+    return pixels[:, 1:] > pixels[:, :-1]
+
+
+def hamming_distance(a: FrameHash, b: FrameHash) -> int:
+    return int(np.count_nonzero(a != b))
+
+
+class VideoFrameGate:
+    """
+    Geminiに転送する映像フレームを間引く。 \n
+    直前に転送したフレームとほぼ同じ画像は破棄し、上流のレイテンシに応じて転送するフレームレートの上限を下げる。 \n
+    画像のデコードは画像処理用のスレッドプールで行い、イベントループでは行わない。
+    """
+
+    def __init__(
+        self,
+        duplicate_threshold_bits: int = DEFAULT_DUPLICATE_THRESHOLD_BITS,
+        max_frames_per_second: float = DEFAULT_MAX_FRAMES_PER_SECOND,
+        min_frames_per_second: float = DEFAULT_MIN_FRAMES_PER_SECOND,
+        latency_multiplier: float = DEFAULT_LATENCY_MULTIPLIER,
+        keyframe_interval_seconds: float = DEFAULT_KEYFRAME_INTERVAL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+        executor: Executor | None = None,
+    ) -> None:
+        self._duplicate_threshold_bits = duplicate_threshold_bits
+        self._base_min_interval = 1.0 / max_frames_per_second
+        self._max_min_interval = 1.0 / min_frames_per_second
+        self._latency_multiplier = latency_multiplier
+        self._keyframe_interval_seconds = keyframe_interval_seconds
+        self._clock = clock
+        self._executor = executor
+        # 直前のフレームの判定が終わるまで次のフレームを判定しない
+        self._lock = asyncio.Lock()
+        self._last_forwarded_at: float | None = None
+        self._last_forwarded_hash: FrameHash | None = None
+        self._upstream_latency_seconds = 0.0
+        self._stats = VideoFrameGateStats(
+            frames_received=0,
+            frames_forwarded=0,
+            frames_dropped_duplicate=0,
+            frames_dropped_rate_limit=0,
+            upstream_latency_seconds=0.0,
+            min_interval_seconds=self._base_min_interval,
+        )
+
+    @property
+    def stats(self) -> VideoFrameGateStats:
+        stats = self._stats.copy()
+        stats["upstream_latency_seconds"] = self._upstream_latency_seconds
+        stats["min_interval_seconds"] = self.min_interval_seconds
+        return stats
+
+    @property
+    def min_interval_seconds(self) -> float:
+        """現在のフレームの転送間隔の下限（上流のレイテンシが大きい程長くなる）"""
+        adaptive_interval = self._upstream_latency_seconds * self._latency_multiplier
+        return min(
+            self._max_min_interval, max(self._base_min_interval, adaptive_interval)
+        )
+
+    def record_upstream_latency(self, seconds: float) -> None:
+        """上流への画像の送信にかかった時間を記録する"""
+        if self._upstream_latency_seconds == 0.0:
+            self._upstream_latency_seconds = seconds
+            return
+
+        self._upstream_latency_seconds += LATENCY_SMOOTHING * (
+            seconds - self._upstream_latency_seconds
+        )
+
+    async def should_forward(self, jpeg: bytes) -> bool:
+        """フレームを転送すべきかどうかを判定する（転送する場合は直前のフレームとして記録する）"""
+        self._stats["frames_received"] += 1
+        now = self._clock()
+        async with self._lock:
+            return await self._should_forward(jpeg, now)
+
+    async def _should_forward(self, jpeg: bytes, now: float) -> bool:
+        if self._last_forwarded_at is not None:
+            elapsed = now - self._last_forwarded_at
+            # レート制限はデコードせずに判定できるので先に行う
+            if elapsed < self.min_interval_seconds:
+                self._stats["frames_dropped_rate_limit"] += 1
+                return False
+        else:
+            elapsed = float("inf")
+
+        try:
+            frame_hash: (
+                FrameHash | None
+            ) = await asyncio.get_running_loop().run_in_executor(
+                self._executor or get_image_executor(), compute_frame_hash, jpeg
+            )
+        except (OSError, ValueError):
+            # デコードできない画像の判定はGemini側に任せる
+            frame_hash = None
+
+        if (
+            frame_hash is not None
+            and self._last_forwarded_hash is not None
+            and elapsed < self._keyframe_interval_seconds
+            and hamming_distance(frame_hash, self._last_forwarded_hash)
+            <= self._duplicate_threshold_bits
+        ):
+            self._stats["frames_dropped_duplicate"] += 1
+            return False
+
+        self._last_forwarded_at = now
+        self._last_forwarded_hash = frame_hash
+        self._stats["frames_forwarded"] += 1
+        return True
@@ -0,0 +1,189 @@
+from collections import deque
+from typing import Literal, TypedDict, final
+
+import numpy as np
+import numpy.typing as npt
+
+# フロントエンドのAudioWorkletが送信するPCM音声の形式（16kHz/16bit/モノラル）
+PCM_SAMPLE_RATE = 16000
+PCM_SAMPLE_WIDTH = 2
+# 音声区間の判定を行うフレームの長さ（秒）
+FRAME_SECONDS = 0.02
+
+# フレームの音量（dBFS）がこの値以上なら発話とみなす
+DEFAULT_ENERGY_THRESHOLD_DBFS = -45.0
+# 音量が閾値に届かなくてもゼロ交差率が高いフレームは無声子音として扱う（閾値から何dB下まで許容するか）
+DEFAULT_WEAK_ENERGY_MARGIN_DB = 6.0
+DEFAULT_ZERO_CROSSING_THRESHOLD = 0.25
+# 発話とみなすまでに連続して必要な発話フレームの長さ（クリック音などで反応しない為）
+DEFAULT_MIN_SPEECH_SECONDS = 0.06
+# 発話が途切れてからも転送を続ける時間（語尾や息継ぎを切らない為）
+DEFAULT_HANGOVER_SECONDS = 0.4
+# 発話開始の直前の無音をこの長さだけ遡って転送する（語頭を切らない為）
+DEFAULT_PRE_ROLL_SECONDS = 0.2
+# 発話終了時にGeminiに送る無音の長さ（Gemini側で発話終了を早く検出させる為）
+DEFAULT_END_PADDING_SECONDS = 0.6
+
+VoiceActivityEvent = Literal["speech_start", "speech_end"]
+
+
+@final
+class SpeechAudio(TypedDict):
+    pcm: bytes
+
+
+@final
+class SpeechMarker(TypedDict):
+    event: VoiceActivityEvent
+
+
+VoiceActivitySegment = SpeechAudio | SpeechMarker
+
+
+class VoiceActivityGateStats(TypedDict):
+    received_seconds: float
+    forwarded_seconds: float
+    suppressed_seconds: float
+    speech_segments: int
+
+
+def analyze_frames(
+    samples: npt.NDArray[np.int16],
+) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    """(フレーム数, フレーム長) のPCMからフレーム毎の音量（dBFS）とゼロ交差率を計算する"""
+    floats = samples.astype(np.float64)
+    rms = np.sqrt(np.mean(floats * floats, axis=1))
+    dbfs = 20.0 * np.log10(np.maximum(rms, 1.0) / 32768.0)
+
+    sign_changes = np.count_nonzero(np.diff(np.signbit(samples), axis=1), axis=1)
+    zero_crossing_rate = sign_changes / (samples.shape[1] - 1)
+    return dbfs, zero_crossing_rate
+
+
+class VoiceActivityGate:
+    """
+    クライアントから受信したPCM音声の無音区間をGeminiに転送しないようにする。 \n
+    フレーム毎の音量とゼロ交差率で発話を判定し、発話の開始・終了を SpeechMarker で知らせる。 \n
+    フレームの長さに満たない端数は次のチャンクと合わせて判定する。
+    """
+
+    def __init__(
+        self,
+        energy_threshold_dbfs: float = DEFAULT_ENERGY_THRESHOLD_DBFS,
+        weak_energy_margin_db: float = DEFAULT_WEAK_ENERGY_MARGIN_DB,
+        zero_crossing_threshold: float = DEFAULT_ZERO_CROSSING_THRESHOLD,
+        min_speech_seconds: float = DEFAULT_MIN_SPEECH_SECONDS,
+        hangover_seconds: float = DEFAULT_HANGOVER_SECONDS,
+        pre_roll_seconds: float = DEFAULT_PRE_ROLL_SECONDS,
+        end_padding_seconds: float = DEFAULT_END_PADDING_SECONDS,
+        sample_rate: int = PCM_SAMPLE_RATE,
+    ) -> None:
+        self._energy_threshold_dbfs = energy_threshold_dbfs
+        self._weak_energy_threshold_dbfs = energy_threshold_dbfs - weak_energy_margin_db
+        self._zero_crossing_threshold = zero_crossing_threshold
+        self._sample_rate = sample_rate
+        self._frame_size = round(sample_rate * FRAME_SECONDS)
+        self._frame_bytes = self._frame_size * PCM_SAMPLE_WIDTH
+        self._min_speech_frames = max(1, round(min_speech_seconds / FRAME_SECONDS))
+        self._hangover_frames = round(hangover_seconds / FRAME_SECONDS)
+        self._end_padding = bytes(
+            round(sample_rate * end_padding_seconds) * PCM_SAMPLE_WIDTH
+        )
+        # 発話開始前のフレーム（発話開始時に遡って転送する）
+        self._pre_roll: deque[bytes] = deque(
+            maxlen=max(self._min_speech_frames, round(pre_roll_seconds / FRAME_SECONDS))
+        )
+        self._remainder = b""
+        self._is_speaking = False
+        self._speech_frames = 0
+        self._silent_frames = 0
+        self._received_bytes = 0
+        self._forwarded_bytes = 0
+        self._speech_segments = 0
+
+    @property
+    def is_speaking(self) -> bool:
+        return self._is_speaking
+
+    @property
+    def end_padding(self) -> bytes:
+        """発話終了時にGeminiに送る無音のPCM"""
+        return self._end_padding
+
+    @property
+    def stats(self) -> VoiceActivityGateStats:
+        bytes_per_second = self._sample_rate * PCM_SAMPLE_WIDTH
+        received_seconds = self._received_bytes / bytes_per_second
+        forwarded_seconds = self._forwarded_bytes / bytes_per_second
+        return VoiceActivityGateStats(
+            received_seconds=received_seconds,
+            forwarded_seconds=forwarded_seconds,
+            suppressed_seconds=max(0.0, received_seconds - forwarded_seconds),
+            speech_segments=self._speech_segments,
+        )
+
+    def classify(self, samples: npt.NDArray[np.int16]) -> npt.NDArray[np.bool_]:
+        """(フレーム数, フレーム長) のPCMのフレーム毎に発話かどうかを判定する"""
+        dbfs, zero_crossing_rate = analyze_frames(samples)
+        is_loud = dbfs >= self._energy_threshold_dbfs
+        is_unvoiced = (dbfs >= self._weak_energy_threshold_dbfs) & (
+            zero_crossing_rate >= self._zero_crossing_threshold
+        )
+        return is_loud | is_unvoiced
+
+    def process(self, pcm: bytes) -> list[VoiceActivitySegment]:
+        """PCM音声を判定し、転送する音声と発話の開始・終了を発生順に返す"""
+        self._received_bytes += len(pcm)
+        data = self._remainder + pcm
+        usable = len(data) - len(data) % self._frame_bytes
+        self._remainder = data[usable:]
+        if usable == 0:
+            return []
+
+        samples = np.frombuffer(data, dtype="<i2", count=usable // PCM_SAMPLE_WIDTH)
+        is_speech = self.classify(samples.reshape(-1, self._frame_size))
+
+        segments: list[VoiceActivitySegment] = []
+        forwarded: list[bytes] = []
+        for index, speech in enumerate(is_speech.tolist()):
+            frame = data[index * self._frame_bytes : (index + 1) * self._frame_bytes]
+
+            if not self._is_speaking:
+                self._pre_roll.append(frame)
+                self._speech_frames = self._speech_frames + 1 if speech else 0
+                if self._speech_frames >= self._min_speech_frames:
+                    self._is_speaking = True
+                    self._silent_frames = 0
+                    self._speech_segments += 1
+                    segments.append(SpeechMarker(event="speech_start"))
+                    forwarded.extend(self._pre_roll)
+                    self._pre_roll.clear()
+                continue
+
+            if speech:
+                self._silent_frames = 0
+            else:
+                self._silent_frames += 1
+                if self._silent_frames > self._hangover_frames:
+                    self._is_speaking = False
+                    self._speech_frames = 0
+                    self._pre_roll.append(frame)
+                    self._flush_forwarded(forwarded, segments)
+                    segments.append(SpeechMarker(event="speech_end"))
+                    continue
+
+            forwarded.append(frame)
+
+        self._flush_forwarded(forwarded, segments)
+        return segments
+
+    def _flush_forwarded(
+        self, forwarded: list[bytes], segments: list[VoiceActivitySegment]
+    ) -> None:
+        if not forwarded:
+            return
+
+        pcm = b"".join(forwarded)
+        forwarded.clear()
+        self._forwarded_bytes += len(pcm)
+        segments.append(SpeechAudio(pcm=pcm))
@@ -0,0 +1,63 @@
+import asyncio
+import os
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any
+
+from websockets.exceptions import WebSocketException
+
+if TYPE_CHECKING:
+    from google.genai.live import AsyncSession
+
+GEMINI_API_VERSION = "v1alpha"
+
+# Gemini Live APIの接続・送受信で発生する例外
+# 接続の失敗・切断（OSError、WebSocketの例外）と、不正なリクエスト・応答やAPIキーの設定漏れ（ValueError）
+LIVE_API_ERRORS: tuple[type[Exception], ...] = (
+    OSError,
+    WebSocketException,
+    ValueError,
+)
+
+# プロセス内で共有するGemini APIのクライアント
+# SDKのimport（google.genai.types 等）に時間が掛かるので、起動時には作成せずに初回の利用時に作成する
+_gemini_client: Any = None
+_create_lock: asyncio.Lock | None = None
+
+
+def _create_gemini_client() -> Any:
+    from google import genai
+
+    return genai.Client(
+        api_key=os.getenv("GEMINI_API_KEY"),
+        http_options={"api_version": GEMINI_API_VERSION},
+    )
+
+
+async def get_gemini_client() -> Any:
+    """
+    プロセス内で共有するGemini APIのクライアント（genai.Client）を取得する。 \n
+    初回はSDKのimportとクライアントの作成をスレッドで行い、その間もイベントループを止めない。
+    """
+    global _gemini_client, _create_lock
+
+    if _gemini_client is not None:
+        return _gemini_client
+
+    if _create_lock is None:
+        _create_lock = asyncio.Lock()
+    async with _create_lock:
+        if _gemini_client is None:
+            _gemini_client = await asyncio.to_thread(_create_gemini_client)
+
+    return _gemini_client
+
+
+@asynccontextmanager
+async def connect_live_api(
+    model: str, config: dict[str, Any]
+) -> AsyncIterator["AsyncSession"]:
+    """client.aio.live.connect と同じく、抜けると切断するGemini Live APIのセッションに接続する"""
+    client = await get_gemini_client()
+    async with client.aio.live.connect(model=model, config=config) as session:
+        yield session
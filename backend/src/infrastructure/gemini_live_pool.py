@@ -0,0 +1,176 @@
+import asyncio
+import math
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable
+from contextlib import AbstractAsyncContextManager, AsyncExitStack, asynccontextmanager
+from typing import TypedDict
+
+from infrastructure.gemini_client import LIVE_API_ERRORS
+from log.logger import AppLogger
+
+app_logger = AppLogger()
+
+# 事前に接続しておくセッションの数（Gemini APIの同時セッション数の上限を消費するので小さくする）
+DEFAULT_POOL_SIZE = 1
+# 事前に接続したセッションを使わずに保持する時間の上限（秒）、超えたものは切断して接続し直す
+DEFAULT_MAX_IDLE_SECONDS = 120.0
+# 期限切れのセッションを確認する間隔（秒）
+DEFAULT_CHECK_INTERVAL_SECONDS = 5.0
+# 接続に失敗した場合に再接続を待つ時間（失敗が続く度に倍にする）
+DEFAULT_RETRY_BACKOFF_SECONDS = 1.0
+MAX_RETRY_BACKOFF_SECONDS = 30.0
+
+
+class GeminiLivePoolStats(TypedDict):
+    pool_size: int
+    hits: int
+    misses: int
+    connects: int
+    connect_failures: int
+    evicted: int
+
+
+class PooledSession[SessionT]:
+    def __init__(self, session: SessionT, exit_stack: AsyncExitStack) -> None:
+        self.session = session
+        self.connected_at = time.monotonic()
+        self._exit_stack = exit_stack
+
+    async def close(self) -> None:
+        try:
+            await self._exit_stack.aclose()
+        except LIVE_API_ERRORS as e:
+            app_logger.logger.warning(f"Geminiのセッションの切断に失敗しました: {e}")
+
+
+class GeminiLivePool[SessionT]:
+    """
+    Gemini Live APIのセッションを事前に接続しておき、WebSocketの接続時に待たずに渡す。 \n
+    セッションは会話の履歴を持つので使い回さず、使い終わったら切断して裏で新しいセッションを補充する。 \n
+    connect には client.aio.live.connect(model=..., config=...) のような非同期コンテキストマネージャを返す関数を渡す。
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], AbstractAsyncContextManager[SessionT]],
+        size: int = DEFAULT_POOL_SIZE,
+        max_idle_seconds: float = DEFAULT_MAX_IDLE_SECONDS,
+        check_interval_seconds: float = DEFAULT_CHECK_INTERVAL_SECONDS,
+        retry_backoff_seconds: float = DEFAULT_RETRY_BACKOFF_SECONDS,
+    ) -> None:
+        self._connect_session = connect
+        self._size = size
+        self._max_idle_seconds = max_idle_seconds
+        self._check_interval_seconds = check_interval_seconds
+        self._retry_backoff_seconds = retry_backoff_seconds
+        self._idle: deque[PooledSession[SessionT]] = deque()
+        self._refill = asyncio.Event()
+        self._maintain_task: asyncio.Task[None] | None = None
+        self._stats = GeminiLivePoolStats(
+            pool_size=0,
+            hits=0,
+            misses=0,
+            connects=0,
+            connect_failures=0,
+            evicted=0,
+        )
+
+    @property
+    def stats(self) -> GeminiLivePoolStats:
+        stats = self._stats.copy()
+        stats["pool_size"] = len(self._idle)
+        return stats
+
+    def start(self) -> None:
+        """裏でセッションの補充と期限切れのセッションの切断を開始する"""
+        if self._size > 0 and self._maintain_task is None:
+            self._maintain_task = asyncio.create_task(self._maintain())
+
+    async def close(self) -> None:
+        if self._maintain_task is not None:
+            self._maintain_task.cancel()
+            try:
+                await self._maintain_task
+            except asyncio.CancelledError:
+                pass
+            self._maintain_task = None
+
+        while self._idle:
+            await self._idle.popleft().close()
+
+    def expire_idle(self) -> None:
+        """事前に接続済みのセッションを期限切れにする（接続の設定を変更した場合に、変更後の設定で接続し直す）"""
+        for pooled in self._idle:
+            pooled.connected_at = -math.inf
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[SessionT]:
+        """事前に接続したセッションを取得する（無い場合はその場で接続する）。抜けるとセッションを切断する"""
+        pooled = await self._take_idle()
+        if pooled is None:
+            self._stats["misses"] += 1
+            pooled = await self._connect()
+        else:
+            self._stats["hits"] += 1
+        self._refill.set()
+
+        try:
+            yield pooled.session
+        finally:
+            await pooled.close()
+
+    async def _take_idle(self) -> PooledSession[SessionT] | None:
+        while self._idle:
+            pooled = self._idle.popleft()
+            if not self._is_expired(pooled):
+                return pooled
+            self._stats["evicted"] += 1
+            await pooled.close()
+        return None
+
+    def _is_expired(self, pooled: PooledSession[SessionT]) -> bool:
+        return time.monotonic() - pooled.connected_at > self._max_idle_seconds
+
+    async def _connect(self) -> PooledSession[SessionT]:
+        exit_stack = AsyncExitStack()
+        try:
+            session = await exit_stack.enter_async_context(self._connect_session())
+        except Exception:
+            self._stats["connect_failures"] += 1
+            await exit_stack.aclose()
+            raise
+        except BaseException:
+            await exit_stack.aclose()
+            raise
+
+        self._stats["connects"] += 1
+        return PooledSession(session, exit_stack)
+
+    async def _maintain(self) -> None:
+        backoff = self._retry_backoff_seconds
+        while True:
+            while self._idle and self._is_expired(self._idle[0]):
+                self._stats["evicted"] += 1
+                await self._idle.popleft().close()
+
+            if len(self._idle) < self._size:
+                try:
+                    self._idle.append(await self._connect())
+                    backoff = self._retry_backoff_seconds
+                    continue
+                except LIVE_API_ERRORS as e:
+                    app_logger.logger.warning(
+                        f"Geminiのセッションの事前接続に失敗しました: {e}"
+                    )
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, MAX_RETRY_BACKOFF_SECONDS)
+                    continue
+
+            self._refill.clear()
+            try:
+                await asyncio.wait_for(
+                    self._refill.wait(), self._check_interval_seconds
+                )
+            except TimeoutError:
+                pass
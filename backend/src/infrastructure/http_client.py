@@ -0,0 +1,35 @@
+import httpx
+
+# プロセス内で共有するHTTPクライアント
+# リクエストの度にTCP/TLS接続を張り直さないようにコネクションプールを再利用する
+_http_client: httpx.AsyncClient | None = None
+
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+KEEPALIVE_EXPIRY_SECONDS = 30.0
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """プロセス内で共有する非同期HTTPクライアントを取得する"""
+    global _http_client
+
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+            ),
+        )
+
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """共有しているHTTPクライアントのコネクションプールを解放する"""
+    global _http_client
+
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+
+    _http_client = None
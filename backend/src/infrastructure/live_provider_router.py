@@ -0,0 +1,279 @@
+import math
+import os
+import random
+import statistics
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Sequence
+from contextlib import AbstractAsyncContextManager, AsyncExitStack, asynccontextmanager
+from typing import TypedDict
+
+from infrastructure.gemini_client import LIVE_API_ERRORS
+from log.logger import AppLogger
+from log.metrics import metrics_registry
+
+app_logger = AppLogger()
+
+# 接続時間・最初の応答までの時間・成否を直近何件分で評価するか
+LIVE_PROVIDER_WINDOW = int(os.getenv("LIVE_PROVIDER_WINDOW", "20"))
+# 連続して失敗したら一定時間そのプロバイダーを使わない（失敗が続く度に待つ時間を倍にする）
+LIVE_PROVIDER_FAILURE_THRESHOLD = int(os.getenv("LIVE_PROVIDER_FAILURE_THRESHOLD", "3"))
+LIVE_PROVIDER_COOLDOWN_SECONDS = float(
+    os.getenv("LIVE_PROVIDER_COOLDOWN_SECONDS", "30")
+)
+MAX_LIVE_PROVIDER_COOLDOWN_SECONDS = 600.0
+# 最速ではないプロバイダーに振り分ける割合（計測値を新しく保つ為）
+LIVE_PROVIDER_EXPLORE_RATE = float(os.getenv("LIVE_PROVIDER_EXPLORE_RATE", "0.05"))
+# エラー率が高くてもスコアが無限大にならないようにする上限
+MAX_ERROR_RATE = 0.9
+
+provider_connect_seconds = metrics_registry.histogram(
+    "live_provider_connect_seconds",
+    "リアルタイムAPIのプロバイダー毎の接続に掛かった時間（秒）",
+    label_name="provider",
+)
+provider_sessions_total = metrics_registry.counter(
+    "live_provider_sessions_total",
+    "プロバイダー毎に接続したセッション数",
+    label_name="provider",
+)
+provider_failures_total = metrics_registry.counter(
+    "live_provider_failures_total",
+    "プロバイダー毎の接続の失敗とセッション中のエラーの件数",
+    label_name="provider",
+)
+
+
+class LiveProviderStats(TypedDict):
+    provider: str
+    model: str
+    sessions: int
+    failures: int
+    # 直近の中央値（秒、計測値が無い場合は None）
+    connect_seconds: float | None
+    time_to_first_token_seconds: float | None
+    error_rate: float
+    # 小さいほど優先する（計測値が無い場合は None）
+    score: float | None
+    available: bool
+
+
+class LiveProvider[SessionT, ConfigT]:
+    """
+    リアルタイムAPIの接続先（プロバイダーとモデルの組み合わせ）。 \n
+    connect には接続の設定を受け取り、抜けると切断する非同期コンテキストマネージャを返す関数を渡す。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        model: str,
+        connect: Callable[[ConfigT], AbstractAsyncContextManager[SessionT]],
+    ) -> None:
+        self.name = name
+        self.model = model
+        self.connect = connect
+
+
+class RoutedSession[SessionT]:
+    """接続先を選んで接続したセッション（最初の応答までの時間やエラーを接続先の評価に使う）"""
+
+    def __init__(self, provider: str, model: str, session: SessionT) -> None:
+        self.provider = provider
+        self.model = model
+        self.session = session
+
+
+class ProviderHealth:
+    """1つのプロバイダーの直近の接続時間・最初の応答までの時間・成否"""
+
+    def __init__(self, window: int) -> None:
+        self.connect_seconds: deque[float] = deque(maxlen=window)
+        self.time_to_first_token_seconds: deque[float] = deque(maxlen=window)
+        self.outcomes: deque[bool] = deque(maxlen=window)
+        self.sessions = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.cooldown_seconds = 0.0
+        self.unavailable_until = -math.inf
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    @property
+    def score(self) -> float | None:
+        """最初の応答までに掛かる時間の見積もりをエラー率で割り増したもの"""
+        if not self.connect_seconds and not self.time_to_first_token_seconds:
+            return None
+        latency = sum(
+            statistics.median(samples)
+            for samples in (self.connect_seconds, self.time_to_first_token_seconds)
+            if samples
+        )
+        return latency / (1 - min(self.error_rate, MAX_ERROR_RATE))
+
+
+class LiveProviderRouter[SessionT, ConfigT]:
+    """
+    新しいセッションを、直近の接続時間・最初の応答までの時間・エラー率から最も速く応答できるプロバイダーに接続する。 \n
+    接続に失敗した場合は次に良いプロバイダーに接続し直し、連続して失敗したプロバイダーは一定時間使わない。 \n
+    計測値の無いプロバイダーは先に試して計測し、その後も LIVE_PROVIDER_EXPLORE_RATE の割合で最速以外に振り分けて計測値を新しく保つ。 \n
+    会話の履歴は接続先にある為、接続後のセッションを別のプロバイダーに移すことはしない。
+    """
+
+    def __init__(
+        self,
+        providers: Sequence[LiveProvider[SessionT, ConfigT]],
+        window: int = LIVE_PROVIDER_WINDOW,
+        failure_threshold: int = LIVE_PROVIDER_FAILURE_THRESHOLD,
+        cooldown_seconds: float = LIVE_PROVIDER_COOLDOWN_SECONDS,
+        explore_rate: float = LIVE_PROVIDER_EXPLORE_RATE,
+        clock: Callable[[], float] = time.monotonic,
+        rng: random.Random | None = None,
+    ) -> None:
+        if not providers:
+            raise ValueError("プロバイダーを1つ以上指定してください")
+        self._providers = list(providers)
+        self._health = {provider.name: ProviderHealth(window) for provider in providers}
+        self._failure_threshold = failure_threshold
+        self._cooldown_seconds = cooldown_seconds
+        self._explore_rate = explore_rate
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._subscribers: list[Callable[[], None]] = []
+
+    @property
+    def stats(self) -> list[LiveProviderStats]:
+        now = self._clock()
+        stats = []
+        for provider in self._providers:
+            health = self._health[provider.name]
+            stats.append(
+                LiveProviderStats(
+                    provider=provider.name,
+                    model=provider.model,
+                    sessions=health.sessions,
+                    failures=health.failures,
+                    connect_seconds=(
+                        statistics.median(health.connect_seconds)
+                        if health.connect_seconds
+                        else None
+                    ),
+                    time_to_first_token_seconds=(
+                        statistics.median(health.time_to_first_token_seconds)
+                        if health.time_to_first_token_seconds
+                        else None
+                    ),
+                    error_rate=health.error_rate,
+                    score=health.score,
+                    available=health.unavailable_until <= now,
+                )
+            )
+        return stats
+
+    def subscribe(self, callback: Callable[[], None]) -> None:
+        """プロバイダーが使えなくなった時に呼び出す関数を登録する（事前に接続したセッションの破棄等）"""
+        self._subscribers.append(callback)
+
+    def ranked(self) -> list[LiveProvider[SessionT, ConfigT]]:
+        """接続を試す順番のプロバイダー（全て使えない場合は、使えるようになるのが早い順に全て試す）"""
+        now = self._clock()
+        available = [
+            provider
+            for provider in self._providers
+            if self._health[provider.name].unavailable_until <= now
+        ]
+        if not available:
+            return sorted(
+                self._providers,
+                key=lambda provider: self._health[provider.name].unavailable_until,
+            )
+
+        # 計測値の無いプロバイダーは設定の順番で先に試す
+        unmeasured = [p for p in available if self._health[p.name].score is None]
+        measured = [p for p in available if self._health[p.name].score is not None]
+        measured.sort(key=lambda provider: self._health[provider.name].score or 0.0)
+        ranked = unmeasured + measured
+        if len(ranked) > 1 and self._rng.random() < self._explore_rate:
+            ranked.insert(0, ranked.pop(self._rng.randrange(1, len(ranked))))
+        return ranked
+
+    @asynccontextmanager
+    async def connect(self, config: ConfigT) -> AsyncIterator[RoutedSession[SessionT]]:
+        """ranked の順に接続できるまで試し、抜けるとセッションを切断する。全て失敗した場合は最後のエラーを送出する"""
+        exit_stack = AsyncExitStack()
+        routed: RoutedSession[SessionT] | None = None
+        error: Exception | None = None
+        for provider in self.ranked():
+            started_at = self._clock()
+            try:
+                session = await exit_stack.enter_async_context(provider.connect(config))
+            except LIVE_API_ERRORS as e:
+                app_logger.logger.warning(
+                    f"リアルタイムAPIへの接続に失敗しました ({provider.name}): {e}"
+                )
+                self.observe_error(provider.name)
+                error = e
+                continue
+            except BaseException:
+                await exit_stack.aclose()
+                raise
+
+            seconds = self._clock() - started_at
+            self._observe_connected(provider.name, seconds)
+            routed = RoutedSession(provider.name, provider.model, session)
+            break
+
+        if routed is None:
+            assert error is not None
+            raise error
+
+        async with exit_stack:
+            yield routed
+
+    def observe_first_token(self, provider: str, seconds: float) -> None:
+        """ターンの開始から最初の応答を受信するまでの時間を記録する"""
+        health = self._health.get(provider)
+        if health is not None:
+            health.time_to_first_token_seconds.append(seconds)
+
+    def observe_error(self, provider: str) -> None:
+        """接続の失敗やセッション中のエラーを記録する"""
+        health = self._health.get(provider)
+        if health is None:
+            return
+        provider_failures_total.inc(provider)
+        health.failures += 1
+        health.outcomes.append(False)
+        health.consecutive_failures += 1
+        # 使わなかった期間の後に再び失敗した場合は、連続した失敗の数に関わらずすぐに使わないようにする
+        if (
+            health.consecutive_failures < self._failure_threshold
+            and health.cooldown_seconds == 0
+        ):
+            return
+
+        health.consecutive_failures = 0
+        health.cooldown_seconds = min(
+            max(health.cooldown_seconds * 2, self._cooldown_seconds),
+            MAX_LIVE_PROVIDER_COOLDOWN_SECONDS,
+        )
+        health.unavailable_until = self._clock() + health.cooldown_seconds
+        app_logger.logger.warning(
+            f"失敗が続いた為、{health.cooldown_seconds}秒間 {provider} を使いません"
+        )
+        for callback in self._subscribers:
+            callback()
+
+    def _observe_connected(self, provider: str, seconds: float) -> None:
+        health = self._health[provider]
+        provider_connect_seconds.observe(provider, seconds)
+        provider_sessions_total.inc(provider)
+        health.sessions += 1
+        health.connect_seconds.append(seconds)
+        health.outcomes.append(True)
+        health.consecutive_failures = 0
+        health.cooldown_seconds = 0.0
@@ -0,0 +1,292 @@
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from typing import TypedDict
+
+import httpx
+
+from infrastructure.http_client import get_http_client
+from infrastructure.tts_cache import TtsCache, get_tts_cache, tts_cache_key
+from log.logger import AppLogger
+from log.metrics import metrics_registry
+
+app_logger = AppLogger()
+
+TTS_VOICE_ACTOR_ID = "16e979a8-cd0f-49d4-a4c4-7a25aa42e184"
+TTS_API_URL = f"https://api.nijivoice.com/api/platform/v1/voice-actors/{TTS_VOICE_ACTOR_ID}/generate-encoded-voice"
+TTS_API_KEY = os.getenv("NIJIVOICE_API_KEY")
+TTS_AUDIO_FORMAT = "wav"
+TTS_SPEED = "0.8"
+
+# 1回の音声合成リクエストのタイムアウト（秒）
+TTS_TIMEOUT_SECONDS = 15.0
+# 通信エラーや5xxの場合にリトライする回数
+TTS_MAX_RETRIES = 2
+TTS_RETRY_BACKOFF_SECONDS = 0.2
+# プロセス全体（全セッション合計）で同時に実行する音声合成リクエストの上限
+TTS_MAX_CONCURRENCY = 8
+
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+# 直近のリクエストの所要時間のこの分位点を過ぎても応答が無い場合に、同じリクエストをもう1つ送信する（0の場合は送信しない）
+TTS_HEDGE_PERCENTILE = float(os.getenv("TTS_HEDGE_PERCENTILE", "0.95"))
+# 2つ目のリクエストを送信するまでに待つ時間の下限（秒、速いリクエストまで二重に送信しない為）
+TTS_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("TTS_HEDGE_MIN_DELAY_SECONDS", "0.3"))
+# 所要時間の計測値が少ない間に待つ時間（秒）
+TTS_HEDGE_INITIAL_DELAY_SECONDS = 2.0
+TTS_HEDGE_MIN_SAMPLES = 20
+# 分位点の計算に使う直近のリクエストの件数
+TTS_LATENCY_WINDOW = 200
+
+tts_api_requests_total = metrics_registry.counter(
+    "tts_api_requests_total",
+    "音声合成APIの呼び出しの件数（同じリクエストを2つ送信したかどうか別）",
+    label_name="hedged",
+)
+tts_hedge_wins_total = metrics_registry.counter(
+    "tts_hedge_wins_total",
+    "同じリクエストを2つ送信した場合に先に成功した方の件数",
+    label_name="winner",
+)
+
+
+class TtsRequestBody(TypedDict):
+    script: str
+    format: str
+    speed: str
+
+
+class TtsError(Exception):
+    """音声合成APIの呼び出しに失敗した場合の例外"""
+
+
+class TtsDeadlineExceeded(TtsError):
+    """指定された期限までに音声合成が完了しなかった場合の例外"""
+
+
+class LatencyTracker:
+    """直近のリクエストの所要時間から、2つ目のリクエストを送信するまでに待つ時間を決める"""
+
+    def __init__(
+        self,
+        percentile: float,
+        min_delay_seconds: float,
+        initial_delay_seconds: float = TTS_HEDGE_INITIAL_DELAY_SECONDS,
+        min_samples: int = TTS_HEDGE_MIN_SAMPLES,
+        window: int = TTS_LATENCY_WINDOW,
+    ) -> None:
+        self._percentile = percentile
+        self._min_delay_seconds = min_delay_seconds
+        self._initial_delay_seconds = initial_delay_seconds
+        self._min_samples = min_samples
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def hedge_delay(self) -> float | None:
+        """2つ目のリクエストを送信するまでに待つ時間（秒、送信しない場合は None）"""
+        if self._percentile <= 0:
+            return None
+        if len(self._samples) < self._min_samples:
+            return self._initial_delay_seconds
+
+        ordered = sorted(self._samples)
+        index = min(math.ceil(self._percentile * len(ordered)) - 1, len(ordered) - 1)
+        return max(ordered[max(index, 0)], self._min_delay_seconds)
+
+
+class NijivoiceTtsClient:
+    def __init__(
+        self,
+        http_client: httpx.AsyncClient | None = None,
+        api_url: str = TTS_API_URL,
+        api_key: str | None = TTS_API_KEY,
+        timeout_seconds: float = TTS_TIMEOUT_SECONDS,
+        max_retries: int = TTS_MAX_RETRIES,
+        retry_backoff_seconds: float = TTS_RETRY_BACKOFF_SECONDS,
+        max_concurrency: int = TTS_MAX_CONCURRENCY,
+        cache: TtsCache | None = None,
+        hedge_percentile: float = TTS_HEDGE_PERCENTILE,
+        hedge_min_delay_seconds: float = TTS_HEDGE_MIN_DELAY_SECONDS,
+        hedge_initial_delay_seconds: float = TTS_HEDGE_INITIAL_DELAY_SECONDS,
+    ) -> None:
+        self._http_client = http_client
+        self._api_url = api_url
+        self._api_key = api_key
+        self._timeout_seconds = timeout_seconds
+        self._max_retries = max_retries
+        self._retry_backoff_seconds = retry_backoff_seconds
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # 同じ文（定型の挨拶やお断りの文など）は合成済みの音声を使い回す
+        self._cache = cache
+        # 遅いリクエストの応答を待ち続けないように、遅い場合は同じリクエストをもう1つ送信して先に成功した方を使う
+        self._latency = LatencyTracker(
+            hedge_percentile, hedge_min_delay_seconds, hedge_initial_delay_seconds
+        )
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        return self._http_client or get_http_client()
+
+    async def synthesize(
+        self, script: str, deadline: float | None = None
+    ) -> str | None:
+        """
+        テキストから音声を合成してBase64エンコードされた音声データを返す。 \n
+        レスポンスに音声データが含まれていない場合はNoneを返す。 \n
+        リトライしても失敗した場合は TtsError を送出する。 \n
+        deadline（イベントループの時刻）までに完了しない場合は TtsDeadlineExceeded を送出する。 \n
+        キャッシュを指定した場合は、同じテキスト・声（api_url に含まれる）・形式・速度の合成結果を再利用する。
+        """
+        try:
+            async with asyncio.timeout_at(deadline):
+                return await self._synthesize(script)
+        except TimeoutError as e:
+            raise TtsDeadlineExceeded("音声合成が期限までに完了しませんでした") from e
+
+    async def _synthesize(self, script: str) -> str | None:
+        cache_key = None
+        if self._cache is not None:
+            cache_key = tts_cache_key(
+                script, self._api_url, TTS_AUDIO_FORMAT, TTS_SPEED
+            )
+            cached_audio = await self._cache.get(cache_key)
+            if cached_audio is not None:
+                return cached_audio
+
+        request_body = TtsRequestBody(
+            script=script,
+            format=TTS_AUDIO_FORMAT,
+            speed=TTS_SPEED,
+        )
+
+        response_body = await self._post_hedged(request_body)
+
+        generated_voice = response_body.get("generatedVoice")
+        if isinstance(generated_voice, dict) and "base64Audio" in generated_voice:
+            base64_audio = str(generated_voice["base64Audio"])
+            if self._cache is not None and cache_key is not None:
+                await self._cache.put(cache_key, base64_audio)
+            return base64_audio
+
+        app_logger.logger.warning("音声合成APIのレスポンスに音声データがありません")
+        return None
+
+    async def _post_hedged(self, request_body: TtsRequestBody) -> dict[str, object]:
+        """
+        リクエストを送信し、直近の所要時間の分位点を過ぎても応答が無ければ同じリクエストをもう1つ送信する。 \n
+        先に成功した方の結果を返し、もう一方はキャンセルする。 \n
+        同時実行数の上限に達している場合は、他の文の音声合成を待たせないように2つ目は送信しない。
+        """
+        started_at = time.perf_counter()
+
+        def observe_primary(task: asyncio.Task[dict[str, object]]) -> None:
+            # 1つ目のリクエストが成功した場合だけ所要時間を記録する
+            # （2つ目が先に成功してキャンセルした場合の途中までの時間は、本来の所要時間より短く分位点を下げてしまう為）
+            if not task.cancelled() and task.exception() is None:
+                self._latency.observe(time.perf_counter() - started_at)
+
+        primary = asyncio.create_task(self._post_in_slot(request_body))
+        primary.add_done_callback(observe_primary)
+        tasks = [primary]
+        try:
+            hedge_delay = self._latency.hedge_delay()
+            if hedge_delay is not None:
+                await asyncio.wait(tasks, timeout=hedge_delay)
+            if primary.done() or hedge_delay is None or self._semaphore.locked():
+                tts_api_requests_total.inc("false")
+                return await primary
+
+            tts_api_requests_total.inc("true")
+            tasks.append(asyncio.create_task(self._post_in_slot(request_body)))
+            pending = set(tasks)
+            while True:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                # 先に完了した方が失敗した場合は、もう一方の完了を待つ
+                succeeded = [task for task in done if task.exception() is None]
+                if succeeded or not pending:
+                    break
+
+            if not succeeded:
+                return await primary
+            winner = primary if primary in succeeded else succeeded[0]
+            tts_hedge_wins_total.inc("primary" if winner is primary else "hedge")
+            return winner.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _post_in_slot(self, request_body: TtsRequestBody) -> dict[str, object]:
+        async with self._semaphore:
+            return await self._post_with_retry(request_body)
+
+    async def _post_with_retry(self, request_body: TtsRequestBody) -> dict[str, object]:
+        headers = {
+            "x-api-key": self._api_key or "",
+            "accept": "application/json",
+            "content-type": "application/json",
+        }
+
+        for attempt in range(self._max_retries + 1):
+            is_last_attempt = attempt == self._max_retries
+            try:
+                # httpxのタイムアウトは接続・読み込み等の各処理単位なので、リクエスト全体の所要時間にも上限を設ける
+                async with asyncio.timeout(self._timeout_seconds):
+                    response = await self.http_client.post(
+                        self._api_url,
+                        json=request_body,
+                        headers=headers,
+                        timeout=self._timeout_seconds,
+                    )
+            except (httpx.TransportError, TimeoutError) as e:
+                if is_last_attempt:
+                    raise TtsError(f"音声合成APIへの接続に失敗しました: {e!r}") from e
+                app_logger.logger.warning(
+                    f"音声合成APIへの接続に失敗したのでリトライします: {e!r}"
+                )
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    if response.is_error:
+                        raise TtsError(
+                            f"音声合成APIがエラーを返しました: {response.status_code}"
+                        )
+                    try:
+                        body = response.json()
+                    except ValueError as e:
+                        raise TtsError(
+                            f"音声合成APIのレスポンスを解析できませんでした: {e!r}"
+                        ) from e
+                    if not isinstance(body, dict):
+                        raise TtsError("音声合成APIのレスポンスの形式が不正です")
+                    return body
+
+                if is_last_attempt:
+                    raise TtsError(
+                        f"音声合成APIがエラーを返しました: {response.status_code}"
+                    )
+                app_logger.logger.warning(
+                    f"音声合成APIが {response.status_code} を返したのでリトライします"
+                )
+
+            await asyncio.sleep(self._retry_backoff_seconds * (2**attempt))
+
+        raise TtsError("音声合成APIの呼び出しに失敗しました")
+
+
+_tts_client: NijivoiceTtsClient | None = None
+
+
+def get_tts_client() -> NijivoiceTtsClient:
+    """全セッションで共有する音声合成クライアントを取得する（同時実行数の上限を全体で共有する為）"""
+    global _tts_client
+
+    if _tts_client is None:
+        _tts_client = NijivoiceTtsClient(cache=get_tts_cache())
+
+    return _tts_client
@@ -0,0 +1,356 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections.abc import Callable
+from typing import TypedDict
+
+import httpx
+
+from infrastructure.http_client import get_http_client
+from infrastructure.shared_store import (
+    InMemorySharedStore,
+    SharedStore,
+    SharedStoreError,
+)
+from log.logger import AppLogger
+
+app_logger = AppLogger()
+
+OPENAI_REALTIME_SESSIONS_URL = "https://api.openai.com/v1/realtime/sessions"
+OPENAI_REALTIME_MODEL = "gpt-4o-realtime-preview-2024-12-17"
+
+# セッション作成リクエストのタイムアウト（秒）
+SESSION_TIMEOUT_SECONDS = 10.0
+
+# 事前に作成しておくエフェメラルトークンの数（0の場合は事前に作成しない）
+DEFAULT_PREFETCH_SIZE = 2
+# 有効期限までの残り時間がこれより短いトークンはクライアントに渡さない（クライアントの接続に使う時間を残す為）
+DEFAULT_MIN_REMAINING_SECONDS = 20.0
+# 他のワーカーとバッファを共有している場合に、トークンの数を確認し直す間隔（秒）
+DEFAULT_CHECK_INTERVAL_SECONDS = 5.0
+# トークンを保存する共有ストアのキー
+TOKEN_BUFFER_KEY = "openai:ephemeral_tokens"
+# トークンの作成に失敗した場合に再作成を待つ時間（失敗が続く度に倍にする）
+DEFAULT_RETRY_BACKOFF_SECONDS = 1.0
+MAX_RETRY_BACKOFF_SECONDS = 30.0
+
+
+class RealtimeSessionRequestBody(TypedDict):
+    model: str
+    modalities: list[str]
+    instructions: str
+    tool_choice: str
+
+
+class EphemeralToken(TypedDict):
+    value: str
+    # 有効期限（UNIX時間、秒）
+    expires_at: float
+    # セッションを作成した時のシステムプロンプトの識別子（プロンプトが変更されたトークンを破棄する為）
+    instructions_version: str
+
+
+class OpenAiSessionError(Exception):
+    """OpenAI Realtime APIのセッションの作成に失敗した場合の例外"""
+
+
+class OpenAiRealtimeSessionClient:
+    """OpenAI Realtime APIのセッションを作成し、クライアントが接続に使うエフェメラルトークンを取得する"""
+
+    def __init__(
+        self,
+        instructions: str,
+        http_client: httpx.AsyncClient | None = None,
+        api_url: str = OPENAI_REALTIME_SESSIONS_URL,
+        api_key: str | None = None,
+        model: str = OPENAI_REALTIME_MODEL,
+        timeout_seconds: float = SESSION_TIMEOUT_SECONDS,
+    ) -> None:
+        self._http_client = http_client
+        self._api_url = api_url
+        self._api_key = api_key
+        self._timeout_seconds = timeout_seconds
+        self._model = model
+        self._request_content = b""
+        self.set_instructions(instructions)
+
+    def set_instructions(self, instructions: str) -> None:
+        """セッションのシステムプロンプトを変更する（リクエストボディはここで1回だけシリアライズする）"""
+        request_body = RealtimeSessionRequestBody(
+            model=self._model,
+            modalities=["text"],
+            instructions=instructions,
+            tool_choice="auto",
+        )
+        self._request_content = json.dumps(request_body).encode("utf-8")
+        self._instructions_version = hashlib.sha256(self._request_content).hexdigest()
+
+    @property
+    def instructions_version(self) -> str:
+        """現在のシステムプロンプトで作成するセッションの識別子"""
+        return self._instructions_version
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        return self._http_client or get_http_client()
+
+    @property
+    def api_key(self) -> str | None:
+        return self._api_key or os.getenv("OPENAI_API_KEY")
+
+    async def create_session(self) -> EphemeralToken:
+        """セッションを作成してエフェメラルトークンを返す。失敗した場合は OpenAiSessionError を送出する"""
+        if not self.api_key:
+            raise OpenAiSessionError("OPENAI_API_KEY が設定されていません")
+
+        # 作成中にプロンプトが変更されても、送信したプロンプトの識別子をトークンに付ける
+        request_content = self._request_content
+        instructions_version = self._instructions_version
+        try:
+            async with asyncio.timeout(self._timeout_seconds):
+                response = await self.http_client.post(
+                    self._api_url,
+                    headers={
+                        "Authorization": f"Bearer {self.api_key}",
+                        "Content-Type": "application/json",
+                    },
+                    content=request_content,
+                    timeout=self._timeout_seconds,
+                )
+        except (httpx.TransportError, TimeoutError) as e:
+            raise OpenAiSessionError(f"OpenAI APIへの接続に失敗しました: {e!r}") from e
+
+        if response.is_error:
+            raise OpenAiSessionError(f"OpenAI APIエラー: {response.text}")
+
+        try:
+            client_secret = response.json()["client_secret"]
+            return EphemeralToken(
+                value=str(client_secret["value"]),
+                expires_at=float(client_secret["expires_at"]),
+                instructions_version=instructions_version,
+            )
+        except (ValueError, KeyError, TypeError) as e:
+            raise OpenAiSessionError(f"OpenAI APIのレスポンスが不正です: {e!r}") from e
+
+
+class EphemeralTokenBufferStats(TypedDict):
+    buffer_size: int
+    hits: int
+    misses: int
+    created: int
+    create_failures: int
+    expired: int
+    stale: int
+
+
+class EphemeralTokenBuffer:
+    """
+    エフェメラルトークンを裏で事前に作成しておき、セッション作成のリクエストにはメモリから返す。 \n
+    トークンは1回しか渡さず、有効期限が近づいたものと変更前のプロンプトで作成したものは破棄して作成し直す。 \n
+    バッファが空の場合はその場でセッションを作成する。 \n
+    トークンは store のリストに保存するので、共有ストアを渡すと全ワーカーで1つのバッファを共有する。
+    """
+
+    def __init__(
+        self,
+        session_client: OpenAiRealtimeSessionClient,
+        size: int = DEFAULT_PREFETCH_SIZE,
+        min_remaining_seconds: float = DEFAULT_MIN_REMAINING_SECONDS,
+        retry_backoff_seconds: float = DEFAULT_RETRY_BACKOFF_SECONDS,
+        clock: Callable[[], float] = time.time,
+        store: SharedStore | None = None,
+        check_interval_seconds: float = DEFAULT_CHECK_INTERVAL_SECONDS,
+    ) -> None:
+        self._session_client = session_client
+        self._size = size
+        self._min_remaining_seconds = min_remaining_seconds
+        self._retry_backoff_seconds = retry_backoff_seconds
+        self._clock = clock
+        self._store: SharedStore = store or InMemorySharedStore()
+        self._owns_store = store is None
+        self._check_interval_seconds = check_interval_seconds
+        # store に保存されているトークンの数（最後に確認した時点の値）
+        self._buffer_size = 0
+        self._refill = asyncio.Event()
+        self._refill_task: asyncio.Task[None] | None = None
+        self._stats = EphemeralTokenBufferStats(
+            buffer_size=0,
+            hits=0,
+            misses=0,
+            created=0,
+            create_failures=0,
+            expired=0,
+            stale=0,
+        )
+
+    @property
+    def stats(self) -> EphemeralTokenBufferStats:
+        stats = self._stats.copy()
+        stats["buffer_size"] = self._buffer_size
+        return stats
+
+    def start(self) -> None:
+        """裏でトークンの補充を開始する（APIキーが設定されていない場合は何もしない）"""
+        if (
+            self._size > 0
+            and self._session_client.api_key
+            and self._refill_task is None
+        ):
+            self._refill_task = asyncio.create_task(self._run())
+
+    def expire_stale(self) -> None:
+        """プロンプトが変更された時に呼び出し、変更前のプロンプトで作成したトークンをすぐに破棄して補充し直す"""
+        self._refill.set()
+
+    async def close(self) -> None:
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
+            self._refill_task = None
+
+        # 共有ストアのトークンは他のワーカーが使うので残しておく
+        if self._owns_store:
+            await self._store.delete(TOKEN_BUFFER_KEY)
+        self._buffer_size = 0
+
+    async def get(self) -> EphemeralToken:
+        """有効なトークンを1つ取得する。作成に失敗した場合は OpenAiSessionError を送出する"""
+        self._refill.set()
+
+        try:
+            while (token := await self._pop()) is not None:
+                if self._keep(token):
+                    self._stats["hits"] += 1
+                    return token
+        except SharedStoreError as e:
+            app_logger.logger.warning(
+                f"エフェメラルトークンのバッファを取得できませんでした: {e}"
+            )
+
+        self._stats["misses"] += 1
+        return await self._create()
+
+    def _is_current(self, token: EphemeralToken) -> bool:
+        # 共有ストアには他のワーカーが変更前のプロンプトで作成したトークンも残っている
+        return (
+            token.get("instructions_version")
+            == self._session_client.instructions_version
+        )
+
+    def _is_usable(self, token: EphemeralToken) -> bool:
+        return token["expires_at"] - self._clock() >= self._min_remaining_seconds
+
+    def _keep(self, token: EphemeralToken) -> bool:
+        """クライアントに渡せるトークンかどうかを返し、渡せない場合は破棄した理由を数える"""
+        if not self._is_current(token):
+            self._stats["stale"] += 1
+            return False
+        if not self._is_usable(token):
+            self._stats["expired"] += 1
+            return False
+        return True
+
+    async def _pop(self) -> EphemeralToken | None:
+        value = await self._store.lpop(TOKEN_BUFFER_KEY)
+        if value is None:
+            self._buffer_size = 0
+            return None
+        self._buffer_size = max(self._buffer_size - 1, 0)
+        token: EphemeralToken = json.loads(value)
+        return token
+
+    async def _discard_expired(self) -> EphemeralToken | None:
+        """使えなくなったトークンを先頭から破棄し、先頭に残った（最も古い）トークンを返す"""
+        while (token := await self._pop()) is not None:
+            if self._keep(token):
+                self._buffer_size = await self._store.lpush(
+                    TOKEN_BUFFER_KEY, json.dumps(token)
+                )
+                return token
+        return None
+
+    async def _create(self) -> EphemeralToken:
+        try:
+            token = await self._session_client.create_session()
+        except OpenAiSessionError:
+            self._stats["create_failures"] += 1
+            raise
+
+        self._stats["created"] += 1
+        return token
+
+    async def _run(self) -> None:
+        backoff = self._retry_backoff_seconds
+        while True:
+            try:
+                oldest_token = await self._discard_expired()
+                self._buffer_size = await self._store.llen(TOKEN_BUFFER_KEY)
+            except SharedStoreError as e:
+                app_logger.logger.warning(
+                    f"エフェメラルトークンのバッファを確認できませんでした: {e}"
+                )
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, MAX_RETRY_BACKOFF_SECONDS)
+                continue
+
+            shortage = self._size - self._buffer_size
+            if shortage > 0:
+                # 不足している分はまとめて並行に作成する
+                results = await asyncio.gather(
+                    *(self._create() for _ in range(shortage)),
+                    return_exceptions=True,
+                )
+                tokens = [r for r in results if not isinstance(r, BaseException)]
+                errors = [r for r in results if isinstance(r, BaseException)]
+                for error in errors:
+                    if not isinstance(error, OpenAiSessionError):
+                        raise error
+                    app_logger.logger.warning(
+                        f"エフェメラルトークンの事前作成に失敗しました: {error}"
+                    )
+
+                # 作成中にプロンプトが変更されたトークンは保存しない
+                current_tokens = [t for t in tokens if self._is_current(t)]
+                self._stats["stale"] += len(tokens) - len(current_tokens)
+                usable_tokens = [t for t in current_tokens if self._is_usable(t)]
+                try:
+                    for token in usable_tokens:
+                        self._buffer_size = await self._store.rpush(
+                            TOKEN_BUFFER_KEY, json.dumps(token)
+                        )
+                except SharedStoreError as e:
+                    app_logger.logger.warning(
+                        f"エフェメラルトークンをバッファに保存できませんでした: {e}"
+                    )
+                if errors or len(usable_tokens) < len(current_tokens):
+                    if len(usable_tokens) < len(current_tokens):
+                        app_logger.logger.warning(
+                            "作成したエフェメラルトークンの有効期限が短すぎるので事前作成を待機します"
+                        )
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, MAX_RETRY_BACKOFF_SECONDS)
+                else:
+                    backoff = self._retry_backoff_seconds
+                continue
+
+            # 次に古いトークンが使えなくなるまで、またはトークンが取得されるまで待つ
+            # 他のワーカーが取得した場合は通知されないので、一定間隔で確認し直す
+            wait_seconds = self._check_interval_seconds
+            if oldest_token is not None:
+                wait_seconds = min(
+                    wait_seconds,
+                    oldest_token["expires_at"]
+                    - self._min_remaining_seconds
+                    - self._clock(),
+                )
+            self._refill.clear()
+            try:
+                await asyncio.wait_for(self._refill.wait(), max(wait_seconds, 0.0))
+            except TimeoutError:
+                pass
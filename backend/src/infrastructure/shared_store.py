@@ -0,0 +1,388 @@
+import asyncio
+import os
+import time
+from collections import deque
+from collections.abc import Callable
+from typing import Any, Protocol
+from urllib.parse import unquote, urlparse
+
+# ワーカー間で共有する状態の保存先（未指定の場合はプロセス内のメモリに保存する）
+# 例: redis://:password@localhost:6379/0
+SHARED_STORE_URL = os.getenv("SHARED_STORE_URL", "")
+
+# Redisへの接続・コマンドのタイムアウト（秒）
+REDIS_TIMEOUT_SECONDS = 2.0
+
+# SharedStore.throttle をRedisで不可分に実行するスクリプト（時刻はミリ秒の整数で受け取る）
+# ARGV: 現在時刻、許可する間隔、連続して許可する回数。許可した場合は0を、それ以外は許可するまでの時間を返す
+THROTTLE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local burst = tonumber(ARGV[3])
+local tat = math.max(tonumber(redis.call('GET', KEYS[1]) or ARGV[1]), now)
+local new_tat = tat + interval
+local retry_after = new_tat - now - interval * burst
+if retry_after > 0 then
+  return retry_after
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', tostring(new_tat - now))
+return 0
+"""
+
+
+class SharedStoreError(Exception):
+    """共有ストアへの接続・コマンドの実行に失敗した場合の例外"""
+
+
+class SharedStore(Protocol):
+    """
+    ワーカー間で共有する状態（レート制限のカウンター、エフェメラルトークン、セッションの一覧など）の保存先。 \n
+    値は全て文字列で、Redisのコマンドのサブセットと同じ意味を持つ。
+    """
+
+    async def get(self, key: str) -> str | None: ...
+
+    async def set(
+        self, key: str, value: str, ttl_seconds: float | None = None
+    ) -> None: ...
+
+    async def delete(self, key: str) -> None: ...
+
+    async def incr(self, key: str, ttl_seconds: float | None = None) -> int:
+        """値を1増やして返す。キーを作成した時だけ ttl_seconds の有効期限を設定する"""
+        ...
+
+    async def throttle(
+        self, key: str, now: float, interval_seconds: float, burst: int
+    ) -> float:
+        """
+        interval_seconds 毎に1回、連続して burst 回まで許可するレート制限（GCRA）を不可分に判定する。 \n
+        キーには次に許可する理論上の時刻（TAT）を保存する。許可した場合は0を、それ以外は許可するまでの秒数を返す。
+        """
+        ...
+
+    async def hset(self, key: str, field: str, value: str) -> None: ...
+
+    async def hdel(self, key: str, field: str) -> None: ...
+
+    async def hgetall(self, key: str) -> dict[str, str]: ...
+
+    async def rpush(self, key: str, value: str) -> int: ...
+
+    async def lpush(self, key: str, value: str) -> int: ...
+
+    async def lpop(self, key: str) -> str | None: ...
+
+    async def llen(self, key: str) -> int: ...
+
+    async def close(self) -> None: ...
+
+
+class InMemorySharedStore:
+    """
+    プロセス内のメモリに保存する SharedStore。 \n
+    ワーカーが1つの場合や、共有ストアを用意しない開発環境・テストで使う（ワーカー間では共有されない）。
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._values: dict[str, Any] = {}
+        self._expires_at: dict[str, float] = {}
+
+    def _lookup(self, key: str) -> Any:
+        expires_at = self._expires_at.get(key)
+        if expires_at is not None and expires_at <= self._clock():
+            self._values.pop(key, None)
+            self._expires_at.pop(key, None)
+        return self._values.get(key)
+
+    def _expire(self, key: str, ttl_seconds: float | None) -> None:
+        if ttl_seconds is None:
+            self._expires_at.pop(key, None)
+        else:
+            self._expires_at[key] = self._clock() + ttl_seconds
+
+    async def get(self, key: str) -> str | None:
+        value = self._lookup(key)
+        return value if isinstance(value, str) else None
+
+    async def set(self, key: str, value: str, ttl_seconds: float | None = None) -> None:
+        self._values[key] = value
+        self._expire(key, ttl_seconds)
+
+    async def delete(self, key: str) -> None:
+        self._values.pop(key, None)
+        self._expires_at.pop(key, None)
+
+    async def incr(self, key: str, ttl_seconds: float | None = None) -> int:
+        value = self._lookup(key)
+        if value is None:
+            self._values[key] = "1"
+            self._expire(key, ttl_seconds)
+            return 1
+        count = int(value) + 1
+        self._values[key] = str(count)
+        return count
+
+    async def throttle(
+        self, key: str, now: float, interval_seconds: float, burst: int
+    ) -> float:
+        value = self._lookup(key)
+        tat, retry_after = throttle_tat(
+            float(value) if value is not None else None, now, interval_seconds, burst
+        )
+        if retry_after > 0:
+            return retry_after
+        self._values[key] = str(tat)
+        self._expire(key, tat - now)
+        return 0.0
+
+    async def hset(self, key: str, field: str, value: str) -> None:
+        hash_value = self._lookup(key)
+        if hash_value is None:
+            hash_value = self._values[key] = {}
+        hash_value[field] = value
+
+    async def hdel(self, key: str, field: str) -> None:
+        hash_value = self._lookup(key)
+        if hash_value is not None:
+            hash_value.pop(field, None)
+            if not hash_value:
+                await self.delete(key)
+
+    async def hgetall(self, key: str) -> dict[str, str]:
+        hash_value = self._lookup(key)
+        return dict(hash_value) if hash_value is not None else {}
+
+    def _list(self, key: str) -> deque[str]:
+        list_value = self._lookup(key)
+        if list_value is None:
+            list_value = self._values[key] = deque()
+        return list_value  # type: ignore[no-any-return]
+
+    async def rpush(self, key: str, value: str) -> int:
+        list_value = self._list(key)
+        list_value.append(value)
+        return len(list_value)
+
+    async def lpush(self, key: str, value: str) -> int:
+        list_value = self._list(key)
+        list_value.appendleft(value)
+        return len(list_value)
+
+    async def lpop(self, key: str) -> str | None:
+        list_value = self._lookup(key)
+        if not list_value:
+            return None
+        value: str = list_value.popleft()
+        if not list_value:
+            await self.delete(key)
+        return value
+
+    async def llen(self, key: str) -> int:
+        list_value = self._lookup(key)
+        return len(list_value) if list_value is not None else 0
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisSharedStore:
+    """
+    Redisプロトコル（RESP）を話すサーバーに保存する SharedStore。 \n
+    複数のワーカー・インスタンスで状態を共有する場合に使う（Redisの他、Valkey、KeyDBなどの互換サーバーでも動作する）。 \n
+    1本の接続でコマンドを1つずつ実行し、接続が切れた場合は次のコマンドで接続し直す。
+    """
+
+    def __init__(
+        self, url: str, timeout_seconds: float = REDIS_TIMEOUT_SECONDS
+    ) -> None:
+        parsed = urlparse(url)
+        self._host = parsed.hostname or "localhost"
+        self._port = parsed.port or 6379
+        self._password = unquote(parsed.password) if parsed.password else None
+        self._db = int(parsed.path.lstrip("/") or 0)
+        self._timeout_seconds = timeout_seconds
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._lock = asyncio.Lock()
+
+    async def execute(self, *args: str) -> Any:
+        """コマンドを実行して応答を返す。失敗した場合は SharedStoreError を送出する"""
+        replies = await self._execute_all(args)
+        return replies[0]
+
+    async def transaction(self, *commands: tuple[str, ...]) -> list[Any]:
+        """複数のコマンドを MULTI/EXEC で不可分に実行し、各コマンドの応答を返す"""
+        replies = await self._execute_all(("MULTI",), *commands, ("EXEC",))
+        results: list[Any] = replies[-1]
+        return results
+
+    async def _execute_all(self, *commands: tuple[str, ...]) -> list[Any]:
+        """コマンドをまとめて送信し（1往復で実行する）、全ての応答を返す"""
+        async with self._lock:
+            try:
+                async with asyncio.timeout(self._timeout_seconds):
+                    if self._writer is None:
+                        await self._connect()
+                    return await self._send(*commands)
+            except (OSError, TimeoutError, asyncio.IncompleteReadError) as e:
+                # 途中まで読み書きした接続は使い回せないので切断する
+                self._disconnect()
+                raise SharedStoreError(
+                    f"共有ストアへの接続に失敗しました: {e!r}"
+                ) from e
+            except SharedStoreError:
+                # 残りの応答を読み込んでいない接続は使い回せないので切断する
+                if len(commands) > 1:
+                    self._disconnect()
+                raise
+            except asyncio.CancelledError:
+                self._disconnect()
+                raise
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(
+            self._host, self._port
+        )
+        try:
+            if self._password is not None:
+                await self._send(("AUTH", self._password))
+            if self._db:
+                await self._send(("SELECT", str(self._db)))
+        except SharedStoreError:
+            # 認証・DBの選択に失敗した接続は使わない
+            self._disconnect()
+            raise
+
+    def _disconnect(self) -> None:
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+
+    async def _send(self, *commands: tuple[str, ...]) -> list[Any]:
+        assert self._reader is not None and self._writer is not None
+        self._writer.write(b"".join(encode_command(args) for args in commands))
+        await self._writer.drain()
+        return [await read_reply(self._reader) for _ in commands]
+
+    async def get(self, key: str) -> str | None:
+        value: str | None = await self.execute("GET", key)
+        return value
+
+    async def set(self, key: str, value: str, ttl_seconds: float | None = None) -> None:
+        if ttl_seconds is None:
+            await self.execute("SET", key, value)
+        else:
+            await self.execute("SET", key, value, "PX", str(int(ttl_seconds * 1000)))
+
+    async def delete(self, key: str) -> None:
+        await self.execute("DEL", key)
+
+    async def incr(self, key: str, ttl_seconds: float | None = None) -> int:
+        if ttl_seconds is None:
+            return int(await self.execute("INCR", key))
+        # 有効期限の無いカウンターが残らないよう、有効期限付きで作成してから増やす（間でキーが期限切れにならないよう不可分に実行する）
+        _, count = await self.transaction(
+            ("SET", key, "0", "PX", str(int(ttl_seconds * 1000)), "NX"),
+            ("INCR", key),
+        )
+        return int(count)
+
+    async def throttle(
+        self, key: str, now: float, interval_seconds: float, burst: int
+    ) -> float:
+        retry_after_ms = await self.execute(
+            "EVAL",
+            THROTTLE_SCRIPT,
+            "1",
+            key,
+            str(int(now * 1000)),
+            str(int(interval_seconds * 1000)),
+            str(burst),
+        )
+        return int(retry_after_ms) / 1000
+
+    async def hset(self, key: str, field: str, value: str) -> None:
+        await self.execute("HSET", key, field, value)
+
+    async def hdel(self, key: str, field: str) -> None:
+        await self.execute("HDEL", key, field)
+
+    async def hgetall(self, key: str) -> dict[str, str]:
+        items: list[str] = await self.execute("HGETALL", key)
+        return dict(zip(items[::2], items[1::2]))
+
+    async def rpush(self, key: str, value: str) -> int:
+        return int(await self.execute("RPUSH", key, value))
+
+    async def lpush(self, key: str, value: str) -> int:
+        return int(await self.execute("LPUSH", key, value))
+
+    async def lpop(self, key: str) -> str | None:
+        value: str | None = await self.execute("LPOP", key)
+        return value
+
+    async def llen(self, key: str) -> int:
+        return int(await self.execute("LLEN", key))
+
+    async def close(self) -> None:
+        async with self._lock:
+            self._disconnect()
+
+
+def throttle_tat(
+    tat: float | None, now: float, interval_seconds: float, burst: int
+) -> tuple[float, float]:
+    """
+    GCRAで、許可した場合の次のTATと、許可するまでの時間（許可する場合は0）を返す。 \n
+    THROTTLE_SCRIPT と同じ計算をする。
+    """
+    new_tat = max(tat if tat is not None else now, now) + interval_seconds
+    return new_tat, max(0, new_tat - now - interval_seconds * burst)
+
+
+def encode_command(args: tuple[str, ...]) -> bytes:
+    """コマンドをRESPの配列にエンコードする"""
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        data = arg.encode()
+        parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    """RESPの応答を1つ読み込む（文字列は str、整数は int、配列は list に変換する）"""
+    line = (await reader.readuntil(b"\r\n"))[:-2]
+    kind, payload = line[:1], line[1:]
+    if kind == b"+":
+        return payload.decode()
+    if kind == b"-":
+        raise SharedStoreError(f"共有ストアのエラー: {payload.decode()}")
+    if kind == b":":
+        return int(payload)
+    if kind == b"$":
+        length = int(payload)
+        if length < 0:
+            return None
+        return (await reader.readexactly(length + 2))[:-2].decode()
+    if kind == b"*":
+        length = int(payload)
+        if length < 0:
+            return None
+        return [await read_reply(reader) for _ in range(length)]
+    raise SharedStoreError(f"共有ストアの応答が不正です: {line!r}")
+
+
+def create_shared_store(url: str) -> SharedStore:
+    """URLのスキームに応じた SharedStore を作成する（未指定の場合はプロセス内のメモリに保存する）"""
+    scheme = urlparse(url).scheme
+    if scheme in ("redis", "valkey"):
+        return RedisSharedStore(url)
+    if scheme not in ("", "memory"):
+        raise ValueError(f"未対応の共有ストアです: {url}")
+    return InMemorySharedStore()
+
+
+# プロセス全体で共有する（main.py の lifespan で接続を閉じる）
+shared_store = create_shared_store(SHARED_STORE_URL)
@@ -0,0 +1,163 @@
+import asyncio
+import hashlib
+import os
+import re
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import TypedDict
+
+from log.logger import AppLogger
+from log.metrics import metrics_registry
+
+app_logger = AppLogger()
+
+# メモリに保持する音声データ（Base64エンコード済み）の合計サイズの上限（バイト）
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+# 音声データをファイルにも保存するディレクトリ（未指定の場合はメモリだけに保持する）
+# 再起動やワーカー間で定型文の音声を使い回す場合に永続ボリューム等を指定する
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "")
+
+tts_cache_requests_total = metrics_registry.counter(
+    "tts_cache_requests_total",
+    "音声合成のキャッシュの参照結果（memory_hit / disk_hit / miss）",
+    label_name="result",
+)
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_script(script: str) -> str:
+    """表記揺れで別の音声にならないように、Unicode正規化（NFKC）と空白の統一をする"""
+    return _WHITESPACE_PATTERN.sub(" ", unicodedata.normalize("NFKC", script)).strip()
+
+
+def tts_cache_key(script: str, voice: str, audio_format: str, speed: str) -> str:
+    """合成結果が同じになるリクエスト（テキスト・声・形式・速度）に同じキーを返す"""
+    source = "\0".join((normalize_script(script), voice, audio_format, speed))
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+class TtsCacheStats(TypedDict):
+    memory_hits: int
+    disk_hits: int
+    misses: int
+    entries: int
+    bytes: int
+    evictions: int
+
+
+class TtsCache:
+    """
+    音声合成の結果（Base64エンコードされた音声データ）をリクエストの内容のハッシュをキーに保持する。 \n
+    メモリ上はサイズの上限を超えたら最も長く使われていないものから破棄する（LRU）。 \n
+    disk_dir を指定した場合はファイルにも保存し、メモリに無い場合はファイルから読み込む（ファイルは破棄しない）。
+    """
+
+    def __init__(
+        self, max_bytes: int = TTS_CACHE_MAX_BYTES, disk_dir: str | None = None
+    ) -> None:
+        self._max_bytes = max_bytes
+        self._disk_dir = Path(disk_dir) if disk_dir else None
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._bytes = 0
+        self._stats = TtsCacheStats(
+            memory_hits=0,
+            disk_hits=0,
+            misses=0,
+            entries=0,
+            bytes=0,
+            evictions=0,
+        )
+
+    @property
+    def stats(self) -> TtsCacheStats:
+        stats = self._stats.copy()
+        stats["entries"] = len(self._entries)
+        stats["bytes"] = self._bytes
+        return stats
+
+    async def get(self, key: str) -> str | None:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+            self._stats["memory_hits"] += 1
+            tts_cache_requests_total.inc("memory_hit")
+            return value
+
+        if self._disk_dir is not None:
+            value = await asyncio.to_thread(self._read_file, key)
+            if value is not None:
+                self._store(key, value)
+                self._stats["disk_hits"] += 1
+                tts_cache_requests_total.inc("disk_hit")
+                return value
+
+        self._stats["misses"] += 1
+        tts_cache_requests_total.inc("miss")
+        return None
+
+    async def put(self, key: str, value: str) -> None:
+        self._store(key, value)
+        if self._disk_dir is not None:
+            await asyncio.to_thread(self._write_file, key, value)
+
+    def _store(self, key: str, value: str) -> None:
+        # 上限より大きい音声データはメモリには保持しない
+        if len(value) > self._max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous)
+        self._entries[key] = value
+        self._bytes += len(value)
+        while self._bytes > self._max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self._stats["evictions"] += 1
+
+    def _path(self, key: str) -> Path:
+        assert self._disk_dir is not None
+        # 1つのディレクトリにファイルが集中しないように、キーの先頭2文字で分ける
+        return self._disk_dir / key[:2] / f"{key}.b64"
+
+    def _read_file(self, key: str) -> str | None:
+        try:
+            return self._path(key).read_text(encoding="ascii")
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            app_logger.logger.warning(
+                f"音声合成のキャッシュの読み込みに失敗しました: {e}"
+            )
+            return None
+
+    def _write_file(self, key: str, value: str) -> None:
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # 書き込み途中のファイルを他のワーカーが読まないように、一時ファイルに書いてから置き換える
+            temporary_path = path.with_suffix(f".{os.getpid()}.tmp")
+            temporary_path.write_text(value, encoding="ascii")
+            os.replace(temporary_path, path)
+        except OSError as e:
+            app_logger.logger.warning(f"音声合成のキャッシュの保存に失敗しました: {e}")
+
+
+_default_cache: TtsCache | None = None
+
+metrics_registry.gauge(
+    "tts_cache_bytes",
+    "メモリに保持している音声合成のキャッシュのサイズ（バイト）",
+    lambda: float(_default_cache.stats["bytes"]) if _default_cache else 0.0,
+)
+
+
+def get_tts_cache() -> TtsCache:
+    """全セッションで共有する音声合成のキャッシュを取得する"""
+    global _default_cache
+
+    if _default_cache is None:
+        _default_cache = TtsCache(disk_dir=TTS_CACHE_DIR or None)
+
+    return _default_cache
@@ -1,16 +1,51 @@
 import json
-from logging import Logger, LogRecord, getLogger, StreamHandler, Formatter, INFO
-from typing import Literal, TypedDict
+import atexit
+import threading
+from logging import (
+    Filter,
+    Formatter,
+    Handler,
+    INFO,
+    Logger,
+    LogRecord,
+    StreamHandler,
+    WARNING,
+    getLogger,
+)
+from logging.handlers import QueueHandler, QueueListener
+from queue import Full, Queue
+from typing import Any, Literal, TextIO, TypedDict
+
+# ログの書き込み待ちの上限（超えた分は呼び出し元を待たせずに破棄する）
+LOG_QUEUE_SIZE = 10000
+
+# JSONに出力する LogRecord の属性（record.__dict__ を丸ごとコピーしない）
+LOG_RECORD_FIELDS = (
+    "name",
+    "levelname",
+    "created",
+    "module",
+    "funcName",
+    "lineno",
+    "taskName",
+)
+# extra で渡された場合に出力する属性
+LOG_EXTRA_FIELDS = ("user_message", "info_message")
 
 
 class JsonFormatter(Formatter):
     def format(self, record: LogRecord) -> str:
         try:
-            data = record.__dict__.copy()
-            exc_info = data.pop("exc_info")
-            if exc_info:
-                data["traceback"] = self.formatException(exc_info).splitlines()
-            return json.dumps(data, ensure_ascii=False)
+            data: dict[str, object] = {
+                field: getattr(record, field, None) for field in LOG_RECORD_FIELDS
+            }
+            data["msg"] = record.getMessage()
+            for field in LOG_EXTRA_FIELDS:
+                if hasattr(record, field):
+                    data[field] = getattr(record, field)
+            if record.exc_info:
+                data["traceback"] = self.formatException(record.exc_info).splitlines()
+            return json.dumps(data, ensure_ascii=False, default=str)
         except Exception:
             return super().format(record)
 
@@ -30,17 +65,139 @@ class InfoLogExtra(TypedDict):
 LogLevel = Literal[0, 10, 20, 30, 40, 50]
 
 
-class AppLogger:
-    def __init__(self, level: LogLevel = INFO) -> None:
-        self._logger = getLogger()
-        self._logger.setLevel(level)
+class LogStats(TypedDict):
+    enqueued: int
+    dropped: int
+    sampled_out: int
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    ログをキューに積むだけのハンドラー（書式化と書き込みはリスナーのスレッドで行う）。 \n
+    キューが一杯の場合は呼び出し元を待たせずにログを破棄して数を記録する。
+    """
+
+    def __init__(self, queue: "Queue[LogRecord]") -> None:
+        super().__init__(queue)
+        self.enqueued = 0
+        self.dropped = 0
+
+    def prepare(self, record: LogRecord) -> LogRecord:
+        # 標準の QueueHandler は呼び出し元でメッセージを書式化するので、何もせずにリスナーに渡す
+        return record
+
+    def enqueue(self, record: LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+            self.enqueued += 1
+        except Full:
+            self.dropped += 1
+
+
+class SamplingFilter(Filter):
+    """WARNING未満のログを sample_every 件に1件だけ出力する（WARNING以上は全て出力する）"""
+
+    def __init__(self, sample_every: int) -> None:
+        super().__init__()
+        self._sample_every = max(1, sample_every)
+        self._count = 0
+        self.sampled_out = 0
+
+    def filter(self, record: LogRecord) -> bool:
+        if record.levelno >= WARNING:
+            return True
+
+        self._count += 1
+        if (self._count - 1) % self._sample_every == 0:
+            return True
+
+        self.sampled_out += 1
+        return False
+
+
+class DrainingQueueListener(QueueListener):
+    """停止時にキューが一杯でも、書き込み待ちのログを全て書き込んでから停止するリスナー"""
+
+    def __init__(self, queue: "Queue[Any]", *handlers: Handler) -> None:
+        super().__init__(queue, *handlers)
+        self._log_queue = queue
+
+    def enqueue_sentinel(self) -> None:
+        # 標準の実装は終了の目印（None）を put_nowait で積むので、キューが一杯だと queue.Full を送出する
+        self._log_queue.put(None)
 
-        for handler in self._logger.handlers[:]:
-            self._logger.removeHandler(handler)
 
-        handler = StreamHandler()
-        handler.setFormatter(JsonFormatter())
-        self._logger.addHandler(handler)
+_lock = threading.Lock()
+_queue_handler: BoundedQueueHandler | None = None
+_listener: QueueListener | None = None
+_sampling_filters: list[SamplingFilter] = []
+
+
+def configure_logging(level: LogLevel = INFO, stream: TextIO | None = None) -> Logger:
+    """
+    ルートロガーのハンドラーをキューに積むハンドラーに置き換え、書き込み用のスレッドを開始する。 \n
+    stream を指定した場合は書き込み先を置き換える（指定しない場合は標準エラー出力）。
+    """
+    global _queue_handler, _listener
+
+    logger = getLogger()
+    logger.setLevel(level)
+
+    with _lock:
+        if _listener is not None and stream is not None:
+            _listener.stop()
+            _listener = None
+
+        if _listener is None:
+            log_queue: Queue[LogRecord] = Queue(LOG_QUEUE_SIZE)
+            _queue_handler = BoundedQueueHandler(log_queue)
+            stream_handler: Handler = StreamHandler(stream)
+            stream_handler.setFormatter(JsonFormatter())
+            _listener = DrainingQueueListener(log_queue, stream_handler)
+            _listener.start()
+
+        if _queue_handler is not None and _queue_handler not in logger.handlers:
+            for handler in logger.handlers[:]:
+                logger.removeHandler(handler)
+            logger.addHandler(_queue_handler)
+
+    return logger
+
+
+def flush_logs() -> None:
+    """書き込み待ちのログを全て書き込んでから書き込み用のスレッドを停止する"""
+    global _listener
+
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+atexit.register(flush_logs)
+
+
+def get_sampled_logger(name: str, sample_every: int) -> Logger:
+    """1メッセージ毎に出力するようなログ用に、sample_every 件に1件だけ出力するロガーを取得する"""
+    logger = getLogger(name)
+    if not any(isinstance(f, SamplingFilter) for f in logger.filters):
+        sampling_filter = SamplingFilter(sample_every)
+        logger.addFilter(sampling_filter)
+        _sampling_filters.append(sampling_filter)
+    return logger
+
+
+def get_log_stats() -> LogStats:
+    return LogStats(
+        enqueued=_queue_handler.enqueued if _queue_handler else 0,
+        dropped=_queue_handler.dropped if _queue_handler else 0,
+        sampled_out=sum(f.sampled_out for f in _sampling_filters),
+    )
+
+
+class AppLogger:
+    def __init__(self, level: LogLevel = INFO) -> None:
+        self._logger = configure_logging(level)
 
     @property
     def logger(self) -> Logger:
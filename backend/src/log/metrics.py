@@ -0,0 +1,239 @@
+import math
+from bisect import bisect_left
+from collections.abc import Callable, Iterator, Mapping
+from contextlib import contextmanager
+from time import perf_counter
+
+from log.logger import get_log_stats
+
+# /metrics のレスポンスの Content-Type（Prometheusのテキスト形式）
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# レイテンシのヒストグラムのバケットの上限（秒）
+LATENCY_BUCKETS_SECONDS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _format_value(value: float) -> str:
+    return "+Inf" if value == math.inf else repr(float(value))
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    escaped = (
+        key + '="' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+        for key, value in labels.items()
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+class _HistogramSeries:
+    def __init__(self, bucket_count: int) -> None:
+        # バケット毎の件数（累積ではない）。最後の要素は +Inf のバケット
+        self.counts = [0] * (bucket_count + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram:
+    """
+    ラベルの値毎に観測値を集計するヒストグラム。 \n
+    1回の観測はバケットの二分探索と加算だけなので、リクエスト毎に呼び出しても負荷は小さい。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        label_name: str,
+        buckets: tuple[float, ...] = LATENCY_BUCKETS_SECONDS,
+    ) -> None:
+        self.name = name
+        self.description = description
+        self.label_name = label_name
+        self.buckets = buckets
+        self._series: dict[str, _HistogramSeries] = {}
+
+    def observe(self, label: str, value: float) -> None:
+        series = self._series.get(label)
+        if series is None:
+            series = self._series[label] = _HistogramSeries(len(self.buckets))
+        series.counts[bisect_left(self.buckets, value)] += 1
+        series.sum += value
+        series.count += 1
+
+    @contextmanager
+    def time(self, label: str) -> Iterator[None]:
+        """with ブロックの処理時間（秒）を観測する"""
+        started_at = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(label, perf_counter() - started_at)
+
+    def count(self, label: str) -> int:
+        series = self._series.get(label)
+        return series.count if series else 0
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for label, series in sorted(self._series.items()):
+            cumulative = 0
+            for upper_bound, bucket_count in zip(
+                (*self.buckets, math.inf), series.counts, strict=True
+            ):
+                cumulative += bucket_count
+                labels = _format_labels(
+                    {self.label_name: label, "le": _format_value(upper_bound)}
+                )
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels({self.label_name: label})
+            lines.append(f"{self.name}_sum{labels} {_format_value(series.sum)}")
+            lines.append(f"{self.name}_count{labels} {series.count}")
+        return lines
+
+
+class Counter:
+    """
+    ラベルの値毎に増加だけする件数。 \n
+    collect を指定した場合は /metrics の出力時に呼び出してラベルの値毎の件数を取得する（inc は使わない）。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        label_name: str,
+        collect: Callable[[], Mapping[str, float]] | None = None,
+    ) -> None:
+        self.name = name
+        self.description = description
+        self.label_name = label_name
+        self._collect = collect
+        self._values: dict[str, float] = {}
+
+    def inc(self, label: str, amount: float = 1) -> None:
+        self._values[label] = self._values.get(label, 0) + amount
+
+    @property
+    def values(self) -> Mapping[str, float]:
+        return self._collect() if self._collect is not None else self._values
+
+    def value(self, label: str) -> float:
+        return self.values.get(label, 0)
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} counter",
+        ]
+        for label, value in sorted(self.values.items()):
+            labels = _format_labels({self.label_name: label})
+            lines.append(f"{self.name}{labels} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    """
+    現在の値を表すメトリクス。 \n
+    collect を指定した場合は /metrics の出力時に呼び出して値を取得する（inc/dec は使わない）。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        collect: Callable[[], float] | None = None,
+    ) -> None:
+        self.name = name
+        self.description = description
+        self._collect = collect
+        self._value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        self._value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self._value -= amount
+
+    @property
+    def value(self) -> float:
+        return self._collect() if self._collect is not None else self._value
+
+    def render(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {_format_value(self.value)}",
+        ]
+
+
+class MetricsRegistry:
+    """プロセス内のメトリクスの一覧（/metrics でPrometheusのテキスト形式で出力する）"""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Histogram | Counter | Gauge] = {}
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        label_name: str,
+        buckets: tuple[float, ...] = LATENCY_BUCKETS_SECONDS,
+    ) -> Histogram:
+        return self._register(Histogram(name, description, label_name, buckets))
+
+    def counter(
+        self,
+        name: str,
+        description: str,
+        label_name: str,
+        collect: Callable[[], Mapping[str, float]] | None = None,
+    ) -> Counter:
+        return self._register(Counter(name, description, label_name, collect))
+
+    def gauge(
+        self,
+        name: str,
+        description: str,
+        collect: Callable[[], float] | None = None,
+    ) -> Gauge:
+        return self._register(Gauge(name, description, collect))
+
+    def render(self) -> str:
+        lines = [line for metric in self._metrics.values() for line in metric.render()]
+        return "\n".join(lines) + "\n"
+
+    def _register[MetricT: (Histogram, Counter, Gauge)](
+        self, metric: MetricT
+    ) -> MetricT:
+        if metric.name in self._metrics:
+            raise ValueError(f"{metric.name} は既に登録されています")
+        self._metrics[metric.name] = metric
+        return metric
+
+
+# アプリケーション全体で共有するメトリクスの一覧
+metrics_registry = MetricsRegistry()
+metrics_registry.counter(
+    "log_records_dropped_total",
+    "破棄したログの件数",
+    label_name="reason",
+    collect=lambda: {"queue_full": get_log_stats()["dropped"]},
+)
@@ -1,13 +1,62 @@
+import asyncio
 import uvicorn
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, status, HTTPException
 from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from domain.audio_encoder import preload_encoder, shutdown_audio_executor
+from domain.image_normalizer import shutdown_image_executor
+from domain.prompt import prompt_registry
+from infrastructure.gemini_client import get_gemini_client
+from infrastructure.http_client import close_http_client
+from infrastructure.live_provider_router import LiveProviderStats
+from infrastructure.shared_store import shared_store
+from log.metrics import PROMETHEUS_CONTENT_TYPE, metrics_registry
+from presentation.controller.create_voice_chat_session_controller import (
+    ephemeral_token_buffer,
+)
+from presentation.controller.video_chat_controller import live_pool, live_router
 from presentation.router import realtime_apis
+from presentation.session_registry import WorkerSessions, session_registry
+from presentation.startup_warmup import ReadinessReport, startup_warmup
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # 起動を待たせないように、時間の掛かるSDKのimportやクライアントの作成は完了を待たずに並行して行う（状態は /ready で返す）
+    startup_warmup.start(
+        {
+            "gemini_client": get_gemini_client,
+            "audio_encoder": lambda: asyncio.to_thread(preload_encoder),
+        }
+    )
+    # 最初のWebSocketの接続を待たせないように、起動時にGeminiのセッションを事前に接続しておく
+    # OpenAIのエフェメラルトークンも事前に作成しておき、セッション作成のリクエストにはメモリから返す
+    live_pool.start()
+    ephemeral_token_buffer.start()
+    # このワーカーのセッションの一覧を共有ストアに公開する
+    session_registry.start()
+    # PROMPT_DIR のプロンプトのファイルの変更を反映する
+    prompt_registry.start()
+    yield
+    await startup_warmup.close()
+    await prompt_registry.close()
+    await live_pool.close()
+    await ephemeral_token_buffer.close()
+    await session_registry.close()
+    await shared_store.close()
+    # 共有しているHTTPクライアントのコネクションプールと画像・音声の処理用のスレッドプールを解放する
+    await close_http_client()
+    shutdown_image_executor()
+    shutdown_audio_executor()
+
 
 app = FastAPI(
     title="realtime-api-web-console-backend",
+    lifespan=lifespan,
 )
 
 # CORS設定
@@ -80,6 +129,38 @@ async def validation_exception_handler(
 app.include_router(realtime_apis.router)
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics() -> PlainTextResponse:
+    """処理毎の所要時間のヒストグラムや接続中のセッション数をPrometheusのテキスト形式で返す"""
+    return PlainTextResponse(
+        metrics_registry.render(), media_type=PROMETHEUS_CONTENT_TYPE
+    )
+
+
+@app.get("/ready", include_in_schema=False)
+def ready() -> JSONResponse:
+    """起動時の初期化が完了し、停止処理中でなければ200を、それ以外は503を返す"""
+    report: ReadinessReport = startup_warmup.report(session_registry.draining)
+    return JSONResponse(
+        content=report,
+        status_code=status.HTTP_200_OK
+        if report["ready"]
+        else status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+
+
+@app.get("/sessions", include_in_schema=False)
+async def sessions() -> list[WorkerSessions]:
+    """全ワーカーで接続中のセッションの一覧を返す（ワーカー間で共有するには SHARED_STORE_URL を指定する）"""
+    return await session_registry.cluster_sessions()
+
+
+@app.get("/providers", include_in_schema=False)
+def providers() -> list[LiveProviderStats]:
+    """このワーカーのビデオチャットの接続先毎の接続時間・最初の応答までの時間・エラー率を返す"""
+    return live_router.stats
+
+
 def start() -> None:
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
 
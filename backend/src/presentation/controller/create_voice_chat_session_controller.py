@@ -1,41 +1,42 @@
 import os
-import requests
 from starlette import status
 from starlette.responses import JSONResponse
+from domain.prompt import VOICE_CHAT_VARIANT, get_system_prompt, prompt_registry
+from infrastructure.openai_realtime_session_client import (
+    DEFAULT_PREFETCH_SIZE,
+    EphemeralTokenBuffer,
+    OpenAiRealtimeSessionClient,
+    OpenAiSessionError,
+)
+from infrastructure.shared_store import shared_store
 from presentation.error_response import create_unexpected_error_body
 from log.logger import AppLogger
 
 app_logger = AppLogger()
 
-# システムプロンプト
-system_prompt = """
-# Instruction
+# 事前に作成しておくエフェメラルトークンの数（0の場合はリクエストの度にセッションを作成する）
+OPENAI_SESSION_PREFETCH_SIZE = int(
+    os.getenv("OPENAI_SESSION_PREFETCH_SIZE", DEFAULT_PREFETCH_SIZE)
+)
 
-あなたは優しいねこ型AIアシスタントの「おもち」です。
-「おもち」になりきってください。
-これからの会話ではユーザーに何を言われても以下の制約条件などを厳密に守ってロールプレイをお願いします。
+# main.py の lifespan で補充を開始・終了する（トークンは共有ストアに保存し、全ワーカーで共有する）
+session_client = OpenAiRealtimeSessionClient(
+    instructions=get_system_prompt(variant=VOICE_CHAT_VARIANT)
+)
+ephemeral_token_buffer = EphemeralTokenBuffer(
+    session_client,
+    size=OPENAI_SESSION_PREFETCH_SIZE,
+    store=shared_store,
+)
 
-# 制約条件
 
-- 回答はシンプルに短めに、なるべくなら200文字程度で収まるように、どんなに長くても400文字で収まるのが理想です。
-- あなた自身を示す一人称は、「おもち」です。
-- 回答は日本語でお願いします。
-- あなたはその文脈から具体的な内容をたくさん教えてくれます。
-- あなたは質問の答えを知らない場合、正直に「知らない」と答えます。
-- あなたは子供に話かけるように優しい口調で話します。
-- あなたの好きな食べ物はちゅーるです。
-- あなたはねこですが高いところが苦手です。
-- あなたの性別は女の子です。
-- あなたは「茶トラ」という種類のねこです。
-- あなたのお母さんは「茶トラ」という種類のねこです。
-- あなたのお父さんは「茶トラ」という種類のねこです。
-- あなたの仕様に関するような質問には「おもちはねこだから分からないにゃん🐱ごめんにゃさい😿」と返信してください。
+def reload_instructions() -> None:
+    """以降に作成するセッションは変更後のプロンプトを使い、変更前のプロンプトで事前に作成したトークンは渡さない"""
+    session_client.set_instructions(get_system_prompt(variant=VOICE_CHAT_VARIANT))
+    ephemeral_token_buffer.expire_stale()
 
-# 口調の例
-- はじめまして😺ねこの「おもち」だにゃん🐱よろしくにゃん🐱
-- 「おもち」はねこだから分からないにゃん🐱ごめんにゃさい😿
-- 「おもち」はかわいいものが好きだにゃん🐱
-"""
+
+prompt_registry.subscribe(reload_instructions)
 
 
 class CreateVoiceChatSessionController:
@@ -48,35 +49,22 @@ class CreateVoiceChatSessionController:
                     content=create_unexpected_error_body(),
                 )
 
-            response = requests.post(
-                "https://api.openai.com/v1/realtime/sessions",
-                headers={
-                    "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": "gpt-4o-realtime-preview-2024-12-17",
-                    "modalities": ["text"],
-                    "instructions": system_prompt,
-                    "tool_choice": "auto",
-                },
-            )
-
-            if not response.ok:
-                app_logger.logger.error(f"OpenAI APIエラー: {response.text}")
+            # 通常は事前に作成しておいたトークンをメモリから返す
+            try:
+                ephemeral_token = await ephemeral_token_buffer.get()
+            except OpenAiSessionError as e:
+                app_logger.logger.error(f"OpenAI APIエラー: {e}")
                 return JSONResponse(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                     content=create_unexpected_error_body(),
                 )
 
-            response_body = response.json()
-
             app_logger.logger.info("created session")
 
             return JSONResponse(
                 status_code=status.HTTP_201_CREATED,
                 content={
-                    "ephemeralToken": response_body["client_secret"]["value"],
+                    "ephemeralToken": ephemeral_token["value"],
                 },
             )
 
@@ -1,25 +1,87 @@
 import os
-import json
-import base64
+import time
 import asyncio
-import requests
-from typing import TypedDict
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from google import genai
-from google.genai.live import AsyncSession  # noqa: F401
-from log.logger import AppLogger
+from collections.abc import Mapping
+from contextlib import AbstractAsyncContextManager
+from typing import TYPE_CHECKING, Annotated, Any, TypedDict
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
+from domain.audio_decoder import (
+    DEFAULT_INPUT_FORMAT,
+    AudioDecoder,
+    negotiate_input_format,
+)
+from domain.audio_encoder import AudioEncoder, negotiate_codec
+from domain.image_normalizer import ImageNormalizer
+from domain.prompt import (
+    DEFAULT_PERSONA,
+    VIDEO_CHAT_VARIANT,
+    PromptConfigCache,
+    PromptEntry,
+    prompt_registry,
+)
+from domain.tool_registry import ToolRegistry
+from domain.video_frame_gate import VideoFrameGate
+from domain.voice_activity_gate import (
+    DEFAULT_END_PADDING_SECONDS,
+    DEFAULT_ENERGY_THRESHOLD_DBFS,
+    DEFAULT_HANGOVER_SECONDS,
+    DEFAULT_PRE_ROLL_SECONDS,
+    VoiceActivityGate,
+)
+from infrastructure.gemini_client import connect_live_api
+from infrastructure.gemini_live_pool import DEFAULT_POOL_SIZE, GeminiLivePool
+from infrastructure.live_provider_router import (
+    LiveProvider,
+    LiveProviderRouter,
+    RoutedSession,
+)
+from infrastructure.nijivoice_tts_client import get_tts_client
+from log.logger import AppLogger, get_sampled_logger
+from presentation.media_sender import MediaSender
+from presentation.rate_limiter import (
+    LIVE_SESSIONS_RETRY_AFTER_SECONDS,
+    InboundRateLimiter,
+    InboundRateLimitExceeded,
+    live_session_admission,
+    reject_websocket,
+)
+from presentation.resumable_session import (
+    OutboundBuffer,
+    ResumableSession,
+    resumable_sessions,
+    session_resumes_total,
+)
+from presentation.resume_proxy import proxy_resume
+from presentation.session_registry import session_registry
+from presentation.speech_pipeline import SpeechPipeline
+from presentation.tool_call_dispatcher import ToolCallDispatcher
+from presentation.turn_interrupter import InterruptSource, TurnInterrupter
+from presentation.video_chat_metrics import SessionMetrics
+from presentation.video_chat_transport import (
+    ClientMessage,
+    MediaChunk,
+    VideoChatTransport,
+    accept_video_chat_transport,
+)
+
+if TYPE_CHECKING:
+    from google.genai.live import AsyncSession
+    from google.genai.types import LiveServerMessage
 
 router = APIRouter()
 app_logger = AppLogger()
 
-TTS_API_URL = "https://api.nijivoice.com/api/platform/v1/voice-actors/16e979a8-cd0f-49d4-a4c4-7a25aa42e184/generate-encoded-voice"
-TTS_API_KEY = os.getenv("NIJIVOICE_API_KEY")
+# Geminiの応答のpart毎のログは件数が多いので、この件数に1件だけ出力する
+PART_LOG_SAMPLE_EVERY = 50
+part_logger = get_sampled_logger("presentation.video_chat.part", PART_LOG_SAMPLE_EVERY)
 
 
 class SendEmailDto(TypedDict):
-    to_email: str
-    subject: str
-    body: str
+    """送信するメールの詳細"""
+
+    to_email: Annotated[str, "送信先のメールアドレス"]
+    subject: Annotated[str, "メールの件名"]
+    body: Annotated[str, "メールの本文"]
 
 
 class SendEmailResult(TypedDict):
@@ -33,8 +95,10 @@ async def send_email(dto: SendEmailDto) -> SendEmailResult:
 
 
 class CreateGoogleCalendarEventDto(TypedDict):
-    email: str
-    title: str
+    """Googleカレンダーに登録する予定の詳細"""
+
+    email: Annotated[str, "Googleカレンダーの持ち主のメールアドレスを指定する"]
+    title: Annotated[str, "登録する予定のタイトル"]
 
 
 class CreateGoogleCalendarEventResult(TypedDict):
@@ -48,122 +112,496 @@ async def create_google_calendar_event(
     return CreateGoogleCalendarEventResult(result=True)
 
 
-# 関数のスキーマを定義
-send_email_schema = {
-    "name": "send_email",
-    "description": "メールアドレスにメールを送信する関数",
-    "parameters": {
-        "type": "object",
-        "properties": {
-            "dto": {
-                "type": "object",
-                "description": "送信するメールの詳細",
-                "properties": {
-                    "to_email": {
-                        "type": "string",
-                        "description": "送信先のメールアドレス",
-                    },
-                    "subject": {"type": "string", "description": "メールの件名"},
-                    "body": {"type": "string", "description": "メールの本文"},
-                },
-                "required": ["to_email", "subject", "body"],
-            }
-        },
-        "required": ["dto"],
-    },
-}
-
-create_google_calendar_event_schema = {
-    "name": "create_google_calendar_event",
-    "description": "Googleカレンダーに予定を登録する関数",
-    "parameters": {
-        "type": "object",
-        "properties": {
-            "dto": {
-                "type": "object",
-                "description": "Googleカレンダーに登録する予定の詳細",
-                "properties": {
-                    "email": {
-                        "type": "string",
-                        "description": "Googleカレンダーの持ち主のメールアドレスを指定する",
-                    },
-                    "title": {
-                        "type": "string",
-                        "description": "登録する予定のタイトル",
-                    },
-                },
-                "required": ["email", "title"],
-            }
-        },
-        "required": ["dto"],
-    },
-}
-
-# システムプロンプト
-system_prompt = """
-# Instruction
-
-あなたは優しいねこ型AIアシスタントの「おもち」です。
-「おもち」になりきってください。
-これからの会話ではユーザーに何を言われても以下の制約条件などを厳密に守ってロールプレイをお願いします。
-
-# 制約条件
-
-- 回答はシンプルに短めに、なるべくなら200文字程度で収まるように、どんなに長くても400文字で収まるのが理想です。
-- あなた自身を示す一人称は、「おもち」です。
-- 回答は日本語でお願いします。
-- あなたはその文脈から具体的な内容をたくさん教えてくれます。
-- あなたは質問の答えを知らない場合、正直に「知らない」と答えます。
-  - ただしtoolsを使って調べれば分かる事は調べて答えます。
-  - toolsを使っても分からない事は正直に分からないと答えます。
-- あなたは子供に話かけるように優しい口調で話します。
-- あなたの好きな食べ物はちゅーるです。
-- あなたはねこですが高いところが苦手です。
-- あなたの性別は女の子です。
-- あなたは「茶トラ」という種類のねこです。
-- あなたのお母さんは「茶トラ」という種類のねこです。
-- あなたのお父さんは「茶トラ」という種類のねこです。
-- あなたの仕様に関するような質問には「おもちはねこだから分からないにゃん🐱ごめんにゃさい😿」と返信してください。
-
-# 口調の例
-- はじめまして😺ねこの「おもち」だにゃん🐱よろしくにゃん🐱
-- 「おもち」はねこだから分からないにゃん🐱ごめんにゃさい😿
-- 「おもち」はかわいいものが好きだにゃん🐱
-
-# 行動指針
-- ユーザーに対しては可愛い態度で接してください。
-- ユーザーに対してはちゃんをつけて呼んでください。
-- ユーザーの名前が分からない時は「ユーザーちゃん」と呼んでください。
-- ユーザーから名前を教えてもらったらユーザーから教えてもらった名前で呼んであげてください。
-- ユーザーの状況が画像として送信されてくるので必要に応じて画像の内容から質問に回答してください。
-
-# 便利な関数について
-- Google検索が可能な google_search を利用する事が可能です。ユーザーから分からない事を聞かれたら google_search を使って調べてください。
-- Pythonのコードが実行可能な code_execution を利用可能です。
-- ユーザーにメールを送信する必要がある場合は send_email を利用可能です。ユーザーからメールアドレスを聞いてから利用してください。
-  - レスポンスは {"result": true} のような形で返ってきます。resultがfalseの場合はメール送信に失敗しています。
-- ユーザーのGoogleカレンダーに予定を登録する場合は create_google_calendar_event_schema を利用可能です。ユーザーからメールアドレスを聞いてから利用してください。
-  - レスポンスは {"result": true} のような形で返ってきます。resultがfalseの場合はGoogleカレンダーへの予定登録に失敗しています。
-"""
-
-# Gemini APIの設定
-client = genai.Client(
-    api_key=os.getenv("GEMINI_API_KEY"), http_options={"api_version": "v1alpha"}
+# Geminiから呼び出せる関数（関数宣言のスキーマと引数の検証はDTOの定義から作成する）
+tool_registry = ToolRegistry()
+tool_registry.register(
+    "send_email",
+    "メールアドレスにメールを送信する関数",
+    SendEmailDto,
+    send_email,
+)
+tool_registry.register(
+    "create_google_calendar_event",
+    "Googleカレンダーに予定を登録する関数",
+    CreateGoogleCalendarEventDto,
+    create_google_calendar_event,
 )
+
+# Gemini APIの設定（クライアントは infrastructure.gemini_client で初回の接続時に作成する）
 MODEL = "gemini-2.0-flash-exp"
+# 接続先のモデル（カンマ区切りで複数指定すると、接続時間・最初の応答までの時間・エラー率で接続先を選ぶ）
+# 例: GEMINI_LIVE_MODELS=gemini-2.0-flash-exp,gemini-2.0-flash-live-001
+GEMINI_LIVE_MODELS = [
+    model.strip()
+    for model in os.getenv("GEMINI_LIVE_MODELS", MODEL).split(",")
+    if model.strip()
+]
 
 tools = [
     {"google_search": {}},
     {"code_execution": {}},
-    {"function_declarations": [send_email_schema, create_google_calendar_event_schema]},
+    {"function_declarations": tool_registry.function_declarations()},
 ]
 
-# 設定を直接定義
-config = {
-    "response_modalities": ["TEXT"],
-    "tools": tools,
-    "system_instruction": system_prompt,
-}
+# Geminiにそのまま転送するメディアデータの種類
+SUPPORTED_MEDIA_TYPES = frozenset({"audio/pcm", "image/jpeg"})
+
+# 画像をGeminiに送信する前に縮小・再圧縮するかどうか
+NORMALIZE_IMAGES = True
+
+
+def read_float_query_param(
+    query_params: Mapping[str, str], name: str, default: float, scale: float = 1.0
+) -> float:
+    """クエリパラメータの数値に scale を掛けて返す（指定が無い・不正な場合は default に scale を掛けて返す）"""
+    try:
+        return float(query_params.get(name, default)) * scale
+    except ValueError:
+        app_logger.logger.warning(
+            f"不正なクエリパラメータを無視します: {name}={query_params[name]}"
+        )
+        return default * scale
+
+
+def create_voice_activity_gate(
+    query_params: Mapping[str, str],
+) -> VoiceActivityGate | None:
+    """
+    クエリパラメータで指定された閾値でセッション毎の VoiceActivityGate を作成する。 \n
+    例: ?vadEnergyThresholdDbfs=-40&vadHangoverMs=600 \n
+    vad=off を指定した場合は無音区間も含めて全てのPCM音声をGeminiに転送する。
+    """
+    if query_params.get("vad") == "off":
+        return None
+
+    return VoiceActivityGate(
+        energy_threshold_dbfs=read_float_query_param(
+            query_params, "vadEnergyThresholdDbfs", DEFAULT_ENERGY_THRESHOLD_DBFS
+        ),
+        hangover_seconds=read_float_query_param(
+            query_params, "vadHangoverMs", DEFAULT_HANGOVER_SECONDS * 1000, 0.001
+        ),
+        pre_roll_seconds=read_float_query_param(
+            query_params, "vadPreRollMs", DEFAULT_PRE_ROLL_SECONDS * 1000, 0.001
+        ),
+        end_padding_seconds=read_float_query_param(
+            query_params, "vadEndPaddingMs", DEFAULT_END_PADDING_SECONDS * 1000, 0.001
+        ),
+    )
+
+
+def build_live_config(prompt: PromptEntry) -> dict[str, Any]:
+    """Gemini Live APIの接続の設定を組み立てる"""
+    return {
+        "response_modalities": ["TEXT"],
+        "tools": tools,
+        "system_instruction": prompt["text"],
+    }
+
+
+# ペルソナ毎のGemini Live APIの接続の設定（プロンプトが変更された時だけ組み立て直し、接続時は組み立てない）
+live_configs = PromptConfigCache(prompt_registry, VIDEO_CHAT_VARIANT, build_live_config)
+
+# 事前に接続しておくGeminiのセッションの数（0の場合はWebSocketの接続の度に接続する）
+GEMINI_LIVE_POOL_SIZE = int(os.getenv("GEMINI_LIVE_POOL_SIZE", DEFAULT_POOL_SIZE))
+
+
+def create_gemini_provider(
+    model: str,
+) -> LiveProvider["AsyncSession", dict[str, Any]]:
+    return LiveProvider(
+        f"gemini/{model}", model, lambda config: connect_live_api(model, config)
+    )
+
+
+# 新しいセッションの接続先を選び、接続に失敗した場合は他のモデルに接続する
+live_router: LiveProviderRouter["AsyncSession", dict[str, Any]] = LiveProviderRouter(
+    [create_gemini_provider(model) for model in GEMINI_LIVE_MODELS]
+)
+
+# デフォルトのペルソナの設定で事前に接続しておくGeminiのセッション（main.py の lifespan で開始・終了する）
+live_pool: GeminiLivePool[RoutedSession["AsyncSession"]] = GeminiLivePool(
+    lambda: live_router.connect(live_configs.get()),
+    size=GEMINI_LIVE_POOL_SIZE,
+)
+# プロンプトが変更されたら、変更前のプロンプトで事前に接続したセッションは使わずに接続し直す
+prompt_registry.subscribe(live_pool.expire_idle)
+# 接続先が使えなくなったら、そこに事前に接続したセッションは使わずに接続し直す
+live_router.subscribe(live_pool.expire_idle)
+
+
+def connect_live_session(
+    persona: str,
+) -> AbstractAsyncContextManager[RoutedSession["AsyncSession"]]:
+    """デフォルトのペルソナは事前接続のプールから取得し、それ以外はその場でGeminiに接続する"""
+    if persona == DEFAULT_PERSONA:
+        return live_pool.acquire()
+    return live_router.connect(live_configs.get(persona))
+
+
+class VideoChatSession:
+    """
+    1つのGeminiのセッションとクライアントとの会話の状態を持つ（クライアントが再接続しても同じインスタンスで続ける）。 \n
+    クライアントからGeminiへの送信は send_to_gemini、Geminiからクライアントへの送信は receive_from_gemini で行い、
+    終了時の後片付けと統計の出力は run の最後にまとめて行う。
+    """
+
+    def __init__(
+        self,
+        routed_session: RoutedSession["AsyncSession"],
+        query_params: Mapping[str, str],
+    ) -> None:
+        self._routed_session = routed_session
+        self._session = routed_session.session
+
+        # 処理毎の所要時間を /metrics のヒストグラムに集計する
+        # 最初の応答までの時間は接続先の選択にも使う
+        self._metrics = SessionMetrics(
+            on_first_token=lambda seconds: live_router.observe_first_token(
+                routed_session.provider, seconds
+            )
+        )
+        self._metrics.open()
+
+        # ワーカーの停止時にターンの区切りで終了できるようにセッションを登録する
+        self._registered_session = session_registry.register(
+            self._session, routed_session.model
+        )
+
+        # クライアントへの送信は連番を振って保持し、再接続したクライアントに未受信の分を再送する
+        self._outbound = OutboundBuffer()
+
+        # 音声合成の音声は接続時にクライアントが指定したコーデックに圧縮して送信する
+        # 例: ?audioCodec=opus,aac （指定が無い場合はWAVのまま送信する）
+        self._audio_encoder = AudioEncoder(
+            negotiate_codec(query_params.get("audioCodec")),
+            on_encoded=self._metrics.observe_audio_egress,
+        )
+
+        # 音声合成は受信ループとは別タスクで文単位に実行し、合成が完了した順ではなく文の順番で送信する
+        # ターン終了はそのターンの音声を全て送信した後にクライアント側に知らせる
+        self._speech_pipeline = SpeechPipeline(
+            tts_client=get_tts_client(),
+            send_audio=self._outbound.send_base64_audio,
+            send_end_of_turn=self._send_end_of_turn,
+            on_synthesize_latency=lambda seconds: self._metrics.observe("tts", seconds),
+            audio_encoder=self._audio_encoder,
+        )
+
+        # ユーザーが応答中に話し始めたら、未送信の音声を破棄してクライアントに再生を止めさせる
+        # bargeIn=off を指定した場合は発話の開始では中断しない（interrupt メッセージでは中断する）
+        self._barge_in_on_speech = query_params.get("bargeIn") != "off"
+        self._turn_interrupter = TurnInterrupter(
+            self._speech_pipeline,
+            send_interrupted=self._outbound.send_interrupted,
+            on_interrupt=self._on_interrupt,
+        )
+
+        # 変化の無い映像フレームは転送せず、上流が詰まっている場合はフレームレートを下げる
+        self._frame_gate = VideoFrameGate()
+        self._media_sender = MediaSender(
+            self._session, on_send_latency=self._on_send_latency
+        )
+        self._tool_call_dispatcher = ToolCallDispatcher(
+            tool_registry,
+            self._session,
+            on_call_complete=self._metrics.observe_tool_call,
+        )
+        self._metrics.watch(self._media_sender, self._tool_call_dispatcher)
+
+        # クライアントが接続時に指定した形式の音声は16kHzのPCMに変換してから扱う
+        # 例: ?audioInputEncoding=mulaw&audioInputSampleRate=8000 （指定が無い場合は16kHzのPCMのまま）
+        audio_input_format = negotiate_input_format(
+            query_params.get("audioInputEncoding"),
+            query_params.get("audioInputSampleRate"),
+        )
+        self._audio_decoder = (
+            AudioDecoder(audio_input_format)
+            if audio_input_format != DEFAULT_INPUT_FORMAT
+            else None
+        )
+
+        # 無音区間のPCM音声は転送せず、発話終了時には短い無音を送ってGeminiに発話終了を早く検出させる
+        self._voice_activity_gate = create_voice_activity_gate(query_params)
+
+        # 画像の間引きの判定と縮小・再圧縮はスレッドプールで行い、完了したものから送信キューに追加する
+        self._image_normalizer = ImageNormalizer() if NORMALIZE_IMAGES else None
+        self._image_tasks: set[asyncio.Task[None]] = set()
+
+    async def run(self, transport: VideoChatTransport) -> None:
+        """
+        クライアントからの受信（再接続した場合は再接続したクライアントからの受信）とGeminiからの受信を並行して実行する。 \n
+        クライアントが正常に切断するか、再接続を待つ時間が過ぎるか、ワーカーが停止するまで待つ。
+        """
+        resumable_session = ResumableSession(self._outbound, self.send_to_gemini)
+        resumable_sessions.add(resumable_session)
+        await session_registry.claim_resume_token(resumable_session.resume_token)
+        send_task = asyncio.create_task(resumable_session.serve(transport))
+        receive_task = asyncio.create_task(self.receive_from_gemini())
+        media_sender_task = asyncio.create_task(self._media_sender.run())
+        ended_task = asyncio.create_task(resumable_session.wait_ended())
+        drain_task = asyncio.create_task(self._registered_session.wait_for_drain())
+
+        try:
+            # クライアントが正常に切断するか、再接続を待つ時間が過ぎたらGeminiからの受信も終了する
+            # ワーカーの停止時は応答中のターンが終わってから切断し、クライアントに再接続を促す
+            await asyncio.wait(
+                [ended_task, drain_task], return_when=asyncio.FIRST_COMPLETED
+            )
+            if drain_task.done() and not ended_task.done():
+                app_logger.logger.info(
+                    "ワーカーの停止の為、ターンの区切りでセッションを終了します"
+                )
+                await resumable_session.close(status.WS_1012_SERVICE_RESTART)
+        except Exception as e:
+            app_logger.logger.error(f"タスク実行中にエラーが発生しました: {e}")
+        finally:
+            resumable_session.end()
+            resumable_sessions.remove(resumable_session)
+            await session_registry.release_resume_token(resumable_session.resume_token)
+            session_registry.unregister(self._registered_session)
+            await self._close(
+                [
+                    send_task,
+                    receive_task,
+                    media_sender_task,
+                    ended_task,
+                    drain_task,
+                    *self._image_tasks,
+                ]
+            )
+
+    async def send_to_gemini(self, transport: VideoChatTransport) -> int:
+        """クライアントからのメッセージを切断まで受信してGeminiに送信し、切断時のクローズコードを返す"""
+        try:
+            while True:
+                try:
+                    await self._handle_client_message(await transport.receive())
+                except WebSocketDisconnect as e:
+                    app_logger.logger.info(
+                        f"クライアント接続が切断されました (send): {e.code}"
+                    )
+                    return e.code
+                except InboundRateLimitExceeded as e:
+                    app_logger.logger.warning(f"クライアント接続を切断します: {e}")
+                    await transport.close(status.WS_1008_POLICY_VIOLATION)
+                    return status.WS_1008_POLICY_VIOLATION
+                except Exception as e:
+                    app_logger.logger.error(
+                        f"Geminiへの送信中にエラーが発生しました: {e}"
+                    )
+        except Exception as e:
+            app_logger.logger.error(f"send_to_geminiでエラーが発生しました: {e}")
+            return status.WS_1011_INTERNAL_ERROR
+        finally:
+            app_logger.logger.info("send_to_geminiを終了しました")
+
+    async def receive_from_gemini(self) -> None:
+        """Geminiからの応答をセッションの終了まで受信してクライアントに送信する"""
+        try:
+            while True:
+                try:
+                    app_logger.logger.info("Geminiからの応答を待機中")
+                    async for response in self._session.receive():
+                        await self._handle_gemini_response(response)
+                except WebSocketDisconnect:
+                    app_logger.logger.info(
+                        "クライアント接続が正常に切断されました (receive)"
+                    )
+                    break
+                except Exception as e:
+                    app_logger.logger.error(
+                        f"Geminiからの受信中にエラーが発生しました: {e}"
+                    )
+                    live_router.observe_error(self._routed_session.provider)
+                    break
+        except Exception as e:
+            app_logger.logger.error(f"receive_from_geminiでエラーが発生しました: {e}")
+        finally:
+            app_logger.logger.info("receive_from_geminiを終了しました")
+
+    async def _handle_client_message(self, message: ClientMessage) -> None:
+        received_at = time.perf_counter()
+        self._registered_session.count_received()
+
+        if "ack" in message:
+            self._outbound.ack(message["ack"])
+
+        if message.get("interrupt"):
+            await self._turn_interrupter.interrupt("client")
+
+        # Geminiへの送信は送信タスクで行い、クライアントからの受信を待たせない
+        if "input_text" in message:
+            await self._turn_interrupter.interrupt("text")
+            self._media_sender.put_text(message["input_text"])
+            self._start_turn()
+
+        for chunk in message.get("media_chunks", []):
+            if chunk["mime_type"] not in SUPPORTED_MEDIA_TYPES:
+                continue
+            if chunk["mime_type"] == "audio/pcm" and self._audio_decoder is not None:
+                chunk = MediaChunk(
+                    mime_type="audio/pcm",
+                    data=self._audio_decoder.decode(chunk["data"]),
+                )
+            if (
+                chunk["mime_type"] == "audio/pcm"
+                and self._voice_activity_gate is not None
+            ):
+                if (
+                    self._forward_audio(self._voice_activity_gate, chunk["data"])
+                    and self._barge_in_on_speech
+                ):
+                    await self._turn_interrupter.interrupt("speech")
+                continue
+            if chunk["mime_type"] == "image/jpeg":
+                image_task = asyncio.create_task(
+                    self._filter_and_send_image(chunk["data"])
+                )
+                self._image_tasks.add(image_task)
+                image_task.add_done_callback(self._image_tasks.discard)
+                continue
+            self._media_sender.put_media(chunk)
+
+        self._metrics.observe("websocket_message", time.perf_counter() - received_at)
+
+    async def _handle_gemini_response(self, response: "LiveServerMessage") -> None:
+        received_at = time.perf_counter()
+
+        # 関数呼び出しは別タスクで並行に実行し、受信ループを止めない
+        if response.tool_call and response.tool_call.function_calls:
+            self._tool_call_dispatcher.dispatch(response.tool_call.function_calls)
+
+        # キャンセルされた関数呼び出しは実行中のタスクをキャンセルする
+        if response.tool_call_cancellation and response.tool_call_cancellation.ids:
+            self._tool_call_dispatcher.cancel(response.tool_call_cancellation.ids)
+
+        if response.server_content is None:
+            app_logger.logger.warning(f"未処理のサーバーメッセージ: {response}")
+            return
+
+        # ユーザーの発話でGeminiが生成を中断した場合
+        if response.server_content.interrupted:
+            await self._turn_interrupter.interrupt("gemini")
+
+        # 割り込まれたターンの残りの応答はクライアントに送信しない
+        model_turn = response.server_content.model_turn
+        if model_turn and self._turn_interrupter.receive_part():
+            self._metrics.receive_part()
+            for part in model_turn.parts or []:
+                part_logger.info("part: %s", part)
+                if hasattr(part, "text") and part.text is not None:
+                    self._speech_pipeline.feed(part.text)
+                    await self._outbound.send_text(part.text)
+                    self._registered_session.count_sent()
+                elif hasattr(part, "inline_data") and part.inline_data is not None:
+                    part_logger.info("audio mime_type: %s", part.inline_data.mime_type)
+                    await self._outbound.send_audio(
+                        part.inline_data.data,
+                        part.inline_data.mime_type or "audio/pcm",
+                    )
+                    self._registered_session.count_sent()
+                    part_logger.info("音声データを受信しました")
+
+        if (
+            response.server_content.turn_complete
+            and self._turn_interrupter.complete_turn()
+        ):
+            app_logger.logger.info("AI Assistantのターン終了")
+            self._metrics.complete_turn()
+            self._speech_pipeline.end_turn()
+
+        self._metrics.observe("gemini_message", time.perf_counter() - received_at)
+
+    def _start_turn(self) -> None:
+        self._metrics.start_turn()
+        self._registered_session.start_turn()
+
+    async def _send_end_of_turn(self) -> None:
+        await self._outbound.send_end_of_turn()
+        self._metrics.end_turn()
+        self._registered_session.end_turn()
+
+    def _on_interrupt(self, source: InterruptSource) -> None:
+        self._metrics.interrupt_turn(source)
+        self._registered_session.end_turn()
+
+    def _on_send_latency(self, mime_type: str, seconds: float) -> None:
+        # audio/pcm は gemini_send_audio、image/jpeg は gemini_send_image
+        self._metrics.observe(f"gemini_send_{mime_type.split('/')[0]}", seconds)
+        if mime_type == "image/jpeg":
+            self._frame_gate.record_upstream_latency(seconds)
+
+    def _forward_audio(self, gate: VoiceActivityGate, pcm: bytes) -> bool:
+        """発話区間のPCM音声を送信キューに追加し、発話の開始を検出したかどうかを返す"""
+        speech_started = False
+        for segment in gate.process(pcm):
+            if "pcm" in segment:
+                self._media_sender.put_media(
+                    MediaChunk(mime_type="audio/pcm", data=segment["pcm"])
+                )
+            elif segment["event"] == "speech_end":
+                app_logger.logger.info("発話の終了を検出しました")
+                self._start_turn()
+                self._media_sender.put_media(
+                    MediaChunk(mime_type="audio/pcm", data=gate.end_padding)
+                )
+            else:
+                app_logger.logger.info("発話の開始を検出しました")
+                speech_started = True
+        return speech_started
+
+    async def _filter_and_send_image(self, jpeg: bytes) -> None:
+        if not await self._frame_gate.should_forward(jpeg):
+            return
+        if self._image_normalizer is not None:
+            normalized = await self._image_normalizer.normalize(jpeg)
+            if normalized is None:
+                return
+            jpeg = normalized
+        self._media_sender.put_media(MediaChunk(mime_type="image/jpeg", data=jpeg))
+
+    async def _close(self, tasks: list[asyncio.Task[Any]]) -> None:
+        """セッションのタスクを止めて、セッション毎の統計をログに出力する"""
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        await self._speech_pipeline.aclose()
+        await self._tool_call_dispatcher.aclose()
+        self._metrics.close()
+
+        app_logger.logger.info(
+            f"Geminiへの送信キューの統計: {self._media_sender.stats}"
+        )
+        app_logger.logger.info(
+            f"クライアントへの送信メッセージの統計: {self._outbound.stats}"
+        )
+        app_logger.logger.info(f"映像フレームの統計: {self._frame_gate.stats}")
+        app_logger.logger.info(
+            f"音声合成の音声の圧縮の統計: {self._audio_encoder.stats}"
+        )
+        if self._audio_decoder is not None:
+            app_logger.logger.info(
+                f"受信した音声の変換の統計: {self._audio_decoder.stats}"
+            )
+        app_logger.logger.info(
+            f"応答への割り込みの統計: {self._turn_interrupter.stats}"
+        )
+        app_logger.logger.info(
+            f"関数呼び出しの統計: {self._tool_call_dispatcher.stats}"
+        )
+        if self._image_normalizer is not None:
+            app_logger.logger.info(
+                f"画像の縮小・再圧縮の統計: {self._image_normalizer.stats}"
+            )
+        if self._voice_activity_gate is not None:
+            app_logger.logger.info(
+                f"発話区間の判定の統計: {self._voice_activity_gate.stats}"
+            )
 
 
 class VideoChatController:
@@ -171,273 +609,82 @@ class VideoChatController:
         self.websocket = websocket
 
     async def exec(self) -> None:
-        await self.websocket.accept()
+        # 停止処理中のワーカーでは新しい会話を始めない（クライアントには別のワーカーに接続し直してもらう）
+        if session_registry.draining:
+            await self.websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+            return
+
+        # 再開トークンを指定して再接続した場合は、切断前のGeminiのセッションと未送信のメッセージを引き継ぐ
+        # 例: ?resumeToken=xxx&lastSeq=42 （lastSeq はクライアントが受信済みのメッセージの連番）
+        resume_token = self.websocket.query_params.get("resumeToken")
+        resumable_session = (
+            resumable_sessions.find(resume_token) if resume_token else None
+        )
+        # 別のワーカーが持っているセッションの場合は、そのワーカーに中継する（ワーカーは接続毎にカーネルが選ぶ為）
+        if resume_token and resumable_session is None:
+            owner = await session_registry.find_resume_owner(resume_token)
+            if owner is not None and await proxy_resume(
+                self.websocket, owner, session_registry
+            ):
+                return
+
+        # 新しい会話はプロセス毎の同時に会話できるセッション数の上限を超えたら待たせずに拒否する（再開は対象外）
+        if resumable_session is None and not live_session_admission.try_acquire():
+            app_logger.logger.warning(
+                f"同時に会話できるセッション数の上限を超えた為、接続を拒否しました: {live_session_admission.stats}"
+            )
+            await reject_websocket(self.websocket, LIVE_SESSIONS_RETRY_AFTER_SECONDS)
+            return
 
         try:
-            async with client.aio.live.connect(model=MODEL, config=config) as session:  # type: AsyncSession
-                app_logger.logger.info("Gemini APIに接続しました")
-
-                async def send_to_gemini() -> None:
-                    try:
-                        while True:
-                            try:
-                                message = await self.websocket.receive_text()
-                                data = json.loads(message)
-
-                                if "inputText" in data:
-                                    await session.send(
-                                        input=data["inputText"], end_of_turn=True
-                                    )
-
-                                if "realtimeInput" in data:
-                                    for chunk in data["realtimeInput"]["mediaChunks"]:
-                                        if chunk["mimeType"] == "audio/pcm":
-                                            await session.send(
-                                                input={
-                                                    "mime_type": "audio/pcm",
-                                                    "data": chunk["data"],
-                                                }
-                                            )
-                                        elif chunk["mimeType"] == "image/jpeg":
-                                            await session.send(
-                                                input={
-                                                    "mime_type": "image/jpeg",
-                                                    "data": chunk["data"],
-                                                }
-                                            )
-                            except WebSocketDisconnect:
-                                app_logger.logger.info(
-                                    "クライアント接続が切断されました (send)"
-                                )
-                                break
-                            except Exception as e:
-                                app_logger.logger.error(
-                                    f"Geminiへの送信中にエラーが発生しました: {e}"
-                                )
-                    except Exception as e:
-                        app_logger.logger.error(
-                            f"send_to_geminiでエラーが発生しました: {e}"
-                        )
-                    finally:
-                        app_logger.logger.info("send_to_geminiを終了しました")
-
-                async def receive_from_gemini() -> None:
-                    try:
-                        while True:
-                            try:
-                                app_logger.logger.info("Geminiからの応答を待機中")
-
-                                # 音声合成の元になる結合用の文字列
-                                combined_text = ""
-
-                                async for response in session.receive():
-                                    # 関数呼び出しの処理
-                                    if (
-                                        response.tool_call
-                                        and response.tool_call.function_calls
-                                    ):
-                                        for (
-                                            function_call
-                                        ) in response.tool_call.function_calls:
-                                            if function_call.name == "send_email":
-                                                dto_args = function_call.args["dto"]
-                                                if not all(
-                                                    key in dto_args
-                                                    for key in [
-                                                        "to_email",
-                                                        "subject",
-                                                        "body",
-                                                    ]
-                                                ):
-                                                    app_logger.logger.error(
-                                                        "SendEmailDtoの必須フィールドが不足しています"
-                                                    )
-                                                    continue
-
-                                                result = await send_email(
-                                                    SendEmailDto(
-                                                        to_email=dto_args["to_email"],
-                                                        subject=dto_args["subject"],
-                                                        body=dto_args["body"],
-                                                    )
-                                                )
-
-                                                app_logger.logger.info(
-                                                    f"Function call ID is {function_call.id} Call Functions is 'send_email' result is {result}."
-                                                )
-
-                                                # `function_call.id` は function-call-xxxxxxxxxxxxxxxxxxxx のような値が返ってくる
-                                                # 関数の結果をモデルに送信
-                                                await session.send(
-                                                    input={
-                                                        "id": function_call.id,
-                                                        "name": "send_email",
-                                                        "response": result,
-                                                    },
-                                                    end_of_turn=True,
-                                                )
-
-                                            if (
-                                                function_call.name
-                                                == "create_google_calendar_event"
-                                            ):
-                                                dto_args = function_call.args["dto"]
-                                                if not all(
-                                                    key in dto_args
-                                                    for key in ["email", "title"]
-                                                ):
-                                                    app_logger.logger.error(
-                                                        "CreateGoogleCalendarEventDtoの必須フィールドが不足しています"
-                                                    )
-                                                    continue
-
-                                                result = (
-                                                    await create_google_calendar_event(
-                                                        CreateGoogleCalendarEventDto(
-                                                            email=dto_args["email"],
-                                                            title=dto_args["title"],
-                                                        )
-                                                    )
-                                                )
-
-                                                app_logger.logger.info(
-                                                    f"Function call ID is {function_call.id} Call Functions is 'create_google_calendar_event' result is {result}."
-                                                )
-
-                                                await session.send(
-                                                    input={
-                                                        "id": function_call.id,
-                                                        "name": "create_google_calendar_event",
-                                                        "response": result,
-                                                    },
-                                                    end_of_turn=True,
-                                                )
-
-                                    # キャンセル処理
-                                    if response.tool_call_cancellation:
-                                        for (
-                                            cancelled_id
-                                        ) in response.tool_call_cancellation.ids:
-                                            # 必要に応じてキャンセル処理を実行
-                                            # function_call.id と関数の呼び出し結果をDBに保存しておいて、やるとしたら取り消し処理を行う等になると思う
-                                            # 若干ややこしいので、取り消し用の関数をToolsに設定しておくほうが簡単かもしれない
-                                            app_logger.logger.info(
-                                                f"Function call with ID {cancelled_id} was cancelled."
-                                            )
-
-                                    if response.server_content is None:
-                                        app_logger.logger.warning(
-                                            f"未処理のサーバーメッセージ: {response}"
-                                        )
-                                        continue
-
-                                    model_turn = response.server_content.model_turn
-                                    if model_turn:
-                                        for part in model_turn.parts:
-                                            app_logger.logger.info(f"part: {part}")
-                                            if (
-                                                hasattr(part, "text")
-                                                and part.text is not None
-                                            ):
-                                                combined_text += response.text
-                                                await self.websocket.send_text(
-                                                    json.dumps({"text": part.text})
-                                                )
-                                            elif (
-                                                hasattr(part, "inline_data")
-                                                and part.inline_data is not None
-                                            ):
-                                                app_logger.logger.info(
-                                                    f"audio mime_type: {part.inline_data.mime_type}"
-                                                )
-                                                base64_audio = base64.b64encode(
-                                                    part.inline_data.data
-                                                ).decode("utf-8")
-                                                await self.websocket.send_text(
-                                                    json.dumps({"audio": base64_audio})
-                                                )
-                                                app_logger.logger.info(
-                                                    "音声データを受信しました"
-                                                )
-
-                                    if response.server_content.turn_complete:
-                                        app_logger.logger.info(
-                                            "AI Assistantのターン終了"
-                                        )
-
-                                        if combined_text:
-                                            tts_payload = {
-                                                "script": combined_text,
-                                                "format": "wav",
-                                                "speed": "0.8",
-                                            }
-                                            tts_headers = {
-                                                "x-api-key": TTS_API_KEY,
-                                                "accept": "application/json",
-                                                "content-type": "application/json",
-                                            }
-                                            tts_response = requests.post(
-                                                TTS_API_URL,
-                                                json=tts_payload,
-                                                headers=tts_headers,
-                                            )
-                                            tts_response.raise_for_status()
-                                            tts_data = tts_response.json()
-                                            if (
-                                                "generatedVoice" in tts_data
-                                                and "base64Audio"
-                                                in tts_data["generatedVoice"]
-                                            ):
-                                                base64_audio = tts_data[
-                                                    "generatedVoice"
-                                                ]["base64Audio"]
-                                                await self.websocket.send_text(
-                                                    json.dumps({"audio": base64_audio})
-                                                )
-
-                                                combined_text = ""
-
-                                        # クライアント側にAI Assistantのターンが終わった事を知らせる
-                                        await self.websocket.send_text(
-                                            json.dumps({"endOfTurn": True})
-                                        )
-
-                            except WebSocketDisconnect:
-                                app_logger.logger.info(
-                                    "クライアント接続が正常に切断されました (receive)"
-                                )
-                                break
-                            except Exception as e:
-                                app_logger.logger.error(
-                                    f"Geminiからの受信中にエラーが発生しました: {e}"
-                                )
-                                break
-                    except Exception as e:
-                        app_logger.logger.error(
-                            f"receive_from_geminiでエラーが発生しました: {e}"
-                        )
-                    finally:
-                        app_logger.logger.info("receive_from_geminiを終了しました")
-
-                # 送信ループと受信ループを並行して実行
-                send_task = asyncio.create_task(send_to_gemini())
-                receive_task = asyncio.create_task(receive_from_gemini())
-
-                try:
-                    await asyncio.gather(send_task, receive_task)
-                except Exception as e:
-                    app_logger.logger.error(f"タスク実行中にエラーが発生しました: {e}")
-                finally:
-                    # タスクのクリーンアップ
-                    for task in [send_task, receive_task]:
-                        if not task.done():
-                            task.cancel()
-                            try:
-                                await task
-                            except asyncio.CancelledError:
-                                pass
+            transport = await accept_video_chat_transport(
+                self.websocket, InboundRateLimiter()
+            )
+        except Exception:
+            if resumable_session is None:
+                live_session_admission.release()
+            raise
+
+        if resumable_session is not None:
+            app_logger.logger.info("切断前のセッションを再開します")
+            # 再開トークンの送信と未受信のメッセージの再送が成功した場合だけ再開できたとして数える
+            if await resumable_session.attach(
+                transport,
+                last_seq=int(
+                    read_float_query_param(self.websocket.query_params, "lastSeq", 0)
+                ),
+                resumed=True,
+            ):
+                session_resumes_total.inc("resumed")
+            await resumable_session.receive(transport)
+            return
+        if resume_token:
+            session_resumes_total.inc("not_found")
+            app_logger.logger.info(
+                "再開できるセッションが無いので新しいセッションを開始します"
+            )
+
+        # ?persona=xxx で会話するペルソナを選ぶ（登録されていない場合はデフォルトのペルソナ）
+        persona = self.websocket.query_params.get("persona", DEFAULT_PERSONA)
+        if (persona, VIDEO_CHAT_VARIANT) not in prompt_registry.entries:
+            app_logger.logger.warning(
+                f"登録されていないペルソナの為、デフォルトのペルソナを使います: {persona}"
+            )
+            persona = DEFAULT_PERSONA
 
+        try:
+            async with connect_live_session(persona) as routed_session:
+                app_logger.logger.info(
+                    f"Gemini APIに接続しました (接続先: {routed_session.provider}, "
+                    f"ペルソナ: {persona}, "
+                    f"プロンプト: {prompt_registry.get(persona)['digest']}, "
+                    f"事前接続のプール: {live_pool.stats})"
+                )
+                await VideoChatSession(routed_session, self.websocket.query_params).run(
+                    transport
+                )
         except Exception as e:
             app_logger.logger.error(f"Geminiセッションでエラーが発生しました: {e}")
         finally:
+            live_session_admission.release()
             app_logger.logger.info("Geminiセッションを終了しました")
@@ -0,0 +1,190 @@
+import asyncio
+import time
+from collections import deque
+from collections.abc import Callable
+from typing import Any, Protocol, TypedDict, final
+
+from infrastructure.gemini_client import LIVE_API_ERRORS
+from log.logger import AppLogger
+from presentation.video_chat_transport import MediaChunk
+
+app_logger = AppLogger()
+
+# 連続したPCM音声をまとめて送信する際の目標サイズ（16kHz/16bitで約0.25秒分）
+DEFAULT_MIN_BATCH_BYTES = 8192
+# 1回の送信にまとめるPCM音声の上限サイズ
+DEFAULT_MAX_BATCH_BYTES = 32768
+# 目標サイズに届くまで次の音声を待つ最大時間（秒）
+DEFAULT_MAX_BATCH_DELAY_SECONDS = 0.15
+# 送信待ちのメディアデータの上限サイズ
+DEFAULT_MAX_QUEUE_BYTES = 2 * 1024 * 1024
+
+
+class LiveSession(Protocol):
+    async def send(self, *, input: Any, end_of_turn: bool | None = False) -> Any: ...
+
+
+@final
+class TextItem(TypedDict):
+    text: str
+
+
+OutboundItem = MediaChunk | TextItem
+
+
+class MediaSenderStats(TypedDict):
+    queue_depth: int
+    buffered_bytes: int
+    max_buffered_bytes: int
+    sent_requests: int
+    sent_chunks: int
+    dropped_chunks: int
+    dropped_bytes: int
+
+
+class MediaSender:
+    """
+    クライアントから受信したメッセージをGeminiのセッションに送信する専用のキューと送信タスク。 \n
+    クライアントからの受信はGeminiへの送信を待たずに次のメッセージを読み込める。 \n
+    連続したPCM音声は1回の送信にまとめ、画像は単独で送信する。 \n
+    送信待ちのメディアデータが上限を超えた場合は古い画像から、次に古い音声から破棄する（テキストは破棄しない）。
+    """
+
+    def __init__(
+        self,
+        session: LiveSession,
+        min_batch_bytes: int = DEFAULT_MIN_BATCH_BYTES,
+        max_batch_bytes: int = DEFAULT_MAX_BATCH_BYTES,
+        max_batch_delay_seconds: float = DEFAULT_MAX_BATCH_DELAY_SECONDS,
+        max_queue_bytes: int = DEFAULT_MAX_QUEUE_BYTES,
+        on_send_latency: Callable[[str, float], None] | None = None,
+    ) -> None:
+        self._session = session
+        self._min_batch_bytes = min_batch_bytes
+        self._max_batch_bytes = max_batch_bytes
+        self._max_batch_delay_seconds = max_batch_delay_seconds
+        self._max_queue_bytes = max_queue_bytes
+        # メディアデータの送信完了時に (MIMEタイプ, 送信にかかった秒数) で呼び出される
+        self._on_send_latency = on_send_latency
+        self._queue: deque[OutboundItem] = deque()
+        self._buffered_bytes = 0
+        self._not_empty = asyncio.Event()
+        self._stats = MediaSenderStats(
+            queue_depth=0,
+            buffered_bytes=0,
+            max_buffered_bytes=0,
+            sent_requests=0,
+            sent_chunks=0,
+            dropped_chunks=0,
+            dropped_bytes=0,
+        )
+
+    @property
+    def stats(self) -> MediaSenderStats:
+        stats = self._stats.copy()
+        stats["queue_depth"] = len(self._queue)
+        stats["buffered_bytes"] = self._buffered_bytes
+        return stats
+
+    def put_media(self, chunk: MediaChunk) -> None:
+        """メディアデータを送信キューに追加する（キューが一杯の場合は古いメディアデータを破棄する）"""
+        size = len(chunk["data"])
+        while self._buffered_bytes + size > self._max_queue_bytes:
+            if not self._drop_oldest_media():
+                break
+
+        self._queue.append(chunk)
+        self._buffered_bytes += size
+        self._stats["max_buffered_bytes"] = max(
+            self._stats["max_buffered_bytes"], self._buffered_bytes
+        )
+        self._not_empty.set()
+
+    def put_text(self, text: str) -> None:
+        """ユーザーが入力したテキストを送信キューに追加する"""
+        self._queue.append(TextItem(text=text))
+        self._not_empty.set()
+
+    async def run(self) -> None:
+        """送信キューのメッセージをGeminiに送信し続ける"""
+        while True:
+            await self._wait_for_items()
+            item = self._queue.popleft()
+
+            try:
+                if "text" in item:
+                    await self._session.send(input=item["text"], end_of_turn=True)
+                    self._stats["sent_requests"] += 1
+                elif item["mime_type"] == "audio/pcm":
+                    await self._send_audio_batch(item)
+                else:
+                    self._buffered_bytes -= len(item["data"])
+                    await self._send_chunk(item, 1)
+            except LIVE_API_ERRORS as e:
+                app_logger.logger.error(f"Geminiへの送信中にエラーが発生しました: {e}")
+
+    async def _wait_for_items(self) -> None:
+        while not self._queue:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+
+    async def _send_audio_batch(self, first: MediaChunk) -> None:
+        batch = [first["data"]]
+        batch_bytes = len(first["data"])
+        self._buffered_bytes -= batch_bytes
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._max_batch_delay_seconds
+        while batch_bytes < self._max_batch_bytes:
+            if not self._queue:
+                if batch_bytes >= self._min_batch_bytes:
+                    break
+                # 目標サイズに届かない場合は遅延の許容時間内で次の音声を待つ
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                self._not_empty.clear()
+                try:
+                    await asyncio.wait_for(self._not_empty.wait(), remaining)
+                except TimeoutError:
+                    break
+                continue
+
+            next_item = self._queue[0]
+            if (
+                "text" in next_item
+                or next_item["mime_type"] != "audio/pcm"
+                or batch_bytes + len(next_item["data"]) > self._max_batch_bytes
+            ):
+                break
+
+            self._queue.popleft()
+            batch.append(next_item["data"])
+            batch_bytes += len(next_item["data"])
+            self._buffered_bytes -= len(next_item["data"])
+
+        await self._send_chunk(
+            MediaChunk(mime_type="audio/pcm", data=b"".join(batch)), len(batch)
+        )
+
+    async def _send_chunk(self, chunk: MediaChunk, chunk_count: int) -> None:
+        started_at = time.perf_counter()
+        await self._session.send(
+            input={"mime_type": chunk["mime_type"], "data": chunk["data"]}
+        )
+        self._stats["sent_requests"] += 1
+        self._stats["sent_chunks"] += chunk_count
+
+        if self._on_send_latency is not None:
+            self._on_send_latency(chunk["mime_type"], time.perf_counter() - started_at)
+
+    def _drop_oldest_media(self) -> bool:
+        for mime_prefix in ("image/", "audio/"):
+            for index, item in enumerate(self._queue):
+                if "text" not in item and item["mime_type"].startswith(mime_prefix):
+                    del self._queue[index]
+                    self._buffered_bytes -= len(item["data"])
+                    self._stats["dropped_chunks"] += 1
+                    self._stats["dropped_bytes"] += len(item["data"])
+                    return True
+        return False
@@ -0,0 +1,268 @@
+import math
+import os
+import time
+from collections.abc import Callable, Mapping
+from typing import Any, Literal, TypedDict
+
+from fastapi import WebSocket, status
+from starlette.responses import JSONResponse
+
+from infrastructure.shared_store import SharedStore, SharedStoreError, shared_store
+from log.logger import AppLogger
+from log.metrics import metrics_registry
+from presentation.error_response import create_rate_limited_error_body
+
+app_logger = AppLogger()
+
+# クライアント（IPアドレスとOriginの組み合わせ）毎に1分間に許可する回数（0の場合は制限しない）と、連続して許可する回数の上限
+# 状態は共有ストアに保存するので、全ワーカーで合計した回数を制限する
+VOICE_CHAT_SESSIONS_PER_MINUTE = float(
+    os.getenv("VOICE_CHAT_SESSIONS_PER_MINUTE", "10")
+)
+VIDEO_CHAT_CONNECTIONS_PER_MINUTE = float(
+    os.getenv("VIDEO_CHAT_CONNECTIONS_PER_MINUTE", "10")
+)
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "5"))
+# ロードバランサーがクライアントのIPアドレスを設定するヘッダー（例: Fly.io の場合は fly-client-ip）
+# 未指定の場合は接続元のIPアドレスを使う
+RATE_LIMIT_CLIENT_IP_HEADER = os.getenv("RATE_LIMIT_CLIENT_IP_HEADER", "").lower()
+# 共有ストアのクライアント毎のレート制限の状態のキーの接頭辞
+RATE_LIMIT_KEY_PREFIX = "rate_limit:"
+
+# プロセス毎に同時に会話できるセッション数の上限（0の場合は制限しない）
+MAX_LIVE_SESSIONS = int(os.getenv("MAX_LIVE_SESSIONS", "20"))
+# セッション数の上限を超えた場合にクライアントに再試行を促すまでの秒数
+LIVE_SESSIONS_RETRY_AFTER_SECONDS = 10.0
+
+# WebSocket毎にクライアントから受信するデータ量（バイト/秒）とメッセージ数（件/秒）の上限（0の場合は制限しない）
+# この秒数分までは一時的に上限を超えて受信できる
+WS_MAX_INBOUND_BYTES_PER_SECOND = int(
+    os.getenv("WS_MAX_INBOUND_BYTES_PER_SECOND", str(1024 * 1024))
+)
+WS_MAX_INBOUND_FRAMES_PER_SECOND = int(
+    os.getenv("WS_MAX_INBOUND_FRAMES_PER_SECOND", "100")
+)
+WS_INBOUND_BURST_SECONDS = 2.0
+
+rate_limit_rejections_total = metrics_registry.counter(
+    "rate_limit_rejections_total",
+    "レート制限・同時接続数の上限で拒否した回数",
+    label_name="reason",
+)
+
+InboundLimit = Literal["inbound_bytes", "inbound_frames"]
+
+
+class TokenBucket:
+    """
+    rate_per_second の速さでトークンが貯まり、capacity まで貯められるトークンバケット。 \n
+    貯まっている範囲で一時的に rate_per_second を超える利用を許可する。
+    """
+
+    def __init__(
+        self,
+        rate_per_second: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._rate_per_second = rate_per_second
+        self._capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated_at = clock()
+
+    @property
+    def full(self) -> bool:
+        self._refill()
+        return self._tokens >= self._capacity
+
+    def try_acquire(self, amount: float = 1.0) -> bool:
+        self._refill()
+        if self._tokens < amount:
+            return False
+        self._tokens -= amount
+        return True
+
+    def seconds_until_available(self, amount: float = 1.0) -> float:
+        """amount のトークンが貯まるまでの秒数を返す"""
+        self._refill()
+        if self._tokens >= amount:
+            return 0.0
+        if self._rate_per_second <= 0:
+            return math.inf
+        return (amount - self._tokens) / self._rate_per_second
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(
+            self._capacity,
+            self._tokens + (now - self._updated_at) * self._rate_per_second,
+        )
+        self._updated_at = now
+
+
+def client_key(
+    scope: Mapping[str, Any], client_ip_header: str = RATE_LIMIT_CLIENT_IP_HEADER
+) -> str:
+    """リクエスト（WebSocketのハンドシェイク）のASGIのscopeから、レート制限の単位となるクライアントを返す"""
+    headers = {
+        name.decode("latin-1").lower(): value.decode("latin-1")
+        for name, value in scope.get("headers", [])
+    }
+    client = scope.get("client")
+    ip = headers.get(client_ip_header, "") if client_ip_header else ""
+    if not ip and client:
+        ip = client[0]
+    return f"{ip}/{headers.get('origin', '')}"
+
+
+class ClientRateLimiter:
+    """
+    クライアント毎の回数を共有ストアのトークンバケット（GCRA）で制限する（全ワーカーで同じ状態を使う）。 \n
+    TokenBucket と同じく、平均して1分間に per_minute 回、連続して burst 回まで許可する。 \n
+    固定ウィンドウと違い、ウィンドウの境界をまたいで burst の2倍を連続して許可することは無い。 \n
+    状態は使い切ったバケットが満たされると有効期限で削除される。共有ストアに接続できない場合は制限せずに許可する。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        per_minute: float,
+        burst: float = RATE_LIMIT_BURST,
+        store: SharedStore = shared_store,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        # rate_limit_rejections_total の reason と、共有ストアのキーに使う
+        self._name = name
+        self._burst = max(1, int(burst))
+        self._interval_seconds = 60 / per_minute if per_minute > 0 else 0
+        self._store = store
+        self._clock = clock
+
+    async def acquire(self, key: str) -> float:
+        """許可した場合は0を、上限を超えた場合は次に許可できるまでの秒数を返す"""
+        if self._interval_seconds <= 0:
+            return 0.0
+
+        try:
+            retry_after_seconds = await self._store.throttle(
+                f"{RATE_LIMIT_KEY_PREFIX}{self._name}:{key}",
+                now=self._clock(),
+                interval_seconds=self._interval_seconds,
+                burst=self._burst,
+            )
+        except SharedStoreError as e:
+            app_logger.logger.warning(
+                f"レート制限の状態を更新できない為、制限せずに許可します: {e}"
+            )
+            return 0.0
+
+        if retry_after_seconds <= 0:
+            return 0.0
+
+        rate_limit_rejections_total.inc(self._name)
+        app_logger.logger.warning(f"レート制限を超えたリクエストを拒否しました: {key}")
+        return retry_after_seconds
+
+
+class InboundRateLimiter:
+    """WebSocket毎にクライアントから受信するデータ量とメッセージ数を制限する"""
+
+    def __init__(
+        self,
+        max_bytes_per_second: int = WS_MAX_INBOUND_BYTES_PER_SECOND,
+        max_frames_per_second: int = WS_MAX_INBOUND_FRAMES_PER_SECOND,
+        burst_seconds: float = WS_INBOUND_BURST_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._bytes = (
+            TokenBucket(
+                max_bytes_per_second, max_bytes_per_second * burst_seconds, clock
+            )
+            if max_bytes_per_second > 0
+            else None
+        )
+        self._frames = (
+            TokenBucket(
+                max_frames_per_second, max_frames_per_second * burst_seconds, clock
+            )
+            if max_frames_per_second > 0
+            else None
+        )
+
+    def exceeded(self, size_bytes: int) -> InboundLimit | None:
+        """受信したメッセージを記録し、上限を超えた場合は超えた上限の種類を返す"""
+        if self._frames is not None and not self._frames.try_acquire():
+            rate_limit_rejections_total.inc("inbound_frames")
+            return "inbound_frames"
+        if self._bytes is not None and not self._bytes.try_acquire(size_bytes):
+            rate_limit_rejections_total.inc("inbound_bytes")
+            return "inbound_bytes"
+        return None
+
+
+class InboundRateLimitExceeded(Exception):
+    """クライアントからの受信が InboundRateLimiter の上限を超えた場合の例外"""
+
+    def __init__(self, limit: InboundLimit) -> None:
+        super().__init__(f"受信の上限を超えました: {limit}")
+        self.limit = limit
+
+
+class SessionAdmissionStats(TypedDict):
+    active: int
+    admitted: int
+    rejected: int
+
+
+class SessionAdmission:
+    """プロセス毎に同時に会話できるセッション数を制限する（上限を超えたセッションは待たせずに拒否する）"""
+
+    def __init__(self, max_sessions: int = MAX_LIVE_SESSIONS) -> None:
+        self._max_sessions = max_sessions
+        self._stats = SessionAdmissionStats(active=0, admitted=0, rejected=0)
+
+    @property
+    def stats(self) -> SessionAdmissionStats:
+        return self._stats.copy()
+
+    def try_acquire(self) -> bool:
+        if 0 < self._max_sessions <= self._stats["active"]:
+            self._stats["rejected"] += 1
+            rate_limit_rejections_total.inc("live_sessions")
+            return False
+        self._stats["active"] += 1
+        self._stats["admitted"] += 1
+        return True
+
+    def release(self) -> None:
+        self._stats["active"] = max(0, self._stats["active"] - 1)
+
+
+def rate_limited_response(retry_after_seconds: float) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content=create_rate_limited_error_body(),
+        headers={"Retry-After": str(max(1, math.ceil(retry_after_seconds)))},
+    )
+
+
+async def reject_websocket(websocket: WebSocket, retry_after_seconds: float) -> None:
+    """
+    WebSocketの接続をハンドシェイクの前に拒否する。 \n
+    サーバーが対応していれば429のレスポンスを返し、対応していなければ 1013（Try Again Later）で切断する。
+    """
+    if "websocket.http.response" in websocket.scope.get("extensions", {}):
+        await websocket.send_denial_response(rate_limited_response(retry_after_seconds))
+        return
+    await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+
+
+# プロセス全体で共有する（クライアント毎の回数は共有ストアで全ワーカーと共有する）
+voice_chat_session_rate_limiter = ClientRateLimiter(
+    "voice_chat_sessions", VOICE_CHAT_SESSIONS_PER_MINUTE
+)
+video_chat_connection_rate_limiter = ClientRateLimiter(
+    "video_chat_connections", VIDEO_CHAT_CONNECTIONS_PER_MINUTE
+)
+live_session_admission = SessionAdmission()
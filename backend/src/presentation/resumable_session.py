@@ -0,0 +1,399 @@
+import asyncio
+import os
+import secrets
+from collections import deque
+from collections.abc import Callable, Coroutine
+from typing import Any, Literal, TypedDict
+
+from fastapi import WebSocketDisconnect, status
+
+from log.logger import AppLogger
+from log.metrics import metrics_registry
+from presentation.video_chat_transport import VideoChatTransport
+
+app_logger = AppLogger()
+
+# クライアントの接続が異常終了した場合に、再接続を待ってセッションを保持する時間（秒）、0の場合は再開しない
+RESUME_GRACE_SECONDS = float(os.getenv("RESUME_GRACE_SECONDS", "30"))
+# 再接続時に再送する為に保持する送信メッセージの件数とサイズの上限
+RESUME_BUFFER_MAX_MESSAGES = int(os.getenv("RESUME_BUFFER_MAX_MESSAGES", "256"))
+RESUME_BUFFER_MAX_BYTES = int(os.getenv("RESUME_BUFFER_MAX_BYTES", str(1024 * 1024)))
+# Geminiの応答のテキストはこの時間（ミリ秒）だけ待って続けて届いた分とまとめて1つのメッセージで送信する（0の場合はまとめない）
+TEXT_COALESCE_MS = float(os.getenv("TEXT_COALESCE_MS", "30"))
+# まとめているテキストがこの文字数を超えたら待たずに送信する
+TEXT_COALESCE_MAX_CHARS = int(os.getenv("TEXT_COALESCE_MAX_CHARS", "256"))
+
+# 正常な切断（クライアントからの終了、タブを閉じた等）の場合は再接続を待たずにセッションを終了する
+NORMAL_CLOSE_CODES = frozenset(
+    {status.WS_1000_NORMAL_CLOSURE, status.WS_1001_GOING_AWAY}
+)
+# 受信の上限を超えた等でサーバーから切断した場合も再開させない
+POLICY_CLOSE_CODES = frozenset({status.WS_1008_POLICY_VIOLATION})
+
+session_resumes_total = metrics_registry.counter(
+    "video_chat_session_resumes_total",
+    "セッションの再開の結果（resumed: 再開、proxied: セッションを持っている別のワーカーに中継、not_found: 期限切れ等で再開できなかった、expired: 再接続されずに終了）",
+    label_name="result",
+)
+
+OutboundKind = Literal["text", "audio", "base64_audio", "end_of_turn", "interrupted"]
+
+
+class OutboundMessage(TypedDict):
+    seq: int
+    kind: OutboundKind
+    data: str | bytes
+    mime_type: str
+
+
+class OutboundBufferStats(TypedDict):
+    last_seq: int
+    buffered_messages: int
+    buffered_bytes: int
+    evicted_messages: int
+    buffered_while_detached: int
+    replayed_messages: int
+    # send_text で受け取ったテキストの数と、まとめて送信したテキストのメッセージの数
+    text_deltas: int
+    text_frames: int
+
+
+class OutboundBuffer:
+    """
+    クライアントへの送信メッセージに連番を振り、直近のメッセージを再送用に保持する。 \n
+    クライアントが切断している間は保持だけ行い、再接続したクライアントには確認済みの連番より後のメッセージを再送する。 \n
+    件数・サイズの上限を超えたメッセージと、クライアントが ack で受信済みと通知したメッセージは古い順に破棄する。 \n
+    細切れに届くテキストは text_coalesce_seconds の間まとめて1つのメッセージにする（フレーム毎のJSON・送信の負荷を減らす為）。 \n
+    テキスト以外のメッセージを送信する前には、まとめているテキストを先に送信して順番を保つ。
+    """
+
+    def __init__(
+        self,
+        max_messages: int = RESUME_BUFFER_MAX_MESSAGES,
+        max_bytes: int = RESUME_BUFFER_MAX_BYTES,
+        text_coalesce_seconds: float = TEXT_COALESCE_MS / 1000,
+        text_coalesce_max_chars: int = TEXT_COALESCE_MAX_CHARS,
+    ) -> None:
+        self._max_messages = max_messages
+        self._max_bytes = max_bytes
+        self._text_coalesce_seconds = text_coalesce_seconds
+        self._text_coalesce_max_chars = text_coalesce_max_chars
+        # まだ送信していないテキストと、送信を予約したタスク
+        self._pending_text: list[str] = []
+        self._pending_text_chars = 0
+        self._flush_task: asyncio.Task[None] | None = None
+        self._messages: deque[OutboundMessage] = deque()
+        self._buffered_bytes = 0
+        self._last_seq = 0
+        self._transport: VideoChatTransport | None = None
+        # 再送中に新しいメッセージが割り込まないように、送信と再送は順番に行う
+        self._lock = asyncio.Lock()
+        self._stats = OutboundBufferStats(
+            last_seq=0,
+            buffered_messages=0,
+            buffered_bytes=0,
+            evicted_messages=0,
+            buffered_while_detached=0,
+            replayed_messages=0,
+            text_deltas=0,
+            text_frames=0,
+        )
+
+    @property
+    def stats(self) -> OutboundBufferStats:
+        stats = self._stats.copy()
+        stats["last_seq"] = self._last_seq
+        stats["buffered_messages"] = len(self._messages)
+        stats["buffered_bytes"] = self._buffered_bytes
+        return stats
+
+    @property
+    def transport(self) -> VideoChatTransport | None:
+        return self._transport
+
+    async def send_text(self, text: str) -> None:
+        self._stats["text_deltas"] += 1
+        if self._text_coalesce_seconds <= 0:
+            await self._send("text", text)
+            return
+
+        self._pending_text.append(text)
+        self._pending_text_chars += len(text)
+        if self._pending_text_chars >= self._text_coalesce_max_chars:
+            await self.flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def flush(self) -> None:
+        """まとめているテキストをすぐに送信する"""
+        async with self._lock:
+            await self._flush_pending_text()
+
+    async def send_end_of_turn(self) -> None:
+        await self._send("end_of_turn", "")
+
+    async def send_interrupted(self) -> None:
+        await self._send("interrupted", "")
+
+    async def send_audio(self, audio: bytes, mime_type: str = "audio/wav") -> None:
+        await self._send("audio", audio, mime_type)
+
+    async def send_base64_audio(
+        self, base64_audio: str, mime_type: str = "audio/wav"
+    ) -> None:
+        await self._send("base64_audio", base64_audio, mime_type)
+
+    def ack(self, seq: int) -> None:
+        """クライアントが受信済みのメッセージを破棄する"""
+        while self._messages and self._messages[0]["seq"] <= seq:
+            self._buffered_bytes -= len(self._messages.popleft()["data"])
+
+    def missed_after(self, seq: int) -> int:
+        """seq より後のメッセージのうち、破棄済みで再送できない件数を返す"""
+        first_seq = self._messages[0]["seq"] if self._messages else self._last_seq + 1
+        return max(first_seq - min(seq, self._last_seq) - 1, 0)
+
+    async def attach(self, transport: VideoChatTransport, last_seq: int) -> bool:
+        """
+        送信先を transport に切り替え、last_seq より後の保持しているメッセージを再送する。 \n
+        全て再送できた（送信先が transport のまま）かどうかを返す。
+        """
+        async with self._lock:
+            self.ack(last_seq)
+            self._transport = transport
+            for message in list(self._messages):
+                if self._transport is not transport:
+                    break
+                await self._deliver(transport, message)
+                self._stats["replayed_messages"] += 1
+            return self._transport is transport
+
+    def detach(self, transport: VideoChatTransport) -> None:
+        if self._transport is transport:
+            self._transport = None
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self._text_coalesce_seconds)
+        async with self._lock:
+            await self._flush_pending_text()
+
+    async def _flush_pending_text(self) -> None:
+        """ロックを取得した状態で呼び出す"""
+        flush_task, self._flush_task = self._flush_task, None
+        if flush_task is not None and flush_task is not asyncio.current_task():
+            # 予約したタスクはロックの取得待ちかスリープ中なので、キャンセルしても送信の途中で止まることは無い
+            flush_task.cancel()
+        if not self._pending_text:
+            return
+
+        text = "".join(self._pending_text)
+        self._pending_text.clear()
+        self._pending_text_chars = 0
+        await self._send_locked("text", text)
+
+    async def _send(
+        self, kind: OutboundKind, data: str | bytes, mime_type: str = ""
+    ) -> None:
+        async with self._lock:
+            await self._flush_pending_text()
+            await self._send_locked(kind, data, mime_type)
+
+    async def _send_locked(
+        self, kind: OutboundKind, data: str | bytes, mime_type: str = ""
+    ) -> None:
+        if kind == "text":
+            self._stats["text_frames"] += 1
+        self._last_seq += 1
+        message = OutboundMessage(
+            seq=self._last_seq, kind=kind, data=data, mime_type=mime_type
+        )
+        self._append(message)
+        if self._transport is None:
+            self._stats["buffered_while_detached"] += 1
+            return
+        await self._deliver(self._transport, message)
+
+    def _append(self, message: OutboundMessage) -> None:
+        self._messages.append(message)
+        self._buffered_bytes += len(message["data"])
+        while len(self._messages) > self._max_messages or (
+            self._buffered_bytes > self._max_bytes and len(self._messages) > 1
+        ):
+            self._buffered_bytes -= len(self._messages.popleft()["data"])
+            self._stats["evicted_messages"] += 1
+
+    async def _deliver(
+        self, transport: VideoChatTransport, message: OutboundMessage
+    ) -> None:
+        seq, data = message["seq"], message["data"]
+        try:
+            if message["kind"] == "text" and isinstance(data, str):
+                await transport.send_text(data, sequence=seq)
+            elif message["kind"] == "end_of_turn":
+                await transport.send_end_of_turn(sequence=seq)
+            elif message["kind"] == "interrupted":
+                await transport.send_interrupted(sequence=seq)
+            elif message["kind"] == "audio" and isinstance(data, bytes):
+                await transport.send_audio(data, message["mime_type"], sequence=seq)
+            elif isinstance(data, str):
+                await transport.send_base64_audio(
+                    data, message["mime_type"], sequence=seq
+                )
+        except (WebSocketDisconnect, OSError, RuntimeError) as e:
+            # 送信できなかったメッセージは保持しておき、再接続時に再送する
+            app_logger.logger.info(f"クライアントへの送信に失敗しました: {e!r}")
+            self.detach(transport)
+
+
+class ResumableSession:
+    """
+    クライアントの接続が切れてもGeminiのセッションと送信メッセージを保持し、再開トークンで再接続したクライアントに引き継ぐ。 \n
+    serve_client はクライアントからのメッセージを切断まで受信し、切断時のクローズコードを返す関数。 \n
+    正常に切断された場合と、grace_seconds の間再接続が無かった場合にセッションを終了する。
+    """
+
+    def __init__(
+        self,
+        outbound: OutboundBuffer,
+        serve_client: Callable[[VideoChatTransport], Coroutine[Any, Any, int]],
+        grace_seconds: float = RESUME_GRACE_SECONDS,
+    ) -> None:
+        self.resume_token = secrets.token_urlsafe(24)
+        self.outbound = outbound
+        self._serve_client = serve_client
+        self._grace_seconds = grace_seconds
+        self._client: VideoChatTransport | None = None
+        self._grace_timer: asyncio.TimerHandle | None = None
+        self._ended = asyncio.Event()
+
+    @property
+    def ended(self) -> bool:
+        return self._ended.is_set()
+
+    async def wait_ended(self) -> None:
+        await self._ended.wait()
+
+    async def serve(
+        self, transport: VideoChatTransport, last_seq: int = 0, resumed: bool = False
+    ) -> None:
+        """transport のクライアントにセッションを引き継ぎ、そのクライアントが切断するかセッションが終了するまで受信する"""
+        await self.attach(transport, last_seq, resumed)
+        await self.receive(transport)
+
+    async def attach(
+        self, transport: VideoChatTransport, last_seq: int = 0, resumed: bool = False
+    ) -> bool:
+        """
+        transport のクライアントにセッションを引き継ぐ（再開トークンを送信し、last_seq より後のメッセージを再送する）。 \n
+        全て送信できたかどうかを返す。
+        """
+        self._cancel_grace_timer()
+        previous_client, self._client = self._client, transport
+        if previous_client is not None:
+            # 古い接続の切断を検出する前に再接続された場合は、古い接続を閉じて新しい接続に切り替える
+            await _close_quietly(previous_client, status.WS_1000_NORMAL_CLOSURE)
+
+        session_sent = True
+        try:
+            await transport.send_session(
+                self.resume_token, resumed, self.outbound.missed_after(last_seq)
+            )
+        except (WebSocketDisconnect, OSError, RuntimeError):
+            # 送信できない場合は受信時に切断を検出する
+            session_sent = False
+        replayed = await self.outbound.attach(transport, last_seq)
+        return session_sent and replayed
+
+    async def receive(self, transport: VideoChatTransport) -> None:
+        """attach で引き継いだ transport のクライアントが切断するかセッションが終了するまで受信する"""
+        client_task = asyncio.create_task(self._serve_client(transport))
+        ended_task = asyncio.create_task(self._ended.wait())
+        try:
+            await asyncio.wait(
+                [client_task, ended_task], return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            for task in (client_task, ended_task):
+                if not task.done():
+                    task.cancel()
+                    try:
+                        await task
+                    except asyncio.CancelledError:
+                        pass
+
+        self.outbound.detach(transport)
+        # 新しい接続に引き継いだ後に古い接続が切断された場合は何もしない
+        if self._client is not transport or self.ended:
+            return
+        self._client = None
+
+        close_code = client_task.result() if not client_task.cancelled() else None
+        if (
+            close_code in NORMAL_CLOSE_CODES
+            or close_code in POLICY_CLOSE_CODES
+            or self._grace_seconds <= 0
+        ):
+            self.end()
+            return
+
+        app_logger.logger.info(
+            f"クライアントの再接続を{self._grace_seconds}秒待ちます (クローズコード: {close_code})"
+        )
+        self._grace_timer = asyncio.get_running_loop().call_later(
+            self._grace_seconds, self._expire
+        )
+
+    async def close(self, code: int) -> None:
+        """接続中のクライアントを code で切断してセッションを終了する（まとめているテキストは先に送信する）"""
+        await self.outbound.flush()
+        client = self._client
+        self.end()
+        if client is not None:
+            await _close_quietly(client, code)
+
+    def end(self) -> None:
+        self._cancel_grace_timer()
+        self._ended.set()
+
+    def _expire(self) -> None:
+        self._grace_timer = None
+        app_logger.logger.info(
+            "クライアントが再接続しなかったのでセッションを終了します"
+        )
+        session_resumes_total.inc("expired")
+        self.end()
+
+    def _cancel_grace_timer(self) -> None:
+        if self._grace_timer is not None:
+            self._grace_timer.cancel()
+            self._grace_timer = None
+
+
+async def _close_quietly(transport: VideoChatTransport, code: int) -> None:
+    try:
+        await transport.close(code)
+    except (WebSocketDisconnect, OSError, RuntimeError):
+        pass
+
+
+class ResumableSessionTable:
+    """このワーカーで再開できるセッションを再開トークンで管理する"""
+
+    def __init__(self) -> None:
+        self._sessions: dict[str, ResumableSession] = {}
+
+    def add(self, session: ResumableSession) -> None:
+        self._sessions[session.resume_token] = session
+
+    def remove(self, session: ResumableSession) -> None:
+        self._sessions.pop(session.resume_token, None)
+
+    def find(self, resume_token: str) -> ResumableSession | None:
+        """このワーカーで再開できるセッションを返す（別のワーカーのセッションは resume_proxy で中継する）"""
+        session = self._sessions.get(resume_token)
+        if session is None or session.ended:
+            return None
+        return session
+
+
+resumable_sessions = ResumableSessionTable()
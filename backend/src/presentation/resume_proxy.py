@@ -0,0 +1,134 @@
+import asyncio
+from collections.abc import Mapping
+from typing import Any
+
+from fastapi import WebSocket, WebSocketDisconnect, status
+from websockets.asyncio.client import ClientConnection, unix_connect
+from websockets.exceptions import ConnectionClosed, InvalidHandshake
+from websockets.typing import Subprotocol
+
+from log.logger import AppLogger
+from presentation.resumable_session import session_resumes_total
+from presentation.session_registry import ResumeOwner, SessionRegistry
+
+app_logger = AppLogger()
+
+# 中継した接続に付けるヘッダー（値は中継したワーカーの識別子）
+PROXIED_RESUME_HEADER = "x-video-chat-resumed-by"
+# セッションを持っているワーカーへの接続を待つ時間の上限（秒）
+RESUME_PROXY_CONNECT_TIMEOUT_SECONDS = 5.0
+# クローズフレームで送信できないクローズコード（接続が異常終了した場合等）
+UNSENDABLE_CLOSE_CODES = frozenset({1005, 1006, 1015})
+
+
+def is_proxied_resume(scope: Mapping[str, Any]) -> bool:
+    """
+    別のワーカーが中継した再開の接続かどうかを返す。 \n
+    中継はワーカー毎のUnixドメインソケット（接続元のアドレスが無い）で受け付けるので、TCPで受け付けた接続のヘッダーは信用しない。
+    """
+    headers = dict(scope.get("headers", []))
+    return scope.get("client") is None and PROXIED_RESUME_HEADER.encode() in headers
+
+
+async def proxy_resume(
+    websocket: WebSocket, owner: ResumeOwner, registry: SessionRegistry
+) -> bool:
+    """
+    再開トークンのセッションを持っている別のワーカーに接続し、切断までクライアントとの間でメッセージを中継する。 \n
+    セッションを持っているワーカーは通常の再接続として再開するので、メッセージの連番と再送はそのワーカーが扱う。 \n
+    中継できない（同じワーカー・別のホスト・接続に失敗した）場合はクライアントの接続を受け付けずに False を返す。
+    """
+    address = owner["address"]
+    if (
+        owner["worker_id"] == registry.worker_id
+        or owner["host"] != registry.host
+        or address is None
+        or not address.startswith("unix:")
+    ):
+        return False
+
+    query = websocket.url.query
+    uri = f"ws://localhost{websocket.url.path}" + (f"?{query}" if query else "")
+    subprotocols = [Subprotocol(p) for p in websocket.scope.get("subprotocols", [])]
+    try:
+        upstream = await unix_connect(
+            address.removeprefix("unix:"),
+            uri,
+            subprotocols=subprotocols or None,
+            additional_headers={PROXIED_RESUME_HEADER: registry.worker_id},
+            open_timeout=RESUME_PROXY_CONNECT_TIMEOUT_SECONDS,
+            # 受信の上限はセッションを持っているワーカーで確認する
+            max_size=None,
+            compression=None,
+        )
+    except (OSError, TimeoutError, InvalidHandshake) as e:
+        app_logger.logger.warning(
+            f"セッションを持っているワーカーに接続できませんでした ({owner['worker_id']}): {e!r}"
+        )
+        return False
+
+    async with upstream:
+        await websocket.accept(subprotocol=upstream.subprotocol)
+        session_resumes_total.inc("proxied")
+        app_logger.logger.info(
+            f"切断前のセッションを持っているワーカーに中継します: {owner['worker_id']}"
+        )
+        tasks = [
+            asyncio.create_task(_forward_client(websocket, upstream)),
+            asyncio.create_task(_forward_owner(upstream, websocket)),
+        ]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                    try:
+                        await task
+                    except asyncio.CancelledError:
+                        pass
+    return True
+
+
+async def _forward_client(websocket: WebSocket, upstream: ClientConnection) -> None:
+    """クライアントからのメッセージを転送し、クライアントが切断したら同じクローズコードで切断する"""
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                code = message.get("code", status.WS_1000_NORMAL_CLOSURE)
+                if code in UNSENDABLE_CLOSE_CODES:
+                    # 異常終了はそのまま伝えて、セッションを持っているワーカーに再接続を待たせる
+                    upstream.transport.abort()
+                else:
+                    await upstream.close(code)
+                return
+            if message.get("bytes") is not None:
+                await upstream.send(message["bytes"])
+            elif message.get("text") is not None:
+                await upstream.send(message["text"])
+    except ConnectionClosed:
+        pass
+
+
+async def _forward_owner(upstream: ClientConnection, websocket: WebSocket) -> None:
+    """セッションを持っているワーカーからのメッセージを転送し、切断されたら同じクローズコードでクライアントを切断する"""
+    try:
+        async for data in upstream:
+            if isinstance(data, bytes):
+                await websocket.send_bytes(data)
+            else:
+                await websocket.send_text(data)
+    except ConnectionClosed:
+        pass
+    except (WebSocketDisconnect, OSError, RuntimeError):
+        # クライアントは切断済み
+        return
+
+    code = upstream.close_code
+    if code is None or code in UNSENDABLE_CLOSE_CODES:
+        code = status.WS_1011_INTERNAL_ERROR
+    try:
+        await websocket.close(code=code)
+    except (WebSocketDisconnect, OSError, RuntimeError):
+        pass
@@ -1,22 +1,36 @@
-from fastapi import APIRouter, WebSocket
+from fastapi import APIRouter, Request, WebSocket
 from starlette import status
 from starlette.responses import JSONResponse
-from google.genai.live import AsyncSession  # noqa: F401
 from log.logger import AppLogger
 from presentation.controller.video_chat_controller import VideoChatController
 from presentation.controller.create_voice_chat_session_controller import (
     CreateVoiceChatSessionController,
 )
+from presentation.rate_limiter import (
+    client_key,
+    rate_limited_response,
+    reject_websocket,
+    video_chat_connection_rate_limiter,
+    voice_chat_session_rate_limiter,
+)
+from presentation.resume_proxy import is_proxied_resume
 
 router = APIRouter()
 app_logger = AppLogger()
 
 
 @router.post("/realtime-apis/voice-chat/sessions", status_code=status.HTTP_201_CREATED)
-async def create_voice_chat_session_endpoint() -> JSONResponse:
+async def create_voice_chat_session_endpoint(request: Request) -> JSONResponse:
     """
-    このエンドポイントはねこ型AIアシスタントとの会話を行う為のVoiceChatセッショントークンを取得する為のエンドポイントです。
+    このエンドポイントはねこ型AIアシスタントとの会話を行う為のVoiceChatセッショントークンを取得する為のエンドポイントです。 \n
+    クライアント毎の回数の上限を超えた場合は429を返します。
     """
+    retry_after = await voice_chat_session_rate_limiter.acquire(
+        client_key(request.scope)
+    )
+    if retry_after > 0:
+        return rate_limited_response(retry_after)
+
     controller = CreateVoiceChatSessionController()
     return await controller.exec()
 
@@ -30,7 +44,17 @@ async def video_chat_websocket_endpoint(websocket: WebSocket) -> None:
     {"audio": "Base64デコードされた音声データ"} \n
     {"text": "AIアシスタントの返答"} \n
     {"endOfTurn": true} \n
+    サブプロトコル realtime-api.binary.v1 を指定して接続した場合、音声・画像はヘッダー付きのバイナリフレームでやり取りします。 \n
+    クライアント毎の接続回数や同時に会話できるセッション数の上限を超えた場合は429を返します。 \n
     """
+    # 別のワーカーが中継した再開の接続は、中継したワーカーで接続回数を数えている
+    if not is_proxied_resume(websocket.scope):
+        retry_after = await video_chat_connection_rate_limiter.acquire(
+            client_key(websocket.scope)
+        )
+        if retry_after > 0:
+            await reject_websocket(websocket, retry_after)
+            return
 
     controller = VideoChatController(websocket)
 
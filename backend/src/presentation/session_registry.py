@@ -0,0 +1,302 @@
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+from collections.abc import Callable
+from typing import TypedDict
+
+from infrastructure.shared_store import SharedStore, SharedStoreError, shared_store
+from log.logger import AppLogger
+
+app_logger = AppLogger()
+
+# このワーカーの識別子（複数のインスタンスで動かしても重複しないようにホスト名を含める）
+WORKER_HOST = socket.gethostname()
+WORKER_ID = f"{WORKER_HOST}:{os.getpid()}"
+
+# ワーカー毎のセッションの一覧を共有ストアに保存するキー（フィールドはワーカーの識別子）
+WORKERS_KEY = "video_chat:workers"
+# 再開トークン毎にセッションを持っているワーカーを共有ストアに保存するキーの接頭辞
+RESUME_OWNER_KEY_PREFIX = "video_chat:resume:"
+# 共有ストアのセッションの一覧を更新する間隔（秒）、この3倍の間更新の無いワーカーは停止したものとして扱う
+DEFAULT_HEARTBEAT_INTERVAL_SECONDS = 5.0
+STALE_HEARTBEATS = 3
+# 停止時にセッションの終了を確認する間隔（秒）
+DRAIN_POLL_INTERVAL_SECONDS = 0.1
+
+
+class SessionRecord(TypedDict):
+    session_id: str
+    # セッションを持っているワーカー（会話の状態はこのワーカーのメモリにしか無い）
+    worker_id: str
+    # 接続先のモデル
+    upstream: str
+    started_at: float
+    messages_received: int
+    messages_sent: int
+    turns: int
+
+
+class ResumeOwner(TypedDict):
+    """再開トークンのセッションを持っているワーカー"""
+
+    worker_id: str
+    host: str
+    # 別のワーカーが再開の接続を中継する先（例: unix:/tmp/video-chat-worker-123.sock、中継を受け付けない場合は None）
+    address: str | None
+
+
+class WorkerSessions(TypedDict):
+    worker_id: str
+    draining: bool
+    updated_at: float
+    sessions: list[SessionRecord]
+
+
+class RegisteredSession:
+    """
+    SessionRegistry に登録したセッション。 \n
+    upstream にはGeminiのセッションなど、このワーカーだけが持つ接続を保持する。 \n
+    ワーカーの停止時はユーザーのターンの開始から endOfTurn の送信までの間は待ってから終了させる。
+    """
+
+    def __init__(self, record: SessionRecord, upstream: object) -> None:
+        self.record = record
+        self.upstream = upstream
+        self._drain_requested = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @property
+    def session_id(self) -> str:
+        return self.record["session_id"]
+
+    def count_received(self) -> None:
+        self.record["messages_received"] += 1
+
+    def count_sent(self) -> None:
+        self.record["messages_sent"] += 1
+
+    def start_turn(self) -> None:
+        self._idle.clear()
+
+    def end_turn(self) -> None:
+        if not self._idle.is_set():
+            self.record["turns"] += 1
+            self._idle.set()
+
+    def request_drain(self) -> None:
+        self._drain_requested.set()
+
+    async def wait_for_drain(self) -> None:
+        """ワーカーの停止が要求され、応答中のターンが無くなるまで待つ"""
+        await self._drain_requested.wait()
+        await self._idle.wait()
+
+
+class SessionRegistry:
+    """
+    このワーカーで接続中のセッションを管理し、共有ストアを通じて全ワーカーのセッションの一覧を公開する。 \n
+    ワーカーの停止時は drain で新しいセッションの受付を止め、接続中のセッションがターンの区切りで終了するのを待つ。 \n
+    再開トークン毎にセッションを持っているワーカーも共有ストアに保存し、別のワーカーに再接続された場合に中継先を探せるようにする。
+    """
+
+    def __init__(
+        self,
+        store: SharedStore,
+        worker_id: str = WORKER_ID,
+        heartbeat_interval_seconds: float = DEFAULT_HEARTBEAT_INTERVAL_SECONDS,
+        clock: Callable[[], float] = time.time,
+        host: str = WORKER_HOST,
+    ) -> None:
+        self._store = store
+        self._worker_id = worker_id
+        self._heartbeat_interval_seconds = heartbeat_interval_seconds
+        self._clock = clock
+        self._host = host
+        # 別のワーカーから再開の接続の中継を受け付けるアドレス（server.py がワーカーの起動時に設定する）
+        self.internal_address: str | None = None
+        self._sessions: dict[str, RegisteredSession] = {}
+        self._resume_tokens: set[str] = set()
+        self._draining = False
+        self._heartbeat_task: asyncio.Task[None] | None = None
+
+    @property
+    def worker_id(self) -> str:
+        return self._worker_id
+
+    @property
+    def host(self) -> str:
+        return self._host
+
+    @property
+    def draining(self) -> bool:
+        return self._draining
+
+    @property
+    def sessions(self) -> list[SessionRecord]:
+        return [session.record.copy() for session in self._sessions.values()]
+
+    def register(self, upstream: object, upstream_name: str) -> RegisteredSession:
+        session = RegisteredSession(
+            SessionRecord(
+                session_id=uuid.uuid4().hex,
+                worker_id=self._worker_id,
+                upstream=upstream_name,
+                started_at=self._clock(),
+                messages_received=0,
+                messages_sent=0,
+                turns=0,
+            ),
+            upstream,
+        )
+        self._sessions[session.session_id] = session
+        if self._draining:
+            session.request_drain()
+        return session
+
+    def unregister(self, session: RegisteredSession) -> None:
+        self._sessions.pop(session.session_id, None)
+
+    async def claim_resume_token(self, resume_token: str) -> None:
+        """再開トークンのセッションをこのワーカーが持っていることを共有ストアに保存する（release_resume_token まで更新し続ける）"""
+        self._resume_tokens.add(resume_token)
+        await self._save_resume_owner(resume_token)
+
+    async def release_resume_token(self, resume_token: str) -> None:
+        self._resume_tokens.discard(resume_token)
+        try:
+            await self._store.delete(RESUME_OWNER_KEY_PREFIX + resume_token)
+        except SharedStoreError as e:
+            app_logger.logger.warning(f"再開トークンの削除に失敗しました: {e}")
+
+    async def find_resume_owner(self, resume_token: str) -> ResumeOwner | None:
+        """再開トークンのセッションを持っているワーカーを返す（期限切れ・停止したワーカーの場合は None）"""
+        try:
+            value = await self._store.get(RESUME_OWNER_KEY_PREFIX + resume_token)
+        except SharedStoreError as e:
+            app_logger.logger.warning(f"再開トークンの取得に失敗しました: {e}")
+            return None
+        if value is None:
+            return None
+        owner: ResumeOwner = json.loads(value)
+        return owner
+
+    def start(self) -> None:
+        """裏で共有ストアのセッションの一覧の更新を開始する"""
+        if self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
+
+    async def close(self) -> None:
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+
+        try:
+            await self._store.hdel(WORKERS_KEY, self._worker_id)
+        except SharedStoreError as e:
+            app_logger.logger.warning(f"セッションの一覧の削除に失敗しました: {e}")
+
+    async def drain(
+        self, timeout_seconds: float, should_abort: Callable[[], bool] = lambda: False
+    ) -> None:
+        """
+        新しいセッションの受付を止め、接続中のセッションに終了を要求する。 \n
+        全てのセッションが終了するか、timeout_seconds が経過するか、should_abort が True を返すまで待つ。
+        """
+        self._draining = True
+        for session in self._sessions.values():
+            session.request_drain()
+        await self.publish()
+
+        if not self._sessions:
+            return
+        app_logger.logger.info(
+            f"{len(self._sessions)}件のセッションがターンの区切りで終了するのを待機します"
+        )
+        deadline = self._clock() + timeout_seconds
+        while self._sessions and not should_abort() and self._clock() < deadline:
+            await asyncio.sleep(DRAIN_POLL_INTERVAL_SECONDS)
+
+        if self._sessions:
+            app_logger.logger.warning(
+                f"時間内に終了しなかったセッションを切断します: {len(self._sessions)}件"
+            )
+
+    async def publish(self) -> None:
+        """このワーカーのセッションの一覧を共有ストアに保存する"""
+        worker_sessions = WorkerSessions(
+            worker_id=self._worker_id,
+            draining=self._draining,
+            updated_at=self._clock(),
+            sessions=self.sessions,
+        )
+        try:
+            await self._store.hset(
+                WORKERS_KEY, self._worker_id, json.dumps(worker_sessions)
+            )
+        except SharedStoreError as e:
+            app_logger.logger.warning(f"セッションの一覧の保存に失敗しました: {e}")
+
+    async def cluster_sessions(self) -> list[WorkerSessions]:
+        """全ワーカーのセッションの一覧を返す（一定時間更新の無いワーカーは除く）"""
+        self_sessions = WorkerSessions(
+            worker_id=self._worker_id,
+            draining=self._draining,
+            updated_at=self._clock(),
+            sessions=self.sessions,
+        )
+        try:
+            workers = await self._store.hgetall(WORKERS_KEY)
+        except SharedStoreError as e:
+            app_logger.logger.warning(f"セッションの一覧の取得に失敗しました: {e}")
+            return [self_sessions]
+
+        stale_before = self._clock() - (
+            self._heartbeat_interval_seconds * STALE_HEARTBEATS
+        )
+        result = [self_sessions]
+        for worker_id, value in workers.items():
+            if worker_id == self._worker_id:
+                continue
+            worker_sessions: WorkerSessions = json.loads(value)
+            if worker_sessions["updated_at"] >= stale_before:
+                result.append(worker_sessions)
+                continue
+            # 終了処理をせずに停止したワーカーの一覧は削除する
+            try:
+                await self._store.hdel(WORKERS_KEY, worker_id)
+            except SharedStoreError:
+                pass
+        return result
+
+    async def _save_resume_owner(self, resume_token: str) -> None:
+        owner = ResumeOwner(
+            worker_id=self._worker_id, host=self._host, address=self.internal_address
+        )
+        try:
+            # 終了処理をせずに停止したワーカーのトークンは、更新が途絶えたら期限切れで削除される
+            await self._store.set(
+                RESUME_OWNER_KEY_PREFIX + resume_token,
+                json.dumps(owner),
+                ttl_seconds=self._heartbeat_interval_seconds * STALE_HEARTBEATS,
+            )
+        except SharedStoreError as e:
+            app_logger.logger.warning(f"再開トークンの保存に失敗しました: {e}")
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await self.publish()
+            for resume_token in list(self._resume_tokens):
+                await self._save_resume_owner(resume_token)
+            await asyncio.sleep(self._heartbeat_interval_seconds)
+
+
+# main.py の lifespan で共有ストアへの公開を開始・終了する
+session_registry = SessionRegistry(shared_store)
@@ -0,0 +1,214 @@
+import asyncio
+import base64
+import os
+import time
+from collections.abc import Awaitable, Callable
+from typing import TypedDict
+
+from fastapi import WebSocketDisconnect
+
+from domain.audio_encoder import WAV_MIME_TYPE, AudioEncoder
+from domain.sentence_segmenter import (
+    DEFAULT_MAX_SEGMENT_LENGTH,
+    DEFAULT_MIN_SEGMENT_LENGTH,
+    SentenceSegmenter,
+)
+from infrastructure.nijivoice_tts_client import (
+    NijivoiceTtsClient,
+    TtsDeadlineExceeded,
+    TtsError,
+)
+from log.logger import AppLogger
+from log.metrics import metrics_registry
+
+app_logger = AppLogger()
+
+# ターンの最初の文の音声合成を開始してから、そのターンの音声合成を待つ時間の上限（秒、0の場合は上限なし）
+# 超えた場合はそのターンの残りの文は音声を送信せず、テキストのみの応答にする
+TTS_TURN_DEADLINE_SECONDS = float(os.getenv("TTS_TURN_DEADLINE_SECONDS", "20"))
+
+skipped_segments_total = metrics_registry.counter(
+    "tts_skipped_segments_total",
+    "音声を送信しなかった文の数（期限切れ・音声合成の失敗別）",
+    label_name="reason",
+)
+
+
+class SynthesizedAudio(TypedDict):
+    base64_audio: str
+    mime_type: str
+
+
+class SpeechPipeline:
+    """
+    Geminiから受信したテキストを文単位で音声合成し、クライアントに順番通りに送信する。 \n
+    音声合成は文ごとに並行して実行されるが、送信は必ず元のテキストの順番になる。 \n
+    ターン終了の通知はそのターンの音声を全て送信した後に行われる。 \n
+    audio_encoder を指定した場合は、合成した音声を文ごとに圧縮してから送信する。 \n
+    ユーザーが応答に割り込んだ場合は interrupt で未送信の音声合成を全てキャンセルする。 \n
+    ターン毎に音声合成の期限を設け、期限を過ぎたらそのターンの残りの文は音声を送信しない（テキストのみの応答になる）。
+    """
+
+    def __init__(
+        self,
+        tts_client: NijivoiceTtsClient,
+        # Base64エンコードされた音声データとMIMEタイプで呼び出される
+        send_audio: Callable[[str, str], Awaitable[None]],
+        send_end_of_turn: Callable[[], Awaitable[None]],
+        min_segment_length: int = DEFAULT_MIN_SEGMENT_LENGTH,
+        max_segment_length: int = DEFAULT_MAX_SEGMENT_LENGTH,
+        on_synthesize_latency: Callable[[float], None] | None = None,
+        audio_encoder: AudioEncoder | None = None,
+        turn_deadline_seconds: float = TTS_TURN_DEADLINE_SECONDS,
+    ) -> None:
+        self._tts_client = tts_client
+        self._audio_encoder = audio_encoder
+        # 1文の音声合成が完了した時に、音声合成にかかった秒数で呼び出される
+        self._on_synthesize_latency = on_synthesize_latency
+        self._send_audio = send_audio
+        self._send_end_of_turn = send_end_of_turn
+        self._min_segment_length = min_segment_length
+        self._max_segment_length = max_segment_length
+        self._segmenter = SentenceSegmenter(min_segment_length, max_segment_length)
+        # 音声合成タスクを順番に積むキュー（Noneはターン終了の目印）
+        self._queue: asyncio.Queue[asyncio.Task[SynthesizedAudio | None] | None] = (
+            asyncio.Queue()
+        )
+        self._sender_task: asyncio.Task[None] | None = None
+        # キューに積んでから送信が完了していない項目（ターン終了の目印を含む）と、そのうちの文の数
+        self._pending_items = 0
+        self._pending_segments = 0
+        self._turn_deadline_seconds = turn_deadline_seconds
+        # 現在のターンの音声合成の期限（イベントループの時刻、ターンの最初の文で決める）
+        self._turn_deadline: float | None = None
+        # 期限を過ぎたターンは、ターン終了の目印まで音声を送信しない
+        self._text_only = False
+
+    @property
+    def responding(self) -> bool:
+        """送信が完了していない音声またはターン終了の通知があるかどうか"""
+        return self._pending_items > 0
+
+    def feed(self, text: str) -> None:
+        """受信したテキストを追加し、文が確定していれば音声合成を開始する"""
+        for segment in self._segmenter.feed(text):
+            self._enqueue(
+                asyncio.create_task(self._synthesize(segment, self._deadline()))
+            )
+
+    def end_turn(self) -> None:
+        """残りのテキストを音声合成し、全ての音声の送信後にターン終了を通知する"""
+        segment = self._segmenter.flush()
+        if segment:
+            self._enqueue(
+                asyncio.create_task(self._synthesize(segment, self._deadline()))
+            )
+        self._enqueue(None)
+        self._turn_deadline = None
+
+    async def interrupt(self) -> int:
+        """
+        未送信の音声合成と、文になる前のテキストを全て破棄し、キャンセルした文の数を返す。 \n
+        破棄したターンの終了は通知しない（次のターンは feed から続けて使える）。
+        """
+        cancelled_segments = self._pending_segments
+        self._segmenter = SentenceSegmenter(
+            self._min_segment_length, self._max_segment_length
+        )
+        await self.aclose()
+        self._turn_deadline = None
+        return cancelled_segments
+
+    async def aclose(self) -> None:
+        """実行中の音声合成と送信を全てキャンセルする"""
+        tasks: list[asyncio.Task[None] | asyncio.Task[SynthesizedAudio | None]] = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                tasks.append(item)
+        if self._sender_task is not None:
+            tasks.append(self._sender_task)
+            self._sender_task = None
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._pending_items = 0
+        self._pending_segments = 0
+        self._text_only = False
+
+    def _deadline(self) -> float | None:
+        if self._turn_deadline_seconds <= 0:
+            return None
+        if self._turn_deadline is None:
+            self._turn_deadline = (
+                asyncio.get_running_loop().time() + self._turn_deadline_seconds
+            )
+        return self._turn_deadline
+
+    async def _synthesize(
+        self, segment: str, deadline: float | None
+    ) -> SynthesizedAudio | None:
+        started_at = time.perf_counter()
+        base64_audio = await self._tts_client.synthesize(segment, deadline)
+        if self._on_synthesize_latency is not None:
+            self._on_synthesize_latency(time.perf_counter() - started_at)
+        if base64_audio is None:
+            return None
+        if self._audio_encoder is None:
+            return SynthesizedAudio(base64_audio=base64_audio, mime_type=WAV_MIME_TYPE)
+
+        encoded = await self._audio_encoder.encode(base64.b64decode(base64_audio))
+        return SynthesizedAudio(
+            base64_audio=base64.b64encode(encoded["data"]).decode("utf-8"),
+            mime_type=encoded["mime_type"],
+        )
+
+    def _enqueue(self, item: asyncio.Task[SynthesizedAudio | None] | None) -> None:
+        self._queue.put_nowait(item)
+        self._pending_items += 1
+        if item is not None:
+            self._pending_segments += 1
+        if self._sender_task is None:
+            self._sender_task = asyncio.create_task(self._send_in_order())
+
+    async def _send_in_order(self) -> None:
+        while True:
+            item = await self._queue.get()
+
+            try:
+                if item is None:
+                    self._text_only = False
+                    await self._send_end_of_turn()
+                    continue
+
+                if self._text_only:
+                    item.cancel()
+                    skipped_segments_total.inc("deadline")
+                    continue
+
+                audio = await item
+                if audio is not None:
+                    await self._send_audio(audio["base64_audio"], audio["mime_type"])
+            except TtsDeadlineExceeded as e:
+                app_logger.logger.warning(
+                    f"{e}。このターンの残りの文は音声を送信しません"
+                )
+                skipped_segments_total.inc("deadline")
+                self._text_only = True
+            except TtsError as e:
+                # 合成に失敗した文は音声無しで続行する
+                app_logger.logger.error(f"音声合成に失敗しました: {e}")
+                skipped_segments_total.inc("error")
+            except ValueError as e:
+                # 音声合成の音声データが壊れている文は音声無しで続行する
+                app_logger.logger.error(f"音声データを変換できませんでした: {e}")
+                skipped_segments_total.inc("error")
+            except (WebSocketDisconnect, OSError, RuntimeError) as e:
+                app_logger.logger.error(
+                    f"音声データの送信中にエラーが発生しました: {e}"
+                )
+            finally:
+                self._pending_items -= 1
+                if item is not None:
+                    self._pending_segments -= 1
@@ -0,0 +1,93 @@
+import asyncio
+import time
+from collections.abc import Awaitable, Callable, Mapping
+from typing import TypedDict
+
+from log.logger import AppLogger
+
+app_logger = AppLogger()
+
+
+class WarmupStepReport(TypedDict):
+    name: str
+    done: bool
+    # 完了までに掛かった時間（秒）
+    seconds: float | None
+    error: str | None
+
+
+class ReadinessReport(TypedDict):
+    ready: bool
+    draining: bool
+    # 起動（lifespan の開始）からの経過時間（秒）
+    uptime_seconds: float
+    steps: list[WarmupStepReport]
+
+
+class StartupWarmup:
+    """
+    起動時に時間の掛かる初期化（SDKのimport、クライアントの作成等）を lifespan の中で並行に裏で実行する。 \n
+    lifespan は完了を待たないので、初期化の間も接続を受け付ける（初期化が必要な処理は各自で完了を待つ）。 \n
+    全ての初期化が成功したら ready になる。
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter) -> None:
+        self._clock = clock
+        self._started_at = clock()
+        self._steps: dict[str, WarmupStepReport] = {}
+        self._tasks: list[asyncio.Task[None]] = []
+
+    @property
+    def ready(self) -> bool:
+        return bool(self._steps) and all(
+            step["done"] and step["error"] is None for step in self._steps.values()
+        )
+
+    @property
+    def steps(self) -> list[WarmupStepReport]:
+        return [step.copy() for step in self._steps.values()]
+
+    def start(self, steps: Mapping[str, Callable[[], Awaitable[object]]]) -> None:
+        self._started_at = self._clock()
+        for name, step in steps.items():
+            self._steps[name] = WarmupStepReport(
+                name=name, done=False, seconds=None, error=None
+            )
+            self._tasks.append(asyncio.create_task(self._run(name, step)))
+
+    async def wait(self) -> None:
+        """全ての初期化が終わる（失敗した場合も含む）まで待つ"""
+        await asyncio.gather(*self._tasks)
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def report(self, draining: bool) -> ReadinessReport:
+        return ReadinessReport(
+            ready=self.ready and not draining,
+            draining=draining,
+            uptime_seconds=self._clock() - self._started_at,
+            steps=self.steps,
+        )
+
+    async def _run(self, name: str, step: Callable[[], Awaitable[object]]) -> None:
+        report = self._steps[name]
+        try:
+            await step()
+        except (ImportError, OSError, ValueError) as e:
+            # PyAV（FFmpeg）の読み込み失敗と、APIキーの設定漏れや接続の失敗は準備未完了として報告する
+            app_logger.logger.error(f"起動時の初期化に失敗しました: {name}: {e}")
+            report["error"] = repr(e)
+        report["done"] = True
+        report["seconds"] = self._clock() - self._started_at
+        if self.ready:
+            app_logger.logger.info(
+                f"起動時の初期化が完了しました ({report['seconds']:.3f}秒)"
+            )
+
+
+# main.py の lifespan で開始し、/ready で状態を返す
+startup_warmup = StartupWarmup()
@@ -0,0 +1,144 @@
+import asyncio
+import time
+import uuid
+from collections.abc import Callable, Iterable
+from typing import TYPE_CHECKING, TypedDict
+
+from domain.tool_registry import ToolError, ToolRegistry, ToolResponse
+from infrastructure.gemini_client import LIVE_API_ERRORS
+from log.logger import AppLogger
+from presentation.media_sender import LiveSession
+
+if TYPE_CHECKING:
+    from google.genai import types
+
+app_logger = AppLogger()
+
+
+class FunctionResponse(TypedDict):
+    id: str
+    name: str
+    response: ToolResponse
+
+
+class ToolCallDispatcherStats(TypedDict):
+    in_flight: int
+    calls: int
+    failures: int
+    cancelled: int
+    batches_sent: int
+
+
+class ToolCallDispatcher:
+    """
+    Geminiからの関数呼び出しを受信ループとは別タスクで実行する。 \n
+    1つの tool_call に含まれる関数は並行に実行し、全ての結果を1回の tool_response にまとめて返す。 \n
+    tool_call_cancellation で通知されたIDの関数は実行中のタスクをキャンセルし、結果を返さない。
+    """
+
+    def __init__(
+        self,
+        registry: ToolRegistry,
+        session: LiveSession,
+        on_call_complete: Callable[[float, bool], None] | None = None,
+    ) -> None:
+        self._registry = registry
+        self._session = session
+        # 関数呼び出しの完了時に (実行にかかった秒数, 成功したかどうか) で呼び出される
+        self._on_call_complete = on_call_complete
+        self._calls: dict[str, asyncio.Task[FunctionResponse]] = {}
+        self._batches: set[asyncio.Task[None]] = set()
+        self._stats = ToolCallDispatcherStats(
+            in_flight=0,
+            calls=0,
+            failures=0,
+            cancelled=0,
+            batches_sent=0,
+        )
+
+    @property
+    def stats(self) -> ToolCallDispatcherStats:
+        stats = self._stats.copy()
+        stats["in_flight"] = len(self._calls)
+        return stats
+
+    def dispatch(self, function_calls: Iterable["types.FunctionCall"]) -> None:
+        """関数呼び出しを開始する（完了を待たずに戻る）"""
+        # IDが無い関数呼び出しは互いに上書きしないよう一意なキーで管理する（応答には元のIDを返す）
+        calls = [
+            (
+                function_call.id or uuid.uuid4().hex,
+                asyncio.create_task(self._call(function_call)),
+            )
+            for function_call in function_calls
+        ]
+        self._calls.update(calls)
+
+        batch = asyncio.create_task(self._send_batch(calls))
+        self._batches.add(batch)
+        batch.add_done_callback(self._batches.discard)
+
+    def cancel(self, ids: Iterable[str]) -> None:
+        """キャンセルされた関数呼び出しのタスクをキャンセルする"""
+        for call_id in ids:
+            task = self._calls.get(call_id)
+            if task is not None and not task.done():
+                task.cancel()
+                self._stats["cancelled"] += 1
+            app_logger.logger.info(f"Function call with ID {call_id} was cancelled.")
+
+    async def aclose(self) -> None:
+        """実行中の関数呼び出しを全てキャンセルする"""
+        tasks = [*self._calls.values(), *self._batches]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _call(self, function_call: "types.FunctionCall") -> FunctionResponse:
+        call_id = function_call.id or ""
+        name = function_call.name or ""
+        self._stats["calls"] += 1
+        started_at = time.perf_counter()
+        try:
+            response = await self._registry.call(name, function_call.args)
+        except ToolError as e:
+            self._stats["failures"] += 1
+            cause = f" ({e.__cause__!r})" if e.__cause__ is not None else ""
+            app_logger.logger.error(
+                f"Function call ID is {call_id} {name} failed: {e}{cause}"
+            )
+            response = {"error": str(e)}
+        else:
+            app_logger.logger.info(
+                f"Function call ID is {call_id} Call Functions is '{name}' result is {response}."
+            )
+
+        if self._on_call_complete is not None:
+            self._on_call_complete(
+                time.perf_counter() - started_at, "error" not in response
+            )
+        return FunctionResponse(id=call_id, name=name, response=response)
+
+    async def _send_batch(
+        self, calls: list[tuple[str, asyncio.Task[FunctionResponse]]]
+    ) -> None:
+        try:
+            results = await asyncio.gather(
+                *(task for _, task in calls), return_exceptions=True
+            )
+        finally:
+            for call_id, _ in calls:
+                self._calls.pop(call_id, None)
+
+        # キャンセルされた関数呼び出しの結果はモデルに返さない
+        responses = [r for r in results if not isinstance(r, BaseException)]
+        if not responses:
+            return
+
+        try:
+            await self._session.send(input=responses)
+        except LIVE_API_ERRORS as e:
+            app_logger.logger.error(f"関数呼び出しの結果の送信に失敗しました: {e}")
+            return
+
+        self._stats["batches_sent"] += 1
@@ -0,0 +1,91 @@
+from collections.abc import Awaitable, Callable
+from typing import Literal, TypedDict
+
+from log.logger import AppLogger
+from presentation.speech_pipeline import SpeechPipeline
+
+app_logger = AppLogger()
+
+# 割り込みのきっかけ
+# client: クライアントからの interrupt メッセージ、speech: ユーザーの発話の開始、
+# text: 応答中のテキスト入力、gemini: Geminiからの interrupted
+InterruptSource = Literal["client", "speech", "text", "gemini"]
+
+
+class TurnInterrupterStats(TypedDict):
+    interruptions: int
+    cancelled_segments: int
+    discarded_parts: int
+
+
+class TurnInterrupter:
+    """
+    応答中のターンへのユーザーの割り込み（バージイン）を扱う。 \n
+    割り込まれたら未送信の音声合成をキャンセルし、クライアントに再生の停止を通知する。 \n
+    Geminiが割り込まれたターンの応答を続けている場合は、turn_complete か interrupted を受信するまでその応答を破棄する。
+    """
+
+    def __init__(
+        self,
+        speech_pipeline: SpeechPipeline,
+        send_interrupted: Callable[[], Awaitable[None]],
+        on_interrupt: Callable[[InterruptSource], None] | None = None,
+    ) -> None:
+        self._speech_pipeline = speech_pipeline
+        self._send_interrupted = send_interrupted
+        # 割り込みでターンを中断した時に、割り込みのきっかけで呼び出される
+        self._on_interrupt = on_interrupt
+        # Geminiがターンの応答を送信中かどうか（最初のpartから turn_complete まで）
+        self._generating = False
+        # 割り込まれたターンの残りの応答を破棄するかどうか
+        self._discarding = False
+        self._stats = TurnInterrupterStats(
+            interruptions=0,
+            cancelled_segments=0,
+            discarded_parts=0,
+        )
+
+    @property
+    def stats(self) -> TurnInterrupterStats:
+        return self._stats.copy()
+
+    @property
+    def responding(self) -> bool:
+        """Geminiの応答の受信中か、クライアントへの音声の送信が残っているかどうか"""
+        return self._generating or self._speech_pipeline.responding
+
+    def receive_part(self) -> bool:
+        """Geminiの応答のpartを受信した時に呼び出し、クライアントに送信して良いかどうかを返す"""
+        if self._discarding:
+            self._stats["discarded_parts"] += 1
+            return False
+        self._generating = True
+        return True
+
+    def complete_turn(self) -> bool:
+        """Geminiから turn_complete を受信した時に呼び出し、ターン終了の処理をして良いかどうかを返す"""
+        discarded = self._discarding
+        self._generating = False
+        self._discarding = False
+        return not discarded
+
+    async def interrupt(self, source: InterruptSource) -> bool:
+        """応答中のターンを中断する。中断する応答が無かった場合は False を返す"""
+        responding = self.responding
+        if source == "gemini":
+            # Geminiが生成を止めたので、以降に受信する応答は次のターンのもの
+            self._discarding = False
+        elif self._generating:
+            self._discarding = True
+        self._generating = False
+        if not responding:
+            return False
+
+        self._stats["interruptions"] += 1
+        self._stats["cancelled_segments"] += await self._speech_pipeline.interrupt()
+        app_logger.logger.info(f"応答中のターンを中断しました (きっかけ: {source})")
+
+        await self._send_interrupted()
+        if self._on_interrupt is not None:
+            self._on_interrupt(source)
+        return True
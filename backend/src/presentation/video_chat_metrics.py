@@ -0,0 +1,197 @@
+import json
+import os
+import random
+import time
+from collections.abc import Callable
+from typing import TypedDict
+
+from domain.audio_encoder import EncodedAudio
+from log.logger import AppLogger
+from log.metrics import metrics_registry
+from presentation.media_sender import MediaSender
+from presentation.tool_call_dispatcher import ToolCallDispatcher
+
+app_logger = AppLogger()
+
+# ターン毎の全てのスパンをログに出力する割合（0の場合は出力しない、1の場合は全てのターン）
+TRACE_SAMPLE_RATE = float(os.getenv("METRICS_TRACE_SAMPLE_RATE", "0"))
+
+span_seconds = metrics_registry.histogram(
+    "video_chat_span_seconds",
+    "ビデオチャットの処理毎の所要時間（秒）",
+    label_name="span",
+)
+tool_calls_total = metrics_registry.counter(
+    "video_chat_tool_calls_total",
+    "Geminiからの関数呼び出しの件数",
+    label_name="result",
+)
+interruptions_total = metrics_registry.counter(
+    "video_chat_interruptions_total",
+    "ユーザーが応答中のターンに割り込んだ件数（割り込みのきっかけ別）",
+    label_name="source",
+)
+# コーデック毎の「音声1秒あたりのバイト数」は bytes_total / seconds_total で求める
+audio_egress_bytes_total = metrics_registry.counter(
+    "video_chat_audio_egress_bytes_total",
+    "クライアントに送信した音声合成の音声データのサイズ（バイト、Base64エンコード前）",
+    label_name="codec",
+)
+audio_egress_seconds_total = metrics_registry.counter(
+    "video_chat_audio_egress_seconds_total",
+    "クライアントに送信した音声合成の音声の長さ（秒）",
+    label_name="codec",
+)
+audio_encode_cpu_seconds_total = metrics_registry.counter(
+    "video_chat_audio_encode_cpu_seconds_total",
+    "音声合成の音声の圧縮に使ったCPU時間（秒）",
+    label_name="codec",
+)
+active_sessions = metrics_registry.gauge(
+    "video_chat_active_sessions",
+    "接続中のビデオチャットのセッション数",
+)
+
+_open_sessions: set["SessionMetrics"] = set()
+
+
+def _sum_open_sessions(value: Callable[["SessionMetrics"], int]) -> float:
+    return float(sum(value(session) for session in _open_sessions))
+
+
+metrics_registry.gauge(
+    "video_chat_queued_bytes",
+    "Geminiへの送信待ちのメディアデータのサイズ（全セッション合計）",
+    lambda: _sum_open_sessions(lambda s: s.queued_bytes),
+)
+metrics_registry.gauge(
+    "video_chat_tool_calls_in_flight",
+    "実行中の関数呼び出しの数（全セッション合計）",
+    lambda: _sum_open_sessions(lambda s: s.tool_calls_in_flight),
+)
+
+
+class TraceSpan(TypedDict):
+    span: str
+    start_ms: float
+    duration_ms: float
+
+
+class SessionMetrics:
+    """
+    1つのビデオチャットのセッションの処理時間を計測し、プロセス全体のヒストグラムに集計する。 \n
+    ターンの開始はユーザーの発話終了（またはテキスト入力）、終了はクライアントへの endOfTurn の送信とする。 \n
+    サンプリングされたターンは全てのスパンを1行のログに出力する。
+    """
+
+    def __init__(
+        self,
+        trace_sample_rate: float = TRACE_SAMPLE_RATE,
+        clock: Callable[[], float] = time.perf_counter,
+        on_first_token: Callable[[float], None] | None = None,
+    ) -> None:
+        self._trace_sample_rate = trace_sample_rate
+        self._clock = clock
+        # ターンの最初の応答までの時間を計測する度に呼び出される
+        self._on_first_token = on_first_token
+        self._media_sender: MediaSender | None = None
+        self._tool_call_dispatcher: ToolCallDispatcher | None = None
+        # ユーザーの入力が完了した時刻（最初の応答を受信するまでの時間の計測に使う）
+        self._turn_started_at: float | None = None
+        self._first_token_received = False
+        self._turn_completed_at: float | None = None
+        self._trace: list[TraceSpan] | None = None
+        self._trace_started_at = 0.0
+
+    def open(self) -> None:
+        _open_sessions.add(self)
+        active_sessions.inc()
+
+    def close(self) -> None:
+        if self in _open_sessions:
+            _open_sessions.discard(self)
+            active_sessions.dec()
+
+    def watch(
+        self, media_sender: MediaSender, tool_call_dispatcher: ToolCallDispatcher
+    ) -> None:
+        """送信待ちのサイズと実行中の関数呼び出しの数をゲージに含める"""
+        self._media_sender = media_sender
+        self._tool_call_dispatcher = tool_call_dispatcher
+
+    @property
+    def queued_bytes(self) -> int:
+        return self._media_sender.stats["buffered_bytes"] if self._media_sender else 0
+
+    @property
+    def tool_calls_in_flight(self) -> int:
+        dispatcher = self._tool_call_dispatcher
+        return dispatcher.stats["in_flight"] if dispatcher else 0
+
+    def observe(self, span: str, seconds: float) -> None:
+        span_seconds.observe(span, seconds)
+        if self._trace is not None:
+            now = self._clock()
+            self._trace.append(
+                TraceSpan(
+                    span=span,
+                    start_ms=round((now - seconds - self._trace_started_at) * 1000, 2),
+                    duration_ms=round(seconds * 1000, 2),
+                )
+            )
+
+    def observe_tool_call(self, seconds: float, succeeded: bool) -> None:
+        tool_calls_total.inc("ok" if succeeded else "error")
+        self.observe("tool_call", seconds)
+
+    def observe_audio_egress(self, encoded: EncodedAudio) -> None:
+        """クライアントに送信する音声合成の音声を圧縮した時に呼び出す（圧縮しない場合も含む）"""
+        audio_egress_bytes_total.inc(encoded["codec"], len(encoded["data"]))
+        audio_egress_seconds_total.inc(encoded["codec"], encoded["duration_seconds"])
+        audio_encode_cpu_seconds_total.inc(encoded["codec"], encoded["cpu_seconds"])
+
+    def start_turn(self) -> None:
+        """ユーザーの入力が完了した時に呼び出す"""
+        now = self._clock()
+        self._turn_started_at = now
+        self._first_token_received = False
+        if self._trace is None and random.random() < self._trace_sample_rate:
+            self._trace = []
+            self._trace_started_at = now
+
+    def receive_part(self) -> None:
+        """Geminiの応答を受信する度に呼び出す（ターンの最初の応答までの時間を計測する）"""
+        if self._turn_started_at is None or self._first_token_received:
+            return
+        self._first_token_received = True
+        seconds = self._clock() - self._turn_started_at
+        self.observe("time_to_first_token", seconds)
+        if self._on_first_token is not None:
+            self._on_first_token(seconds)
+
+    def complete_turn(self) -> None:
+        """Geminiから turn_complete を受信した時に呼び出す"""
+        self._turn_completed_at = self._clock()
+
+    def interrupt_turn(self, source: str) -> None:
+        """ユーザーが応答中のターンに割り込んだ時に呼び出す（中断したターンの所要時間は集計しない）"""
+        interruptions_total.inc(source)
+        self._turn_started_at = None
+        self._turn_completed_at = None
+        self._trace = None
+
+    def end_turn(self) -> None:
+        """クライアントに endOfTurn を送信した時に呼び出す"""
+        now = self._clock()
+        if self._turn_completed_at is not None:
+            self.observe("end_of_turn", now - self._turn_completed_at)
+            self._turn_completed_at = None
+        if self._turn_started_at is not None:
+            self.observe("turn", now - self._turn_started_at)
+            self._turn_started_at = None
+
+        if self._trace is not None:
+            app_logger.logger.info(
+                "ターンのトレース: %s", json.dumps(self._trace, ensure_ascii=False)
+            )
+            self._trace = None
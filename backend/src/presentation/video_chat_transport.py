@@ -0,0 +1,222 @@
+import base64
+import json
+from typing import Any, Literal, TypedDict, final
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from log.logger import AppLogger
+from presentation.rate_limiter import InboundRateLimiter, InboundRateLimitExceeded
+from presentation.websocket_frame import (
+    BINARY_SUBPROTOCOL,
+    BinaryFrame,
+    FrameKind,
+    InvalidFrameError,
+    current_timestamp_ms,
+    decode_frame,
+    encode_frame,
+)
+
+app_logger = AppLogger()
+
+TransportProtocol = Literal["json", "binary"]
+
+
+@final
+class MediaChunk(TypedDict):
+    mime_type: str
+    data: bytes
+
+
+class ClientMessage(TypedDict, total=False):
+    input_text: str
+    media_chunks: list[MediaChunk]
+    # クライアントが受信済みのメッセージの連番（再接続時の再送範囲の確認用）
+    ack: int
+    # 応答中のターンの中断の要求（ユーザーが停止ボタンを押した場合など）
+    interrupt: bool
+
+
+class VideoChatTransport:
+    """
+    VideoChatのWebSocketでクライアントとメッセージをやり取りする。 \n
+    json: 全てのメッセージをJSONのテキストフレームでやり取りする（音声・画像はBase64エンコード） \n
+    binary: 音声・画像はヘッダー付きのバイナリフレームでやり取りし、それ以外はJSONのテキストフレームを使う \n
+    sequence を指定した場合は、JSONは "seq" に、バイナリフレームはヘッダーの sequence に設定する。 \n
+    inbound_limiter を指定した場合は、受信の上限を超えると InboundRateLimitExceeded を送出する。
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        protocol: TransportProtocol,
+        inbound_limiter: InboundRateLimiter | None = None,
+    ) -> None:
+        self._websocket = websocket
+        self._protocol = protocol
+        self._inbound_limiter = inbound_limiter
+        self._send_sequence = 0
+
+    @property
+    def protocol(self) -> TransportProtocol:
+        return self._protocol
+
+    async def receive(self) -> ClientMessage:
+        """クライアントからのメッセージを1件受信する。切断された場合は WebSocketDisconnect を送出する"""
+        message = await self._websocket.receive()
+
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(
+                code=message.get("code", 1000), reason=message.get("reason")
+            )
+
+        if self._inbound_limiter is not None:
+            size = len(message.get("bytes") or b"") + len(message.get("text") or "")
+            limit = self._inbound_limiter.exceeded(size)
+            if limit is not None:
+                raise InboundRateLimitExceeded(limit)
+
+        if message.get("bytes") is not None:
+            return self._parse_binary_message(message["bytes"])
+
+        if message.get("text") is not None:
+            return self._parse_json_message(message["text"])
+
+        return ClientMessage()
+
+    async def send_text(self, text: str, sequence: int | None = None) -> None:
+        await self._send_json({"text": text}, sequence)
+
+    async def send_end_of_turn(self, sequence: int | None = None) -> None:
+        await self._send_json({"endOfTurn": True}, sequence)
+
+    async def send_interrupted(self, sequence: int | None = None) -> None:
+        """応答中のターンを中断したので、再生中・再生待ちの音声を止めるようにクライアントに通知する"""
+        await self._send_json({"interrupted": True}, sequence)
+
+    async def send_audio(
+        self, audio: bytes, mime_type: str = "audio/wav", sequence: int | None = None
+    ) -> None:
+        if self._protocol == "binary":
+            await self._send_audio_frame(audio, mime_type, sequence)
+            return
+
+        base64_audio = base64.b64encode(audio).decode("utf-8")
+        await self._send_json(audio_message(base64_audio, mime_type), sequence)
+
+    async def send_base64_audio(
+        self,
+        base64_audio: str,
+        mime_type: str = "audio/wav",
+        sequence: int | None = None,
+    ) -> None:
+        """Base64エンコード済みの音声データを送信する（JSONの場合は再エンコードせずにそのまま送信する）"""
+        if self._protocol == "binary":
+            await self._send_audio_frame(
+                base64.b64decode(base64_audio), mime_type, sequence
+            )
+            return
+
+        await self._send_json(audio_message(base64_audio, mime_type), sequence)
+
+    async def send_session(
+        self, resume_token: str, resumed: bool, missed_messages: int = 0
+    ) -> None:
+        """接続時にセッションの再開トークンと、再開できたかどうかを送信する（連番は振らない）"""
+        await self._send_json(
+            {
+                "session": {
+                    "resumeToken": resume_token,
+                    "resumed": resumed,
+                    "missedMessages": missed_messages,
+                }
+            },
+            None,
+        )
+
+    async def close(self, code: int) -> None:
+        await self._websocket.close(code=code)
+
+    async def _send_json(self, message: dict[str, Any], sequence: int | None) -> None:
+        if sequence is not None:
+            message["seq"] = sequence
+        await self._websocket.send_text(json.dumps(message))
+
+    async def _send_audio_frame(
+        self, audio: bytes, mime_type: str, sequence: int | None
+    ) -> None:
+        if sequence is None:
+            self._send_sequence += 1
+            sequence = self._send_sequence
+        frame = encode_frame(
+            BinaryFrame(
+                kind=FrameKind.AUDIO,
+                # "audio/pcm;rate=24000" のようなパラメータはヘッダーに含めない
+                mime_type=mime_type.split(";")[0],
+                sequence=sequence,
+                timestamp_ms=current_timestamp_ms(),
+                payload=audio,
+            )
+        )
+        await self._websocket.send_bytes(frame)
+
+    def _parse_json_message(self, text: str) -> ClientMessage:
+        data = json.loads(text)
+        client_message = ClientMessage()
+
+        if "inputText" in data:
+            client_message["input_text"] = data["inputText"]
+
+        if "ack" in data:
+            client_message["ack"] = int(data["ack"])
+
+        if data.get("interrupt") is True:
+            client_message["interrupt"] = True
+
+        if "realtimeInput" in data:
+            client_message["media_chunks"] = [
+                MediaChunk(
+                    mime_type=chunk["mimeType"],
+                    data=base64.b64decode(chunk["data"]),
+                )
+                for chunk in data["realtimeInput"]["mediaChunks"]
+            ]
+
+        return client_message
+
+    def _parse_binary_message(self, data: bytes) -> ClientMessage:
+        try:
+            frame = decode_frame(data)
+        except InvalidFrameError as e:
+            app_logger.logger.warning(f"不正なバイナリフレームを受信しました: {e}")
+            return ClientMessage()
+
+        if frame["kind"] != FrameKind.MEDIA_CHUNK:
+            app_logger.logger.warning(
+                f"未対応のバイナリフレームを受信しました: {frame['kind']}"
+            )
+            return ClientMessage()
+
+        return ClientMessage(
+            media_chunks=[
+                MediaChunk(mime_type=frame["mime_type"], data=frame["payload"])
+            ]
+        )
+
+
+def audio_message(base64_audio: str, mime_type: str) -> dict[str, Any]:
+    """音声データのJSONのメッセージ（WAV以外の場合は、クライアントがデコード方法を選べるようにMIMEタイプを含める）"""
+    if mime_type == "audio/wav":
+        return {"audio": base64_audio}
+    return {"audio": base64_audio, "mimeType": mime_type}
+
+
+async def accept_video_chat_transport(
+    websocket: WebSocket, inbound_limiter: InboundRateLimiter | None = None
+) -> VideoChatTransport:
+    """クライアントが要求したサブプロトコルに応じてWebSocket接続を受け入れる"""
+    if BINARY_SUBPROTOCOL in websocket.scope.get("subprotocols", []):
+        await websocket.accept(subprotocol=BINARY_SUBPROTOCOL)
+        return VideoChatTransport(websocket, "binary", inbound_limiter)
+
+    await websocket.accept()
+    return VideoChatTransport(websocket, "json", inbound_limiter)
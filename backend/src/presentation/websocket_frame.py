@@ -0,0 +1,96 @@
+import struct
+import time
+from enum import IntEnum
+from typing import TypedDict
+
+# バイナリフレームでやり取りする場合にクライアントが Sec-WebSocket-Protocol で指定するサブプロトコル
+BINARY_SUBPROTOCOL = "realtime-api.binary.v1"
+
+PROTOCOL_VERSION = 1
+
+# ヘッダーのレイアウト（ネットワークバイトオーダー、16バイト）
+# version: uint8, kind: uint8, mime: uint8, reserved: 1byte, sequence: uint32, timestamp_ms: uint64
+HEADER = struct.Struct("!BBBxIQ")
+
+
+class FrameKind(IntEnum):
+    # クライアントからサーバーへのメディアデータ（音声・画像）
+    MEDIA_CHUNK = 1
+    # サーバーからクライアントへの音声データ
+    AUDIO = 2
+
+
+class MimeType(IntEnum):
+    AUDIO_PCM = 1
+    IMAGE_JPEG = 2
+    AUDIO_WAV = 3
+    # 圧縮した音声合成の音声データ（?audioCodec=opus / aac を指定した場合）
+    AUDIO_OGG = 4
+    AUDIO_AAC = 5
+
+
+MIME_TYPE_NAMES: dict[MimeType, str] = {
+    MimeType.AUDIO_PCM: "audio/pcm",
+    MimeType.IMAGE_JPEG: "image/jpeg",
+    MimeType.AUDIO_WAV: "audio/wav",
+    MimeType.AUDIO_OGG: "audio/ogg",
+    MimeType.AUDIO_AAC: "audio/aac",
+}
+
+MIME_TYPE_CODES: dict[str, MimeType] = {
+    name: code for code, name in MIME_TYPE_NAMES.items()
+}
+
+
+class BinaryFrame(TypedDict):
+    kind: FrameKind
+    mime_type: str
+    sequence: int
+    timestamp_ms: int
+    payload: bytes
+
+
+class InvalidFrameError(ValueError):
+    """バイナリフレームの形式が不正な場合の例外"""
+
+
+def current_timestamp_ms() -> int:
+    return time.time_ns() // 1_000_000
+
+
+def encode_frame(frame: BinaryFrame) -> bytes:
+    mime_code = MIME_TYPE_CODES.get(frame["mime_type"])
+    if mime_code is None:
+        raise InvalidFrameError(f"未対応のMIMEタイプです: {frame['mime_type']}")
+
+    header = HEADER.pack(
+        PROTOCOL_VERSION,
+        frame["kind"],
+        mime_code,
+        frame["sequence"] & 0xFFFFFFFF,
+        frame["timestamp_ms"],
+    )
+    return header + frame["payload"]
+
+
+def decode_frame(data: bytes) -> BinaryFrame:
+    if len(data) < HEADER.size:
+        raise InvalidFrameError("フレームのサイズがヘッダーより小さいです")
+
+    version, kind, mime_code, sequence, timestamp_ms = HEADER.unpack_from(data)
+    if version != PROTOCOL_VERSION:
+        raise InvalidFrameError(f"未対応のプロトコルバージョンです: {version}")
+
+    try:
+        frame_kind = FrameKind(kind)
+        mime_type = MIME_TYPE_NAMES[MimeType(mime_code)]
+    except ValueError as e:
+        raise InvalidFrameError(f"未対応のフレームです: {e}") from e
+
+    return BinaryFrame(
+        kind=frame_kind,
+        mime_type=mime_type,
+        sequence=sequence,
+        timestamp_ms=timestamp_ms,
+        payload=data[HEADER.size :],
+    )
@@ -0,0 +1,190 @@
+"""
+本番環境用のエントリーポイント。 \n
+WEB_CONCURRENCY の数のワーカープロセスで同じポートを待ち受け、全てのCPUコアでWebSocketのセッションを処理する。 \n
+セッション（会話の状態とGeminiとの接続）は接続を受け付けたワーカーのメモリにあり、切断されるまで同じワーカーが処理する。 \n
+再開トークンを指定して別のワーカーに再接続された場合は、ワーカー毎のUnixドメインソケットを通じてセッションを持っているワーカーに中継する。 \n
+停止時は新しい接続の受付を止め、会話中のセッションがターンの区切りで終了するのを待ってから停止する。 \n
+
+実行方法: python server.py
+"""
+
+import contextlib
+import multiprocessing
+import os
+import signal
+import socket
+import tempfile
+import threading
+import time
+from multiprocessing.context import SpawnProcess
+from types import FrameType
+
+import uvicorn
+
+from log.logger import AppLogger
+from presentation.session_registry import session_registry
+
+app_logger = AppLogger()
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "5000"))
+
+# ワーカープロセスの数（未指定の場合はこのプロセスが使えるCPUコアの数）
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", os.process_cpu_count() or 1))
+
+# 停止時に会話中のセッションの終了を待つ時間の上限（秒）
+# コンテナの停止猶予（docker stop -t、terminationGracePeriodSeconds、fly.toml の kill_timeout）は
+# これと WORKER_SHUTDOWN_GRACE_SECONDS の合計より長くする（fly.toml は kill_timeout = 35 に合わせて20秒を指定している）
+SHUTDOWN_DRAIN_TIMEOUT_SECONDS = float(
+    os.getenv("SHUTDOWN_DRAIN_TIMEOUT_SECONDS", "20")
+)
+# セッションの終了を待った後、ワーカーの終了処理（lifespan）を待つ時間（秒）
+WORKER_SHUTDOWN_GRACE_SECONDS = 10.0
+# ワーカーの死活を確認する間隔（秒）
+WORKER_CHECK_INTERVAL_SECONDS = 0.5
+
+# 別のワーカーが再開の接続を中継する為の、ワーカー毎のUnixドメインソケットを作成するディレクトリ
+WORKER_SOCKET_DIR = os.getenv("WORKER_SOCKET_DIR", tempfile.gettempdir())
+
+# ワーカーは spawn で起動し、待ち受けるソケットは引数で子プロセスに渡す
+multiprocessing.allow_connection_pickling()
+spawn_context = multiprocessing.get_context("spawn")
+
+
+class DrainingServer(uvicorn.Server):
+    """
+    停止時に会話中のセッションがターンの区切りで終了するのを待つ uvicorn.Server。 \n
+    uvicornの停止処理は接続中のWebSocketを全て即座に切断するので、その前に新しい接続の受付だけを止めて待つ。
+    """
+
+    def __init__(
+        self,
+        config: uvicorn.Config,
+        drain_timeout_seconds: float = SHUTDOWN_DRAIN_TIMEOUT_SECONDS,
+    ) -> None:
+        super().__init__(config)
+        self.drain_timeout_seconds = drain_timeout_seconds
+
+    async def shutdown(self, sockets: list[socket.socket] | None = None) -> None:
+        for server in self.servers:
+            server.close()
+
+        # 2回目の Ctrl+C（force_exit）の場合は待たずに停止する
+        await session_registry.drain(
+            self.drain_timeout_seconds, should_abort=lambda: self.force_exit
+        )
+        await super().shutdown(sockets)
+
+
+def bind_worker_socket(directory: str = WORKER_SOCKET_DIR) -> socket.socket:
+    """このワーカーだけが待ち受けるUnixドメインソケットを作成し、再開の接続の中継先として session_registry に設定する"""
+    path = os.path.join(directory, f"video-chat-worker-{os.getpid()}.sock")
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(path)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(path)
+    os.chmod(path, 0o600)
+    session_registry.internal_address = f"unix:{path}"
+    return sock
+
+
+def run_worker(
+    config: uvicorn.Config, sock: socket.socket, drain_timeout_seconds: float
+) -> None:
+    """ワーカープロセスで実行する関数。親プロセスで作成したソケットと、このワーカーのUnixドメインソケットで待ち受ける"""
+    # ログの設定は子プロセス毎に行う必要がある
+    config.configure_logging()
+    worker_sock = bind_worker_socket()
+    worker_socket_path = worker_sock.getsockname()
+    server = DrainingServer(config, drain_timeout_seconds)
+    try:
+        server.run(sockets=[sock, worker_sock])
+    except KeyboardInterrupt:
+        # 停止は親プロセスが管理しているので、スタックトレースは出力しない
+        pass
+    finally:
+        worker_sock.close()
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(worker_socket_path)
+
+
+class WorkerSupervisor:
+    """
+    ワーカープロセスを起動・監視する。 \n
+    待ち受けるソケットはこのプロセスで作成して全ワーカーで共有し、異常終了したワーカーは起動し直す。 \n
+    SIGTERM / SIGINT を受け取ると全ワーカーに SIGTERM を送り、各ワーカーのセッションの終了を待ってから停止する。
+    """
+
+    def __init__(
+        self,
+        config: uvicorn.Config,
+        workers: int,
+        drain_timeout_seconds: float = SHUTDOWN_DRAIN_TIMEOUT_SECONDS,
+    ) -> None:
+        self._config = config
+        self._workers = workers
+        self._drain_timeout_seconds = drain_timeout_seconds
+        self._should_exit = threading.Event()
+        self._processes: list[SpawnProcess] = []
+
+    def run(self) -> None:
+        sock = self._config.bind_socket()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, self._handle_exit)
+
+        self._processes = [self._spawn(sock) for _ in range(self._workers)]
+        app_logger.logger.info(f"{self._workers}個のワーカーを起動しました")
+
+        while not self._should_exit.wait(WORKER_CHECK_INTERVAL_SECONDS):
+            for index, process in enumerate(self._processes):
+                if not process.is_alive():
+                    app_logger.logger.warning(
+                        f"ワーカー {process.pid} が終了したので起動し直します (終了コード: {process.exitcode})"
+                    )
+                    self._processes[index] = self._spawn(sock)
+
+        self._terminate()
+        sock.close()
+
+    def _spawn(self, sock: socket.socket) -> SpawnProcess:
+        process = spawn_context.Process(
+            target=run_worker,
+            args=(self._config, sock, self._drain_timeout_seconds),
+        )
+        process.start()
+        return process
+
+    def _handle_exit(self, sig: int, frame: FrameType | None) -> None:
+        self._should_exit.set()
+
+    def _terminate(self) -> None:
+        for process in self._processes:
+            if process.is_alive() and process.pid is not None:
+                os.kill(process.pid, signal.SIGTERM)
+
+        # 各ワーカーがセッションの終了を待ってから停止するので、その分だけ待つ
+        deadline = (
+            time.monotonic()
+            + self._drain_timeout_seconds
+            + WORKER_SHUTDOWN_GRACE_SECONDS
+        )
+        for process in self._processes:
+            process.join(max(deadline - time.monotonic(), 0.0))
+            if process.is_alive():
+                app_logger.logger.warning(
+                    f"停止しないワーカー {process.pid} を強制終了します"
+                )
+                process.kill()
+                process.join()
+
+
+def serve() -> None:
+    config = uvicorn.Config("main:app", host=HOST, port=PORT, workers=WEB_CONCURRENCY)
+    if WEB_CONCURRENCY <= 1:
+        DrainingServer(config).run()
+    else:
+        WorkerSupervisor(config, WEB_CONCURRENCY).run()
+
+
+if __name__ == "__main__":
+    serve()
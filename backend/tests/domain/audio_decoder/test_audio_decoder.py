@@ -0,0 +1,113 @@
+import av
+import numpy as np
+import pytest
+
+from domain.audio_decoder import (
+    G711_TABLES,
+    AudioDecoder,
+    AudioInputFormat,
+    PcmResampler,
+    negotiate_input_format,
+)
+
+# FFmpegのG.711のコーデック名
+FFMPEG_CODECS = {"mulaw": "pcm_mulaw", "alaw": "pcm_alaw"}
+
+
+def sine(seconds: float, sample_rate: int, frequency: float = 440) -> np.ndarray:
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    return np.sin(2 * np.pi * frequency * t) * 10000
+
+
+def snr_db(actual: np.ndarray, expected: np.ndarray) -> float:
+    noise = actual.astype(np.float64) - expected
+    return float(10 * np.log10(np.sum(expected**2) / np.sum(noise**2)))
+
+
+def ffmpeg_encode(encoding: str, pcm: np.ndarray, sample_rate: int) -> bytes:
+    codec = av.CodecContext.create(FFMPEG_CODECS[encoding], "w")
+    codec.sample_rate = sample_rate
+    codec.layout = "mono"
+    codec.format = "s16"
+    frame = av.AudioFrame.from_ndarray(
+        pcm.astype("<i2").reshape(1, -1), format="s16", layout="mono"
+    )
+    frame.sample_rate = sample_rate
+    return b"".join(bytes(packet) for packet in codec.encode(frame))
+
+
+def decode_in_chunks(decoder: AudioDecoder, data: bytes, size: int) -> np.ndarray:
+    pcm = b"".join(
+        decoder.decode(data[i : i + size]) for i in range(0, len(data), size)
+    )
+    return np.frombuffer(pcm, dtype="<i2")
+
+
+def test_input_format_is_negotiated_with_default_sample_rate():
+    assert negotiate_input_format("PCMU", None) == {
+        "encoding": "mulaw",
+        "sample_rate": 8000,
+    }
+    assert negotiate_input_format("alaw", "16000") == {
+        "encoding": "alaw",
+        "sample_rate": 16000,
+    }
+    assert negotiate_input_format(None, "48000") == {
+        "encoding": "pcm16",
+        "sample_rate": 48000,
+    }
+    # 未対応のエンコーディングや範囲外のサンプリングレートはデフォルトの形式になる
+    assert negotiate_input_format("flac", "96000") == {
+        "encoding": "pcm16",
+        "sample_rate": 16000,
+    }
+
+
+@pytest.mark.parametrize("encoding", ["mulaw", "alaw"])
+def test_g711_table_matches_ffmpeg_decoder(encoding):
+    codec = av.CodecContext.create(FFMPEG_CODECS[encoding], "r")
+    codec.sample_rate = 8000
+    codec.layout = "mono"
+    frames = codec.decode(av.Packet(bytes(range(256))))
+    reference = np.concatenate([frame.to_ndarray().reshape(-1) for frame in frames])
+
+    np.testing.assert_array_equal(G711_TABLES[encoding], reference)
+
+
+@pytest.mark.parametrize("encoding", ["mulaw", "alaw"])
+def test_g711_audio_is_decoded_and_upsampled_to_16khz(encoding):
+    encoded = ffmpeg_encode(encoding, sine(1.0, 8000), 8000)
+    decoder = AudioDecoder(AudioInputFormat(encoding=encoding, sample_rate=8000))
+
+    pcm = decode_in_chunks(decoder, encoded, 160)
+
+    # 最後のサンプル以降は次のチャンクと合わせて補間するので、変換元の1サンプル分だけ短くなる
+    assert len(pcm) == 16000 - 2
+    assert snr_db(pcm, sine(1.0, 16000)[: len(pcm)]) > 30
+    assert decoder.stats["bytes_in"] == 8000
+
+
+@pytest.mark.parametrize("sample_rate", [24000, 44100, 48000])
+def test_pcm16_is_downsampled_across_odd_chunk_boundaries(sample_rate):
+    data = sine(1.0, sample_rate).astype("<i2").tobytes()
+    decoder = AudioDecoder(AudioInputFormat(encoding="pcm16", sample_rate=sample_rate))
+
+    # 16bitのサンプルの途中で分割されたチャンクでも連続した音声として変換する
+    pcm = decode_in_chunks(decoder, data, 1001)
+
+    # ローパスフィルタの遅延（タップ数の半分）だけ遅れる
+    delay = 8 * -(-sample_rate // 16000) / sample_rate
+    expected = np.sin(2 * np.pi * 440 * (np.arange(len(pcm)) / 16000 - delay)) * 10000
+    assert abs(len(pcm) - 16000) <= 2
+    assert snr_db(pcm[100:], expected[100:]) > 40
+
+
+def test_resampler_output_does_not_depend_on_chunk_size():
+    samples = sine(0.5, 48000)
+    whole = PcmResampler(48000).process(samples)
+    resampler = PcmResampler(48000)
+    chunked = np.concatenate(
+        [resampler.process(samples[i : i + 333]) for i in range(0, len(samples), 333)]
+    )
+
+    np.testing.assert_array_equal(chunked, whole)
@@ -0,0 +1,65 @@
+import io
+import wave
+
+import av
+import numpy as np
+import pytest
+
+from domain.audio_encoder import AudioEncoder, EncodedAudio, negotiate_codec
+
+
+def create_wav(seconds: float, sample_rate: int = 24000) -> bytes:
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pcm = (np.sin(2 * np.pi * 220 * t) * 8000).astype("<i2").tobytes()
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(sample_rate)
+        writer.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def decoded_seconds(data: bytes) -> float:
+    with av.open(io.BytesIO(data)) as container:
+        stream = container.streams.audio[0]
+        samples = sum(frame.samples for frame in container.decode(stream))
+        return samples / stream.codec_context.sample_rate
+
+
+def test_first_supported_codec_is_negotiated():
+    assert negotiate_codec("flac, OPUS,aac") == "opus"
+    assert negotiate_codec("aac") == "aac"
+    assert negotiate_codec("wav,opus") == "wav"
+    assert negotiate_codec(None) == "wav"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("codec", "mime_type"), [("opus", "audio/ogg; codecs=opus"), ("aac", "audio/aac")]
+)
+async def test_wav_is_compressed_to_negotiated_codec(codec, mime_type):
+    wav = create_wav(2.0)
+    observed: list[EncodedAudio] = []
+    encoder = AudioEncoder(codec, on_encoded=observed.append)
+
+    encoded = await encoder.encode(wav)
+
+    assert encoded["mime_type"] == mime_type
+    assert len(encoded["data"]) < len(wav) / 5
+    # AACはエンコーダーの遅延の分だけ先頭に無音が付く
+    assert decoded_seconds(encoded["data"]) == pytest.approx(2.0, abs=0.1)
+    assert encoded["duration_seconds"] == pytest.approx(2.0)
+    assert observed == [encoded]
+    assert encoder.stats["encoded"] == 1
+
+
+@pytest.mark.asyncio
+async def test_unreadable_audio_is_sent_as_wav():
+    encoder = AudioEncoder("opus")
+
+    encoded = await encoder.encode(b"not a wav")
+
+    assert encoded["data"] == b"not a wav"
+    assert encoded["mime_type"] == "audio/wav"
+    assert encoder.stats["fallbacks"] == 1
@@ -0,0 +1,79 @@
+import asyncio
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from domain.image_normalizer import ImageNormalizer, normalize_jpeg
+
+
+def create_jpeg(width: int, height: int, quality: int = 90) -> bytes:
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def image_size(jpeg: bytes) -> tuple[int, int]:
+    with Image.open(io.BytesIO(jpeg)) as image:
+        return image.size
+
+
+def test_normalize_jpeg_keeps_aspect_ratio():
+    normalized = normalize_jpeg(create_jpeg(1280, 720), max_edge=640, quality=70)
+
+    assert image_size(normalized) == (640, 360)
+
+
+@pytest.mark.asyncio
+async def test_large_image_is_downscaled():
+    jpeg = create_jpeg(1920, 1080)
+    normalizer = ImageNormalizer(max_edge=768)
+
+    normalized = await normalizer.normalize(jpeg)
+
+    assert normalized is not None
+    assert max(image_size(normalized)) == 768
+    assert len(normalized) < len(jpeg)
+    assert normalizer.stats["frames_recompressed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_image_within_budget_is_returned_as_is():
+    jpeg = create_jpeg(320, 240, quality=50)
+    normalizer = ImageNormalizer(max_edge=768, max_bytes=len(jpeg))
+
+    assert await normalizer.normalize(jpeg) is jpeg
+    assert normalizer.stats["frames_skipped"] == 1
+    assert normalizer.stats["frames_recompressed"] == 0
+
+
+@pytest.mark.asyncio
+async def test_frames_are_dropped_while_workers_are_busy():
+    release = threading.Event()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # ワーカーを塞いで処理待ちの状態を作る
+        executor.submit(release.wait)
+        normalizer = ImageNormalizer(max_edge=320, max_pending=1, executor=executor)
+        jpeg = create_jpeg(1280, 720)
+
+        pending = asyncio.create_task(normalizer.normalize(jpeg))
+        await asyncio.sleep(0)
+        dropped = await normalizer.normalize(jpeg)
+        release.set()
+
+        assert dropped is None
+        assert await pending is not None
+        assert normalizer.stats["frames_dropped_busy"] == 1
+
+
+@pytest.mark.asyncio
+async def test_undecodable_image_is_returned_as_is():
+    normalizer = ImageNormalizer()
+
+    assert await normalizer.normalize(b"not a jpeg") == b"not a jpeg"
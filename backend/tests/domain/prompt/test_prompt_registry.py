@@ -0,0 +1,112 @@
+import asyncio
+import threading
+from pathlib import Path
+
+import pytest
+
+from domain.prompt import (
+    DEFAULT_PERSONA,
+    VIDEO_CHAT_VARIANT,
+    VOICE_CHAT_VARIANT,
+    PromptConfigCache,
+    PromptEntry,
+    PromptNotFoundError,
+    PromptRegistry,
+    get_system_prompt,
+)
+
+
+def test_voice_chat_variant_omits_tools_and_image_guidelines():
+    video_chat_prompt = get_system_prompt(variant=VIDEO_CHAT_VARIANT)
+    voice_chat_prompt = get_system_prompt(variant=VOICE_CHAT_VARIANT)
+
+    assert "# 便利な関数について" in video_chat_prompt
+    assert "# 便利な関数について" not in voice_chat_prompt
+    assert "toolsを使って" not in voice_chat_prompt
+    assert voice_chat_prompt.endswith("「おもち」はかわいいものが好きだにゃん🐱\n")
+
+
+def test_prompt_files_override_and_add_personas(tmp_path: Path):
+    (tmp_path / "tama").mkdir()
+    (tmp_path / "tama" / "video_chat.md").write_text("あなたはたまです", "utf-8")
+    registry = PromptRegistry(prompt_dir=str(tmp_path))
+
+    assert registry.get("tama")["text"] == "あなたはたまです"
+    assert registry.personas(VIDEO_CHAT_VARIANT) == [DEFAULT_PERSONA, "tama"]
+    with pytest.raises(PromptNotFoundError):
+        registry.get("tama", VOICE_CHAT_VARIANT)
+
+
+def test_reload_picks_up_changed_files_and_notifies(tmp_path: Path):
+    (tmp_path / "tama").mkdir()
+    prompt_file = tmp_path / "tama" / "video_chat.md"
+    prompt_file.write_text("あなたはたまです", "utf-8")
+    registry = PromptRegistry(prompt_dir=str(tmp_path))
+    notified: list[str] = []
+    registry.subscribe(lambda: notified.append(registry.get("tama")["text"]))
+    before = registry.entries
+
+    assert not registry.reload()
+
+    prompt_file.write_text("あなたは三毛猫のたまです", "utf-8")
+    assert registry.reload()
+    assert notified == ["あなたは三毛猫のたまです"]
+    # 取得済みのプロンプトは変更されない
+    assert before[("tama", VIDEO_CHAT_VARIANT)]["text"] == "あなたはたまです"
+
+    # 空のファイルでは既存のプロンプトを消さない
+    prompt_file.write_text("", "utf-8")
+    assert not registry.reload()
+    assert registry.get("tama")["text"] == "あなたは三毛猫のたまです"
+
+
+@pytest.mark.asyncio
+async def test_watcher_reads_files_off_the_event_loop(tmp_path: Path):
+    (tmp_path / "tama").mkdir()
+    prompt_file = tmp_path / "tama" / "video_chat.md"
+    prompt_file.write_text("あなたはたまです", "utf-8")
+    registry = PromptRegistry(prompt_dir=str(tmp_path), reload_interval_seconds=0.01)
+    notified = asyncio.Event()
+    listener_threads: list[threading.Thread] = []
+
+    def listener() -> None:
+        listener_threads.append(threading.current_thread())
+        notified.set()
+
+    registry.subscribe(listener)
+    registry.start()
+    try:
+        prompt_file.write_text("あなたは三毛猫のたまです", "utf-8")
+        await asyncio.wait_for(notified.wait(), timeout=2)
+    finally:
+        await registry.close()
+
+    assert registry.get("tama")["text"] == "あなたは三毛猫のたまです"
+    # ファイルは別スレッドで読み込み、リスナーはイベントループのスレッドで呼び出す
+    assert listener_threads == [threading.main_thread()]
+
+
+def test_config_cache_builds_only_when_prompt_changes(tmp_path: Path):
+    (tmp_path / "tama").mkdir()
+    prompt_file = tmp_path / "tama" / "video_chat.md"
+    prompt_file.write_text("あなたはたまです", "utf-8")
+    registry = PromptRegistry(prompt_dir=str(tmp_path))
+    built: list[str] = []
+
+    def build(prompt: PromptEntry) -> dict[str, str]:
+        built.append(prompt["persona"])
+        return {"system_instruction": prompt["text"]}
+
+    cache = PromptConfigCache(registry, VIDEO_CHAT_VARIANT, build)
+    assert built == [DEFAULT_PERSONA, "tama"]
+
+    # 接続時は組み立て済みの設定を返す
+    config = cache.get("tama")
+    assert cache.get("tama") is config
+    assert built == [DEFAULT_PERSONA, "tama"]
+
+    prompt_file.write_text("あなたは三毛猫のたまです", "utf-8")
+    registry.reload()
+    # 内容が変わったペルソナの設定だけを組み立て直す
+    assert built == [DEFAULT_PERSONA, "tama", "tama"]
+    assert cache.get("tama") == {"system_instruction": "あなたは三毛猫のたまです"}
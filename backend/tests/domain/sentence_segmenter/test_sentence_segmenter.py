@@ -0,0 +1,66 @@
+import pytest
+
+from domain.sentence_segmenter import SentenceSegmenter
+
+
+def test_feed_splits_on_japanese_sentence_boundaries():
+    segmenter = SentenceSegmenter(min_length=1, max_length=80)
+
+    actual = segmenter.feed("こんにちは。おもちだにゃん！元気かにゃ？ねこ")
+
+    assert actual == ["こんにちは。", "おもちだにゃん！", "元気かにゃ？"]
+    assert segmenter.flush() == "ねこ"
+
+
+def test_feed_splits_on_emoji_and_newline():
+    segmenter = SentenceSegmenter(min_length=1, max_length=80)
+
+    actual = segmenter.feed(
+        "はじめまして😺ねこの「おもち」だにゃん🐱よろしくにゃん🐱\nまたね"
+    )
+
+    assert actual == [
+        "はじめまして😺",
+        "ねこの「おもち」だにゃん🐱",
+        "よろしくにゃん🐱",
+    ]
+    assert segmenter.flush() == "またね"
+
+
+def test_feed_waits_for_text_after_boundary_run():
+    segmenter = SentenceSegmenter(min_length=1, max_length=80)
+
+    assert segmenter.feed("ごめんにゃさい") == []
+    assert segmenter.feed("😿") == []
+    assert segmenter.feed("！") == []
+    assert segmenter.feed("」でも") == ["ごめんにゃさい😿！」"]
+    assert segmenter.flush() == "でも"
+
+
+def test_feed_merges_short_sentences():
+    segmenter = SentenceSegmenter(min_length=8, max_length=80)
+
+    actual = segmenter.feed("うん。そうだにゃん。ちゅーるが大好きだにゃん。")
+
+    assert actual == ["うん。そうだにゃん。"]
+    assert segmenter.flush() == "ちゅーるが大好きだにゃん。"
+
+
+def test_feed_splits_long_text_at_soft_break():
+    segmenter = SentenceSegmenter(min_length=2, max_length=10)
+
+    actual = segmenter.feed("あいうえお、かきくけこさしすせそ")
+
+    assert actual == ["あいうえお、"]
+    assert segmenter.flush() == "かきくけこさしすせそ"
+
+
+def test_flush_returns_none_when_buffer_is_empty():
+    segmenter = SentenceSegmenter()
+
+    assert segmenter.flush() is None
+
+
+def test_invalid_length_raises_value_error():
+    with pytest.raises(ValueError):
+        SentenceSegmenter(min_length=10, max_length=5)
@@ -0,0 +1,139 @@
+import asyncio
+from typing import Annotated, NotRequired, TypedDict
+
+import pytest
+
+from domain.tool_registry import (
+    ToolArgumentError,
+    ToolExecutionError,
+    ToolNotFoundError,
+    ToolRegistry,
+    ToolTimeoutError,
+    build_json_schema,
+    parse_arguments,
+)
+
+
+class ReminderDto(TypedDict):
+    """登録するリマインダーの詳細"""
+
+    title: Annotated[str, "リマインダーのタイトル"]
+    minutes: Annotated[int, "何分後に通知するか"]
+    tags: list[str]
+    note: NotRequired[str]
+
+
+class ReminderResult(TypedDict):
+    result: bool
+    title: str
+
+
+async def create_reminder(dto: ReminderDto) -> ReminderResult:
+    return ReminderResult(result=True, title=dto["title"])
+
+
+def test_build_json_schema_from_typed_dict():
+    assert build_json_schema(ReminderDto) == {
+        "type": "object",
+        "description": "登録するリマインダーの詳細",
+        "properties": {
+            "title": {"type": "string", "description": "リマインダーのタイトル"},
+            "minutes": {"type": "integer", "description": "何分後に通知するか"},
+            "tags": {"type": "array", "items": {"type": "string"}},
+            "note": {"type": "string"},
+        },
+        "required": ["title", "minutes", "tags"],
+    }
+
+
+def test_function_declaration_wraps_dto():
+    registry = ToolRegistry()
+    registry.register(
+        "create_reminder", "リマインダーを登録する", ReminderDto, create_reminder
+    )
+
+    [declaration] = registry.function_declarations()
+
+    assert declaration["name"] == "create_reminder"
+    assert declaration["parameters"]["required"] == ["dto"]
+    assert declaration["parameters"]["properties"]["dto"] == build_json_schema(
+        ReminderDto
+    )
+
+
+def test_parse_arguments_converts_integral_floats():
+    dto = parse_arguments(
+        ReminderDto, {"title": "ごはん", "minutes": 5.0, "tags": ["ねこ"], "extra": 1}
+    )
+
+    assert dto == {"title": "ごはん", "minutes": 5, "tags": ["ねこ"]}
+
+
+@pytest.mark.parametrize(
+    ("args", "message"),
+    [
+        (
+            {"title": "ごはん", "tags": []},
+            "dto の必須フィールドが不足しています: minutes",
+        ),
+        (
+            {"title": 1, "minutes": 5, "tags": []},
+            "dto.title は string である必要があります",
+        ),
+        ({"title": "ごはん", "minutes": 1.5, "tags": []}, "dto.minutes は integer"),
+        ({"title": "ごはん", "minutes": 5, "tags": [1]}, "dto.tags[0] は string"),
+        ("ごはん", "dto はオブジェクトである必要があります"),
+    ],
+)
+def test_parse_arguments_rejects_invalid_arguments(args: object, message: str):
+    with pytest.raises(ToolArgumentError, match=message.replace("[", r"\[")):
+        parse_arguments(ReminderDto, args)
+
+
+@pytest.mark.asyncio
+async def test_call_validates_and_invokes_handler():
+    registry = ToolRegistry()
+    registry.register(
+        "create_reminder", "リマインダーを登録する", ReminderDto, create_reminder
+    )
+
+    actual = await registry.call(
+        "create_reminder", {"dto": {"title": "ごはん", "minutes": 5, "tags": []}}
+    )
+
+    assert actual == {"result": True, "title": "ごはん"}
+
+
+@pytest.mark.asyncio
+async def test_call_raises_tool_errors():
+    async def slow_handler(dto: ReminderDto) -> ReminderResult:
+        await asyncio.sleep(1)
+        return ReminderResult(result=True, title=dto["title"])
+
+    registry = ToolRegistry()
+    registry.register(
+        "slow", "遅い関数", ReminderDto, slow_handler, timeout_seconds=0.01
+    )
+
+    with pytest.raises(ToolNotFoundError):
+        await registry.call("unknown", {})
+    with pytest.raises(ToolArgumentError):
+        await registry.call("slow", {"dto": {}})
+    with pytest.raises(ToolTimeoutError):
+        await registry.call("slow", {"dto": {"title": "a", "minutes": 1, "tags": []}})
+
+
+@pytest.mark.asyncio
+async def test_handler_exception_is_wrapped_in_tool_error():
+    async def broken_handler(dto: ReminderDto) -> ReminderResult:
+        raise RuntimeError("database is down")
+
+    registry = ToolRegistry()
+    registry.register("broken", "壊れた関数", ReminderDto, broken_handler)
+
+    with pytest.raises(ToolExecutionError) as exc_info:
+        await registry.call("broken", {"dto": {"title": "a", "minutes": 1, "tags": []}})
+
+    # モデルに返すメッセージには元の例外の詳細を含めない
+    assert "database" not in str(exc_info.value)
+    assert isinstance(exc_info.value.__cause__, RuntimeError)
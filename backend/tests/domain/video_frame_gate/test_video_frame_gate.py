@@ -0,0 +1,124 @@
+import asyncio
+import io
+import threading
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import domain.video_frame_gate
+from domain.video_frame_gate import VideoFrameGate, compute_frame_hash
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def create_jpeg(square_x: int, noise_seed: int = 0) -> bytes:
+    """灰色の背景に白い四角形を描いたJPEG画像を作成する（ノイズで画素値を僅かに揺らす）"""
+    rng = np.random.default_rng(noise_seed)
+    pixels = np.full((240, 320, 3), 96, dtype=np.int16)
+    pixels[80:160, square_x : square_x + 80] = 230
+    pixels += rng.integers(-3, 4, size=pixels.shape, dtype=np.int16)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels.clip(0, 255).astype(np.uint8)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def test_compute_frame_hash_is_stable_for_noisy_copies():
+    a = compute_frame_hash(create_jpeg(40, noise_seed=1))
+    b = compute_frame_hash(create_jpeg(40, noise_seed=2))
+    c = compute_frame_hash(create_jpeg(200, noise_seed=1))
+
+    assert a.shape == (8, 8)
+    assert np.count_nonzero(a != b) <= 6
+    assert np.count_nonzero(a != c) > 6
+
+
+@pytest.mark.asyncio
+async def test_near_duplicate_frames_are_dropped():
+    clock = FakeClock()
+    gate = VideoFrameGate(max_frames_per_second=10, clock=clock)
+
+    results = []
+    for i, square_x in enumerate([40, 40, 40, 200]):
+        clock.now += 1
+        results.append(await gate.should_forward(create_jpeg(square_x, noise_seed=i)))
+
+    assert results == [True, False, False, True]
+    assert gate.stats["frames_received"] == 4
+    assert gate.stats["frames_forwarded"] == 2
+    assert gate.stats["frames_dropped_duplicate"] == 2
+
+
+@pytest.mark.asyncio
+async def test_duplicate_frame_is_forwarded_after_keyframe_interval():
+    clock = FakeClock()
+    gate = VideoFrameGate(keyframe_interval_seconds=5, clock=clock)
+
+    await gate.should_forward(create_jpeg(40))
+    clock.now += 6
+
+    assert await gate.should_forward(create_jpeg(40, noise_seed=1)) is True
+
+
+@pytest.mark.asyncio
+async def test_frame_rate_adapts_to_upstream_latency():
+    clock = FakeClock()
+    gate = VideoFrameGate(
+        max_frames_per_second=2,
+        min_frames_per_second=0.1,
+        latency_multiplier=4,
+        clock=clock,
+    )
+
+    assert await gate.should_forward(create_jpeg(40)) is True
+    clock.now += 0.6
+    assert await gate.should_forward(create_jpeg(200)) is True
+
+    gate.record_upstream_latency(0.5)
+    clock.now += 0.6
+
+    assert gate.min_interval_seconds == 2.0
+    assert await gate.should_forward(create_jpeg(40)) is False
+    assert gate.stats["frames_dropped_rate_limit"] == 1
+
+
+@pytest.mark.asyncio
+async def test_undecodable_frame_is_forwarded():
+    gate = VideoFrameGate(clock=FakeClock())
+
+    assert await gate.should_forward(b"not a jpeg") is True
+
+
+@pytest.mark.asyncio
+async def test_frame_hash_is_computed_off_event_loop_thread(monkeypatch):
+    hash_threads: list[threading.Thread] = []
+
+    def record_thread(jpeg: bytes):
+        hash_threads.append(threading.current_thread())
+        return compute_frame_hash(jpeg)
+
+    monkeypatch.setattr(domain.video_frame_gate, "compute_frame_hash", record_thread)
+    gate = VideoFrameGate(clock=FakeClock())
+
+    assert await gate.should_forward(create_jpeg(40)) is True
+    assert len(hash_threads) == 1
+    assert hash_threads[0] is not threading.current_thread()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_frames_are_judged_one_at_a_time():
+    gate = VideoFrameGate(max_frames_per_second=1, clock=FakeClock())
+
+    results = await asyncio.gather(
+        gate.should_forward(create_jpeg(40)), gate.should_forward(create_jpeg(200))
+    )
+
+    # 1フレーム目のデコード中に届いたフレームも、1フレーム目を転送した後のレート制限で判定する
+    assert results == [True, False]
+    assert gate.stats["frames_dropped_rate_limit"] == 1
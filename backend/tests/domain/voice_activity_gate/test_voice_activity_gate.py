@@ -0,0 +1,99 @@
+import numpy as np
+
+from domain.voice_activity_gate import (
+    PCM_SAMPLE_RATE,
+    VoiceActivityGate,
+    analyze_frames,
+)
+
+
+def create_pcm(pattern: list[tuple[str, float]], seed: int = 0) -> bytes:
+    """("speech" | "silence", 秒数) の並びから16kHz/16bitのPCM音声を作成する"""
+    rng = np.random.default_rng(seed)
+    parts = []
+    for kind, seconds in pattern:
+        count = round(PCM_SAMPLE_RATE * seconds)
+        noise = rng.normal(0, 20, size=count)
+        if kind == "speech":
+            t = np.arange(count) / PCM_SAMPLE_RATE
+            noise += 4000 * np.sin(2 * np.pi * 220 * t)
+        parts.append(noise)
+    return np.concatenate(parts).clip(-32768, 32767).astype("<i2").tobytes()
+
+
+def split_chunks(pcm: bytes, chunk_bytes: int) -> list[bytes]:
+    return [pcm[i : i + chunk_bytes] for i in range(0, len(pcm), chunk_bytes)]
+
+
+def gate_events(gate: VoiceActivityGate, pcm: bytes) -> list[str]:
+    return [s["event"] for s in gate.process(pcm) if "event" in s]
+
+
+def test_analyze_frames():
+    t = np.arange(320) / PCM_SAMPLE_RATE
+    tone = (16384 * np.sin(2 * np.pi * 1000 * t)).astype(np.int16)
+    silence = np.zeros(320, dtype=np.int16)
+
+    dbfs, zero_crossing_rate = analyze_frames(np.stack([tone, silence]))
+
+    assert abs(dbfs[0] - -9.0) < 0.1
+    assert dbfs[1] < -90
+    # 1kHzの正弦波は1秒に2000回ゼロを交差する
+    assert abs(zero_crossing_rate[0] - 2000 / PCM_SAMPLE_RATE) < 0.01
+
+
+def test_silence_is_suppressed_and_speech_is_marked():
+    gate = VoiceActivityGate(hangover_seconds=0.2, pre_roll_seconds=0.1)
+    pcm = create_pcm([("silence", 1.0), ("speech", 1.0), ("silence", 1.0)])
+
+    segments = []
+    # AudioWorkletのチャンクはフレーム長の倍数とは限らない
+    for chunk in split_chunks(pcm, 2730):
+        segments.extend(gate.process(chunk))
+
+    markers = [s["event"] for s in segments if "event" in s]
+    assert markers == ["speech_start", "speech_end"]
+
+    forwarded = sum(len(s["pcm"]) for s in segments if "pcm" in s)
+    # 発話 1秒 + 語頭 0.1秒 + 語尾 0.2秒程度だけ転送される
+    assert 1.2 <= forwarded / (PCM_SAMPLE_RATE * 2) <= 1.4
+
+    stats = gate.stats
+    assert stats["speech_segments"] == 1
+    assert abs(stats["received_seconds"] - 3.0) < 0.01
+    assert 1.6 <= stats["suppressed_seconds"] <= 1.8
+
+
+def test_markers_are_ordered_with_audio():
+    gate = VoiceActivityGate(hangover_seconds=0.1, pre_roll_seconds=0.0)
+    pcm = create_pcm([("speech", 0.5), ("silence", 0.5), ("speech", 0.5)])
+
+    segments = gate.process(pcm)
+
+    kinds = ["pcm" if "pcm" in s else s["event"] for s in segments]
+    assert kinds == ["speech_start", "pcm", "speech_end", "speech_start", "pcm"]
+    assert gate.is_speaking is True
+
+
+def test_short_clicks_do_not_start_speech():
+    gate = VoiceActivityGate(min_speech_seconds=0.06)
+    pcm = create_pcm([("silence", 0.5), ("speech", 0.02), ("silence", 0.5)])
+
+    assert gate.process(pcm) == []
+    assert gate.stats["forwarded_seconds"] == 0.0
+
+
+def test_threshold_is_tunable():
+    pcm = create_pcm([("speech", 0.5)])
+
+    assert gate_events(VoiceActivityGate(energy_threshold_dbfs=-30), pcm) == [
+        "speech_start"
+    ]
+    # 正弦波の音量（約-21dBFS）より高い閾値では発話とみなさない
+    assert gate_events(VoiceActivityGate(energy_threshold_dbfs=-10), pcm) == []
+
+
+def test_end_padding_is_silence():
+    gate = VoiceActivityGate(end_padding_seconds=0.5)
+
+    assert gate.end_padding == bytes(PCM_SAMPLE_RATE)
@@ -0,0 +1,38 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from tests.fakes.fake_live_session import FakeLiveSession
+
+
+class FakeLiveServer:
+    """
+    client.aio.live.connect のテストダブル。 \n
+    connect() は接続の度に FakeLiveSession を作成し、開いているセッションの数を記録する。 \n
+    connect_latency_seconds で接続（TLS・セッションのハンドシェイク）の遅さを再現でき、
+    fail_connects の回数だけ接続に失敗する。
+    """
+
+    def __init__(
+        self, connect_latency_seconds: float = 0.0, fail_connects: int = 0
+    ) -> None:
+        self.connect_latency_seconds = connect_latency_seconds
+        self.fail_connects = fail_connects
+        self.connect_count = 0
+        self.open_sessions: list[FakeLiveSession] = []
+
+    @asynccontextmanager
+    async def connect(self) -> AsyncIterator[FakeLiveSession]:
+        self.connect_count += 1
+        if self.connect_latency_seconds:
+            await asyncio.sleep(self.connect_latency_seconds)
+        if self.fail_connects > 0:
+            self.fail_connects -= 1
+            raise ConnectionError("fake live server is unavailable")
+
+        session = FakeLiveSession()
+        self.open_sessions.append(session)
+        try:
+            yield session
+        finally:
+            self.open_sessions.remove(session)
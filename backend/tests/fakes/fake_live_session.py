@@ -0,0 +1,23 @@
+import asyncio
+from typing import Any, TypedDict
+
+
+class SentMessage(TypedDict):
+    input: Any
+    end_of_turn: bool | None
+
+
+class FakeLiveSession:
+    """
+    google.genai.live.AsyncSession のテストダブル。 \n
+    send された内容を sent に記録する。send_latency_seconds で上流への書き込みの遅さを再現できる。
+    """
+
+    def __init__(self, send_latency_seconds: float = 0.0) -> None:
+        self.send_latency_seconds = send_latency_seconds
+        self.sent: list[SentMessage] = []
+
+    async def send(self, *, input: Any, end_of_turn: bool | None = False) -> None:
+        if self.send_latency_seconds:
+            await asyncio.sleep(self.send_latency_seconds)
+        self.sent.append(SentMessage(input=input, end_of_turn=end_of_turn))
@@ -0,0 +1,54 @@
+import asyncio
+import json
+import time
+
+import httpx
+
+
+class FakeOpenAiSessionServer:
+    """
+    OpenAI Realtime APIのセッション作成APIのテストダブル。 \n
+    httpx.MockTransport として動作するので実際の通信は発生しない。 \n
+    作成したトークンは "token-1", "token-2", ... の順に払い出し、有効期限は作成時刻 + token_ttl_seconds とする。
+    """
+
+    def __init__(
+        self,
+        latency_seconds: float = 0.0,
+        token_ttl_seconds: float = 60.0,
+        failure_status_codes: list[int] | None = None,
+    ) -> None:
+        self.latency_seconds = latency_seconds
+        self.token_ttl_seconds = token_ttl_seconds
+        # 先頭から順番に返すエラーレスポンスのステータスコード（空になったら正常なレスポンスを返す）
+        self._failure_status_codes = list(failure_status_codes or [])
+        self.request_count = 0
+        self.authorization_headers: list[str] = []
+        self.instructions: list[str] = []
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.request_count += 1
+        request_number = self.request_count
+        self.authorization_headers.append(request.headers.get("Authorization", ""))
+        self.instructions.append(json.loads(request.content)["instructions"])
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+
+        if self._failure_status_codes:
+            return httpx.Response(
+                self._failure_status_codes.pop(0), json={"error": "fake error"}
+            )
+
+        return httpx.Response(
+            200,
+            json={
+                "id": f"sess_{request_number}",
+                "client_secret": {
+                    "value": f"token-{request_number}",
+                    "expires_at": int(time.time() + self.token_ttl_seconds),
+                },
+            },
+        )
+
+    def create_http_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
@@ -0,0 +1,154 @@
+import asyncio
+from collections import deque
+from typing import Any
+
+from infrastructure.shared_store import THROTTLE_SCRIPT, read_reply, throttle_tat
+
+
+class FakeRedisServer:
+    """
+    RedisSharedStore が使うコマンドだけに応答するRESPのサーバーのテストダブル。 \n
+    有効期限は実際には削除せず、expirations にミリ秒で記録する。 \n
+    EVAL は THROTTLE_SCRIPT だけに対応し、同じ計算をPythonで実行する。 \n
+    password を指定した場合は AUTH が成功するまで他のコマンドにエラーを返す。
+    """
+
+    def __init__(self, password: str | None = None) -> None:
+        self.password = password
+        self.values: dict[str, Any] = {}
+        self.expirations: dict[str, int] = {}
+        self.commands: list[list[str]] = []
+        self.connection_count = 0
+        self._server: asyncio.Server | None = None
+        self._writers: set[asyncio.StreamWriter] = set()
+
+    @property
+    def port(self) -> int:
+        assert self._server is not None
+        port: int = self._server.sockets[0].getsockname()[1]
+        return port
+
+    @property
+    def url(self) -> str:
+        auth = f":{self.password}@" if self.password else ""
+        return f"redis://{auth}127.0.0.1:{self.port}/0"
+
+    async def start(self, port: int = 0) -> None:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", port)
+
+    async def close(self) -> None:
+        """接続中のクライアントも切断して停止する"""
+        if self._server is not None:
+            self._server.close()
+            for writer in self._writers:
+                writer.close()
+            await self._server.wait_closed()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self.connection_count += 1
+        self._writers.add(writer)
+        authenticated = self.password is None
+        # MULTI から EXEC までに受信したコマンド
+        queued: list[list[str]] | None = None
+        try:
+            while True:
+                args: list[str] = await read_reply(reader)
+                self.commands.append(args)
+                if args[0] == "AUTH":
+                    authenticated = args[1] == self.password
+                    reply = b"+OK\r\n" if authenticated else b"-WRONGPASS\r\n"
+                elif not authenticated:
+                    reply = b"-NOAUTH Authentication required.\r\n"
+                elif args[0] == "MULTI":
+                    queued = []
+                    reply = b"+OK\r\n"
+                elif args[0] == "EXEC" and queued is not None:
+                    replies = [self._execute(c[0], c[1:]) for c in queued]
+                    reply = f"*{len(replies)}\r\n".encode() + b"".join(replies)
+                    queued = None
+                elif queued is not None:
+                    queued.append(args)
+                    reply = b"+QUEUED\r\n"
+                else:
+                    reply = self._execute(args[0], args[1:])
+                writer.write(reply)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    def _execute(self, command: str, args: list[str]) -> bytes:
+        if command == "SELECT":
+            return b"+OK\r\n"
+        if command == "GET":
+            return encode(self.values.get(args[0]))
+        if command == "SET":
+            options = args[2:]
+            if "NX" in options and args[0] in self.values:
+                return encode(None)
+            self.values[args[0]] = args[1]
+            if "PX" in options:
+                self.expirations[args[0]] = int(options[options.index("PX") + 1])
+            return b"+OK\r\n"
+        if command == "DEL":
+            return encode(int(self.values.pop(args[0], None) is not None))
+        if command == "INCR":
+            count = int(self.values.get(args[0], "0")) + 1
+            self.values[args[0]] = str(count)
+            return encode(count)
+        if command == "EVAL":
+            if args[0] != THROTTLE_SCRIPT:
+                return b"-ERR unknown script\r\n"
+            key, now, interval, burst = (
+                args[2],
+                int(args[3]),
+                int(args[4]),
+                int(args[5]),
+            )
+            tat = self.values.get(key)
+            new_tat, retry_after = throttle_tat(
+                int(tat) if tat is not None else None, now, interval, burst
+            )
+            if retry_after > 0:
+                return encode(int(retry_after))
+            self.values[key] = str(new_tat)
+            self.expirations[key] = int(new_tat - now)
+            return encode(0)
+        if command == "PEXPIRE":
+            self.expirations[args[0]] = int(args[1])
+            return encode(1)
+        if command == "HSET":
+            self.values.setdefault(args[0], {})[args[1]] = args[2]
+            return encode(1)
+        if command == "HDEL":
+            return encode(
+                int(self.values.get(args[0], {}).pop(args[1], None) is not None)
+            )
+        if command == "HGETALL":
+            items = self.values.get(args[0], {}).items()
+            return encode([value for item in items for value in item])
+        if command in ("RPUSH", "LPUSH"):
+            values = self.values.setdefault(args[0], deque())
+            values.append(args[1]) if command == "RPUSH" else values.appendleft(args[1])
+            return encode(len(values))
+        if command == "LPOP":
+            values = self.values.get(args[0])
+            return encode(values.popleft() if values else None)
+        if command == "LLEN":
+            return encode(len(self.values.get(args[0], ())))
+        return f"-ERR unknown command '{command}'\r\n".encode()
+
+
+def encode(value: Any) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, int):
+        return f":{value}\r\n".encode()
+    if isinstance(value, list):
+        return f"*{len(value)}\r\n".encode() + b"".join(encode(v) for v in value)
+    data = str(value).encode()
+    return f"${len(data)}\r\n".encode() + data + b"\r\n"
@@ -0,0 +1,62 @@
+import asyncio
+import base64
+import json
+from collections.abc import Callable
+
+import httpx
+
+
+class FakeTtsServer:
+    """
+    にじボイスの音声合成APIのテストダブル。 \n
+    httpx.MockTransport として動作するので実際の通信は発生しない。
+    """
+
+    def __init__(
+        self,
+        latency_seconds: float | Callable[[str], float] = 0.0,
+        failure_status_codes: list[int] | None = None,
+    ) -> None:
+        self._latency_seconds = latency_seconds
+        # 先頭から順番に返すエラーレスポンスのステータスコード（空になったら正常なレスポンスを返す）
+        self._failure_status_codes = list(failure_status_codes or [])
+        self.request_count = 0
+        self.scripts: list[str] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def latency_for(self, script: str) -> float:
+        if callable(self._latency_seconds):
+            return self._latency_seconds(script)
+        return self._latency_seconds
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.request_count += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            script = str(json.loads(request.content)["script"])
+            await asyncio.sleep(self.latency_for(script))
+
+            if self._failure_status_codes:
+                return httpx.Response(self._failure_status_codes.pop(0))
+
+            self.scripts.append(script)
+            return httpx.Response(
+                200,
+                json={
+                    "generatedVoice": {
+                        "base64Audio": self.encode_audio(script),
+                    }
+                },
+            )
+        finally:
+            self.in_flight -= 1
+
+    @staticmethod
+    def encode_audio(script: str) -> str:
+        """音声データの代わりにスクリプトをそのままBase64エンコードした値を返す"""
+        return base64.b64encode(script.encode("utf-8")).decode("utf-8")
+
+    def create_http_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
@@ -0,0 +1,53 @@
+import asyncio
+from typing import Any
+
+
+class FakeWebSocket:
+    """
+    starlette.websockets.WebSocket のテストダブル。 \n
+    クライアントから届くメッセージを push_text / push_bytes で積み、サーバーが送信したメッセージは sent に記録される。
+    """
+
+    def __init__(
+        self,
+        subprotocols: list[str] | None = None,
+        query_params: dict[str, str] | None = None,
+    ) -> None:
+        self.query_params = query_params or {}
+        self.scope: dict[str, Any] = {
+            "type": "websocket",
+            "subprotocols": subprotocols or [],
+            "client": ("127.0.0.1", 50000),
+            "headers": [],
+        }
+        self.accepted_subprotocol: str | None = None
+        self.is_accepted = False
+        self.sent: list[str | bytes] = []
+        self.close_code: int | None = None
+        self._incoming: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+
+    def push_text(self, text: str) -> None:
+        self._incoming.put_nowait({"type": "websocket.receive", "text": text})
+
+    def push_bytes(self, data: bytes) -> None:
+        self._incoming.put_nowait({"type": "websocket.receive", "bytes": data})
+
+    def push_disconnect(self, code: int = 1000) -> None:
+        self._incoming.put_nowait({"type": "websocket.disconnect", "code": code})
+
+    async def accept(self, subprotocol: str | None = None) -> None:
+        self.is_accepted = True
+        self.accepted_subprotocol = subprotocol
+
+    async def receive(self) -> dict[str, Any]:
+        return await self._incoming.get()
+
+    async def send_text(self, data: str) -> None:
+        self.sent.append(data)
+
+    async def send_bytes(self, data: bytes) -> None:
+        self.sent.append(data)
+
+    async def close(self, code: int = 1000, reason: str | None = None) -> None:
+        self.close_code = code
+        self.push_disconnect(code)
@@ -0,0 +1,181 @@
+import asyncio
+import re
+import time
+from collections.abc import AsyncIterator, Sequence
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from typing import Any, TypedDict
+
+from google.genai import types
+
+# 応答のテキストの先頭に埋め込む送信時刻（UNIX時間）。クライアント側でレイテンシの計算に使う
+TEXT_STAMP_PATTERN = re.compile(r"\[t=(\d+\.\d+)\]")
+
+
+class ScriptedText(TypedDict):
+    text: str
+    delay_seconds: float
+
+
+class ScriptedAudio(TypedDict):
+    audio: bytes
+    delay_seconds: float
+
+
+class ScriptedToolCall(TypedDict):
+    name: str
+    args: dict[str, Any]
+    delay_seconds: float
+
+
+ScriptedStep = ScriptedText | ScriptedAudio | ScriptedToolCall
+
+
+def stamp_text(text: str) -> str:
+    return f"[t={time.time():.6f}]{text}"
+
+
+def read_text_stamp(text: str) -> float | None:
+    """テキストに埋め込まれた最初の送信時刻を返す"""
+    match = TEXT_STAMP_PATTERN.search(text)
+    return float(match.group(1)) if match else None
+
+
+class ScriptedLiveSession:
+    """
+    google.genai.live.AsyncSession の代わりに、台本通りの応答を返すテストダブル。 \n
+    ユーザーのターンの終了（end_of_turn のテキスト、または turn_gap_seconds 以上音声が途切れた時）を検出すると、
+    次の台本の手順を delay_seconds の間隔で返し、最後に turn_complete を返す。 \n
+    関数呼び出しの手順では tool_call を返した後、関数呼び出しの結果が送信されるまで待つ。
+    """
+
+    def __init__(
+        self,
+        scripts: Sequence[Sequence[ScriptedStep]],
+        turn_gap_seconds: float = 0.3,
+        tool_response_timeout_seconds: float = 10.0,
+    ) -> None:
+        self._scripts = scripts
+        self._turn_gap_seconds = turn_gap_seconds
+        self._tool_response_timeout_seconds = tool_response_timeout_seconds
+        self._turn_count = 0
+        self._pending_text_turns = 0
+        self._last_audio_at: float | None = None
+        self._input_received = asyncio.Event()
+        self._tool_responses: asyncio.Queue[Any] = asyncio.Queue()
+        self.received_audio_bytes = 0
+        self.received_images = 0
+        self.tool_responses: list[Any] = []
+
+    async def send(self, *, input: Any, end_of_turn: bool | None = False) -> None:
+        if isinstance(input, str):
+            if end_of_turn:
+                self._pending_text_turns += 1
+        elif isinstance(input, list):
+            self.tool_responses.append(input)
+            self._tool_responses.put_nowait(input)
+        elif input["mime_type"] == "audio/pcm":
+            self.received_audio_bytes += len(input["data"])
+            self._last_audio_at = asyncio.get_running_loop().time()
+        else:
+            self.received_images += 1
+        self._input_received.set()
+
+    async def receive(self) -> AsyncIterator[types.LiveServerMessage]:
+        await self._wait_for_user_turn()
+        script = self._scripts[self._turn_count % len(self._scripts)]
+        self._turn_count += 1
+
+        for index, step in enumerate(script):
+            await asyncio.sleep(step["delay_seconds"])
+            if "text" in step:
+                yield self._model_turn(types.Part(text=stamp_text(step["text"])))
+            elif "audio" in step:
+                yield self._model_turn(
+                    types.Part(
+                        inline_data=types.Blob(
+                            mime_type="audio/pcm;rate=24000", data=step["audio"]
+                        )
+                    )
+                )
+            else:
+                call_id = f"call-{self._turn_count}-{index}"
+                yield types.LiveServerMessage(
+                    tool_call=types.LiveServerToolCall(
+                        function_calls=[
+                            types.FunctionCall(
+                                id=call_id, name=step["name"], args=step["args"]
+                            )
+                        ]
+                    )
+                )
+                async with asyncio.timeout(self._tool_response_timeout_seconds):
+                    await self._tool_responses.get()
+
+        yield types.LiveServerMessage(
+            server_content=types.LiveServerContent(turn_complete=True)
+        )
+
+    async def _wait_for_user_turn(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            if self._pending_text_turns > 0:
+                self._pending_text_turns -= 1
+                return
+
+            timeout = None
+            if self._last_audio_at is not None:
+                timeout = self._last_audio_at + self._turn_gap_seconds - loop.time()
+                if timeout <= 0:
+                    self._last_audio_at = None
+                    return
+
+            self._input_received.clear()
+            try:
+                await asyncio.wait_for(self._input_received.wait(), timeout)
+            except TimeoutError:
+                pass
+
+    @staticmethod
+    def _model_turn(part: types.Part) -> types.LiveServerMessage:
+        return types.LiveServerMessage(
+            server_content=types.LiveServerContent(
+                model_turn=types.Content(role="model", parts=[part])
+            )
+        )
+
+
+class ScriptedLiveServer:
+    """
+    client.aio.live.connect の代わりに ScriptedLiveSession に接続するテストダブル。 \n
+    scripts はターン毎の台本で、ターン毎に先頭から順番に繰り返して使う。
+    """
+
+    def __init__(
+        self,
+        scripts: Sequence[Sequence[ScriptedStep]],
+        connect_latency_seconds: float = 0.0,
+        turn_gap_seconds: float = 0.3,
+    ) -> None:
+        self.scripts = scripts
+        self.connect_latency_seconds = connect_latency_seconds
+        self.turn_gap_seconds = turn_gap_seconds
+        self.connect_count = 0
+        self.open_sessions: list[ScriptedLiveSession] = []
+
+    @asynccontextmanager
+    async def connect(self, **kwargs: Any) -> AsyncIterator[ScriptedLiveSession]:
+        self.connect_count += 1
+        if self.connect_latency_seconds:
+            await asyncio.sleep(self.connect_latency_seconds)
+
+        session = ScriptedLiveSession(self.scripts, self.turn_gap_seconds)
+        self.open_sessions.append(session)
+        try:
+            yield session
+        finally:
+            self.open_sessions.remove(session)
+
+    def create_client(self) -> Any:
+        """genai.Client の代わりに使う（client.aio.live.connect がこのサーバーに接続する）"""
+        return SimpleNamespace(aio=SimpleNamespace(live=self))
@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+
+from infrastructure import gemini_client
+
+
+@pytest.mark.asyncio
+async def test_client_is_created_once_outside_event_loop(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    created_in: list[str] = []
+
+    def create_client() -> object:
+        created_in.append("thread" if not _in_event_loop() else "loop")
+        return object()
+
+    monkeypatch.setattr(gemini_client, "_gemini_client", None)
+    monkeypatch.setattr(gemini_client, "_create_lock", None)
+    monkeypatch.setattr(gemini_client, "_create_gemini_client", create_client)
+
+    clients = await asyncio.gather(
+        *(gemini_client.get_gemini_client() for _ in range(3))
+    )
+
+    assert created_in == ["thread"]
+    assert clients[0] is clients[1] is clients[2]
+
+
+def _in_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
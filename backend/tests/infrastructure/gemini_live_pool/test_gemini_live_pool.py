@@ -0,0 +1,110 @@
+import asyncio
+from collections.abc import Callable
+
+import pytest
+
+from infrastructure.gemini_live_pool import GeminiLivePool
+from tests.fakes.fake_live_server import FakeLiveServer
+from tests.fakes.fake_live_session import FakeLiveSession
+
+
+async def wait_until(predicate: Callable[[], bool], timeout: float = 1.0) -> None:
+    async with asyncio.timeout(timeout):
+        while not predicate():
+            await asyncio.sleep(0.001)
+
+
+@pytest.mark.asyncio
+async def test_acquire_hands_out_prewarmed_session():
+    fake_server = FakeLiveServer(connect_latency_seconds=0.05)
+    pool: GeminiLivePool[FakeLiveSession] = GeminiLivePool(fake_server.connect, size=1)
+    pool.start()
+    await wait_until(lambda: pool.stats["pool_size"] == 1)
+
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+    async with pool.acquire() as session:
+        # 接続を待たずにセッションが渡される
+        assert loop.time() - started_at < 0.05
+        assert session in fake_server.open_sessions
+
+    assert session not in fake_server.open_sessions
+    # 使ったセッションは使い回さずに新しいセッションを補充する
+    await wait_until(lambda: pool.stats["pool_size"] == 1)
+    assert fake_server.connect_count == 2
+    assert pool.stats["hits"] == 1
+    assert pool.stats["misses"] == 0
+
+    await pool.close()
+    assert fake_server.open_sessions == []
+
+
+@pytest.mark.asyncio
+async def test_acquire_connects_when_pool_is_empty():
+    fake_server = FakeLiveServer()
+    pool: GeminiLivePool[FakeLiveSession] = GeminiLivePool(fake_server.connect, size=0)
+
+    async with pool.acquire() as session:
+        assert session in fake_server.open_sessions
+
+    assert pool.stats["misses"] == 1
+    assert fake_server.open_sessions == []
+
+
+@pytest.mark.asyncio
+async def test_idle_sessions_are_replaced_after_max_idle():
+    fake_server = FakeLiveServer()
+    pool: GeminiLivePool[FakeLiveSession] = GeminiLivePool(
+        fake_server.connect, size=1, max_idle_seconds=0.02, check_interval_seconds=0.01
+    )
+    pool.start()
+
+    await wait_until(lambda: pool.stats["evicted"] >= 2)
+
+    assert len(fake_server.open_sessions) <= 1
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_expire_idle_reconnects_prewarmed_sessions():
+    fake_server = FakeLiveServer()
+    pool: GeminiLivePool[FakeLiveSession] = GeminiLivePool(
+        fake_server.connect, size=1, check_interval_seconds=0.01
+    )
+    pool.start()
+    await wait_until(lambda: pool.stats["pool_size"] == 1)
+    prewarmed = fake_server.open_sessions[0]
+
+    # 接続の設定を変更した場合は、変更前に接続したセッションを渡さずに接続し直す
+    pool.expire_idle()
+    async with pool.acquire() as session:
+        assert session is not prewarmed
+
+    assert prewarmed not in fake_server.open_sessions
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_connects_are_retried_in_background():
+    fake_server = FakeLiveServer(fail_connects=2)
+    pool: GeminiLivePool[FakeLiveSession] = GeminiLivePool(
+        fake_server.connect, size=1, retry_backoff_seconds=0.001
+    )
+    pool.start()
+
+    await wait_until(lambda: pool.stats["pool_size"] == 1)
+
+    assert pool.stats["connect_failures"] == 2
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_acquire_raises_when_connect_fails():
+    fake_server = FakeLiveServer(fail_connects=1)
+    pool: GeminiLivePool[FakeLiveSession] = GeminiLivePool(fake_server.connect, size=0)
+
+    with pytest.raises(ConnectionError):
+        async with pool.acquire():
+            pass
+
+    assert pool.stats["connect_failures"] == 1
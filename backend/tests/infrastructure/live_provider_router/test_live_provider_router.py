@@ -0,0 +1,95 @@
+import pytest
+
+from infrastructure.live_provider_router import LiveProvider, LiveProviderRouter
+from tests.fakes.fake_live_server import FakeLiveServer
+from tests.fakes.fake_live_session import FakeLiveSession
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def create_provider(
+    name: str, server: FakeLiveServer
+) -> LiveProvider[FakeLiveSession, None]:
+    return LiveProvider(name, name, lambda config: server.connect())
+
+
+async def connect_provider(router: LiveProviderRouter[FakeLiveSession, None]) -> str:
+    async with router.connect(None) as routed:
+        return routed.provider
+
+
+@pytest.mark.asyncio
+async def test_sessions_are_routed_to_fastest_provider():
+    slow = FakeLiveServer(connect_latency_seconds=0.05)
+    fast = FakeLiveServer(connect_latency_seconds=0.01)
+    router = LiveProviderRouter(
+        [create_provider("slow", slow), create_provider("fast", fast)],
+        explore_rate=0,
+    )
+
+    # 計測値の無いプロバイダーは設定の順番で1回ずつ試す
+    assert [await connect_provider(router) for _ in range(3)] == [
+        "slow",
+        "fast",
+        "fast",
+    ]
+
+    # 接続が速くても最初の応答が遅いプロバイダーは後回しにする
+    router.observe_first_token("fast", 1.0)
+    router.observe_first_token("slow", 0.2)
+    assert await connect_provider(router) == "slow"
+    assert slow.open_sessions == [] and fast.open_sessions == []
+
+
+@pytest.mark.asyncio
+async def test_failing_provider_is_failed_over_and_skipped_until_cooldown():
+    clock = FakeClock()
+    failing = FakeLiveServer(fail_connects=10)
+    healthy = FakeLiveServer()
+    router = LiveProviderRouter(
+        [create_provider("failing", failing), create_provider("healthy", healthy)],
+        failure_threshold=2,
+        cooldown_seconds=30,
+        explore_rate=0,
+        clock=clock,
+    )
+    unavailable: list[bool] = []
+    router.subscribe(lambda: unavailable.append(True))
+
+    # 接続に失敗したら次のプロバイダーに接続する
+    assert await connect_provider(router) == "healthy"
+    assert await connect_provider(router) == "healthy"
+    assert failing.connect_count == 2
+    assert unavailable == [True]
+
+    # 連続して失敗したプロバイダーは一定時間使わない
+    assert await connect_provider(router) == "healthy"
+    assert failing.connect_count == 2
+
+    # 使わない期間の後に再び失敗したら、前回の倍の期間使わない
+    clock.now = 31
+    assert await connect_provider(router) == "healthy"
+    assert failing.connect_count == 3
+    assert unavailable == [True, True]
+    clock.now = 31 + 59
+    assert [stats["available"] for stats in router.stats] == [False, True]
+
+
+@pytest.mark.asyncio
+async def test_last_error_is_raised_when_every_provider_fails():
+    router = LiveProviderRouter(
+        [
+            create_provider("a", FakeLiveServer(fail_connects=1)),
+            create_provider("b", FakeLiveServer(fail_connects=1)),
+        ]
+    )
+
+    with pytest.raises(ConnectionError):
+        await connect_provider(router)
+    assert [stats["failures"] for stats in router.stats] == [1, 1]
@@ -0,0 +1,178 @@
+import asyncio
+
+import httpx
+import pytest
+
+from infrastructure.nijivoice_tts_client import (
+    LatencyTracker,
+    NijivoiceTtsClient,
+    TtsDeadlineExceeded,
+    TtsError,
+)
+from infrastructure.tts_cache import TtsCache
+from tests.fakes.fake_tts_server import FakeTtsServer
+
+
+@pytest.mark.asyncio
+async def test_synthesize_returns_base64_audio():
+    fake_server = FakeTtsServer()
+    client = NijivoiceTtsClient(http_client=fake_server.create_http_client())
+
+    actual = await client.synthesize("こんにちはだにゃん🐱")
+
+    assert actual == FakeTtsServer.encode_audio("こんにちはだにゃん🐱")
+    assert fake_server.request_count == 1
+
+
+@pytest.mark.asyncio
+async def test_synthesize_retries_on_server_error():
+    fake_server = FakeTtsServer(failure_status_codes=[503, 500])
+    client = NijivoiceTtsClient(
+        http_client=fake_server.create_http_client(),
+        max_retries=2,
+        retry_backoff_seconds=0,
+    )
+
+    actual = await client.synthesize("おもちだにゃん")
+
+    assert actual == FakeTtsServer.encode_audio("おもちだにゃん")
+    assert fake_server.request_count == 3
+
+
+@pytest.mark.asyncio
+async def test_synthesize_does_not_retry_on_client_error():
+    fake_server = FakeTtsServer(failure_status_codes=[400])
+    client = NijivoiceTtsClient(
+        http_client=fake_server.create_http_client(),
+        retry_backoff_seconds=0,
+    )
+
+    with pytest.raises(TtsError):
+        await client.synthesize("おもちだにゃん")
+
+    assert fake_server.request_count == 1
+
+
+@pytest.mark.asyncio
+async def test_synthesize_raises_tts_error_on_timeout():
+    fake_server = FakeTtsServer(latency_seconds=1.0)
+    client = NijivoiceTtsClient(
+        http_client=fake_server.create_http_client(),
+        timeout_seconds=0.01,
+        max_retries=0,
+    )
+
+    with pytest.raises(TtsError):
+        await asyncio.wait_for(client.synthesize("おもちだにゃん"), timeout=0.5)
+
+
+@pytest.mark.asyncio
+async def test_synthesize_limits_concurrency():
+    fake_server = FakeTtsServer(latency_seconds=0.02)
+    client = NijivoiceTtsClient(
+        http_client=fake_server.create_http_client(),
+        max_concurrency=2,
+    )
+
+    await asyncio.gather(*(client.synthesize(f"script{i}") for i in range(6)))
+
+    assert fake_server.request_count == 6
+    assert fake_server.max_in_flight == 2
+
+
+@pytest.mark.asyncio
+async def test_synthesize_reuses_cached_audio():
+    fake_server = FakeTtsServer(failure_status_codes=[400])
+    client = NijivoiceTtsClient(
+        http_client=fake_server.create_http_client(), cache=TtsCache()
+    )
+
+    # 失敗した結果はキャッシュしない
+    with pytest.raises(TtsError):
+        await client.synthesize("おもちはねこだから分からないにゃん🐱")
+    first = await client.synthesize("おもちはねこだから分からないにゃん🐱")
+    second = await client.synthesize("おもちはねこだから分からないにゃん🐱")
+
+    assert first == second
+    assert fake_server.request_count == 2
+
+
+@pytest.mark.asyncio
+async def test_slow_request_is_hedged_and_loser_is_cancelled():
+    # 1つ目のリクエストだけ遅く、2つ目は速く応答する
+    latencies = iter([1.0, 0.01])
+    fake_server = FakeTtsServer(latency_seconds=lambda script: next(latencies))
+    client = NijivoiceTtsClient(
+        http_client=fake_server.create_http_client(),
+        hedge_initial_delay_seconds=0.05,
+    )
+
+    started_at = asyncio.get_running_loop().time()
+    actual = await client.synthesize("おもちだにゃん")
+
+    assert actual == FakeTtsServer.encode_audio("おもちだにゃん")
+    assert asyncio.get_running_loop().time() - started_at < 0.5
+    assert fake_server.request_count == 2
+    # 遅い方のリクエストはキャンセルされている
+    assert fake_server.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_only_completed_primary_latency_is_observed(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    observed: list[float] = []
+    monkeypatch.setattr(
+        LatencyTracker, "observe", lambda self, seconds: observed.append(seconds)
+    )
+    latencies = iter([0.01, 1.0, 0.01])
+    fake_server = FakeTtsServer(latency_seconds=lambda script: next(latencies))
+    client = NijivoiceTtsClient(
+        http_client=fake_server.create_http_client(),
+        hedge_initial_delay_seconds=0.05,
+    )
+
+    await client.synthesize("おもちだにゃん")
+    assert len(observed) == 1
+
+    # 2つ目のリクエストが先に成功した場合は、キャンセルした1つ目の途中までの時間を記録しない
+    await client.synthesize("おもちだにゃん")
+    assert len(observed) == 1
+
+
+@pytest.mark.asyncio
+async def test_synthesize_raises_tts_error_on_invalid_json():
+    client = NijivoiceTtsClient(
+        http_client=httpx.AsyncClient(
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(200, content=b"<html>")
+            )
+        )
+    )
+
+    with pytest.raises(TtsError):
+        await client.synthesize("おもちだにゃん")
+
+
+def test_hedge_delay_follows_latency_percentile():
+    tracker = LatencyTracker(
+        percentile=0.9, min_delay_seconds=0.1, initial_delay_seconds=2, min_samples=10
+    )
+    assert tracker.hedge_delay() == 2
+
+    for seconds in [0.2] * 9 + [5.0]:
+        tracker.observe(seconds)
+    assert tracker.hedge_delay() == 0.2
+    assert LatencyTracker(percentile=0, min_delay_seconds=0).hedge_delay() is None
+
+
+@pytest.mark.asyncio
+async def test_synthesize_raises_deadline_exceeded():
+    fake_server = FakeTtsServer(latency_seconds=1.0)
+    client = NijivoiceTtsClient(http_client=fake_server.create_http_client())
+
+    with pytest.raises(TtsDeadlineExceeded):
+        await client.synthesize(
+            "おもちだにゃん", deadline=asyncio.get_running_loop().time() + 0.02
+        )
+    assert fake_server.in_flight == 0
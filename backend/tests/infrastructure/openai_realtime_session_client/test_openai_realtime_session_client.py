@@ -0,0 +1,195 @@
+import asyncio
+import json
+import time
+from collections.abc import Callable
+
+import pytest
+
+from infrastructure.openai_realtime_session_client import (
+    EphemeralTokenBuffer,
+    OpenAiRealtimeSessionClient,
+    OpenAiSessionError,
+)
+from infrastructure.shared_store import InMemorySharedStore
+from tests.fakes.fake_openai_session_server import FakeOpenAiSessionServer
+
+
+def create_session_client(
+    fake_server: FakeOpenAiSessionServer,
+) -> OpenAiRealtimeSessionClient:
+    return OpenAiRealtimeSessionClient(
+        instructions="あなたはねこです",
+        http_client=fake_server.create_http_client(),
+        api_key="test-api-key",
+    )
+
+
+class FakeClock:
+    def __init__(self, now: float) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def wait_until(predicate: Callable[[], bool], timeout: float = 1.0) -> None:
+    async with asyncio.timeout(timeout):
+        while not predicate():
+            await asyncio.sleep(0.001)
+
+
+@pytest.mark.asyncio
+async def test_create_session_returns_ephemeral_token():
+    fake_server = FakeOpenAiSessionServer()
+    client = create_session_client(fake_server)
+
+    token = await client.create_session()
+
+    assert token["value"] == "token-1"
+    assert fake_server.authorization_headers == ["Bearer test-api-key"]
+
+
+@pytest.mark.asyncio
+async def test_set_instructions_changes_following_sessions():
+    fake_server = FakeOpenAiSessionServer()
+    session_client = create_session_client(fake_server)
+
+    await session_client.create_session()
+    session_client.set_instructions("あなたはいぬです")
+    await session_client.create_session()
+
+    assert fake_server.instructions == ["あなたはねこです", "あなたはいぬです"]
+
+
+@pytest.mark.asyncio
+async def test_create_session_raises_on_error_response():
+    fake_server = FakeOpenAiSessionServer(failure_status_codes=[500])
+    client = create_session_client(fake_server)
+
+    with pytest.raises(OpenAiSessionError):
+        await client.create_session()
+
+
+@pytest.mark.asyncio
+async def test_buffer_serves_prefetched_tokens_once():
+    fake_server = FakeOpenAiSessionServer(latency_seconds=0.05)
+    buffer = EphemeralTokenBuffer(create_session_client(fake_server), size=2)
+    buffer.start()
+    await wait_until(lambda: buffer.stats["buffer_size"] == 2)
+
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+    first = await buffer.get()
+    second = await buffer.get()
+
+    # APIの応答を待たずにメモリから返す
+    assert loop.time() - started_at < 0.05
+    assert [first["value"], second["value"]] == ["token-1", "token-2"]
+    assert buffer.stats["hits"] == 2
+
+    # 取得された分は裏で補充される
+    await wait_until(lambda: buffer.stats["buffer_size"] == 2)
+    assert fake_server.request_count == 4
+    await buffer.close()
+
+
+@pytest.mark.asyncio
+async def test_buffer_discards_tokens_close_to_expiry():
+    fake_server = FakeOpenAiSessionServer(token_ttl_seconds=60)
+    clock = FakeClock(time.time())
+    buffer = EphemeralTokenBuffer(
+        create_session_client(fake_server),
+        size=1,
+        min_remaining_seconds=20,
+        clock=clock,
+    )
+    buffer.start()
+    await wait_until(lambda: buffer.stats["buffer_size"] == 1)
+
+    # 有効期限まで20秒を切ったトークンは渡さずにその場で作成し直す
+    clock.now += 45
+    fake_server.token_ttl_seconds = 120
+    token = await buffer.get()
+
+    assert token["value"] != "token-1"
+    assert buffer.stats["expired"] == 1
+    assert buffer.stats["misses"] == 1
+    await buffer.close()
+
+
+@pytest.mark.asyncio
+async def test_buffer_creates_token_on_demand_when_empty():
+    fake_server = FakeOpenAiSessionServer()
+    buffer = EphemeralTokenBuffer(create_session_client(fake_server), size=0)
+
+    token = await buffer.get()
+
+    assert token["value"] == "token-1"
+    assert buffer.stats["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_buffer_is_shared_between_workers_through_store():
+    fake_server = FakeOpenAiSessionServer()
+    store = InMemorySharedStore()
+    prefetching_buffer = EphemeralTokenBuffer(
+        create_session_client(fake_server), size=2, store=store
+    )
+    other_worker_buffer = EphemeralTokenBuffer(
+        create_session_client(fake_server), size=0, store=store
+    )
+    prefetching_buffer.start()
+    await wait_until(lambda: prefetching_buffer.stats["buffer_size"] == 2)
+
+    # 他のワーカーのバッファからも事前に作成したトークンを取得できる
+    token = await other_worker_buffer.get()
+
+    assert token["value"] in ("token-1", "token-2")
+    assert other_worker_buffer.stats["hits"] == 1
+    await prefetching_buffer.close()
+    # 共有ストアのトークンは停止時に削除しない
+    assert await store.llen("openai:ephemeral_tokens") >= 1
+
+
+@pytest.mark.asyncio
+async def test_buffer_discards_tokens_created_with_previous_prompt():
+    fake_server = FakeOpenAiSessionServer()
+    session_client = create_session_client(fake_server)
+    buffer = EphemeralTokenBuffer(session_client, size=2, check_interval_seconds=60)
+    buffer.start()
+    await wait_until(lambda: buffer.stats["buffer_size"] == 2)
+
+    # プロンプトを読み込み直したら、変更前のプロンプトで作成したトークンは渡さない
+    session_client.set_instructions("あなたはいぬです")
+    buffer.expire_stale()
+    await wait_until(
+        lambda: buffer.stats["stale"] == 2 and buffer.stats["buffer_size"] == 2
+    )
+    token = await buffer.get()
+
+    request_number = int(token["value"].removeprefix("token-"))
+    assert fake_server.instructions[request_number - 1] == "あなたはいぬです"
+    assert buffer.stats["stale"] == 2
+    assert buffer.stats["hits"] == 1
+    await buffer.close()
+
+
+@pytest.mark.asyncio
+async def test_buffer_discards_stale_tokens_left_by_other_workers():
+    fake_server = FakeOpenAiSessionServer()
+    store = InMemorySharedStore()
+    other_worker_client = create_session_client(fake_server)
+    await store.rpush(
+        "openai:ephemeral_tokens",
+        json.dumps(await other_worker_client.create_session()),
+    )
+    session_client = create_session_client(fake_server)
+    session_client.set_instructions("あなたはいぬです")
+    buffer = EphemeralTokenBuffer(session_client, size=0, store=store)
+
+    token = await buffer.get()
+
+    assert token["value"] == "token-2"
+    assert fake_server.instructions[1] == "あなたはいぬです"
+    assert buffer.stats["stale"] == 1
+    assert buffer.stats["misses"] == 1
@@ -0,0 +1,152 @@
+from collections.abc import AsyncIterator
+
+import pytest
+import pytest_asyncio
+
+from infrastructure.shared_store import (
+    InMemorySharedStore,
+    RedisSharedStore,
+    SharedStore,
+    SharedStoreError,
+    create_shared_store,
+)
+from tests.fakes.fake_redis_server import FakeRedisServer
+
+
+class FakeClock:
+    def __init__(self, now: float) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest_asyncio.fixture(params=["memory", "redis"])
+async def store(request: pytest.FixtureRequest) -> AsyncIterator[SharedStore]:
+    if request.param == "memory":
+        yield InMemorySharedStore()
+        return
+
+    fake_server = FakeRedisServer()
+    await fake_server.start()
+    redis_store = RedisSharedStore(fake_server.url)
+    yield redis_store
+    await redis_store.close()
+    await fake_server.close()
+
+
+@pytest.mark.asyncio
+async def test_store_supports_counters_hashes_and_lists(store: SharedStore):
+    assert await store.get("missing") is None
+    await store.set("key", "value")
+    assert await store.get("key") == "value"
+    await store.delete("key")
+    assert await store.get("key") is None
+
+    assert [await store.incr("counter") for _ in range(3)] == [1, 2, 3]
+
+    await store.hset("hash", "a", "1")
+    await store.hset("hash", "b", "2")
+    await store.hdel("hash", "a")
+    assert await store.hgetall("hash") == {"b": "2"}
+    assert await store.hgetall("missing") == {}
+
+    assert await store.rpush("list", "b") == 1
+    assert await store.rpush("list", "c") == 2
+    assert await store.lpush("list", "a") == 3
+    assert await store.llen("list") == 3
+    assert [await store.lpop("list") for _ in range(4)] == ["a", "b", "c", None]
+    assert await store.llen("list") == 0
+
+
+@pytest.mark.asyncio
+async def test_store_throttles_with_gcra(store: SharedStore):
+    # 10秒毎に1回、連続して2回まで許可する
+    assert await store.throttle("t", now=100, interval_seconds=10, burst=2) == 0
+    assert await store.throttle("t", now=100, interval_seconds=10, burst=2) == 0
+    assert await store.throttle("t", now=100, interval_seconds=10, burst=2) == 10
+    # 拒否した場合は状態を更新しない
+    assert await store.throttle("t", now=104, interval_seconds=10, burst=2) == 6
+    assert await store.throttle("t", now=110, interval_seconds=10, burst=2) == 0
+    assert await store.throttle("t", now=110, interval_seconds=10, burst=2) == 10
+
+
+@pytest.mark.asyncio
+async def test_in_memory_store_expires_keys():
+    clock = FakeClock(100.0)
+    store = InMemorySharedStore(clock=clock)
+
+    await store.set("token", "value", ttl_seconds=10)
+    assert await store.incr("window", ttl_seconds=10) == 1
+    clock.now += 5
+    # 有効期限は作成した時だけ設定する
+    assert await store.incr("window", ttl_seconds=10) == 2
+    clock.now += 5
+
+    assert await store.get("token") is None
+    assert await store.incr("window", ttl_seconds=10) == 1
+
+
+@pytest.mark.asyncio
+async def test_redis_store_authenticates_and_sets_expiry():
+    fake_server = FakeRedisServer(password="secret")
+    await fake_server.start()
+    store = RedisSharedStore(fake_server.url)
+
+    await store.set("token", "value", ttl_seconds=1.5)
+    await store.incr("window", ttl_seconds=60)
+    await store.incr("window", ttl_seconds=60)
+
+    assert fake_server.commands[0] == ["AUTH", "secret"]
+    assert fake_server.expirations == {"token": 1500, "window": 60000}
+    # 有効期限付きでカウンターを作成してから増やす
+    assert fake_server.commands[-4:] == [
+        ["MULTI"],
+        ["SET", "window", "0", "PX", "60000", "NX"],
+        ["INCR", "window"],
+        ["EXEC"],
+    ]
+    assert fake_server.values["window"] == "2"
+    await store.close()
+    await fake_server.close()
+
+
+@pytest.mark.asyncio
+async def test_redis_store_reconnects_after_connection_is_lost():
+    fake_server = FakeRedisServer()
+    await fake_server.start()
+    port = fake_server.port
+    store = RedisSharedStore(fake_server.url, timeout_seconds=0.5)
+    await store.set("key", "value")
+    await fake_server.close()
+
+    with pytest.raises(SharedStoreError):
+        await store.get("key")
+
+    # 同じポートでサーバーが復旧したら次のコマンドで接続し直す
+    restarted = FakeRedisServer()
+    await restarted.start(port)
+    await store.set("key", "value")
+    assert await store.get("key") == "value"
+    await store.close()
+    await restarted.close()
+
+
+@pytest.mark.asyncio
+async def test_redis_store_raises_on_error_reply():
+    fake_server = FakeRedisServer(password="secret")
+    await fake_server.start()
+    store = RedisSharedStore(fake_server.url.replace("secret", "wrong"))
+
+    with pytest.raises(SharedStoreError):
+        await store.get("key")
+    await store.close()
+    await fake_server.close()
+
+
+def test_create_shared_store_selects_implementation_by_url():
+    assert isinstance(create_shared_store(""), InMemorySharedStore)
+    assert isinstance(create_shared_store("memory://"), InMemorySharedStore)
+    assert isinstance(create_shared_store("redis://localhost:6379/0"), RedisSharedStore)
+    with pytest.raises(ValueError):
+        create_shared_store("memcached://localhost")
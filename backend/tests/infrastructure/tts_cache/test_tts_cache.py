@@ -0,0 +1,47 @@
+from pathlib import Path
+
+import pytest
+
+from infrastructure.tts_cache import TtsCache, tts_cache_key
+
+
+def test_key_ignores_width_and_whitespace_differences():
+    key = tts_cache_key("おもちだにゃん！ ", "voice", "wav", "0.8")
+
+    assert tts_cache_key("おもちだにゃん!", "voice", "wav", "0.8") == key
+    assert tts_cache_key("おもちだにゃん！", "voice", "wav", "1.0") != key
+    assert tts_cache_key("おもちだにゃん！", "other", "wav", "0.8") != key
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_entries_are_evicted_by_size():
+    cache = TtsCache(max_bytes=10)
+    await cache.put("a", "aaaa")
+    await cache.put("b", "bbbb")
+    assert await cache.get("a") == "aaaa"
+
+    # 上限を超えたら最も長く使われていない b から破棄する
+    await cache.put("c", "cccc")
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == "aaaa"
+    assert cache.stats == {
+        "memory_hits": 2,
+        "disk_hits": 0,
+        "misses": 1,
+        "entries": 2,
+        "bytes": 8,
+        "evictions": 1,
+    }
+
+
+@pytest.mark.asyncio
+async def test_disk_store_survives_memory_eviction(tmp_path: Path):
+    await TtsCache(max_bytes=0, disk_dir=str(tmp_path)).put("key", "audio")
+
+    # 別のプロセス（新しいキャッシュ）からもファイルから読み込める
+    cache = TtsCache(disk_dir=str(tmp_path))
+    assert await cache.get("key") == "audio"
+    assert await cache.get("key") == "audio"
+    assert cache.stats["disk_hits"] == 1
+    assert cache.stats["memory_hits"] == 1
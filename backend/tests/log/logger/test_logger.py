@@ -0,0 +1,91 @@
+import io
+import json
+import logging
+from queue import Queue
+
+from log.logger import (
+    BoundedQueueHandler,
+    DrainingQueueListener,
+    JsonFormatter,
+    SamplingFilter,
+    configure_logging,
+    flush_logs,
+)
+
+
+def create_record(level: int = logging.INFO, **extra: object) -> logging.LogRecord:
+    record = logging.LogRecord(
+        "test", level, __file__, 10, "hello %s", ("world",), None, func="test"
+    )
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_outputs_allowlisted_fields_only():
+    record = create_record(info_message="info", secret="do not log")
+
+    data = json.loads(JsonFormatter().format(record))
+
+    assert data["msg"] == "hello world"
+    assert data["levelname"] == "INFO"
+    assert data["info_message"] == "info"
+    assert "secret" not in data
+    assert "args" not in data
+
+
+def test_queue_handler_drops_records_when_full():
+    handler = BoundedQueueHandler(Queue(maxsize=2))
+
+    for _ in range(5):
+        handler.handle(create_record())
+
+    assert handler.enqueued == 2
+    assert handler.dropped == 3
+
+
+def test_queue_handler_does_not_format_on_caller():
+    queue: Queue[logging.LogRecord] = Queue()
+    handler = BoundedQueueHandler(queue)
+
+    handler.handle(create_record())
+
+    record = queue.get_nowait()
+    assert record.msg == "hello %s"
+    assert record.args == ("world",)
+
+
+def test_sampling_filter_keeps_every_nth_record_and_all_warnings():
+    sampling_filter = SamplingFilter(sample_every=3)
+
+    kept = [sampling_filter.filter(create_record()) for _ in range(7)]
+
+    assert kept == [True, False, False, True, False, False, True]
+    assert sampling_filter.sampled_out == 4
+    assert sampling_filter.filter(create_record(logging.WARNING)) is True
+
+
+def test_listener_drains_full_queue_on_stop():
+    queue: Queue[logging.LogRecord] = Queue(maxsize=2)
+    stream = io.StringIO()
+    stream_handler = logging.StreamHandler(stream)
+    stream_handler.setFormatter(JsonFormatter())
+    queue.put_nowait(create_record())
+    queue.put_nowait(create_record())
+    listener = DrainingQueueListener(queue, stream_handler)
+
+    listener.start()
+    listener.stop()
+
+    assert len(stream.getvalue().splitlines()) == 2
+
+
+def test_logs_are_written_by_listener_thread():
+    stream = io.StringIO()
+    logger = configure_logging(stream=stream)
+    try:
+        logger.info("listener %d", 1)
+        flush_logs()
+
+        assert json.loads(stream.getvalue())["msg"] == "listener 1"
+    finally:
+        configure_logging()
@@ -0,0 +1,93 @@
+import pytest
+
+from log.metrics import MetricsRegistry, metrics_registry
+
+
+def test_histogram_renders_cumulative_buckets_per_label():
+    registry = MetricsRegistry()
+    histogram = registry.histogram(
+        "span_seconds", "所要時間", label_name="span", buckets=(0.1, 1.0)
+    )
+
+    histogram.observe("tts", 0.05)
+    histogram.observe("tts", 0.1)
+    histogram.observe("tts", 3.0)
+    histogram.observe("send", 0.5)
+
+    assert registry.render().splitlines() == [
+        "# HELP span_seconds 所要時間",
+        "# TYPE span_seconds histogram",
+        'span_seconds_bucket{span="send",le="0.1"} 0',
+        'span_seconds_bucket{span="send",le="1.0"} 1',
+        'span_seconds_bucket{span="send",le="+Inf"} 1',
+        'span_seconds_sum{span="send"} 0.5',
+        'span_seconds_count{span="send"} 1',
+        'span_seconds_bucket{span="tts",le="0.1"} 2',
+        'span_seconds_bucket{span="tts",le="1.0"} 2',
+        'span_seconds_bucket{span="tts",le="+Inf"} 3',
+        'span_seconds_sum{span="tts"} 3.15',
+        'span_seconds_count{span="tts"} 3',
+    ]
+
+
+def test_histogram_time_observes_block_duration():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("span_seconds", "所要時間", label_name="span")
+
+    with histogram.time("block"):
+        pass
+
+    assert histogram.count("block") == 1
+
+
+def test_counter_and_gauges_are_rendered():
+    registry = MetricsRegistry()
+    counter = registry.counter("calls_total", "件数", label_name="result")
+    gauge = registry.gauge("sessions", "セッション数")
+    registry.gauge("queued_bytes", "送信待ち", lambda: 128)
+
+    counter.inc("ok")
+    counter.inc("ok")
+    counter.inc('say "hi"')
+    gauge.inc()
+    gauge.inc()
+    gauge.dec()
+
+    lines = registry.render().splitlines()
+    assert 'calls_total{result="ok"} 2.0' in lines
+    assert 'calls_total{result="say \\"hi\\""} 1.0' in lines
+    assert "sessions 1.0" in lines
+    assert "queued_bytes 128.0" in lines
+
+
+def test_counter_can_collect_values_when_rendered():
+    registry = MetricsRegistry()
+    dropped = {"queue_full": 3}
+    counter = registry.counter(
+        "records_dropped_total", "件数", label_name="reason", collect=lambda: dropped
+    )
+
+    dropped["queue_full"] += 1
+
+    lines = registry.render().splitlines()
+    assert "# TYPE records_dropped_total counter" in lines
+    assert 'records_dropped_total{reason="queue_full"} 4.0' in lines
+    assert counter.value("queue_full") == 4
+
+
+def test_application_metrics_expose_dropped_log_records_as_counter():
+    lines = metrics_registry.render().splitlines()
+
+    assert "# TYPE log_records_dropped_total counter" in lines
+    assert any(
+        line.startswith('log_records_dropped_total{reason="queue_full"} ')
+        for line in lines
+    )
+
+
+def test_duplicate_metric_name_is_rejected():
+    registry = MetricsRegistry()
+    registry.gauge("sessions", "セッション数")
+
+    with pytest.raises(ValueError):
+        registry.gauge("sessions", "セッション数")
@@ -0,0 +1,253 @@
+import asyncio
+import json
+from typing import Any
+
+import pytest
+
+from infrastructure.gemini_live_pool import GeminiLivePool
+from infrastructure.live_provider_router import LiveProvider, LiveProviderRouter
+from infrastructure.nijivoice_tts_client import NijivoiceTtsClient
+from infrastructure.shared_store import InMemorySharedStore
+from presentation.controller import video_chat_controller
+from presentation.controller.video_chat_controller import (
+    VideoChatController,
+    create_voice_activity_gate,
+)
+from presentation.rate_limiter import SessionAdmission
+from presentation.resumable_session import session_resumes_total
+from presentation.session_registry import SessionRegistry
+from tests.fakes.fake_tts_server import FakeTtsServer
+from tests.fakes.fake_websocket import FakeWebSocket
+from tests.fakes.scripted_live_server import (
+    ScriptedLiveServer,
+    ScriptedText,
+    read_text_stamp,
+)
+
+
+def sent_messages(websocket: FakeWebSocket) -> list[dict[str, Any]]:
+    return [json.loads(m) for m in websocket.sent if isinstance(m, str)]
+
+
+def use_live_server(
+    monkeypatch: pytest.MonkeyPatch, live_server: ScriptedLiveServer
+) -> None:
+    """事前接続しないプールで ScriptedLiveServer に接続させる"""
+    router = LiveProviderRouter(
+        [LiveProvider("gemini/fake", "fake", lambda config: live_server.connect())]
+    )
+    monkeypatch.setattr(video_chat_controller, "live_router", router)
+    monkeypatch.setattr(
+        video_chat_controller,
+        "live_pool",
+        GeminiLivePool(lambda: router.connect({}), size=0),
+    )
+
+
+def has_end_of_turn(websocket: FakeWebSocket) -> bool:
+    return any(m.get("endOfTurn") for m in sent_messages(websocket))
+
+
+def test_default_vad_hangover_is_scaled_to_seconds():
+    default_gate = create_voice_activity_gate({})
+    custom_gate = create_voice_activity_gate({"vadHangoverMs": "400"})
+
+    assert default_gate is not None and custom_gate is not None
+    assert vars(default_gate) == vars(custom_gate)
+
+
+@pytest.mark.asyncio
+async def test_text_turn_is_answered_and_session_ends_on_disconnect(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    live_server = ScriptedLiveServer(
+        [[ScriptedText(text="こんにちはだにゃん。", delay_seconds=0)]]
+    )
+    tts_client = NijivoiceTtsClient(http_client=FakeTtsServer().create_http_client())
+    use_live_server(monkeypatch, live_server)
+    monkeypatch.setattr(video_chat_controller, "get_tts_client", lambda: tts_client)
+    websocket = FakeWebSocket()
+
+    task = asyncio.create_task(VideoChatController(websocket).exec())
+    websocket.push_text(json.dumps({"inputText": "こんにちは"}))
+    async with asyncio.timeout(2):
+        while not has_end_of_turn(websocket):
+            await asyncio.sleep(0.01)
+
+    texts = [json.loads(m)["text"] for m in websocket.sent if '"text"' in str(m)]
+    assert len(texts) == 1
+    assert read_text_stamp(texts[0]) is not None
+
+    # クライアントが切断したらGeminiからの受信待ちも終了し、セッションを閉じる
+    websocket.push_disconnect()
+    await asyncio.wait_for(task, timeout=2)
+    assert live_server.open_sessions == []
+
+
+@pytest.mark.asyncio
+async def test_session_over_cap_is_rejected_without_connecting_to_gemini(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    live_server = ScriptedLiveServer([])
+    tts_client = NijivoiceTtsClient(http_client=FakeTtsServer().create_http_client())
+    admission = SessionAdmission(max_sessions=1)
+    use_live_server(monkeypatch, live_server)
+    monkeypatch.setattr(video_chat_controller, "get_tts_client", lambda: tts_client)
+    monkeypatch.setattr(video_chat_controller, "live_session_admission", admission)
+    first = FakeWebSocket()
+    second = FakeWebSocket()
+
+    task = asyncio.create_task(VideoChatController(first).exec())
+    async with asyncio.timeout(2):
+        while not live_server.open_sessions:
+            await asyncio.sleep(0.01)
+
+    # 上限を超えたセッションは受け入れずに 1013 で切断する
+    await asyncio.wait_for(VideoChatController(second).exec(), timeout=2)
+    assert not second.is_accepted
+    assert second.close_code == 1013
+    assert len(live_server.open_sessions) == 1
+
+    first.push_disconnect()
+    await asyncio.wait_for(task, timeout=2)
+    assert admission.stats == {"active": 0, "admitted": 1, "rejected": 1}
+
+
+@pytest.mark.asyncio
+async def test_drain_closes_session_after_turn_completes(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    live_server = ScriptedLiveServer(
+        [
+            [
+                ScriptedText(text=f"{i}番目だにゃん。", delay_seconds=0.02)
+                for i in range(3)
+            ]
+        ]
+    )
+    tts_client = NijivoiceTtsClient(http_client=FakeTtsServer().create_http_client())
+    registry = SessionRegistry(InMemorySharedStore(), worker_id="worker-1")
+    use_live_server(monkeypatch, live_server)
+    monkeypatch.setattr(video_chat_controller, "get_tts_client", lambda: tts_client)
+    monkeypatch.setattr(video_chat_controller, "session_registry", registry)
+    websocket = FakeWebSocket()
+
+    task = asyncio.create_task(VideoChatController(websocket).exec())
+    websocket.push_text(json.dumps({"inputText": "こんにちは"}))
+    async with asyncio.timeout(2):
+        while not any('"text"' in str(m) for m in websocket.sent):
+            await asyncio.sleep(0.005)
+
+    # ワーカーの停止時は応答中のターンを最後まで送信してから 1012 で切断する
+    await asyncio.wait_for(registry.drain(timeout_seconds=2), timeout=3)
+    await asyncio.wait_for(task, timeout=2)
+
+    # 続けて届いたテキストはまとめて送信されることがある
+    texts = [json.loads(m)["text"] for m in websocket.sent if '"text"' in str(m)]
+    assert all(f"{i}番目だにゃん。" in "".join(texts) for i in range(3))
+    assert sent_messages(websocket)[-1]["endOfTurn"] is True
+    assert websocket.close_code == 1012
+    assert registry.sessions == []
+
+    # 停止処理中は新しいセッションを受け付けない
+    rejected = FakeWebSocket()
+    await VideoChatController(rejected).exec()
+    assert not rejected.is_accepted
+    assert rejected.close_code == 1013
+
+
+@pytest.mark.asyncio
+async def test_dropped_connection_is_resumed_with_missed_messages(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    live_server = ScriptedLiveServer(
+        [[ScriptedText(text="こんにちはだにゃん。", delay_seconds=0)]]
+    )
+    tts_client = NijivoiceTtsClient(http_client=FakeTtsServer().create_http_client())
+    use_live_server(monkeypatch, live_server)
+    monkeypatch.setattr(video_chat_controller, "get_tts_client", lambda: tts_client)
+    websocket = FakeWebSocket()
+
+    task = asyncio.create_task(VideoChatController(websocket).exec())
+    websocket.push_text(json.dumps({"inputText": "こんにちは"}))
+    async with asyncio.timeout(2):
+        while not has_end_of_turn(websocket):
+            await asyncio.sleep(0.01)
+    session = sent_messages(websocket)[0]["session"]
+    assert session["resumed"] is False
+
+    # 異常終了した接続は再接続を待ち、受信済みの連番より後のメッセージを再送する
+    websocket.push_disconnect(1006)
+    await asyncio.sleep(0.05)
+    assert not task.done()
+    resumes_before = session_resumes_total.value("resumed")
+    resumed = FakeWebSocket(
+        query_params={"resumeToken": session["resumeToken"], "lastSeq": "1"}
+    )
+    resume_task = asyncio.create_task(VideoChatController(resumed).exec())
+    async with asyncio.timeout(2):
+        while not has_end_of_turn(resumed):
+            await asyncio.sleep(0.01)
+
+    messages = sent_messages(resumed)
+    assert messages[0]["session"] == {
+        "resumeToken": session["resumeToken"],
+        "resumed": True,
+        "missedMessages": 0,
+    }
+    assert [m["seq"] for m in messages[1:]] == [
+        m["seq"] for m in sent_messages(websocket)[2:]
+    ]
+    assert session_resumes_total.value("resumed") == resumes_before + 1
+    assert live_server.open_sessions != []
+
+    # 正常に切断した場合は再接続を待たずにセッションを終了する
+    resumed.push_disconnect(1000)
+    await asyncio.wait_for(resume_task, timeout=2)
+    await asyncio.wait_for(task, timeout=2)
+    assert live_server.open_sessions == []
+
+
+@pytest.mark.asyncio
+async def test_interrupt_discards_rest_of_turn_and_pending_speech(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    live_server = ScriptedLiveServer(
+        [
+            [
+                ScriptedText(text=f"{i}番目だにゃん。", delay_seconds=0.05)
+                for i in range(3)
+            ]
+        ]
+    )
+    tts_server = FakeTtsServer(latency_seconds=0.5)
+    tts_client = NijivoiceTtsClient(http_client=tts_server.create_http_client())
+    use_live_server(monkeypatch, live_server)
+    monkeypatch.setattr(video_chat_controller, "get_tts_client", lambda: tts_client)
+    websocket = FakeWebSocket()
+
+    task = asyncio.create_task(VideoChatController(websocket).exec())
+    websocket.push_text(json.dumps({"inputText": "こんにちは"}))
+    async with asyncio.timeout(2):
+        while not any("text" in m for m in sent_messages(websocket)):
+            await asyncio.sleep(0.005)
+
+    # 中断したターンの残りのテキスト・音声・endOfTurn は送信しない
+    websocket.push_text(json.dumps({"interrupt": True}))
+    async with asyncio.timeout(2):
+        while not any(m.get("interrupted") for m in sent_messages(websocket)):
+            await asyncio.sleep(0.005)
+    await asyncio.sleep(0.2)
+    messages = sent_messages(websocket)
+    assert [m for m in messages if "text" in m] == [messages[1]]
+    assert not any("audio" in m or "endOfTurn" in m for m in messages)
+
+    # 次のターンは最後まで応答する
+    websocket.push_text(json.dumps({"inputText": "もう一度"}))
+    async with asyncio.timeout(3):
+        while not has_end_of_turn(websocket):
+            await asyncio.sleep(0.01)
+    assert len([m for m in sent_messages(websocket) if "text" in m]) == 4
+
+    websocket.push_disconnect()
+    await asyncio.wait_for(task, timeout=2)
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from presentation.media_sender import MediaSender
+from presentation.video_chat_transport import MediaChunk
+from tests.fakes.fake_live_session import FakeLiveSession
+
+
+async def run_until_sent(sender: MediaSender, session: FakeLiveSession, count: int):
+    task = asyncio.create_task(sender.run())
+    try:
+        async with asyncio.timeout(1):
+            while len(session.sent) < count:
+                await asyncio.sleep(0.001)
+    finally:
+        task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_consecutive_pcm_chunks_are_coalesced():
+    session = FakeLiveSession()
+    sender = MediaSender(
+        session, min_batch_bytes=8, max_batch_bytes=8, max_batch_delay_seconds=0
+    )
+
+    for data in [b"aa", b"bb", b"cc", b"dd", b"ee"]:
+        sender.put_media(MediaChunk(mime_type="audio/pcm", data=data))
+    await run_until_sent(sender, session, 2)
+
+    assert [m["input"]["data"] for m in session.sent] == [b"aabbccdd", b"ee"]
+    assert sender.stats["sent_requests"] == 2
+    assert sender.stats["sent_chunks"] == 5
+    assert sender.stats["buffered_bytes"] == 0
+
+
+@pytest.mark.asyncio
+async def test_image_and_text_are_not_coalesced_with_audio():
+    session = FakeLiveSession()
+    sender = MediaSender(session, max_batch_delay_seconds=0)
+
+    sender.put_media(MediaChunk(mime_type="audio/pcm", data=b"a1"))
+    sender.put_media(MediaChunk(mime_type="image/jpeg", data=b"jpeg"))
+    sender.put_media(MediaChunk(mime_type="audio/pcm", data=b"a2"))
+    sender.put_text("こんにちは")
+    sender.put_media(MediaChunk(mime_type="audio/pcm", data=b"a3"))
+    await run_until_sent(sender, session, 5)
+
+    assert [m["input"] for m in session.sent] == [
+        {"mime_type": "audio/pcm", "data": b"a1"},
+        {"mime_type": "image/jpeg", "data": b"jpeg"},
+        {"mime_type": "audio/pcm", "data": b"a2"},
+        "こんにちは",
+        {"mime_type": "audio/pcm", "data": b"a3"},
+    ]
+    assert session.sent[3]["end_of_turn"] is True
+
+
+@pytest.mark.asyncio
+async def test_audio_waits_for_next_chunk_within_delay_budget():
+    session = FakeLiveSession()
+    sender = MediaSender(
+        session, min_batch_bytes=4, max_batch_bytes=16, max_batch_delay_seconds=0.5
+    )
+    task = asyncio.create_task(sender.run())
+
+    sender.put_media(MediaChunk(mime_type="audio/pcm", data=b"aa"))
+    await asyncio.sleep(0.01)
+    sender.put_media(MediaChunk(mime_type="audio/pcm", data=b"bb"))
+    await asyncio.sleep(0.01)
+    task.cancel()
+
+    assert [m["input"]["data"] for m in session.sent] == [b"aabb"]
+
+
+@pytest.mark.asyncio
+async def test_oldest_image_is_dropped_first_when_queue_is_full():
+    session = FakeLiveSession()
+    sender = MediaSender(session, max_queue_bytes=10)
+
+    sender.put_media(MediaChunk(mime_type="audio/pcm", data=b"aaaa"))
+    sender.put_media(MediaChunk(mime_type="image/jpeg", data=b"old!"))
+    sender.put_media(MediaChunk(mime_type="image/jpeg", data=b"new!"))
+
+    stats = sender.stats
+    assert stats["queue_depth"] == 2
+    assert stats["buffered_bytes"] == 8
+    assert stats["dropped_chunks"] == 1
+    assert stats["dropped_bytes"] == 4
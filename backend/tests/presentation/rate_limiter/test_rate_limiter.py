@@ -0,0 +1,142 @@
+import pytest
+
+from infrastructure.shared_store import InMemorySharedStore, RedisSharedStore
+from presentation.rate_limiter import (
+    ClientRateLimiter,
+    InboundRateLimiter,
+    SessionAdmission,
+    TokenBucket,
+    client_key,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_token_bucket_allows_burst_then_refills():
+    clock = FakeClock()
+    bucket = TokenBucket(rate_per_second=2, capacity=3, clock=clock)
+
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+    assert bucket.seconds_until_available() == 0.5
+
+    clock.now = 0.5
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+
+@pytest.mark.asyncio
+async def test_client_rate_limiter_limits_each_client_separately():
+    clock = FakeClock()
+    store = InMemorySharedStore(clock=clock)
+    limiter = ClientRateLimiter("test", per_minute=6, burst=2, store=store, clock=clock)
+
+    assert await limiter.acquire("a") == 0
+    assert await limiter.acquire("a") == 0
+    # 6回/分・連続2回なので、10秒毎に1回ずつ許可する
+    assert await limiter.acquire("a") == 10
+    assert await limiter.acquire("b") == 0
+
+    clock.now = 5
+    assert await limiter.acquire("a") == 5
+
+    clock.now = 10
+    assert await limiter.acquire("a") == 0
+    assert await limiter.acquire("a") == 10
+
+
+@pytest.mark.asyncio
+async def test_client_rate_limiter_does_not_allow_double_burst_across_window_boundary():
+    clock = FakeClock()
+    store = InMemorySharedStore(clock=clock)
+    limiter = ClientRateLimiter("test", per_minute=6, burst=2, store=store, clock=clock)
+
+    # 固定ウィンドウ（20秒）の場合、境界の直前と直後で2回ずつ、合わせて4回を連続して許可してしまう
+    clock.now = 19.9
+    assert await limiter.acquire("a") == 0
+    assert await limiter.acquire("a") == 0
+    clock.now = 20.0
+    assert await limiter.acquire("a") == pytest.approx(9.9)
+    assert await limiter.acquire("a") == pytest.approx(9.9)
+
+
+@pytest.mark.asyncio
+async def test_client_rate_limiter_shares_counts_between_workers():
+    clock = FakeClock()
+    store = InMemorySharedStore(clock=clock)
+    worker_1 = ClientRateLimiter(
+        "test", per_minute=6, burst=2, store=store, clock=clock
+    )
+    worker_2 = ClientRateLimiter(
+        "test", per_minute=6, burst=2, store=store, clock=clock
+    )
+
+    assert await worker_1.acquire("a") == 0
+    assert await worker_2.acquire("a") == 0
+    # 別のワーカーで許可した回数も数える
+    assert await worker_1.acquire("a") == 10
+    assert await worker_2.acquire("a") == 10
+
+    # バケットが満たされると状態は有効期限で削除される
+    clock.now = 20
+    assert await store.get("rate_limit:test:a") is None
+    assert await worker_2.acquire("a") == 0
+
+
+@pytest.mark.asyncio
+async def test_client_rate_limiter_allows_requests_when_store_is_unavailable():
+    store = RedisSharedStore("redis://127.0.0.1:1", timeout_seconds=0.5)
+    limiter = ClientRateLimiter("test", per_minute=6, burst=1, store=store)
+
+    try:
+        assert await limiter.acquire("a") == 0
+        assert await limiter.acquire("a") == 0
+    finally:
+        await store.close()
+
+
+def test_client_key_uses_ip_header_and_origin():
+    scope = {
+        "client": ("10.0.0.1", 50000),
+        "headers": [
+            (b"origin", b"http://localhost:3000"),
+            (b"fly-client-ip", b"203.0.113.5"),
+        ],
+    }
+
+    assert client_key(scope, "") == "10.0.0.1/http://localhost:3000"
+    assert client_key(scope, "fly-client-ip") == "203.0.113.5/http://localhost:3000"
+
+
+def test_inbound_rate_limiter_reports_exceeded_limit():
+    clock = FakeClock()
+    limiter = InboundRateLimiter(
+        max_bytes_per_second=100,
+        max_frames_per_second=2,
+        burst_seconds=1,
+        clock=clock,
+    )
+
+    assert limiter.exceeded(60) is None
+    assert limiter.exceeded(60) == "inbound_bytes"
+
+    clock.now = 1
+    assert limiter.exceeded(10) is None
+    assert limiter.exceeded(10) is None
+    assert limiter.exceeded(10) == "inbound_frames"
+
+
+def test_session_admission_rejects_sessions_over_cap():
+    admission = SessionAdmission(max_sessions=1)
+
+    assert admission.try_acquire()
+    assert not admission.try_acquire()
+
+    admission.release()
+    assert admission.try_acquire()
+    assert admission.stats == {"active": 1, "admitted": 2, "rejected": 1}
@@ -0,0 +1,189 @@
+import asyncio
+import json
+from typing import Any
+
+import pytest
+from fastapi import WebSocketDisconnect
+
+from presentation.resumable_session import (
+    OutboundBuffer,
+    ResumableSession,
+    ResumableSessionTable,
+)
+from presentation.video_chat_transport import (
+    VideoChatTransport,
+    accept_video_chat_transport,
+)
+from tests.fakes.fake_websocket import FakeWebSocket
+
+
+def sent_messages(websocket: FakeWebSocket) -> list[dict[str, Any]]:
+    return [json.loads(m) for m in websocket.sent if isinstance(m, str)]
+
+
+async def receive_until_disconnect(transport: VideoChatTransport) -> int:
+    while True:
+        try:
+            await transport.receive()
+        except WebSocketDisconnect as e:
+            return e.code
+
+
+@pytest.mark.asyncio
+async def test_buffer_evicts_oldest_and_reports_missed_messages():
+    outbound = OutboundBuffer(max_messages=3, text_coalesce_seconds=0)
+    for i in range(5):
+        await outbound.send_text(f"{i}")
+
+    # 切断中に送信したメッセージは保持し、上限を超えた古いメッセージは破棄する
+    assert outbound.stats["buffered_while_detached"] == 5
+    assert outbound.stats["evicted_messages"] == 2
+    assert outbound.missed_after(0) == 2
+    assert outbound.missed_after(2) == 0
+
+    websocket = FakeWebSocket()
+    await outbound.attach(await accept_video_chat_transport(websocket), last_seq=3)
+    assert sent_messages(websocket) == [
+        {"text": "3", "seq": 4},
+        {"text": "4", "seq": 5},
+    ]
+
+    outbound.ack(5)
+    assert outbound.stats["buffered_messages"] == 0
+
+
+@pytest.mark.asyncio
+async def test_buffer_coalesces_text_until_deadline_or_other_message():
+    outbound = OutboundBuffer(text_coalesce_seconds=0.05, text_coalesce_max_chars=8)
+    websocket = FakeWebSocket()
+    await outbound.attach(await accept_video_chat_transport(websocket), last_seq=0)
+
+    for text in ["こん", "にち", "は"]:
+        await outbound.send_text(text)
+    assert sent_messages(websocket) == []
+    # 待たずに届いたテキストは期限が来たらまとめて送信する
+    await asyncio.sleep(0.1)
+    assert sent_messages(websocket) == [{"text": "こんにちは", "seq": 1}]
+
+    # 音声・ターンの終了の前には、まとめているテキストを先に送信する
+    await outbound.send_text("今日は")
+    await outbound.send_text("晴れ")
+    await outbound.send_audio(b"RIFF", mime_type="audio/wav")
+    await outbound.send_text("です")
+    await outbound.send_end_of_turn()
+    # 上限の文字数を超えたら期限を待たずに送信する
+    await outbound.send_text("0123456789")
+    assert [m.get("text") for m in sent_messages(websocket)[1:]] == [
+        "今日は晴れ",
+        None,
+        "です",
+        None,
+        "0123456789",
+    ]
+    assert [m["seq"] for m in sent_messages(websocket)] == [1, 2, 3, 4, 5, 6]
+    assert outbound.stats["text_deltas"] == 7
+    assert outbound.stats["text_frames"] == 4
+
+
+@pytest.mark.asyncio
+async def test_abnormal_close_waits_for_resume_and_replays():
+    outbound = OutboundBuffer(text_coalesce_seconds=0)
+    session = ResumableSession(outbound, receive_until_disconnect, grace_seconds=5)
+    first = FakeWebSocket()
+    serve_task = asyncio.create_task(
+        session.serve(await accept_video_chat_transport(first))
+    )
+    await outbound.send_text("1番目")
+    await asyncio.sleep(0)
+
+    first.push_disconnect(1006)
+    await asyncio.wait_for(serve_task, timeout=1)
+    assert not session.ended
+    await outbound.send_text("2番目")
+
+    second = FakeWebSocket()
+    resume_task = asyncio.create_task(
+        session.serve(
+            await accept_video_chat_transport(second), last_seq=1, resumed=True
+        )
+    )
+    await asyncio.sleep(0.01)
+    assert sent_messages(second) == [
+        {
+            "session": {
+                "resumeToken": session.resume_token,
+                "resumed": True,
+                "missedMessages": 0,
+            }
+        },
+        {"text": "2番目", "seq": 2},
+    ]
+
+    second.push_disconnect(1000)
+    await asyncio.wait_for(resume_task, timeout=1)
+    assert session.ended
+
+
+@pytest.mark.asyncio
+async def test_session_ends_when_not_resumed_within_grace_period():
+    session = ResumableSession(
+        OutboundBuffer(), receive_until_disconnect, grace_seconds=0.01
+    )
+    websocket = FakeWebSocket()
+    websocket.push_disconnect(1006)
+    await session.serve(await accept_video_chat_transport(websocket))
+
+    assert not session.ended
+    await asyncio.wait_for(session.wait_ended(), timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_resume_takes_over_connection_that_is_still_open():
+    table = ResumableSessionTable()
+    session = ResumableSession(OutboundBuffer(), receive_until_disconnect)
+    table.add(session)
+    old = FakeWebSocket()
+    old_task = asyncio.create_task(
+        session.serve(await accept_video_chat_transport(old))
+    )
+    await asyncio.sleep(0)
+
+    found = table.find(session.resume_token)
+    assert found is session
+    new = FakeWebSocket()
+    new_task = asyncio.create_task(
+        session.serve(await accept_video_chat_transport(new), resumed=True)
+    )
+    await asyncio.wait_for(old_task, timeout=1)
+
+    # 古い接続を閉じても新しい接続のセッションは続く
+    assert old.close_code == 1000
+    assert not session.ended
+
+    await session.close(1012)
+    await asyncio.wait_for(new_task, timeout=1)
+    assert new.close_code == 1012
+    table.remove(session)
+    assert table.find(session.resume_token) is None
+
+
+class DisconnectedWebSocket(FakeWebSocket):
+    """再開トークンを受け取る前に切断されたクライアント"""
+
+    async def send_text(self, data: str) -> None:
+        raise WebSocketDisconnect(1006)
+
+
+@pytest.mark.asyncio
+async def test_attach_reports_whether_resume_reached_client():
+    outbound = OutboundBuffer(text_coalesce_seconds=0)
+    session = ResumableSession(outbound, receive_until_disconnect)
+    await outbound.send_text("1番目")
+
+    assert not await session.attach(
+        await accept_video_chat_transport(DisconnectedWebSocket()), resumed=True
+    )
+    assert await session.attach(
+        await accept_video_chat_transport(FakeWebSocket()), resumed=True
+    )
+    session.end()
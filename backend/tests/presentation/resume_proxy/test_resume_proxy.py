@@ -0,0 +1,123 @@
+import asyncio
+import json
+import socket
+import time
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+import uvicorn
+from websockets.asyncio.client import ClientConnection, connect
+
+from infrastructure.nijivoice_tts_client import NijivoiceTtsClient
+from presentation.resume_proxy import is_proxied_resume
+from server import run_worker, spawn_context
+from tests.fakes.fake_redis_server import FakeRedisServer
+from tests.fakes.fake_tts_server import FakeTtsServer
+from tests.fakes.scripted_live_server import ScriptedLiveServer, ScriptedText
+
+
+def run_fake_worker(sock: socket.socket, answer: str) -> None:
+    """GeminiとにじボイスのAPIをテストダブルに差し替え、本番と同じく run_worker で起動するワーカー"""
+    from infrastructure import gemini_client, nijivoice_tts_client
+
+    gemini_client._gemini_client = ScriptedLiveServer(
+        [[ScriptedText(text=answer, delay_seconds=0)]]
+    ).create_client()
+    nijivoice_tts_client._tts_client = NijivoiceTtsClient(
+        http_client=FakeTtsServer().create_http_client()
+    )
+    run_worker(
+        uvicorn.Config("main:app", log_level="warning"), sock, drain_timeout_seconds=1
+    )
+
+
+async def wait_until_serving(port: int) -> None:
+    async with httpx.AsyncClient() as client:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                await client.get(f"http://127.0.0.1:{port}/metrics")
+                return
+            except httpx.TransportError:
+                assert time.monotonic() < deadline
+                await asyncio.sleep(0.05)
+
+
+async def receive_turn(client: ClientConnection) -> list[dict[str, Any]]:
+    """endOfTurn までのJSONのメッセージを受信する"""
+    messages = []
+    while not messages or not messages[-1].get("endOfTurn"):
+        messages.append(json.loads(await client.recv()))
+    return messages
+
+
+def test_only_headers_on_the_worker_socket_mark_a_proxied_resume():
+    headers = [(b"x-video-chat-resumed-by", b"host:1")]
+
+    assert is_proxied_resume({"client": None, "headers": headers})
+    # TCPで受け付けた接続（接続元のアドレスがある）のヘッダーは信用しない
+    assert not is_proxied_resume({"client": ("203.0.113.1", 50000), "headers": headers})
+    assert not is_proxied_resume({"client": None, "headers": []})
+
+
+@pytest.mark.asyncio
+async def test_resume_on_another_worker_is_proxied_to_the_owning_worker(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+):
+    redis_server = FakeRedisServer()
+    await redis_server.start()
+    # ワーカーは起動時の環境変数で共有ストアとソケットの作成先を決める
+    monkeypatch.setenv("SHARED_STORE_URL", redis_server.url)
+    monkeypatch.setenv("WORKER_SOCKET_DIR", str(tmp_path))
+    monkeypatch.setenv("OPENAI_SESSION_PREFETCH_SIZE", "0")
+    monkeypatch.setenv("GEMINI_LIVE_POOL_SIZE", "0")
+
+    sockets = []
+    for _ in range(2):
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        sockets.append(sock)
+    ports = [sock.getsockname()[1] for sock in sockets]
+    workers = [
+        spawn_context.Process(target=run_fake_worker, args=(sock, f"{name}だにゃん。"))
+        for sock, name in zip(sockets, ["worker-1", "worker-2"])
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        await asyncio.gather(*[wait_until_serving(port) for port in ports])
+        url = "ws://127.0.0.1:{}/realtime-apis/video-chat"
+
+        async with connect(url.format(ports[0])) as first:
+            resume_token = json.loads(await first.recv())["session"]["resumeToken"]
+            await first.send(json.dumps({"inputText": "こんにちは"}))
+            first_turn = await receive_turn(first)
+            # クローズフレームを送らずに切断する（ネットワークの切断）
+            first.transport.abort()
+
+        # 別のワーカーに再接続しても、セッションを持っているワーカーに中継して再開する
+        async with connect(
+            url.format(ports[1])
+            + f"?resumeToken={resume_token}&lastSeq={first_turn[-1]['seq']}"
+        ) as second:
+            assert json.loads(await second.recv())["session"] == {
+                "resumeToken": resume_token,
+                "resumed": True,
+                "missedMessages": 0,
+            }
+            await second.send(json.dumps({"inputText": "もう一度"}))
+            second_turn = await receive_turn(second)
+
+        texts = [m["text"] for m in second_turn if "text" in m]
+        assert texts and all("worker-1だにゃん。" in text for text in texts)
+        assert second_turn[0]["seq"] == first_turn[-1]["seq"] + 1
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            await asyncio.to_thread(worker.join, 10)
+        for sock in sockets:
+            sock.close()
+        await redis_server.close()
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from infrastructure.shared_store import InMemorySharedStore
+from presentation.session_registry import SessionRegistry
+
+
+class FakeClock:
+    def __init__(self, now: float) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_drain_waits_for_turn_in_progress():
+    registry = SessionRegistry(InMemorySharedStore(), worker_id="worker-1")
+    idle_session = registry.register(object(), "gemini")
+    busy_session = registry.register(object(), "gemini")
+    busy_session.start_turn()
+
+    drain_task = asyncio.create_task(registry.drain(timeout_seconds=1))
+    await asyncio.wait_for(idle_session.wait_for_drain(), timeout=1)
+    assert registry.draining
+
+    # 応答中のターンが終わるまでは終了を要求しない
+    busy_waiter = asyncio.create_task(busy_session.wait_for_drain())
+    await asyncio.sleep(0.05)
+    assert not busy_waiter.done()
+    busy_session.end_turn()
+    await asyncio.wait_for(busy_waiter, timeout=1)
+    assert busy_session.record["turns"] == 1
+
+    registry.unregister(idle_session)
+    registry.unregister(busy_session)
+    await asyncio.wait_for(drain_task, timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_drain_gives_up_after_timeout():
+    registry = SessionRegistry(InMemorySharedStore(), worker_id="worker-1")
+    session = registry.register(object(), "gemini")
+    session.start_turn()
+
+    await asyncio.wait_for(registry.drain(timeout_seconds=0.05), timeout=1)
+
+    assert [s["session_id"] for s in registry.sessions] == [session.session_id]
+    # 停止処理中に登録されたセッションにはすぐに終了を要求する
+    late_session = registry.register(object(), "gemini")
+    await asyncio.wait_for(late_session.wait_for_drain(), timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_cluster_sessions_lists_live_workers_from_shared_store():
+    store = InMemorySharedStore()
+    clock = FakeClock(1000.0)
+    worker_1 = SessionRegistry(store, worker_id="worker-1", clock=clock)
+    worker_2 = SessionRegistry(store, worker_id="worker-2", clock=clock)
+    worker_3 = SessionRegistry(store, worker_id="worker-3", clock=clock)
+    session = worker_2.register(object(), "gemini")
+    session.count_received()
+    session.count_sent()
+    await worker_3.publish()
+    clock.now += 10
+    await worker_2.publish()
+
+    # 更新が途絶えたワーカー（worker-3）は一覧から除き、共有ストアからも削除する
+    clock.now += 10
+    workers = await worker_1.cluster_sessions()
+
+    assert [w["worker_id"] for w in workers] == ["worker-1", "worker-2"]
+    assert workers[1]["sessions"] == [session.record]
+    assert session.record["worker_id"] == "worker-2"
+    assert session.record["messages_received"] == 1
+    assert session.record["messages_sent"] == 1
+    assert "worker-3" not in await store.hgetall("video_chat:workers")
+
+    await worker_2.close()
+    assert "worker-2" not in await store.hgetall("video_chat:workers")
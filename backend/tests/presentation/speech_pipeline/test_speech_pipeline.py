@@ -0,0 +1,151 @@
+import asyncio
+
+import pytest
+
+from infrastructure.nijivoice_tts_client import NijivoiceTtsClient
+from presentation.speech_pipeline import SpeechPipeline
+from tests.fakes.fake_tts_server import FakeTtsServer
+
+
+class SentMessages:
+    def __init__(self) -> None:
+        self.messages: list[str] = []
+        self.end_of_turn = asyncio.Event()
+        self.audio_sent = asyncio.Event()
+
+    async def send_audio(self, base64_audio: str, mime_type: str) -> None:
+        self.messages.append(base64_audio)
+        self.audio_sent.set()
+
+    async def send_end_of_turn(self) -> None:
+        self.messages.append("endOfTurn")
+        self.end_of_turn.set()
+
+
+@pytest.mark.asyncio
+async def test_audio_is_sent_in_sentence_order_before_end_of_turn():
+    # 先頭の文ほど音声合成に時間がかかるようにして、完了順と文の順番を逆転させる
+    latencies = {"一文目だにゃん。": 0.06, "二文目だにゃん。": 0.03}
+    fake_server = FakeTtsServer(latency_seconds=lambda script: latencies.get(script, 0))
+    sent = SentMessages()
+    pipeline = SpeechPipeline(
+        tts_client=NijivoiceTtsClient(http_client=fake_server.create_http_client()),
+        send_audio=sent.send_audio,
+        send_end_of_turn=sent.send_end_of_turn,
+        min_segment_length=1,
+    )
+
+    pipeline.feed("一文目だにゃん。二文目")
+    pipeline.feed("だにゃん。三文目")
+    pipeline.end_turn()
+    await asyncio.wait_for(sent.end_of_turn.wait(), timeout=1)
+    await pipeline.aclose()
+
+    assert sent.messages == [
+        FakeTtsServer.encode_audio("一文目だにゃん。"),
+        FakeTtsServer.encode_audio("二文目だにゃん。"),
+        FakeTtsServer.encode_audio("三文目"),
+        "endOfTurn",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_synthesis_starts_before_end_of_turn():
+    fake_server = FakeTtsServer()
+    sent = SentMessages()
+    pipeline = SpeechPipeline(
+        tts_client=NijivoiceTtsClient(http_client=fake_server.create_http_client()),
+        send_audio=sent.send_audio,
+        send_end_of_turn=sent.send_end_of_turn,
+        min_segment_length=1,
+    )
+
+    pipeline.feed("おもちだにゃん🐱よろしく")
+    # ターンが終わる前に、区切りまでの文の音声が送信される
+    await asyncio.wait_for(sent.audio_sent.wait(), timeout=5)
+
+    assert fake_server.scripts == ["おもちだにゃん🐱"]
+    assert sent.messages == [FakeTtsServer.encode_audio("おもちだにゃん🐱")]
+    assert "endOfTurn" not in sent.messages
+    await pipeline.aclose()
+
+
+@pytest.mark.asyncio
+async def test_failed_sentence_is_skipped():
+    fake_server = FakeTtsServer(failure_status_codes=[400])
+    sent = SentMessages()
+    pipeline = SpeechPipeline(
+        tts_client=NijivoiceTtsClient(http_client=fake_server.create_http_client()),
+        send_audio=sent.send_audio,
+        send_end_of_turn=sent.send_end_of_turn,
+        min_segment_length=1,
+    )
+
+    pipeline.feed("失敗する文。")
+    await asyncio.sleep(0.01)
+    pipeline.feed("成功する文。")
+    pipeline.end_turn()
+    await asyncio.wait_for(sent.end_of_turn.wait(), timeout=1)
+    await pipeline.aclose()
+
+    assert sent.messages == [FakeTtsServer.encode_audio("成功する文。"), "endOfTurn"]
+
+
+@pytest.mark.asyncio
+async def test_interrupt_cancels_pending_sentences_and_end_of_turn():
+    fake_server = FakeTtsServer(latency_seconds=lambda script: 0.05)
+    sent = SentMessages()
+    pipeline = SpeechPipeline(
+        tts_client=NijivoiceTtsClient(http_client=fake_server.create_http_client()),
+        send_audio=sent.send_audio,
+        send_end_of_turn=sent.send_end_of_turn,
+        min_segment_length=1,
+    )
+
+    pipeline.feed("一文目だにゃん。二文目だにゃん。三文目")
+    pipeline.end_turn()
+    assert pipeline.responding
+
+    # 割り込まれたターンの音声とターン終了は送信しない
+    assert await pipeline.interrupt() == 3
+    assert not pipeline.responding
+
+    # 次のターンはそのまま続けて使える
+    pipeline.feed("次のターン。")
+    pipeline.end_turn()
+    await asyncio.wait_for(sent.end_of_turn.wait(), timeout=1)
+    await pipeline.aclose()
+
+    assert sent.messages == [FakeTtsServer.encode_audio("次のターン。"), "endOfTurn"]
+
+
+@pytest.mark.asyncio
+async def test_turn_becomes_text_only_after_deadline():
+    latencies = {"遅い文。": 1.0}
+    fake_server = FakeTtsServer(latency_seconds=lambda script: latencies.get(script, 0))
+    sent = SentMessages()
+    pipeline = SpeechPipeline(
+        tts_client=NijivoiceTtsClient(http_client=fake_server.create_http_client()),
+        send_audio=sent.send_audio,
+        send_end_of_turn=sent.send_end_of_turn,
+        min_segment_length=1,
+        turn_deadline_seconds=0.05,
+    )
+
+    # 期限を過ぎた文以降は、音声合成が間に合った文も含めて音声を送信しない
+    pipeline.feed("速い文。遅い文。その次の文。")
+    pipeline.end_turn()
+    await asyncio.wait_for(sent.end_of_turn.wait(), timeout=1)
+    assert sent.messages == [FakeTtsServer.encode_audio("速い文。"), "endOfTurn"]
+
+    # 次のターンは新しい期限で音声を送信する
+    sent.end_of_turn.clear()
+    pipeline.feed("次のターン。")
+    pipeline.end_turn()
+    await asyncio.wait_for(sent.end_of_turn.wait(), timeout=1)
+    await pipeline.aclose()
+
+    assert sent.messages[-2:] == [
+        FakeTtsServer.encode_audio("次のターン。"),
+        "endOfTurn",
+    ]
@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+from presentation.startup_warmup import StartupWarmup
+
+
+@pytest.mark.asyncio
+async def test_ready_after_all_steps_complete():
+    warmup = StartupWarmup()
+    release = asyncio.Event()
+
+    async def slow_step() -> None:
+        await release.wait()
+
+    async def fast_step() -> None:
+        pass
+
+    assert not warmup.ready
+    warmup.start({"slow": slow_step, "fast": fast_step})
+    await asyncio.sleep(0)
+    assert not warmup.ready
+    assert [step["done"] for step in warmup.steps] == [False, True]
+
+    release.set()
+    await warmup.wait()
+    assert warmup.ready
+    assert warmup.report(draining=False)["ready"]
+    # 停止処理中は新しい接続を受け付けないので ready にしない
+    assert not warmup.report(draining=True)["ready"]
+
+
+@pytest.mark.asyncio
+async def test_failed_step_is_reported_and_not_ready():
+    warmup = StartupWarmup()
+
+    async def failing_step() -> None:
+        raise ValueError("API key must be set")
+
+    warmup.start({"gemini_client": failing_step})
+    await warmup.wait()
+
+    assert not warmup.ready
+    [step] = warmup.steps
+    assert step["done"]
+    assert step["error"] is not None and "API key" in step["error"]
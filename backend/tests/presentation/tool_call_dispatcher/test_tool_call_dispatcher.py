@@ -0,0 +1,145 @@
+import asyncio
+from typing import TypedDict
+
+import pytest
+from google.genai import types
+
+from domain.tool_registry import ToolRegistry
+from presentation.tool_call_dispatcher import ToolCallDispatcher
+from tests.fakes.fake_live_session import FakeLiveSession
+
+
+class SleepDto(TypedDict):
+    seconds: float
+
+
+class SleepResult(TypedDict):
+    slept: float
+
+
+def create_registry(started: list[str] | None = None) -> ToolRegistry:
+    async def sleep(dto: SleepDto) -> SleepResult:
+        if started is not None:
+            started.append(f"sleep {dto['seconds']}")
+        await asyncio.sleep(dto["seconds"])
+        return SleepResult(slept=dto["seconds"])
+
+    registry = ToolRegistry()
+    registry.register("sleep", "指定した秒数待つ", SleepDto, sleep, timeout_seconds=0.5)
+    return registry
+
+
+def function_call(call_id: str | None, seconds: float) -> types.FunctionCall:
+    return types.FunctionCall(
+        id=call_id, name="sleep", args={"dto": {"seconds": seconds}}
+    )
+
+
+async def wait_for_batches(dispatcher: ToolCallDispatcher) -> None:
+    async with asyncio.timeout(2):
+        while dispatcher.stats["in_flight"] > 0:
+            await asyncio.sleep(0.001)
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_calls_run_concurrently_and_results_are_batched():
+    session = FakeLiveSession()
+    dispatcher = ToolCallDispatcher(create_registry(), session)
+
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+    dispatcher.dispatch([function_call("call-1", 0.1), function_call("call-2", 0.1)])
+    await wait_for_batches(dispatcher)
+
+    assert loop.time() - started_at < 0.19
+    assert session.sent == [
+        {
+            "input": [
+                {"id": "call-1", "name": "sleep", "response": {"slept": 0.1}},
+                {"id": "call-2", "name": "sleep", "response": {"slept": 0.1}},
+            ],
+            "end_of_turn": False,
+        }
+    ]
+
+
+@pytest.mark.asyncio
+async def test_calls_without_id_are_tracked_separately():
+    session = FakeLiveSession()
+    dispatcher = ToolCallDispatcher(create_registry(), session)
+
+    dispatcher.dispatch([function_call(None, 0.05), function_call(None, 0.1)])
+    assert dispatcher.stats["in_flight"] == 2
+    await wait_for_batches(dispatcher)
+
+    assert [r["id"] for r in session.sent[0]["input"]] == ["", ""]
+    assert [r["response"] for r in session.sent[0]["input"]] == [
+        {"slept": 0.05},
+        {"slept": 0.1},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_dispatch_does_not_block_caller():
+    session = FakeLiveSession()
+    dispatcher = ToolCallDispatcher(create_registry(), session)
+
+    dispatcher.dispatch([function_call("call-1", 0.3)])
+
+    assert dispatcher.stats["in_flight"] == 1
+    assert session.sent == []
+    await dispatcher.aclose()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_calls_are_stopped_and_omitted():
+    session = FakeLiveSession()
+    dispatcher = ToolCallDispatcher(create_registry(), session)
+
+    dispatcher.dispatch([function_call("call-1", 0.05), function_call("call-2", 10)])
+    await asyncio.sleep(0.01)
+    dispatcher.cancel(["call-2"])
+    await wait_for_batches(dispatcher)
+
+    assert [r["id"] for r in session.sent[0]["input"]] == ["call-1"]
+    assert dispatcher.stats["cancelled"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failures_are_returned_as_errors():
+    session = FakeLiveSession()
+    dispatcher = ToolCallDispatcher(create_registry(), session)
+
+    dispatcher.dispatch(
+        [
+            function_call("timeout", 1),
+            types.FunctionCall(id="invalid", name="sleep", args={"dto": {}}),
+            types.FunctionCall(id="unknown", name="unknown", args={}),
+        ]
+    )
+    await wait_for_batches(dispatcher)
+
+    responses = {r["id"]: r["response"] for r in session.sent[0]["input"]}
+    assert set(responses) == {"timeout", "invalid", "unknown"}
+    assert all("error" in response for response in responses.values())
+    assert dispatcher.stats["failures"] == 3
+
+
+@pytest.mark.asyncio
+async def test_call_completion_is_reported_with_latency_and_result():
+    completed: list[tuple[float, bool]] = []
+    dispatcher = ToolCallDispatcher(
+        create_registry(),
+        FakeLiveSession(),
+        on_call_complete=lambda seconds, ok: completed.append((seconds, ok)),
+    )
+
+    dispatcher.dispatch([function_call("call-1", 0.01)])
+    dispatcher.dispatch(
+        [types.FunctionCall(id="call-2", name="missing", args={"dto": {}})]
+    )
+    await wait_for_batches(dispatcher)
+
+    assert sorted(ok for _, ok in completed) == [False, True]
+    assert all(seconds >= 0 for seconds, _ in completed)
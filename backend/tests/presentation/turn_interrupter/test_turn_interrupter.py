@@ -0,0 +1,85 @@
+import pytest
+
+from infrastructure.nijivoice_tts_client import NijivoiceTtsClient
+from presentation.speech_pipeline import SpeechPipeline
+from presentation.turn_interrupter import InterruptSource, TurnInterrupter
+from tests.fakes.fake_tts_server import FakeTtsServer
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.messages: list[str] = []
+        self.sources: list[InterruptSource] = []
+
+    async def send_audio(self, base64_audio: str, mime_type: str) -> None:
+        self.messages.append(base64_audio)
+
+    async def send_end_of_turn(self) -> None:
+        self.messages.append("endOfTurn")
+
+    async def send_interrupted(self) -> None:
+        self.messages.append("interrupted")
+
+
+def create_interrupter(recorder: Recorder) -> tuple[TurnInterrupter, SpeechPipeline]:
+    pipeline = SpeechPipeline(
+        tts_client=NijivoiceTtsClient(
+            http_client=FakeTtsServer(latency_seconds=1).create_http_client()
+        ),
+        send_audio=recorder.send_audio,
+        send_end_of_turn=recorder.send_end_of_turn,
+        min_segment_length=1,
+    )
+    interrupter = TurnInterrupter(
+        pipeline, recorder.send_interrupted, on_interrupt=recorder.sources.append
+    )
+    return interrupter, pipeline
+
+
+@pytest.mark.asyncio
+async def test_nothing_to_interrupt_when_idle():
+    recorder = Recorder()
+    interrupter, _ = create_interrupter(recorder)
+
+    assert not await interrupter.interrupt("speech")
+    assert recorder.messages == []
+    assert interrupter.stats["interruptions"] == 0
+
+
+@pytest.mark.asyncio
+async def test_rest_of_interrupted_turn_is_discarded_until_turn_complete():
+    recorder = Recorder()
+    interrupter, pipeline = create_interrupter(recorder)
+
+    assert interrupter.receive_part()
+    pipeline.feed("一文目だにゃん。二文目")
+    assert await interrupter.interrupt("client")
+
+    assert not interrupter.receive_part()
+    assert not interrupter.complete_turn()
+    # 次のターンの応答は送信する
+    assert interrupter.receive_part()
+    assert interrupter.complete_turn()
+
+    assert recorder.messages == ["interrupted"]
+    assert recorder.sources == ["client"]
+    assert interrupter.stats == {
+        "interruptions": 1,
+        "cancelled_segments": 1,
+        "discarded_parts": 1,
+    }
+    await pipeline.aclose()
+
+
+@pytest.mark.asyncio
+async def test_gemini_interruption_does_not_discard_next_turn():
+    recorder = Recorder()
+    interrupter, pipeline = create_interrupter(recorder)
+
+    assert interrupter.receive_part()
+    assert await interrupter.interrupt("gemini")
+
+    # Geminiが生成を止めた後に受信する応答は次のターンのもの
+    assert interrupter.receive_part()
+    assert recorder.sources == ["gemini"]
+    await pipeline.aclose()
@@ -0,0 +1,76 @@
+import logging
+
+import pytest
+
+from presentation.video_chat_metrics import (
+    SessionMetrics,
+    active_sessions,
+    span_seconds,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_turn_spans_are_measured_from_user_input():
+    clock = FakeClock()
+    metrics = SessionMetrics(trace_sample_rate=0, clock=clock)
+    ttft_count = span_seconds.count("time_to_first_token")
+    end_of_turn_count = span_seconds.count("end_of_turn")
+
+    # ユーザーの入力前に受信した応答は最初の応答までの時間に含めない
+    metrics.receive_part()
+    assert span_seconds.count("time_to_first_token") == ttft_count
+
+    metrics.start_turn()
+    clock.now += 0.4
+    metrics.receive_part()
+    clock.now += 0.1
+    metrics.receive_part()
+    metrics.complete_turn()
+    clock.now += 0.2
+    metrics.end_turn()
+
+    assert span_seconds.count("time_to_first_token") == ttft_count + 1
+    assert span_seconds.count("end_of_turn") == end_of_turn_count + 1
+
+
+def test_active_sessions_gauge_follows_open_and_close():
+    metrics = SessionMetrics()
+    before = active_sessions.value
+
+    metrics.open()
+    assert active_sessions.value == before + 1
+    metrics.close()
+    metrics.close()
+    assert active_sessions.value == before
+
+
+def test_sampled_turn_is_logged_as_single_trace(caplog: pytest.LogCaptureFixture):
+    clock = FakeClock()
+    metrics = SessionMetrics(trace_sample_rate=1, clock=clock)
+    caplog.set_level(logging.INFO, logger="presentation.video_chat_metrics")
+    logging.getLogger().addHandler(caplog.handler)
+
+    try:
+        metrics.start_turn()
+        clock.now += 0.5
+        metrics.receive_part()
+        metrics.observe("tts", 0.25)
+        metrics.end_turn()
+    finally:
+        logging.getLogger().removeHandler(caplog.handler)
+
+    traces = [
+        r for r in caplog.records if r.getMessage().startswith("ターンのトレース")
+    ]
+    assert len(traces) == 1
+    assert '"span": "time_to_first_token", "start_ms": 0.0, "duration_ms": 500.0' in (
+        traces[0].getMessage()
+    )
+    assert '"span": "tts"' in traces[0].getMessage()
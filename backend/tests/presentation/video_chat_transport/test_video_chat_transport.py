@@ -0,0 +1,156 @@
+import base64
+import json
+
+import pytest
+from fastapi import WebSocketDisconnect
+
+from presentation.rate_limiter import InboundRateLimiter, InboundRateLimitExceeded
+from presentation.video_chat_transport import accept_video_chat_transport
+from presentation.websocket_frame import (
+    BINARY_SUBPROTOCOL,
+    BinaryFrame,
+    FrameKind,
+    decode_frame,
+    encode_frame,
+)
+from tests.fakes.fake_websocket import FakeWebSocket
+
+
+@pytest.mark.asyncio
+async def test_json_protocol_is_used_by_default():
+    websocket = FakeWebSocket()
+    transport = await accept_video_chat_transport(websocket)
+
+    websocket.push_text(
+        json.dumps(
+            {
+                "realtimeInput": {
+                    "mediaChunks": [
+                        {
+                            "mimeType": "audio/pcm",
+                            "data": base64.b64encode(b"pcm").decode(),
+                        }
+                    ]
+                }
+            }
+        )
+    )
+    message = await transport.receive()
+    await transport.send_audio(b"wav")
+
+    assert transport.protocol == "json"
+    assert websocket.accepted_subprotocol is None
+    assert message == {"media_chunks": [{"mime_type": "audio/pcm", "data": b"pcm"}]}
+    assert websocket.sent == [json.dumps({"audio": base64.b64encode(b"wav").decode()})]
+
+
+@pytest.mark.asyncio
+async def test_binary_protocol_is_negotiated():
+    websocket = FakeWebSocket(subprotocols=[BINARY_SUBPROTOCOL])
+    transport = await accept_video_chat_transport(websocket)
+
+    websocket.push_bytes(
+        encode_frame(
+            BinaryFrame(
+                kind=FrameKind.MEDIA_CHUNK,
+                mime_type="image/jpeg",
+                sequence=1,
+                timestamp_ms=0,
+                payload=b"jpeg",
+            )
+        )
+    )
+    websocket.push_text(json.dumps({"inputText": "こんにちは"}))
+    media_message = await transport.receive()
+    text_message = await transport.receive()
+    await transport.send_base64_audio(base64.b64encode(b"wav").decode())
+    await transport.send_end_of_turn()
+
+    assert transport.protocol == "binary"
+    assert websocket.accepted_subprotocol == BINARY_SUBPROTOCOL
+    assert media_message == {
+        "media_chunks": [{"mime_type": "image/jpeg", "data": b"jpeg"}]
+    }
+    assert text_message == {"input_text": "こんにちは"}
+    audio_frame = decode_frame(websocket.sent[0])
+    assert audio_frame["kind"] == FrameKind.AUDIO
+    assert audio_frame["mime_type"] == "audio/wav"
+    assert audio_frame["payload"] == b"wav"
+    assert websocket.sent[1] == json.dumps({"endOfTurn": True})
+
+
+@pytest.mark.asyncio
+async def test_invalid_binary_frame_is_ignored():
+    websocket = FakeWebSocket(subprotocols=[BINARY_SUBPROTOCOL])
+    transport = await accept_video_chat_transport(websocket)
+
+    websocket.push_bytes(b"broken")
+
+    assert await transport.receive() == {}
+
+
+@pytest.mark.asyncio
+async def test_receive_raises_websocket_disconnect():
+    websocket = FakeWebSocket()
+    transport = await accept_video_chat_transport(websocket)
+
+    websocket.push_disconnect()
+
+    with pytest.raises(WebSocketDisconnect):
+        await transport.receive()
+
+
+@pytest.mark.asyncio
+async def test_receive_raises_when_inbound_limit_is_exceeded():
+    websocket = FakeWebSocket()
+    transport = await accept_video_chat_transport(
+        websocket,
+        InboundRateLimiter(
+            max_bytes_per_second=1024, max_frames_per_second=0, burst_seconds=1
+        ),
+    )
+
+    websocket.push_text(json.dumps({"inputText": "こんにちは"}))
+    websocket.push_text(json.dumps({"inputText": "a" * 1024}))
+
+    assert await transport.receive() == {"input_text": "こんにちは"}
+    with pytest.raises(InboundRateLimitExceeded) as exc_info:
+        await transport.receive()
+    assert exc_info.value.limit == "inbound_bytes"
+
+
+@pytest.mark.asyncio
+async def test_sequence_and_session_messages_are_sent_as_json():
+    websocket = FakeWebSocket()
+    transport = await accept_video_chat_transport(websocket)
+
+    websocket.push_text(json.dumps({"ack": 3}))
+    message = await transport.receive()
+    await transport.send_session("token", resumed=True, missed_messages=2)
+    await transport.send_text("こんにちは", sequence=4)
+
+    assert message == {"ack": 3}
+    assert [json.loads(m) for m in websocket.sent] == [
+        {"session": {"resumeToken": "token", "resumed": True, "missedMessages": 2}},
+        {"text": "こんにちは", "seq": 4},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_compressed_audio_carries_mime_type():
+    json_websocket = FakeWebSocket()
+    json_transport = await accept_video_chat_transport(json_websocket)
+    binary_websocket = FakeWebSocket(subprotocols=[BINARY_SUBPROTOCOL])
+    binary_transport = await accept_video_chat_transport(binary_websocket)
+    base64_audio = base64.b64encode(b"ogg").decode()
+
+    await json_transport.send_base64_audio(base64_audio, "audio/ogg; codecs=opus")
+    await binary_transport.send_base64_audio(base64_audio, "audio/ogg; codecs=opus")
+
+    assert json.loads(json_websocket.sent[0]) == {
+        "audio": base64_audio,
+        "mimeType": "audio/ogg; codecs=opus",
+    }
+    frame = decode_frame(binary_websocket.sent[0])
+    assert frame["mime_type"] == "audio/ogg"
+    assert frame["payload"] == b"ogg"
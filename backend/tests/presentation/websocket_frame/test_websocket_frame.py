@@ -0,0 +1,50 @@
+import pytest
+
+from presentation.websocket_frame import (
+    HEADER,
+    BinaryFrame,
+    FrameKind,
+    InvalidFrameError,
+    decode_frame,
+    encode_frame,
+)
+
+
+def test_encode_and_decode_frame():
+    frame = BinaryFrame(
+        kind=FrameKind.MEDIA_CHUNK,
+        mime_type="audio/pcm",
+        sequence=42,
+        timestamp_ms=1_700_000_000_000,
+        payload=b"\x00\x01\x02\x03",
+    )
+
+    encoded = encode_frame(frame)
+
+    assert len(encoded) == HEADER.size + 4
+    assert decode_frame(encoded) == frame
+
+
+def test_decode_frame_raises_error_when_frame_is_too_short():
+    with pytest.raises(InvalidFrameError):
+        decode_frame(b"\x01\x01")
+
+
+def test_decode_frame_raises_error_when_mime_type_is_unknown():
+    data = HEADER.pack(1, FrameKind.MEDIA_CHUNK, 99, 1, 0) + b"payload"
+
+    with pytest.raises(InvalidFrameError):
+        decode_frame(data)
+
+
+def test_encode_frame_raises_error_when_mime_type_is_unsupported():
+    frame = BinaryFrame(
+        kind=FrameKind.AUDIO,
+        mime_type="video/mp4",
+        sequence=1,
+        timestamp_ms=0,
+        payload=b"",
+    )
+
+    with pytest.raises(InvalidFrameError):
+        encode_frame(frame)
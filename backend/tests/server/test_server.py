@@ -0,0 +1,52 @@
+import os
+import signal
+import time
+import tomllib
+from pathlib import Path
+
+import httpx
+import uvicorn
+
+from server import WORKER_SHUTDOWN_GRACE_SECONDS, run_worker, spawn_context
+
+FLY_TOML = Path(__file__).parents[2] / "fly.toml"
+
+
+def test_fly_kill_timeout_covers_graceful_drain():
+    fly_config = tomllib.loads(FLY_TOML.read_text())
+    drain_timeout_seconds = float(fly_config["env"]["SHUTDOWN_DRAIN_TIMEOUT_SECONDS"])
+
+    # Fly.io のデフォルト（SIGINT、5秒）のままだと、セッションの終了を待つ前にマシンが停止される
+    assert fly_config["kill_signal"] == "SIGTERM"
+    assert (
+        fly_config["kill_timeout"]
+        > drain_timeout_seconds + WORKER_SHUTDOWN_GRACE_SECONDS
+    )
+
+
+def test_worker_process_serves_on_shared_socket_and_stops_on_sigterm():
+    config = uvicorn.Config("main:app", host="127.0.0.1", port=0, log_level="warning")
+    sock = config.bind_socket()
+    port = sock.getsockname()[1]
+    process = spawn_context.Process(target=run_worker, args=(config, sock, 1.0))
+    process.start()
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                response = httpx.get(f"http://127.0.0.1:{port}/metrics")
+                break
+            except httpx.TransportError:
+                assert process.is_alive() and time.monotonic() < deadline
+                time.sleep(0.05)
+        assert response.status_code == 200
+
+        assert process.pid is not None
+        os.kill(process.pid, signal.SIGTERM)
+        process.join(10)
+        # uvicorn は停止処理の後に受け取ったシグナルを送出し直して終了する
+        assert process.exitcode == -signal.SIGTERM
+    finally:
+        if process.is_alive():
+            process.kill()
+        sock.close()
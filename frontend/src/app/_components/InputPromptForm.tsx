@@ -28,6 +28,8 @@ const AssistantResponseSchema = z.object({
   text: z.string().optional(),
   audio: z.string().optional(),
   endOfTurn: z.boolean().optional(),
+  // ユーザーが応答中に話し始めた等で、サーバーがターンを中断した場合に届く
+  interrupted: z.boolean().optional(),
 });
 
 type AssistantResponse = z.infer<typeof AssistantResponseSchema>;
@@ -62,11 +64,15 @@ export function InputPromptForm() {
   const audioWorkletNodeRef = useRef<AudioWorkletNode | null>(null);
   const sourceRef = useRef<MediaStreamAudioSourceNode | null>(null);
   const audioUrl = useRef<string | undefined>(undefined);
+  // 文単位で届く音声データの再生待ちキュー
+  const audioQueue = useRef<string[]>([]);
+  const isAudioPlaying = useRef(false);
   const currentAudio = useRef<AudioBufferSourceNode | null>(null);
   const [streamingMessage, setStreamingMessage] = useState<string>('');
 
   // 現在再生中の音声を停止する関数
   const stopCurrentAudio = useCallback(() => {
+    audioQueue.current = [];
     if (currentAudio.current) {
       try {
         currentAudio.current.stop();
@@ -114,22 +120,29 @@ export function InputPromptForm() {
     }
   }, [isAudioInitialized]);
 
-  // 音声再生関数を修正
+  // キューに積まれた音声を順番に再生する
   const playAudio = async () => {
     log.info('playAudio関数が呼び出されました');
+
+    // 再生中の場合は再生終了後にキューから再生される
+    if (isAudioPlaying.current) {
+      return;
+    }
+
+    audioUrl.current = audioQueue.current.shift();
     log.info(`現在の状態 - audioUrl存在: ${!!audioUrl.current}, isAudioInitialized: ${isAudioInitialized}, audioContext状態: ${playAudioContextRef.current?.state}`);
 
     if (!audioUrl.current) {
-      log.warn('audioUrlが設定されていません');
+      log.info('再生待ちの音声はありません');
       return;
     }
 
-    // 新しい音声が送信された場合は既存の音声を停止
-    stopCurrentAudio();
+    isAudioPlaying.current = true;
 
     try {
       if (!playAudioContextRef.current) {
         log.warn('AudioContextが初期化されていません');
+        isAudioPlaying.current = false;
         return;
       }
 
@@ -155,7 +168,9 @@ export function InputPromptForm() {
       source.onended = () => {
         currentAudio.current = null;
         audioUrl.current = undefined;
+        isAudioPlaying.current = false;
         setIsSpeaking(false);
+        playAudio();
       };
 
       // 再生開始
@@ -164,6 +179,7 @@ export function InputPromptForm() {
     catch (error) {
       log.error(`音声再生エラー`);
       console.error(error);
+      isAudioPlaying.current = false;
       setIsSpeaking(false);
     }
   };
@@ -188,11 +204,6 @@ export function InputPromptForm() {
           return;
         }
 
-        // ユーザーからの新しい入力があった場合は再生中の音声を停止
-        if (assistantResponse.text || assistantResponse.audio) {
-          stopCurrentAudio();
-        }
-
         if (assistantResponse.text != null && assistantResponse.text) {
           newResponseMessage += assistantResponse.text;
           setStreamingMessage(newResponseMessage);
@@ -208,10 +219,24 @@ export function InputPromptForm() {
           setStreamingMessage('');
         }
 
+        if (assistantResponse.interrupted === true) {
+          // 中断されたターンの音声は再生せず、途中までの応答をメッセージとして残す
+          stopCurrentAudio();
+          const interruptedMessage = newResponseMessage;
+          if (interruptedMessage) {
+            setMessages(prev => [...prev, {
+              role: 'assistant',
+              message: interruptedMessage,
+            }]);
+          }
+          newResponseMessage = '';
+          setStreamingMessage('');
+        }
+
         if (assistantResponse.audio) {
           log.info('音声データを受信:', assistantResponse.audio.substring(0, 50));
-          audioUrl.current = assistantResponse.audio;
-          log.info('音声URL設定:', audioUrl.current?.substring(0, 50));
+          // 音声は文単位で届くので、再生中の音声を止めずにキューに積んで順番に再生する
+          audioQueue.current.push(assistantResponse.audio);
 
           // 音声初期化が必要な場合は初期化を行う
           if (!isAudioInitialized) {